@@ -15,6 +15,7 @@ from gemini_client import GeminiClient
 from services.claude_service import ClaudeService
 from services.gpt_service import GPTService
 from gemini_prompts import GeminiPrompts
+from provider_throttle import athrottle
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -568,11 +569,14 @@ class AIOrchestrator:
         Para GPT, utiliza schema/JSON estrito e retries (implementado no serviço).
         """
         if provider == "gemini":
-            return await asyncio.to_thread(self.gemini_client.generate_content, prompt)
+            async with athrottle("gemini"):
+                return await asyncio.to_thread(self.gemini_client.generate_content, prompt)
         elif provider == "claude":
-            return await self.claude_service.generate_script(prompt)
+            async with athrottle("claude"):
+                return await self.claude_service.generate_script(prompt)
         elif provider == "gpt":
-            return await self.gpt_service.generate_script(prompt, json_schema=json_schema)
+            async with athrottle("gpt"):
+                return await self.gpt_service.generate_script(prompt, json_schema=json_schema)
 
         logger.error(f"❌ Provedor de IA '{provider}' não suportado.")
         return None
@@ -10,22 +10,37 @@ from services.advanced_image_service import AdvancedImageService
 from services.elevenlabs_tts import ElevenLabsTTS
 from services.prompt_optimizer import PromptOptimizer
 from content_pipeline_optimized import ContentPipelineOptimized, ContentRequest, ContentResult
+from render_job_queue import RenderJobQueue, STATUS_COMPLETED, STATUS_FAILED, STATUS_QUEUED
+from progress_events import current_job_id, progress_bus, job_context
+from provider_throttle import throttle_metrics
+from render_governor import render_governor_metrics
+from music_library import check_source as check_music_source, get_music_library
+from image_cache_index import get_image_cache_index
+from image_prompt_cache import get_image_prompt_cache
+from complete_pipeline import run_pipeline
+from render_quality import DEFAULT_QUALITY
+from job_workspace import job_workspace, new_job_id, production_dir, prune_productions
+from scene_fingerprint import fingerprint
+from image_variations import LOCAL_VARIANTS
 import os
+import re
 import logging
 import asyncio
 import sys
 import json
 import time
 import hashlib
+import hmac
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 from dataclasses import dataclass, asdict
 from functools import wraps
 from threading import Lock
 
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, make_response, request, send_from_directory
 from flask_cors import CORS
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, join_room, leave_room
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_caching import Cache
@@ -108,6 +123,21 @@ def validate_json(*required_fields):
     return decorator
 
 
+def require_admin_token(f):
+    """Exige o ADMIN_API_TOKEN (header X-Admin-Token ou Authorization: Bearer); sem token configurado, 403."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = config.ADMIN_API_TOKEN
+        if not expected:
+            return jsonify({"error": "Endpoint administrativo desativado (ADMIN_API_TOKEN não configurado)"}), 403
+        auth = request.headers.get('Authorization', '')
+        provided = request.headers.get('X-Admin-Token') or (auth[7:] if auth.startswith('Bearer ') else '')
+        if not hmac.compare_digest(provided.encode(), expected.encode()):
+            return jsonify({"error": "Não autorizado"}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
 def handle_errors(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -118,16 +148,56 @@ def handle_errors(f):
             return jsonify({"error": "Erro interno do servidor", "message": str(e)}), 500
     return decorated_function
 
+
+def with_progress_job(kind: str):
+    """Roda um endpoint síncrono num job de progresso: os eventos dos serviços (imagens, TTS,
+    vídeo) vão para a sala SocketIO do job e a resposta JSON leva o `job_id`.
+
+    O cliente pode mandar `job_id` no corpo (e entrar na sala com 'join_job' antes do POST);
+    sem ele, ou se o id já for de um job da fila ou de outra requisição em curso, um novo é gerado.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            data = request.get_json(silent=True) or {}
+            job_id = str(data.get('job_id') or '') if isinstance(data, dict) else ''
+            if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", job_id) or render_jobs.get(job_id):
+                job_id = new_job_id()
+            with _JOBS_LOCK:
+                if job_id in _REQUEST_JOBS:
+                    job_id = new_job_id()
+                _REQUEST_JOBS.add(job_id)
+            status = STATUS_FAILED
+            try:
+                with job_context(job_id):
+                    response = make_response(f(*args, **kwargs))
+                body = response.get_json(silent=True)
+                if isinstance(body, dict):
+                    response.set_data(app.json.dumps({**body, "job_id": body.get("job_id", job_id)}))
+                    if response.status_code < 400 and body.get("success", True) is not False:
+                        status = STATUS_COMPLETED
+                return response
+            finally:
+                socketio.emit('job_status', {"job_id": job_id, "kind": kind, "status": status},
+                              to=_job_room(job_id))
+                with _JOBS_LOCK:
+                    _REQUEST_JOBS.discard(job_id)
+                progress_bus.forget(job_id)
+        return decorated_function
+    return decorator
+
 # ===== ENDPOINTS DA API =====
 
 # ===== CONTROLE DE IDEMPOTÊNCIA/LOCK PARA TAREFAS PESADAS =====
 # Evita que o mesmo payload gere múltiplos vídeos quando o frontend re-tenta
 # a requisição por timeout/erros transitórios.
 
-# key -> {'started_at': float}
+# key -> {'started_at': float, 'job_id': str}
 _ACTIVE_VIDEO_JOBS: dict[str, dict] = {}
 # key -> {'finished_at': float, 'result': dict}
 _COMPLETED_VIDEO_JOBS: dict[str, dict] = {}
+# job_id dos endpoints síncronos em execução (ver with_progress_job)
+_REQUEST_JOBS: set[str] = set()
 _JOBS_LOCK = Lock()
 _JOB_TTL_SECONDS = 15 * 60  # manter resultados por 15 minutos
 
@@ -162,6 +232,7 @@ def _stable_hash_for_video_request(data: dict) -> str:
             'background_music': settings.get('background_music') or settings.get('background_music_category'),
             'transitions': settings.get('transitions'),
             'render_preset': settings.get('render_preset'),
+            'render_quality': settings.get('render_quality'),
         }
         payload = {
             'audio_path': audio_path,
@@ -183,6 +254,20 @@ def health_check():
     return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat(), "version": "2.0"})
 
 
+@app.route('/api/providers/throttle', methods=['GET'])
+@handle_errors
+def get_provider_throttle():
+    """Métricas do throttle global por provider (esperas, chamadas em andamento)."""
+    return jsonify({"success": True, "providers": throttle_metrics()})
+
+
+@app.route('/api/render/governor', methods=['GET'])
+@handle_errors
+def get_render_governor_usage():
+    """Uso atual do orçamento de render (núcleos, memória reservada, ffmpeg abertos, renders ativos)."""
+    return jsonify({"success": True, "governor": render_governor_metrics()})
+
+
 @app.route('/api/status', methods=['GET'])
 @handle_errors
 @cache.cached(timeout=10)
@@ -468,6 +553,7 @@ def ai_battle_production():
 
 
 @app.route('/api/production/generate-audio', methods=['POST'])
+@with_progress_job('tts')
 @handle_errors
 @limiter.limit("10 per minute")
 def generate_audio_enhanced_endpoint():
@@ -840,6 +926,7 @@ def generate_simple_images_endpoint():
 
 
 @app.route('/api/production/generate-preferred-audio', methods=['POST'])
+@with_progress_job('tts')
 @handle_errors
 @validate_json('text')
 @limiter.limit("10 per minute")
@@ -923,6 +1010,7 @@ def serve_video(filename):
 
 
 @app.route('/api/production/generate-images', methods=['POST'])
+@with_progress_job('images')
 @handle_errors
 @validate_json('script_data', 'visual_style')
 @limiter.limit("3 per minute")
@@ -937,6 +1025,10 @@ def generate_images_only_endpoint():
         if isinstance(provider, str) and provider.lower() == 'dalle':
             provider = 'openai'
         force_regenerate = data.get('force_regenerate', False)
+        # Variações de preenchimento derivadas localmente (ausente = padrão IMAGE_LOCAL_VARIANTS).
+        # Valor efetivo já resolvido aqui: ele entra na chave do cache abaixo
+        local_variants = data.get('local_variants')
+        local_variants = LOCAL_VARIANTS if local_variants is None else bool(local_variants)
 
         logger.info(
             f"🎨 Iniciando geração de imagens - Estilo: {visual_style} | Provedor: {provider}")
@@ -955,6 +1047,8 @@ def generate_images_only_endpoint():
             'visual_style': visual_style,
             'image_provider': provider
         }
+        if local_variants:
+            script_key_elements['local_variants'] = True
 
         # Criar hash único
         script_hash = hashlib.md5(
@@ -1018,34 +1112,16 @@ def generate_images_only_endpoint():
         except Exception as e:
             logger.warning(f"⚠️ Não foi possível otimizar prompts: {e}")
 
-        # Verificar cache existente
-        cache_file = config.IMAGES_DIR / f"cache_{script_hash}.json"
-        cached_images = []
-
-        if cache_file.exists() and not force_regenerate:
+        # Verificar cache existente (índice SQLite; só as imagens que ainda existem)
+        image_cache = get_image_cache_index()
+        if not force_regenerate:
             try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-
-                # Verificar se as imagens ainda existem no disco
-                valid_cached_images = []
-                for img_path in cache_data.get('images', []):
-                    if os.path.exists(img_path):
-                        valid_cached_images.append(img_path)
-                    else:
-                        logger.warning(
-                            f"⚠️ Imagem em cache não encontrada: {img_path}")
-
-                if valid_cached_images:
-                    cached_images = valid_cached_images
+                cached = image_cache.get(script_hash)
+                if cached:
+                    cached_images = cached['paths']
                     logger.info(
                         f"✅ Usando {len(cached_images)} imagens do cache")
 
-                    # Atualizar timestamp do cache
-                    cache_data['last_used'] = datetime.now().isoformat()
-                    with open(cache_file, 'w', encoding='utf-8') as f:
-                        json.dump(cache_data, f, indent=2, ensure_ascii=False)
-
                     return jsonify({
                         "success": True,
                         "images": cached_images,
@@ -1065,7 +1141,7 @@ def generate_images_only_endpoint():
         try:
             images = loop.run_until_complete(
                 image_generator.generate_images_for_script(
-                    script_data, visual_style, provider)
+                    script_data, visual_style, provider, local_variants=local_variants)
             )
         finally:
             loop.close()
@@ -1073,20 +1149,15 @@ def generate_images_only_endpoint():
         if images:
             # Salvar no cache
             try:
-                cache_data = {
-                    'script_hash': script_hash,
-                    'script_elements': script_key_elements,
-                    'images': images,
-                    'generated_at': datetime.now().isoformat(),
-                    'last_used': datetime.now().isoformat(),
-                    'image_count': len(images),
-                    'visual_style': visual_style
-                }
-
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump(cache_data, f, indent=2, ensure_ascii=False)
-
-                logger.info(f"💾 Cache salvo: {cache_file.name}")
+                image_cache.put(
+                    script_hash, images,
+                    prompt="\n".join(used_prompts) or None,
+                    provider=provider,
+                    style=visual_style,
+                    title=script_key_elements.get('title'),
+                    meta={'script_elements': script_key_elements},
+                )
+                logger.info(f"💾 Cache salvo: {script_hash}")
 
             except Exception as e:
                 logger.warning(f"⚠️ Erro ao salvar cache: {e}")
@@ -1253,48 +1324,21 @@ def leonardo_text_to_video_endpoint():
 @app.route('/api/production/image-cache', methods=['GET'])
 @handle_errors
 def get_image_cache_info():
-    """Endpoint para listar informações sobre o cache de imagens"""
+    """Endpoint para listar o cache de imagens (paginado: ?limit=&offset=)"""
     try:
-        cache_files = list(config.IMAGES_DIR.glob("cache_*.json"))
-        cache_info = []
-
-        for cache_file in cache_files:
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cache_data = json.load(f)
-
-                # Verificar se as imagens ainda existem
-                valid_images = []
-                invalid_images = []
-
-                for img_path in cache_data.get('images', []):
-                    if os.path.exists(img_path):
-                        valid_images.append(img_path)
-                    else:
-                        invalid_images.append(img_path)
-
-                cache_info.append({
-                    'cache_hash': cache_data.get('script_hash'),
-                    'cache_file': cache_file.name,
-                    'generated_at': cache_data.get('generated_at'),
-                    'last_used': cache_data.get('last_used'),
-                    'visual_style': cache_data.get('visual_style'),
-                    'total_images': len(cache_data.get('images', [])),
-                    'valid_images': len(valid_images),
-                    'invalid_images': len(invalid_images),
-                    'script_title': cache_data.get('script_elements', {}).get('title', 'N/A')
-                })
-
-            except Exception as e:
-                logger.warning(f"⚠️ Erro ao ler cache {cache_file}: {e}")
-
-        # Ordenar por data de uso mais recente
-        cache_info.sort(key=lambda x: x.get('last_used', ''), reverse=True)
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 500)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        image_cache = get_image_cache_index()
+        page = image_cache.list(limit=limit, offset=offset)
 
         return jsonify({
             "success": True,
-            "cache_count": len(cache_info),
-            "caches": cache_info
+            "cache_count": page['total'],
+            "limit": page['limit'],
+            "offset": page['offset'],
+            "caches": page['caches'],
+            "stats": image_cache.stats(),
+            "prompt_cache": get_image_prompt_cache().stats()
         })
 
     except Exception as e:
@@ -1311,42 +1355,23 @@ def get_image_cache_info():
 def delete_image_cache(cache_hash):
     """Endpoint para deletar um cache específico"""
     try:
-        cache_file = config.IMAGES_DIR / f"cache_{cache_hash}.json"
+        # Opcionalmente, deletar também as imagens
+        delete_images = request.args.get(
+            'delete_images', 'false').lower() == 'true'
 
-        if not cache_file.exists():
+        entry = get_image_cache_index().delete(cache_hash, delete_images=delete_images)
+        if entry is None:
             return jsonify({
                 "success": False,
                 "error": "Cache não encontrado"
             }), 404
 
-        # Ler dados do cache antes de deletar
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            cache_data = json.load(f)
-
-        # Opcionalmente, deletar também as imagens
-        delete_images = request.args.get(
-            'delete_images', 'false').lower() == 'true'
-        deleted_images = 0
-
-        if delete_images:
-            for img_path in cache_data.get('images', []):
-                try:
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
-                        deleted_images += 1
-                except Exception as e:
-                    logger.warning(
-                        f"⚠️ Erro ao deletar imagem {img_path}: {e}")
-
-        # Deletar arquivo de cache
-        cache_file.unlink()
-
         logger.info(f"🗑️ Cache deletado: {cache_hash}")
 
         return jsonify({
             "success": True,
             "message": f"Cache {cache_hash} deletado",
-            "deleted_images": deleted_images if delete_images else 0
+            "deleted_images": entry['deleted_images']
         })
 
     except Exception as e:
@@ -1359,6 +1384,7 @@ def delete_image_cache(cache_hash):
 
 
 @app.route('/api/production/create-video', methods=['POST'])
+@with_progress_job('video')
 @handle_errors
 @validate_json('audio_path', 'images', 'script')
 @limiter.limit("2 per minute")
@@ -1383,20 +1409,23 @@ def create_video_final_endpoint():
                 "success": True,
                 "status": "in_progress",
                 "message": "Renderização já em execução para este payload. Evite chamadas duplicadas.",
-                "job_key": job_key
+                "job_key": job_key,
+                "job_id": _ACTIVE_VIDEO_JOBS[job_key]["job_id"],
             }), 202
-        # Marcar como ativo
-        _ACTIVE_VIDEO_JOBS[job_key] = {"started_at": now}
+        # Marcar como ativo (o job_id é o da sala de progresso, ver with_progress_job)
+        _ACTIVE_VIDEO_JOBS[job_key] = {"started_at": now, "job_id": current_job_id()}
 
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     try:
-        video_path = loop.run_until_complete(video_builder.create_video(
-            audio_path=data['audio_path'],
-            images=data['images'],
-            script=data['script'],
-            settings=data.get('settings', {})
-        ))
+        # Workspace próprio (nomeado pelo job): renders simultâneos não compartilham temporários
+        with job_workspace():
+            video_path = loop.run_until_complete(video_builder.create_video(
+                audio_path=data['audio_path'],
+                images=data['images'],
+                script=data['script'],
+                settings=data.get('settings', {})
+            ))
     finally:
         loop.close()
         with _JOBS_LOCK:
@@ -2020,28 +2049,9 @@ def optimize_visual_prompts():
 @app.route('/api/content/music', methods=['GET'])
 @handle_errors
 def get_music():
-    """Retorna lista de músicas disponíveis para background"""
+    """Retorna as faixas da biblioteca de música (por categoria) para background"""
     try:
-        music_categories = {
-            "epic": [
-                {"id": "epic_1", "name": "Epic Orchestral",
-                    "duration": 180, "mood": "inspirational"},
-                {"id": "epic_2", "name": "Cinematic Power",
-                    "duration": 200, "mood": "dramatic"}
-            ],
-            "chill": [
-                {"id": "chill_1", "name": "Ambient Waves",
-                    "duration": 240, "mood": "relaxing"},
-                {"id": "chill_2", "name": "Lo-Fi Dreams",
-                    "duration": 160, "mood": "peaceful"}
-            ],
-            "upbeat": [
-                {"id": "upbeat_1", "name": "Electronic Energy",
-                    "duration": 120, "mood": "energetic"},
-                {"id": "upbeat_2", "name": "Pop Motivation",
-                    "duration": 140, "mood": "positive"}
-            ]
-        }
+        music_categories = get_music_library().catalog()
 
         return jsonify({
             "music": music_categories,
@@ -2054,6 +2064,26 @@ def get_music():
         return jsonify({"error": f"Erro ao buscar músicas: {str(e)}"}), 500
 
 
+@app.route('/api/content/music', methods=['POST'])
+@handle_errors
+@require_admin_token
+@validate_json('source', 'category')
+@limiter.limit("10 per minute")
+def ingest_music():
+    """Ingere uma faixa na biblioteca: decodifica, normaliza e indexa (requer ADMIN_API_TOKEN).
+
+    `source`: URL http(s) de um host em MUSIC_ALLOWED_HOSTS ou arquivo dentro de MUSIC_DIR/inbox.
+    """
+    data = request.get_json()
+    try:
+        source = check_music_source(str(data['source']), config.MUSIC_DIR / "inbox")
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    track = get_music_library().ingest(source, str(data['category']),
+                                       mood=data.get('mood'), name=data.get('name'))
+    return jsonify({"success": True, "track": track.to_dict()})
+
+
 @app.route('/api/content/ai-battle', methods=['POST'])
 @handle_errors
 def start_content_ai_battle():
@@ -2204,12 +2234,13 @@ def replace_single_image_endpoint():
         except Exception:
             optimized_prompt = prompt
 
-        # Gerar imagem
+        # Gerar imagem nova (o cache por prompt devolveria a mesma imagem que está sendo trocada)
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         try:
             path = loop.run_until_complete(
-                image_generator._generate_single_image(optimized_prompt, filename_prefix, visual_style, provider)
+                image_generator._generate_single_image(optimized_prompt, filename_prefix, visual_style, provider,
+                                                       use_cache=False)
             )
         finally:
             loop.close()
@@ -2551,179 +2582,288 @@ def veo_image_to_video_endpoint():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
-@app.route('/api/production/render-complete-video', methods=['POST'])
-@handle_errors
-@limiter.limit("2 per minute")  # Limite baixo pois renderização é pesada
-def render_complete_video_endpoint():
+_SCENE_IMAGE_FIELDS = ('image', 'image_url', 'image_path', 'image_prompt')
+
+
+def _production_key(storyboard_data: dict, settings: dict) -> str:
+    """Chave estável da produção: id enviado pelo editor ou hash do storyboard sem os campos de imagem.
+
+    Trocar a imagem de uma cena mantém a mesma produção (mesmo work_dir persistente),
+    então só os artefatos daquela cena são refeitos no próximo render.
     """
-    Endpoint para renderização completa de vídeo usando pipeline otimizado:
-    Storyboard -> Imagens -> TTS (ElevenLabs) -> Motion (Leonardo) -> Vídeo Final
+    explicit = (settings.get('production_id') or storyboard_data.get('production_id')
+                or storyboard_data.get('id'))
+    if explicit:
+        return str(explicit)
+    scenes = [{k: v for k, v in s.items() if k not in _SCENE_IMAGE_FIELDS}
+              for s in storyboard_data.get('scenes', []) if isinstance(s, dict)]
+    rest = {k: v for k, v in storyboard_data.items() if k not in ('scenes', 'thumbnail')}
+    return fingerprint(rest, scenes)[:32]
+
+
+def _local_image_path(ref: Optional[str]) -> Optional[str]:
+    """URL /media/images/<arquivo> (absoluta ou relativa) -> caminho em IMAGES_DIR; outras refs: None."""
+    if not isinstance(ref, str) or '/media/images/' not in ref:
+        return None
+    from urllib.parse import urlparse
+    filename = os.path.basename(urlparse(ref).path)
+    path = config.IMAGES_DIR / filename
+    return str(path) if filename and path.is_file() else None
+
+
+def _run_complete_video_job(job_id: str, payload: dict) -> dict:
+    """Executa o pipeline completo para um job da fila persistente.
+
+    Imagens/áudios/motions/segmentos ficam no diretório persistente da produção
+    (DATA_DIR/productions/<chave>): um job retomado após crash/restart, ou um novo
+    render depois de trocar a imagem de uma cena, reaproveita tudo o que não mudou.
+    Só os temporários do job (storyboard.json, final.mp4, áudio do MoviePy) ficam
+    em TEMP_DIR/jobs/<job_id>.
     """
-    try:
-        if not request.is_json:
-            return jsonify({"error": "Content-Type deve ser application/json"}), 400
+    import shutil
+    import uuid
+
+    storyboard_data = payload['storyboard']
+    settings = payload.get('settings', {})
+    voice_id = settings.get('elevenlabs_voice', 'Rachel')
+    image_provider = settings.get('image_provider', 'openai')
+    music_path = settings.get('background_music')
+    render_quality = settings.get('render_quality') or DEFAULT_QUALITY
+    scenes = storyboard_data.get('scenes', [])
+
+    logger.info(f"🎬 [job {job_id}] Iniciando pipeline completo para {len(scenes)} cenas")
+    logger.info(f"   Voz: {voice_id}")
+    logger.info(f"   Provider de imagem: {image_provider}")
+    logger.info(f"   Qualidade: {render_quality}")
+
+    images = [_local_image_path(ref) for ref in payload.get('images') or []]
+    prune_productions(config.PRODUCTION_CACHE_DAYS)
+
+    # Temporários de todos os estágios (áudio do MoviePy, mixes) ficam no workspace do job
+    with job_workspace(job_id) as workspace, \
+            production_dir(_production_key(storyboard_data, settings)) as work_dir:
+        storyboard_path = workspace.path / "storyboard.json"
+        output_path = workspace.path / "final.mp4"
+
+        with open(storyboard_path, 'w', encoding='utf-8') as f:
+            json.dump(storyboard_data, f, indent=2, ensure_ascii=False)
 
-        data = request.get_json()
-        logger.info(
-            f"📹 Dados recebidos para render completo: {list(data.keys())}")
+        try:
+            # Pipeline roda no próprio worker (módulos/sessões HTTP quentes);
+            # o progresso publicado pelos estágios vai para a sala SocketIO do job
+            with job_context(job_id):
+                run_pipeline(
+                    storyboard=storyboard_path,
+                    work_dir=work_dir,
+                    out=output_path,
+                    image_provider=image_provider,
+                    voice_id=voice_id,
+                    music=music_path,
+                    timeout=config.RENDER_JOB_TIMEOUT,
+                    images=images,
+                    render_quality=render_quality,
+                )
+        except TimeoutError:
+            raise RuntimeError("Pipeline timeout - renderização muito longa")
+        except Exception as e:
+            raise RuntimeError(f"Pipeline falhou: {e}") from e
 
-        # Controle de idempotência para render completo
-        job_key = _stable_hash_for_video_request(data)
-        now = time.time()
-        with _JOBS_LOCK:
-            _cleanup_old_jobs(now)
-            cached = _COMPLETED_VIDEO_JOBS.get(job_key)
-            if cached:
-                logger.info("♻️ Retornando resultado recente do pipeline completo (idempotente)")
-                return jsonify(cached['result'])
-            if job_key in _ACTIVE_VIDEO_JOBS:
-                logger.info("⏳ Pipeline completo já em execução para este payload")
-                return jsonify({
-                    "success": True,
-                    "status": "in_progress",
-                    "message": "Renderização já em execução para este payload. Evite chamadas duplicadas.",
-                    "job_key": job_key
-                }), 202
-            _ACTIVE_VIDEO_JOBS[job_key] = {"started_at": now}
-
-        # Validação de dados obrigatórios
-        storyboard_data = data.get('storyboard') or data.get('storyboard_data')
-        if not storyboard_data:
-            return jsonify({"error": "Campo 'storyboard' é obrigatório"}), 400
-        # Aceitar storyboard como string JSON
-        if isinstance(storyboard_data, str):
-            try:
-                storyboard_data = json.loads(storyboard_data)
-            except Exception:
-                logger.error("❌ 'storyboard' enviado como string mas não é JSON válido")
-                return jsonify({"error": "'storyboard' deve ser objeto ou JSON válido"}), 400
+        if not output_path.exists():
+            raise RuntimeError("Vídeo final não foi gerado")
 
-        scenes = storyboard_data.get('scenes', []) if isinstance(storyboard_data, dict) else []
-        if not scenes:
-            return jsonify({"error": "Storyboard deve conter 'scenes'"}), 400
+        # Mover vídeo para diretório de mídia
+        final_filename = f"complete_video_{uuid.uuid4().hex[:8]}.mp4"
+        final_path = str(config.VIDEO_DIR / final_filename)
+        shutil.copy2(str(output_path), final_path)
+        logger.info(f"✅ Renderização completa concluída: {final_path}")
 
-        # Configurações do pipeline
-        settings = data.get('settings', {})
-        voice_id = settings.get('elevenlabs_voice', 'Rachel')
-        image_provider = settings.get('image_provider', 'openai')
-        music_path = settings.get('background_music')
+        return {
+            "success": True,
+            "message": "Vídeo renderizado com sucesso",
+            "video_path": f"/media/videos/{final_filename}",
+            "video_url": f"/media/videos/{final_filename}",
+            "duration": None,
+            "scenes_count": len(scenes),
+            "render_quality": render_quality,
+            "timestamp": datetime.now().isoformat(),
+        }
 
-        logger.info(f"🎬 Iniciando pipeline completo para {len(scenes)} cenas")
-        logger.info(f"   Voz: {voice_id}")
-        logger.info(f"   Provider de imagem: {image_provider}")
 
-        # Criar workspace temporário
-        import tempfile
-        import shutil
-        from pathlib import Path
+def _job_status_payload(job: dict) -> dict:
+    """Formata o status de um job para o frontend (compatível com o polling do ProductionStudio)."""
+    payload = {
+        "success": job['status'] != STATUS_FAILED,
+        "job_id": job['job_id'],
+        "job_key": job['request_id'],
+        "kind": job['kind'],
+        "status": job['status'],
+        "created_at": job['created_at'],
+        "completed_at": job['completed_at'],
+        "status_url": f"/api/jobs/{job['job_id']}",
+    }
+    if job['status'] == STATUS_QUEUED:
+        payload["queue_position"] = render_jobs.queue_position(job['job_id'])
+    elif job['status'] == STATUS_COMPLETED:
+        payload["progress"] = 100
+    else:
+        latest = progress_bus.latest(job['job_id'])
+        if latest:
+            payload["progress"] = _overall_progress(job['job_id'])
+            payload["progress_event"] = latest
+    if job['result']:
+        payload.update({k: v for k, v in job['result'].items() if k != 'success'})
+    if job['error']:
+        payload["error"] = job['error']
+    return payload
+
+
+# Peso de cada estágio no progresso global (0-100) do pipeline completo.
+# Imagens, TTS e motion correm em paralelo por cena; 'scenes' é o agregado do agendador.
+_PIPELINE_STAGE_WEIGHT = {
+    'images': 30,
+    'tts': 15,
+    'motion': 30,
+    'render': 25,
+}
+
+
+def _overall_progress(job_id: str) -> float:
+    """Progresso global do job a partir do pico de cada estágio (nunca retrocede)."""
+    peaks = progress_bus.stage_progress(job_id)
+    if peaks.get('pipeline', 0.0) >= 100.0:
+        return 100.0
+    stage = dict(peaks)
+    stage['render'] = max(peaks.get('video', 0.0), peaks.get('encode', 0.0))
+    prepare = sum(_PIPELINE_STAGE_WEIGHT[s] * stage.get(s, 0.0) / 100.0 for s in ('images', 'tts', 'motion'))
+    prepare_weight = _PIPELINE_STAGE_WEIGHT['images'] + _PIPELINE_STAGE_WEIGHT['tts'] + _PIPELINE_STAGE_WEIGHT['motion']
+    prepare = max(prepare, prepare_weight * stage.get('scenes', 0.0) / 100.0)
+    return round(prepare + _PIPELINE_STAGE_WEIGHT['render'] * stage['render'] / 100.0, 1)
+
+
+def _job_room(job_id: str) -> str:
+    return f"job_{job_id}"
+
+
+def _emit_progress_event(event: dict):
+    """Assinante do barramento: reemite o evento para a sala SocketIO do job."""
+    job_id = event.get('job_id')
+    if not job_id:
+        return
+    with _JOBS_LOCK:
+        single_stage = job_id in _REQUEST_JOBS
+    if single_stage:
+        # Endpoint síncrono (um serviço só): o progresso é o do próprio estágio
+        progress = max(progress_bus.stage_progress(job_id).values(), default=0.0)
+    else:
+        progress = _overall_progress(job_id)
+    socketio.emit('job_progress', {**event, "progress": progress}, to=_job_room(job_id))
 
-        with tempfile.TemporaryDirectory() as temp_dir:
-            workspace = Path(temp_dir)
 
-            # Caminhos
-            storyboard_path = workspace / "storyboard.json"
-            output_path = workspace / "final.mp4"
+def _emit_job_status(job: dict):
+    """Listener da fila: publica mudanças de status e libera o estado de progresso."""
+    socketio.emit('job_status', _job_status_payload(job), to=_job_room(job['job_id']))
+    if job['status'] in (STATUS_COMPLETED, STATUS_FAILED):
+        progress_bus.forget(job['job_id'])
 
-            # Salvar storyboard
-            with open(storyboard_path, 'w', encoding='utf-8') as f:
-                json.dump(storyboard_data, f, indent=2, ensure_ascii=False)
 
-            try:
-                # Executar pipeline completo
-                import subprocess
-                import sys
-
-                cmd = [
-                    sys.executable, "complete_pipeline.py",
-                    "--storyboard", str(storyboard_path),
-                    "--work-dir", str(workspace),
-                    "--out", str(output_path),
-                    "--image-provider", image_provider,
-                    "--voice-id", voice_id
-                ]
-
-                if music_path:
-                    cmd.extend(["--music", music_path])
-
-                logger.info(f"🚀 Executando: {' '.join(cmd)}")
-
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    cwd=os.path.dirname(os.path.abspath(__file__)),
-                    timeout=1800  # 30 minutos timeout
-                )
+progress_bus.subscribe(_emit_progress_event)
 
-                if result.returncode != 0:
-                    logger.error(f"❌ Pipeline falhou: {result.stderr}")
-                    return jsonify({
-                        "success": False,
-                        "error": f"Pipeline falhou: {result.stderr}"
-                    }), 500
+render_jobs = RenderJobQueue(config.DATA_DIR / "tiktok_automation.db",
+                             workers=config.RENDER_WORKERS)
+render_jobs.register_handler("complete_video", _run_complete_video_job)
+render_jobs.add_status_listener(_emit_job_status)
+# Workers só no processo que atende requisições: servido por WSGI (import), começam aqui;
+# rodando como script, no bloco __main__ (fora do processo monitor do reloader)
+if __name__ != '__main__':
+    render_jobs.start()
 
-                # Verificar se vídeo foi gerado
-                if not output_path.exists():
-                    return jsonify({
-                        "success": False,
-                        "error": "Vídeo final não foi gerado"
-                    }), 500
 
-                # Mover vídeo para diretório de mídia
-                import uuid
-                final_filename = f"complete_video_{uuid.uuid4().hex[:8]}.mp4"
-                final_path = str(config.VIDEO_DIR / final_filename)
+@socketio.on('join_job')
+def on_join_job(data):
+    """Cliente entra na sala do job para receber 'job_progress'/'job_status' em tempo real."""
+    job_id = (data or {}).get('job_id')
+    if not job_id:
+        return
+    join_room(_job_room(job_id))
+    job = render_jobs.get(job_id)
+    if job:
+        socketio.emit('job_status', _job_status_payload(job), to=request.sid)
 
-                shutil.copy2(str(output_path), final_path)
 
-                # Duração opcional (evitar dependência de moviepy aqui)
-                duration = None
+@socketio.on('leave_job')
+def on_leave_job(data):
+    job_id = (data or {}).get('job_id')
+    if job_id:
+        leave_room(_job_room(job_id))
 
-                logger.info(f"✅ Renderização completa concluída: {final_path}")
 
-                result_json = {
-                    "success": True,
-                    "message": "Vídeo renderizado com sucesso",
-                    "video_path": f"/media/videos/{final_filename}",
-                    "duration": duration,
-                    "scenes_count": len(scenes),
-                    "pipeline_output": result.stdout,
-                    "timestamp": datetime.now().isoformat(),
-                    "job_key": job_key
-                }
+@app.route('/api/production/render-complete-video', methods=['POST'])
+@handle_errors
+@limiter.limit("2 per minute")  # Limite baixo pois renderização é pesada
+def render_complete_video_endpoint():
+    """
+    Enfileira a renderização completa de vídeo (pipeline otimizado):
+    Storyboard -> Imagens -> TTS (ElevenLabs) -> Motion (Leonardo) -> Vídeo Final
 
-                with _JOBS_LOCK:
-                    _ACTIVE_VIDEO_JOBS.pop(job_key, None)
-                    _COMPLETED_VIDEO_JOBS[job_key] = {"finished_at": time.time(), "result": result_json}
+    Retorna 202 + job_id; acompanhe em GET /api/jobs/<job_id>.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Content-Type deve ser application/json"}), 400
 
-                return jsonify(result_json)
+    data = request.get_json()
+    logger.info(
+        f"📹 Dados recebidos para render completo: {list(data.keys())}")
+
+    # Validação de dados obrigatórios
+    storyboard_data = data.get('storyboard') or data.get('storyboard_data')
+    if not storyboard_data:
+        return jsonify({"error": "Campo 'storyboard' é obrigatório"}), 400
+    # Aceitar storyboard como string JSON
+    if isinstance(storyboard_data, str):
+        try:
+            storyboard_data = json.loads(storyboard_data)
+        except Exception:
+            logger.error("❌ 'storyboard' enviado como string mas não é JSON válido")
+            return jsonify({"error": "'storyboard' deve ser objeto ou JSON válido"}), 400
 
-            except subprocess.TimeoutExpired:
-                logger.error("❌ Pipeline timeout (30 minutos)")
-                with _JOBS_LOCK:
-                    _ACTIVE_VIDEO_JOBS.pop(job_key, None)
-                return jsonify({
-                    "success": False,
-                    "error": "Pipeline timeout - renderização muito longa"
-                }), 500
-            except Exception as e:
-                logger.error(f"❌ Erro na execução do pipeline: {e}")
-                with _JOBS_LOCK:
-                    _ACTIVE_VIDEO_JOBS.pop(job_key, None)
-                return jsonify({
-                    "success": False,
-                    "error": f"Erro na execução: {str(e)}"
-                }), 500
+    scenes = storyboard_data.get('scenes', []) if isinstance(storyboard_data, dict) else []
+    if not scenes:
+        return jsonify({"error": "Storyboard deve conter 'scenes'"}), 400
 
-    except Exception as e:
-        logger.error(
-            f"❌ Erro no endpoint de renderização completa: {e}", exc_info=True)
-        with _JOBS_LOCK:
-            _ACTIVE_VIDEO_JOBS.pop(job_key, None)
-        return jsonify({
-            "success": False,
-            "error": f"Erro interno: {str(e)}"
-        }), 500
+    # Chave idempotente: re-tentativas do frontend reaproveitam o mesmo job
+    job_key = _stable_hash_for_video_request(data)
+    job_id, created = render_jobs.submit(
+        "complete_video",
+        {"storyboard": storyboard_data, "settings": data.get('settings', {}),
+         "images": data.get('images') or []},
+        request_id=job_key,
+    )
+    if not created:
+        logger.info(f"♻️ Payload já possui job {job_id} (idempotente)")
+
+    job = render_jobs.get(job_id)
+    response = _job_status_payload(job)
+    response["message"] = ("Renderização enfileirada" if created
+                           else "Renderização já existente para este payload")
+    return jsonify(response), (200 if job['status'] == STATUS_COMPLETED else 202)
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@handle_errors
+def get_job_status(job_id):
+    """Status de um job da fila persistente de renderização."""
+    job = render_jobs.get(job_id)
+    if not job:
+        return jsonify({"success": False, "error": "Job não encontrado"}), 404
+    return jsonify(_job_status_payload(job))
+
+
+@app.route('/api/production/job-status', methods=['GET'])
+@handle_errors
+def get_production_job_status():
+    """Alias usado pelo polling do ProductionStudio (?job_id=...)."""
+    job_id = request.args.get('job_id', '')
+    return get_job_status(job_id)
 
 
 @app.route('/api/production/leonardo-motion-prompts', methods=['GET'])
@@ -2847,6 +2987,7 @@ def analyze_script_intensity():
 # ===== ELEVENLABS TTS ENDPOINTS =====
 
 @app.route('/api/production/generate-elevenlabs-audio', methods=['POST'])
+@with_progress_job('tts')
 @handle_errors
 def generate_elevenlabs_audio():
     """Gera áudio usando ElevenLabs TTS"""
@@ -2976,6 +3117,7 @@ def clone_voice_endpoint():
 # ===== HYBRID TTS ENDPOINTS (GOOGLE + ELEVENLABS) =====
 
 @app.route('/api/production/generate-google-tts', methods=['POST'])
+@with_progress_job('tts')
 @handle_errors
 def generate_google_tts():
     """Gera áudio especificamente usando Google Cloud TTS"""
@@ -3035,6 +3177,7 @@ def generate_google_tts():
 
 
 @app.route('/api/production/generate-hybrid-tts', methods=['POST'])
+@with_progress_job('tts')
 @handle_errors
 def generate_hybrid_tts():
     """Endpoint inteligente que tenta ElevenLabs primeiro, depois Google TTS como fallback"""
@@ -3386,6 +3529,8 @@ def calculate_prompts_needed():
 if __name__ == '__main__':
     print("🚀 Iniciando TikTok Automation API v2.0 - Dashboard Suprema")
     debug_mode = os.getenv('FLASK_ENV') == 'development'
+    if not debug_mode or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        render_jobs.start()
     socketio.run(
         app,
         host=config.API_HOST,
@@ -0,0 +1,173 @@
+# /var/www/tiktok-automation/backend/audio_dsp.py
+# -*- coding: utf-8 -*-
+
+"""
+Utilitários de áudio em NumPy (decodificação, loudness, loop).
+
+- decode_audio: qualquer formato -> float32 (amostras, canais) numa taxa fixa
+  (WAV já na taxa certa é lido direto; o resto passa uma vez pelo ffmpeg)
+- integrated_loudness: loudness integrado ITU-R BS.1770-4 (LUFS), com
+  ponderação K e gates absoluto (-70) e relativo (-10)
+- normalize_loudness: ganho para um alvo em LUFS com teto de pico
+- loop_to_length: loop com crossfade de potência constante + fade-out final
+
+Uso:
+    x = decode_audio("musica.mp3")                   # (n, 2) float32 @ 44.1 kHz
+    x = normalize_loudness(x, SAMPLE_RATE, -16.0)
+    bed = loop_to_length(x, int(42.0 * SAMPLE_RATE), SAMPLE_RATE)
+    write_wav("bed.wav", bed, SAMPLE_RATE)
+"""
+
+import os
+import subprocess
+import threading
+from typing import Tuple
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import lfilter
+
+from ffmpeg_render import FFMPEG_BIN
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+
+
+# =========================
+# E/S
+# =========================
+
+def decode_audio(path: str, sr: int = SAMPLE_RATE, channels: int = CHANNELS) -> np.ndarray:
+    """Decodifica para float32 com shape (amostras, canais) em `sr` Hz."""
+    try:
+        info = sf.info(path)
+        if info.samplerate == sr and info.channels == channels:
+            data, _ = sf.read(path, dtype="float32", always_2d=True)
+            return data
+    except (RuntimeError, sf.LibsndfileError):
+        pass  # formato que o libsndfile não lê (mp3 antigo, aac...): ffmpeg
+
+    proc = subprocess.run(
+        [FFMPEG_BIN, "-v", "error", "-i", path, "-vn", "-f", "f32le",
+         "-ac", str(channels), "-ar", str(sr), "pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg não decodificou {path}: {proc.stderr.decode(errors='ignore')[-500:]}")
+    return np.frombuffer(proc.stdout, dtype=np.float32).reshape(-1, channels).copy()
+
+
+def write_wav(path: str, samples: np.ndarray, sr: int = SAMPLE_RATE, subtype: str = "PCM_16") -> str:
+    """Grava WAV de forma atômica (tmp único por processo/thread + replace)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    sf.write(tmp, np.clip(samples, -1.0, 1.0), sr, subtype=subtype, format="WAV")
+    os.replace(tmp, path)
+    return path
+
+
+# =========================
+# Loudness (BS.1770-4)
+# =========================
+
+def _k_weighting(sr: int) -> Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]:
+    """Coeficientes (b, a) dos dois estágios da ponderação K para qualquer taxa."""
+    # Estágio 1: shelf de alta (efeito da cabeça)
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = np.tan(np.pi * f0 / sr)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf = (np.array([(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]),
+             np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]))
+    # Estágio 2: passa-altas (RLB)
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = np.tan(np.pi * f0 / sr)
+    a0 = 1.0 + k / q + k * k
+    highpass = (np.array([1.0, -2.0, 1.0]),
+                np.array([1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]))
+    return shelf, highpass
+
+
+def integrated_loudness(samples: np.ndarray, sr: int = SAMPLE_RATE) -> float:
+    """Loudness integrado em LUFS (-inf para silêncio ou áudio < 400 ms)."""
+    x = np.asarray(samples, dtype=np.float64)
+    if x.ndim == 1:
+        x = x[:, None]
+    block, step = int(0.4 * sr), int(0.1 * sr)
+    if len(x) < block:
+        return float("-inf")
+
+    (b1, a1), (b2, a2) = _k_weighting(sr)
+    y = lfilter(b2, a2, lfilter(b1, a1, x, axis=0), axis=0)
+
+    # Média quadrática por bloco de 400 ms (75% de sobreposição) via soma acumulada
+    energy = np.concatenate([np.zeros((1, y.shape[1])), np.cumsum(y * y, axis=0)])
+    starts = np.arange(0, len(y) - block + 1, step)
+    z = (energy[starts + block] - energy[starts]) / block          # (blocos, canais)
+    power = z.sum(axis=1)                                             # G = 1 para L/R
+    with np.errstate(divide="ignore"):
+        block_lufs = -0.691 + 10.0 * np.log10(power)
+
+    gated = power[block_lufs > -70.0]
+    if not len(gated):
+        return float("-inf")
+    relative = -0.691 + 10.0 * np.log10(gated.mean()) - 10.0
+    gated = power[(block_lufs > -70.0) & (block_lufs > relative)]
+    if not len(gated):
+        return float("-inf")
+    return float(-0.691 + 10.0 * np.log10(gated.mean()))
+
+
+def normalize_loudness(samples: np.ndarray, sr: int, target_lufs: float,
+                       peak_dbfs: float = -1.0) -> np.ndarray:
+    """Aplica o ganho que leva o áudio a `target_lufs`, sem passar do teto de pico."""
+    loudness = integrated_loudness(samples, sr)
+    if not np.isfinite(loudness):
+        return samples
+    gain = 10.0 ** ((target_lufs - loudness) / 20.0)
+    peak = float(np.max(np.abs(samples))) if samples.size else 0.0
+    ceiling = 10.0 ** (peak_dbfs / 20.0)
+    if peak * gain > ceiling > 0:
+        gain = ceiling / peak
+    return (samples * gain).astype(np.float32)
+
+
+# =========================
+# Loop / corte
+# =========================
+
+def loop_to_length(samples: np.ndarray, n: int, sr: int = SAMPLE_RATE,
+                   crossfade_s: float = 1.0, fade_out_s: float = 1.5) -> np.ndarray:
+    """Repete (com crossfade nas emendas) ou corta até `n` amostras; fade-out no final."""
+    x = np.asarray(samples, dtype=np.float32)
+    if x.ndim == 1:
+        x = x[:, None]
+    out = np.zeros((n, x.shape[1]), dtype=np.float32)
+    if not len(x) or n <= 0:
+        return out
+
+    if len(x) >= n:
+        out[:] = x[:n]
+    else:
+        xf = min(int(crossfade_s * sr), len(x) // 4)
+        theta = np.linspace(0.0, np.pi / 2.0, xf, dtype=np.float32)[:, None] if xf else None
+        piece = x.copy()
+        if xf:
+            piece[:xf] *= np.sin(theta)        # potência constante: sin² + cos² = 1
+            piece[-xf:] *= np.cos(theta)
+        hop = len(x) - xf
+        pos = 0
+        while pos < n:
+            src = x if pos == 0 else piece
+            if pos == 0 and xf:
+                src = x.copy()
+                src[-xf:] *= np.cos(theta)     # primeira passada entra sem fade-in
+            take = min(len(src), n - pos)
+            out[pos:pos + take] += src[:take]
+            pos += hop
+
+    fade = min(int(fade_out_s * sr), n)
+    if fade:
+        out[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)[:, None]
+    return out
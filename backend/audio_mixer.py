@@ -0,0 +1,123 @@
+# /var/www/tiktok-automation/backend/audio_mixer.py
+# -*- coding: utf-8 -*-
+
+"""
+Mixer de áudio em NumPy: narração + música com ducking e loudness final.
+
+Substitui o CompositeAudioClip (avaliado em pedaços pelo Python durante o
+export, sem ducking) por um estágio único e vetorizado:
+
+1) narração e música decodificadas uma vez para float32 (44.1 kHz estéreo)
+2) sidechain: envelope RMS da narração em quadros de 10 ms -> ganho da música
+   (atenuação de `duck_db` com voz, hold/release por filtro de máximo e rampa
+   de ataque por média móvel centralizada, que antecipa a entrada da voz)
+3) fade-in da música, fade-out do mix
+4) loudness integrado no alvo (AUDIO_TARGET_LUFS, padrão -14 LUFS para TikTok)
+   e limitador de pico com lookahead (-1 dBFS)
+
+O resultado é um único WAV PCM entregue ao encoder.
+
+Uso:
+    mix_to_wav("narracao.mp3", "mix.wav", duration=42.0, music_path="bed.wav", music_volume=0.3)
+"""
+
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+from scipy.ndimage import maximum_filter1d, minimum_filter1d, uniform_filter1d
+
+from audio_dsp import SAMPLE_RATE, decode_audio, integrated_loudness, loop_to_length, write_wav
+
+logger = logging.getLogger(__name__)
+
+FRAME_S = 0.010
+# Mesmo alvo do config_manager (AUDIO_TARGET_LUFS); os pipelines de montagem não carregam o config
+TARGET_LUFS = float(os.getenv("AUDIO_TARGET_LUFS", "-14"))
+
+
+def _frame_rms_db(x: np.ndarray, hop: int) -> np.ndarray:
+    """RMS (dBFS) por quadro de `hop` amostras, somando os canais."""
+    n = len(x) // hop
+    if n == 0:
+        return np.full(1, -120.0)
+    frames = x[: n * hop].reshape(n, hop, -1)
+    power = np.mean(frames.astype(np.float64) ** 2, axis=(1, 2))
+    return 10.0 * np.log10(np.maximum(power, 1e-12))
+
+
+def duck_gain(narration: np.ndarray, n_samples: int, sr: int = SAMPLE_RATE, duck_db: float = -10.0,
+              threshold_db: float = -40.0, attack_s: float = 0.08, release_s: float = 0.35) -> np.ndarray:
+    """Ganho (por amostra, linear) da música, controlado pela presença de voz na narração."""
+    hop = max(1, int(FRAME_S * sr))
+    active = (_frame_rms_db(narration, hop) > threshold_db).astype(np.float64)
+    # Hold: mantém o ducking durante pausas curtas entre palavras (release)
+    hold = max(1, int(release_s / FRAME_S))
+    active = maximum_filter1d(active, size=hold, origin=(hold - 1) // 2, mode="constant")
+    # Ataque/soltura suaves: média móvel centralizada (começa a baixar antes da voz)
+    ramp = max(1, int(attack_s / FRAME_S))
+    active = uniform_filter1d(active, size=ramp, mode="nearest")
+
+    frame_gain = 10.0 ** (duck_db * active / 20.0)
+    centers = (np.arange(len(frame_gain)) + 0.5) * hop
+    return np.interp(np.arange(n_samples), centers, frame_gain).astype(np.float32)
+
+
+def limit_peaks(x: np.ndarray, ceiling_dbfs: float = -1.0, sr: int = SAMPLE_RATE,
+                lookahead_s: float = 0.005) -> np.ndarray:
+    """Limitador com lookahead: ganho mínimo numa janela curta, suavizado (sem clipping audível)."""
+    ceiling = 10.0 ** (ceiling_dbfs / 20.0)
+    peak = np.max(np.abs(x), axis=1) if x.ndim == 2 else np.abs(x)
+    if not len(peak) or peak.max() <= ceiling:
+        return x
+    gain = np.minimum(1.0, ceiling / np.maximum(peak, 1e-12))
+    window = max(1, int(lookahead_s * sr))
+    # Mínimo em ±window e média em window: o ganho suavizado nunca passa do necessário
+    gain = minimum_filter1d(gain, size=2 * window + 1)
+    gain = uniform_filter1d(gain, size=window, mode="nearest")
+    out = x * (gain[:, None] if x.ndim == 2 else gain)
+    return np.clip(out, -ceiling, ceiling).astype(np.float32)
+
+
+def mix(narration: np.ndarray, music: Optional[np.ndarray] = None, sr: int = SAMPLE_RATE,
+        duration: Optional[float] = None, music_volume: float = 0.3, duck_db: float = -10.0,
+        music_fade_in_s: float = 0.5, fade_out_s: float = 1.0, target_lufs: Optional[float] = -14.0,
+        peak_dbfs: float = -1.0) -> np.ndarray:
+    """Mix final (float32, (amostras, canais)) da narração com a música (opcional)."""
+    n = int(round(duration * sr)) if duration else len(narration)
+    out = np.zeros((n, narration.shape[1]), dtype=np.float32)
+    take = min(n, len(narration))
+    out[:take] = narration[:take]
+
+    if music is not None and len(music):
+        bed = music[:n] if len(music) >= n else loop_to_length(music, n, sr, fade_out_s=0.0)
+        gain = duck_gain(out, n, sr, duck_db=duck_db) * np.float32(music_volume)
+        fade_in = min(n, int(music_fade_in_s * sr))
+        if fade_in:
+            gain[:fade_in] *= np.linspace(0.0, 1.0, fade_in, dtype=np.float32)
+        out += bed * gain[:, None]
+
+    fade = min(n, int(fade_out_s * sr))
+    if fade:
+        out[-fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)[:, None]
+
+    if target_lufs is not None:
+        loudness = integrated_loudness(out, sr)
+        if np.isfinite(loudness):
+            out *= np.float32(10.0 ** ((target_lufs - loudness) / 20.0))
+    return limit_peaks(out, peak_dbfs, sr)
+
+
+def mix_to_wav(narration_path: str, out_path: str, duration: Optional[float] = None,
+               music_path: Optional[str] = None, music_volume: float = 0.3,
+               target_lufs: Optional[float] = TARGET_LUFS, duck_db: float = -10.0) -> str:
+    """Decodifica, mixa e grava um único WAV PCM 16-bit para o encoder."""
+    narration = decode_audio(narration_path, SAMPLE_RATE)
+    music = decode_audio(music_path, SAMPLE_RATE) if music_path else None
+    out = mix(narration, music, SAMPLE_RATE, duration=duration, music_volume=music_volume,
+              duck_db=duck_db, target_lufs=target_lufs)
+    write_wav(out_path, out, SAMPLE_RATE)
+    logger.info(f"🎚️ Áudio mixado ({len(out) / SAMPLE_RATE:.1f}s, alvo {target_lufs} LUFS"
+                f"{', com música' if music is not None else ''}): {out_path}")
+    return out_path
@@ -0,0 +1,131 @@
+# /var/www/tiktok-automation/backend/clip_loop.py
+# -*- coding: utf-8 -*-
+
+"""
+Loop de clipes curtos (motion de ~5 s do Leonardo) com um único leitor.
+
+Antes, cobrir uma cena de 20 s abria `reps` VideoFileClip do mesmo arquivo
+(um processo ffmpeg leitor cada) e concatenava; os leitores nunca eram
+fechados. Aqui:
+
+- clipe sem áudio que cabe em LOOP_FRAME_CACHE_MB: decodificado UMA vez para
+  memória, leitor fechado na hora; o loop (ou ping-pong) só indexa os frames
+- senão: arquivo `<clipe>.loopN.mp4` feito por `ffmpeg -stream_loop` com
+  stream copy (ping-pong: ida+volta codificado uma vez) e lido por um só
+  VideoFileClip; ambos ficam ao lado do original, rastreados por scene_fingerprint
+
+Modo padrão: SCENE_LOOP_MODE=loop | pingpong.
+
+Uso:
+    clip = looped_clip("scene_03.mp4", 18.4)                 # >= 18.4 s, um leitor
+    clip = looped_clip("scene_03.mp4", 18.4, pingpong=True)
+    ...
+    clip.close()
+"""
+
+import os
+import logging
+import subprocess
+from math import ceil
+from typing import List, Optional
+
+from ffmpeg_render import FFMPEG_BIN
+from render_governor import encoder_threads, ffmpeg_slot, run_process
+from scene_fingerprint import file_digest, fingerprint, is_fresh, mark_fresh
+
+logger = logging.getLogger(__name__)
+
+LOOP_MODE = os.getenv("SCENE_LOOP_MODE", "loop")
+LOOP_FRAME_CACHE_MB = int(os.getenv("LOOP_FRAME_CACHE_MB", "256"))
+
+
+def frame_index(t: float, fps: float, n_frames: int, pingpong: bool = False) -> int:
+    """Índice do frame de origem no instante `t` do loop (ping-pong sem repetir as pontas)."""
+    idx = int(t * fps + 1e-6)
+    if not pingpong or n_frames < 2:
+        return idx % n_frames
+    period = 2 * n_frames - 2
+    j = idx % period
+    return j if j < n_frames else period - j
+
+
+def _run(cmd: List[str]):
+    with ffmpeg_slot():
+        proc = run_process(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg falhou ({proc.returncode}): {proc.stderr[-1500:]}")
+
+
+def _pingpong_file(src: str) -> str:
+    """Ida + volta do clipe (sem áudio), codificado uma vez e reaproveitado."""
+    out = f"{os.path.splitext(src)[0]}.pingpong.mp4"
+    fp = fingerprint(file_digest(src), "pingpong")
+    if not is_fresh(out, fp):
+        graph = ("[0:v]split[f][b];[b]reverse,trim=start_frame=1,setpts=PTS-STARTPTS[r];"
+                 "[f][r]concat=n=2:v=1:a=0,format=yuv420p[v]")
+        tmp = f"{out}.{os.getpid()}.tmp.mp4"
+        _run([FFMPEG_BIN, "-y", "-v", "error", "-i", src, "-filter_complex", graph, "-map", "[v]",
+              "-an", "-c:v", "libx264", "-preset", "veryfast", "-crf", "16",
+              "-threads", str(encoder_threads()), tmp])
+        os.replace(tmp, out)
+        mark_fresh(out, fp)
+    return out
+
+
+def loop_file(src: str, src_duration: float, min_dur: float, pingpong: bool = False) -> str:
+    """Arquivo com `src` repetido até cobrir `min_dur` (`-stream_loop`, sem re-encode)."""
+    if pingpong:
+        src, src_duration = _pingpong_file(src), 2.0 * src_duration
+    reps = max(1, ceil(min_dur / max(0.1, src_duration)))
+    if reps == 1 and not pingpong:
+        return src
+    out = f"{os.path.splitext(src)[0]}.loop{reps}.mp4"
+    fp = fingerprint(file_digest(src), reps)
+    if not is_fresh(out, fp):
+        tmp = f"{out}.{os.getpid()}.tmp.mp4"
+        _run([FFMPEG_BIN, "-y", "-v", "error", "-stream_loop", str(reps - 1), "-i", src,
+              "-c", "copy", tmp])
+        os.replace(tmp, out)
+        mark_fresh(out, fp)
+    return out
+
+
+def _cached_loop(base, min_dur: float, pingpong: bool):
+    """Decodifica `base` uma vez para memória (fecha o leitor) e devolve o clipe em loop."""
+    from moviepy import VideoClip
+
+    fps = base.fps
+    frames = [frame for frame in base.iter_frames(fps=fps, dtype="uint8")]
+    base.close()
+    n = len(frames)
+
+    def frame_function(t):
+        return frames[frame_index(t, fps, n, pingpong)]
+
+    return VideoClip(frame_function, duration=min_dur).with_fps(fps)
+
+
+def looped_clip(path: str, min_dur: float, pingpong: Optional[bool] = None):
+    """Clipe com pelo menos `min_dur` segundos lido por um único leitor (ou da memória)."""
+    from moviepy import VideoFileClip
+
+    pingpong = (LOOP_MODE == "pingpong") if pingpong is None else pingpong
+    base = VideoFileClip(path)
+    if base.duration >= min_dur:
+        return base.subclipped(0, min_dur)
+
+    w, h = base.size
+    frame_bytes = w * h * 3 * base.duration * base.fps
+    if base.audio is None and frame_bytes <= LOOP_FRAME_CACHE_MB * 1024 * 1024:
+        return _cached_loop(base, min_dur, pingpong)
+
+    src_duration = base.duration
+    base.close()
+    try:
+        looped = VideoFileClip(loop_file(path, src_duration, min_dur, pingpong))
+    except (OSError, RuntimeError) as e:
+        # Sem ffmpeg no PATH: loop por tempo no mesmo leitor (reabre a cada volta, um processo só)
+        logger.warning(f"⚠️ Loop via ffmpeg falhou ({e}); usando loop no leitor")
+        from moviepy import vfx
+        return VideoFileClip(path).with_effects([vfx.Loop(duration=min_dur)])
+    return looped.subclipped(0, min(min_dur, looped.duration))
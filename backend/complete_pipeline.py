@@ -11,7 +11,15 @@ Sequência otimizada:
 4) Geração de animação (Leonardo Motion) usando duração do áudio
 5) Montagem final (MoviePy)
 
-Uso:
+Os passos 2-4 rodam num grafo por cena: a motion da cena 1 começa assim que a
+imagem e o áudio da cena 1 ficam prontos, enquanto as demais cenas seguem.
+
+Os estágios rodam no mesmo processo (módulos, sessões HTTP e caches ficam
+quentes entre jobs). Uso como biblioteca:
+  from complete_pipeline import run_pipeline
+  run_pipeline(storyboard, work_dir, out, image_provider="openai", voice_id="Rachel")
+
+Uso (CLI):
   python complete_pipeline.py \
     --storyboard /path/storyboard.json \
     --work-dir /path/work \
@@ -25,15 +33,20 @@ Dependências:
 """
 
 import os
-import sys
 import json
+import shutil
 import argparse
-import tempfile
-import subprocess
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from dotenv import load_dotenv
 
+from progress_events import publish_progress
+from image_fetcher import fetch_scene_image
+from render_pipeline_audio_driven import render_audio_driven
+from render_quality import QUALITIES
+from render_governor import remaining_time, render_deadline
+from scene_fingerprint import file_digest, fingerprint, is_fresh, mark_fresh
+
 # Carregar .env
 load_dotenv()
 
@@ -52,26 +65,11 @@ def save_storyboard(data: Dict[str, Any], path: str):
     with open(path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
 
-def run_command(cmd: list, description: str):
-    """Executa comando e verifica sucesso."""
-    print(f"\n🚀 {description}")
-    print(f"   Comando: {' '.join(cmd)}")
-    
-    try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        print(f"✅ {description} - Sucesso")
-        if result.stdout:
-            print(f"   Output: {result.stdout}")
-        return result
-    except subprocess.CalledProcessError as e:
-        print(f"❌ {description} - Falhou")
-        print(f"   Erro: {e.stderr}")
-        print(f"   Exit code: {e.returncode}")
-        raise
-
 class CompletePipeline:
-    def __init__(self, args):
+    def __init__(self, args, timeout: Optional[float] = None):
         self.args = args
+        # Prazo total (s) do job: limita esperas de motion/TTS e os encodes (render_governor.render_deadline)
+        self.timeout = timeout
         self.work_dir = Path(args.work_dir)
         self.images_dir = self.work_dir / "images"
         self.assets_dir = self.work_dir / "assets"
@@ -102,44 +100,71 @@ class CompletePipeline:
         if not self.leonardo_key:
             raise ValueError("Leonardo API key necessária para motion")
 
-    def step_1_generate_images(self):
-        """Gera imagens usando image_fetcher.py"""
-        cmd = [
-            sys.executable, "image_fetcher.py",
-            "--storyboard", self.args.storyboard,
-            "--outdir", str(self.images_dir),
-            "--provider", self.args.image_provider,
-            "--size", "1024x1792",
-            "--ar", "9:16"
-        ]
-        
-        # Adicionar API key baseado no provider
-        if self.args.image_provider == "openai":
-            cmd.extend(["--openai-key", self.openai_key])
-        elif self.args.image_provider == "google":
-            cmd.extend(["--google-key", self.google_key])
-        elif self.args.image_provider == "leonardo":
-            cmd.extend(["--leonardo-key", self.leonardo_key])
-            
-        run_command(cmd, "Gerando imagens")
-
-    def step_2_generate_audio_and_motion(self):
-        """Gera áudio e motion usando render_pipeline_audio_driven.py"""
-        cmd = [
-            sys.executable, "render_pipeline_audio_driven.py",
-            "--storyboard", self.args.storyboard,
-            "--assets-dir", str(self.assets_dir),
-            "--images-dir", str(self.images_dir),
-            "--out", self.args.out,
-            "--voice-id", self.args.voice_id,
-            "--eleven-key", self.eleven_key,
-            "--leonardo-key", self.leonardo_key
-        ]
-        
-        if self.args.music:
-            cmd.extend(["--music", self.args.music])
-            
-        run_command(cmd, "Gerando áudio e motion, montagem final")
+    def seed_images(self, images: List[Optional[str]]):
+        """Usa as imagens escolhidas no editor (alinhadas às cenas) como images/scene_XX.png.
+
+        O work_dir persiste entre jobs da mesma produção: só a cena cuja imagem
+        mudou é reescrita (e, pelo fingerprint, só a motion/segmento dela refeitos).
+        """
+        for i, src in enumerate(images, start=1):
+            if not src or not os.path.isfile(src):
+                continue
+            dest = self.images_dir / f"scene_{i:02d}.png"
+            origin = Path(f"{dest}.origin")
+            digest = file_digest(src)
+            if dest.exists() and origin.exists() and origin.read_text(encoding="utf-8").strip() == digest:
+                continue
+            # Grava ao lado e troca: dest pode ser hardlink de um blob do cache por prompt
+            tmp = self.images_dir / f".{dest.name}.{os.getpid()}.tmp"
+            if src.lower().endswith(".png"):
+                shutil.copyfile(src, tmp)
+            else:
+                from PIL import Image
+                with Image.open(src) as im:
+                    im.save(tmp, "PNG")
+            os.replace(tmp, dest)
+            origin.write_text(digest, encoding="utf-8")
+            # Sem .src: adotada pelo prompt atual em _scene_image (não é regerada)
+            Path(f"{dest}.src").unlink(missing_ok=True)
+            print(f"[SEED] Cena {i}: {src}")
+
+    def _scene_image(self, i: int, scene: Dict[str, Any]) -> Optional[str]:
+        """Nó 'images' do grafo de cenas (regera só se o image_prompt/provider mudou)."""
+        remaining_time()  # prazo vencido: não começa outra imagem
+        prompt = (scene.get("image_prompt") or "").strip()
+        out_path = str(self.images_dir / f"scene_{i:02d}.png")
+        fp = fingerprint(prompt, self.args.image_provider)
+        if os.path.exists(out_path) and not is_fresh(out_path, fp, adopt_legacy=True):
+            os.remove(out_path)  # prompt novo: passa pelo cache por prompt e gera de novo
+        path = fetch_scene_image(
+            i, prompt, str(self.images_dir),
+            self.args.image_provider,
+            size="1024x1792",
+            ar_hint="9:16",
+            openai_key=self.openai_key,
+            google_key=self.google_key,
+            leonardo_key=self.leonardo_key,
+        )
+        if path:
+            mark_fresh(path, fp)
+        return path
+
+    def step_generate_and_assemble(self):
+        """Imagens, áudio e motion sobrepostos por cena (DAG), depois montagem final."""
+        print("\n🚀 Gerando imagens, áudio e motion por cena; montagem final")
+        render_audio_driven(
+            load_storyboard(self.args.storyboard),
+            assets_dir=str(self.assets_dir),
+            images_dir=str(self.images_dir),
+            out_path=self.args.out,
+            voice_id=self.args.voice_id,
+            eleven_key=self.eleven_key,
+            leonardo_key=self.leonardo_key,
+            music_path=self.args.music,
+            image_fn=self._scene_image,
+            render_quality=getattr(self.args, "render_quality", None),
+        )
+        print("✅ Pipeline de cenas e montagem final - Sucesso")
 
     def run(self):
         """Executa pipeline completo."""
@@ -155,11 +180,14 @@ class CompletePipeline:
             if not os.path.exists(self.args.storyboard):
                 raise FileNotFoundError(f"Storyboard não encontrado: {self.args.storyboard}")
             
-            # Step 1: Gerar imagens
-            self.step_1_generate_images()
-            
-            # Step 2: Gerar áudio, motion e montagem final
-            self.step_2_generate_audio_and_motion()
+            # Imagens + áudio + motion por cena (grafo de dependências) e montagem final
+            if getattr(self.args, "images", None):
+                self.seed_images(self.args.images)
+            publish_progress("pipeline", percent=0.0, message="Gerando cenas")
+            with render_deadline(self.timeout):
+                self.step_generate_and_assemble()
+            publish_progress("pipeline", percent=100.0, message="Pipeline concluído",
+                             bytes_written=os.path.getsize(self.args.out) if os.path.exists(self.args.out) else None)
             
             print(f"\n🎉 Pipeline concluído com sucesso!")
             print(f"   Vídeo final: {self.args.out}")
@@ -179,6 +207,28 @@ class CompletePipeline:
             print(f"\n❌ Pipeline falhou: {e}")
             raise
 
+def run_pipeline(storyboard: str, work_dir: str, out: str, image_provider: str = "openai",
+                 voice_id: str = "Rachel", music: Optional[str] = None,
+                 openai_key: Optional[str] = None, google_key: Optional[str] = None,
+                 leonardo_key: Optional[str] = None, eleven_key: Optional[str] = None,
+                 timeout: Optional[float] = None, images: Optional[List[Optional[str]]] = None,
+                 render_quality: Optional[str] = None) -> str:
+    """API importável do pipeline completo (mesmos estágios da CLI). Retorna o caminho do vídeo.
+
+    `images`: caminhos locais já escolhidos por cena (None = gerar pelo image_prompt).
+    `render_quality`: 'final' | 'draft' (None = RENDER_QUALITY); o rascunho grava imagens/TTS
+    no mesmo work_dir, então o render final seguinte só gera as motions e re-codifica.
+    """
+    args = argparse.Namespace(
+        storyboard=str(storyboard), work_dir=str(work_dir), out=str(out),
+        image_provider=image_provider, voice_id=voice_id, music=music, images=images,
+        render_quality=render_quality,
+        openai_key=openai_key, google_key=google_key,
+        leonardo_key=leonardo_key, eleven_key=eleven_key,
+    )
+    CompletePipeline(args, timeout=timeout).run()
+    return args.out
+
 def main():
     parser = argparse.ArgumentParser(description="Pipeline completo de automação de vídeo")
     
@@ -191,6 +241,8 @@ def main():
     parser.add_argument("--image-provider", choices=["openai", "google", "leonardo"], 
                        default="openai", help="Provider de geração de imagens")
     parser.add_argument("--voice-id", default="Rachel", help="ID da voz ElevenLabs")
+    parser.add_argument("--render-quality", choices=QUALITIES, default=None,
+                       help="final (padrão) ou draft: prévia rápida sem gerar motion")
     
     # Arquivos opcionais
     parser.add_argument("--music", help="Caminho para música de fundo")
@@ -20,6 +20,7 @@ class Config:
     TEMP_DIR: Path
     MUSIC_DIR: Path
     LOGS_DIR: Path
+    DATA_DIR: Path
     
     # Default arguments last
     AI_BATTLE_PARTICIPANTS: List[str] = field(
@@ -42,6 +43,9 @@ class Config:
     NEWS_API_KEY: str = field(
         default_factory=lambda: os.getenv("NEWS_API_KEY"))
     # ... adicione outras chaves de API aqui
+    # Token dos endpoints administrativos (ex.: ingestão de música); vazio = desativados
+    ADMIN_API_TOKEN: str = field(
+        default_factory=lambda: os.getenv("ADMIN_API_TOKEN", ""))
 
     # Google Cloud Settings
     GOOGLE_PROJECT_ID: str = field(default_factory=lambda: os.getenv(
@@ -60,6 +64,15 @@ class Config:
     TTS_VOICE: str = "pt-BR-Chirp3-HD-Puck"
     TTS_SPEAKING_RATE: float = 1.05
     TTS_MODEL: str = "gemini-2.5-pro-preview-tts"
+    TTS_CACHE_MAX_MB: int = field(
+        default_factory=lambda: int(os.getenv("TTS_CACHE_MAX_MB", "1024")))
+
+    # Cache de imagens por roteiro (índice SQLite + despejo LRU)
+    IMAGE_CACHE_MAX_MB: int = field(
+        default_factory=lambda: int(os.getenv("IMAGE_CACHE_MAX_MB", "4096")))
+    # Cache por prompt final, compartilhado entre roteiros
+    IMAGE_PROMPT_CACHE_MAX_MB: int = field(
+        default_factory=lambda: int(os.getenv("IMAGE_PROMPT_CACHE_MAX_MB", "2048")))
 
     # Video Settings
     VIDEO_WIDTH: int = 1080
@@ -67,12 +80,26 @@ class Config:
     VIDEO_FPS: int = 30
     VIDEO_CRF: int = 23
     AUDIO_BITRATE: int = 128
+    # Loudness integrado do mix final (TikTok normaliza em torno de -14 LUFS)
+    AUDIO_TARGET_LUFS: float = field(
+        default_factory=lambda: float(os.getenv("AUDIO_TARGET_LUFS", "-14")))
+    # "moviepy" (padrão) ou "ffmpeg" (filter_complex nativo, muito mais rápido)
+    RENDER_BACKEND: str = field(
+        default_factory=lambda: os.getenv("RENDER_BACKEND", "moviepy"))
 
     # Timeouts (seconds)
     API_TIMEOUT: int = 30
     FFMPEG_TIMEOUT: int = 300
     IMAGE_DOWNLOAD_TIMEOUT: int = 10
 
+    # Render Jobs (fila persistente)
+    RENDER_WORKERS: int = field(
+        default_factory=lambda: int(os.getenv("RENDER_WORKERS", "2")))
+    RENDER_JOB_TIMEOUT: int = 1800
+    # Artefatos por produção (DATA_DIR/productions) para re-render incremental
+    PRODUCTION_CACHE_DAYS: int = field(
+        default_factory=lambda: int(os.getenv("PRODUCTION_CACHE_DAYS", "14")))
+
     # Trending System Settings
     TRENDING_MAX_CACHE_HOURS: int = 6
     TRENDING_MAX_USED_TOPICS: int = 100
@@ -111,6 +138,7 @@ class ConfigManager:
             TEMP_DIR=media_dir / "temp",
             MUSIC_DIR=media_dir / "music",
             LOGS_DIR=base_dir / "logs",
+            DATA_DIR=base_dir / "data",
         )
 
         # Atualiza paths com base no .env se necessário
@@ -134,6 +162,7 @@ class ConfigManager:
             self._config.TEMP_DIR,
             self._config.MUSIC_DIR,
             self._config.LOGS_DIR,
+            self._config.DATA_DIR,
         ]
         for directory in dirs_to_create:
             directory.mkdir(parents=True, exist_ok=True)
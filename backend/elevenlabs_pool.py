@@ -0,0 +1,132 @@
+# /var/www/tiktok-automation/backend/elevenlabs_pool.py
+# -*- coding: utf-8 -*-
+
+"""
+Pool compartilhado de requisições TTS do ElevenLabs.
+
+- Uma única requests.Session (keep-alive) para todo o processo
+- Limite global via throttle "elevenlabs" do provider_throttle
+  (ELEVENLABS_MAX_CONCURRENCY, de acordo com o plano contratado)
+- Backoff compartilhado em 429: quando um worker é limitado, todos pausam
+  até o fim da janela (respeita Retry-After)
+- `synthesize_many` gera várias cenas em paralelo; a narração de um vídeo
+  leva o tempo da cena mais longa, não a soma
+
+Uso:
+    from elevenlabs_pool import get_tts_pool
+    audio = get_tts_pool().post_tts(url, headers, payload)          # bytes
+    results = get_tts_pool().synthesize_many(gerar_cena, cenas)    # [resultado | Exception]
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from provider_throttle import ProviderLimits, ProviderThrottle, get_throttle
+from render_governor import remaining_time
+
+logger = logging.getLogger(__name__)
+
+
+class ElevenLabsPool:
+    """Sessão HTTP e throttle (concorrência + pausa de rate limit) compartilhados entre workers."""
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_rate_limit_retries: int = 5,
+                 throttle: Optional[ProviderThrottle] = None):
+        if throttle is None:
+            throttle = get_throttle("elevenlabs")
+            if max_concurrency is not None:
+                # Limite explícito: throttle próprio, com o mesmo ritmo do global
+                throttle = ProviderThrottle("elevenlabs", ProviderLimits(
+                    int(max_concurrency), throttle.limits.requests_per_minute, throttle.limits.burst))
+        self.throttle = throttle
+        self.max_concurrency = max(1, throttle.limits.max_concurrent)
+        self.max_rate_limit_retries = max_rate_limit_retries
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("https://", adapter)
+
+    # ---------- Rate limit compartilhado ----------
+    def _pause_all(self, seconds: float):
+        self.throttle.pause(seconds)
+
+    @staticmethod
+    def _retry_after(response: requests.Response, fallback: float) -> float:
+        try:
+            return max(fallback, float(response.headers.get("Retry-After", "")))
+        except ValueError:
+            return fallback
+
+    # ---------- Requisição ----------
+    def post_tts(self, url: str, headers: Dict[str, str], payload: Dict[str, Any],
+                 timeout: int = 60, retries: int = 2, backoff_sec: float = 2.0) -> bytes:
+        """POST de TTS com limite de concorrência e retry. Retorna o áudio (bytes).
+
+        Dentro de um job com prazo (render_governor), esperas e requisições não passam dele.
+        """
+        attempt = 0
+        rate_limited = 0
+        while True:
+            try:
+                with self.throttle.slot(remaining_time()):
+                    r = self.session.post(url, headers=headers, json=payload, timeout=remaining_time(timeout))
+            except requests.RequestException as e:
+                if attempt >= retries:
+                    raise
+                time.sleep(backoff_sec * (2 ** attempt))
+                attempt += 1
+                logger.warning(f"⚠️ TTS tentativa {attempt} falhou ({e}), tentando novamente...")
+                continue
+
+            if r.status_code == 200:
+                return r.content
+
+            if r.status_code == 429 and rate_limited < self.max_rate_limit_retries:
+                self._pause_all(self._retry_after(r, backoff_sec * (2 ** rate_limited)))
+                rate_limited += 1
+                continue
+
+            error = RuntimeError(f"ElevenLabs TTS falhou ({r.status_code}): {r.text[:300]}")
+            if r.status_code < 500 or attempt >= retries:
+                raise error
+            time.sleep(backoff_sec * (2 ** attempt))
+            attempt += 1
+            logger.warning(f"⚠️ TTS tentativa {attempt} falhou ({r.status_code}), tentando novamente...")
+
+    # ---------- Várias cenas ----------
+    def synthesize_many(self, fn: Callable[[Any], Any], items: Iterable[Any],
+                        max_workers: Optional[int] = None) -> List[Any]:
+        """Executa fn(item) em paralelo (na ordem dos itens); falhas voltam como Exception."""
+        items = list(items)
+        if not items:
+            return []
+        workers = min(len(items), max_workers or self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts") as pool:
+            futures = [pool.submit(contextvars.copy_context().run, fn, item) for item in items]
+        results: List[Any] = []
+        for fut in futures:
+            try:
+                results.append(fut.result())
+            except Exception as e:
+                results.append(e)
+        return results
+
+
+_pool: Optional[ElevenLabsPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_tts_pool() -> ElevenLabsPool:
+    """Pool único por processo (compartilhado entre cenas e jobs)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ElevenLabsPool()
+        return _pool
@@ -0,0 +1,452 @@
+# /var/www/tiktok-automation/backend/ffmpeg_render.py
+# -*- coding: utf-8 -*-
+
+"""
+Backend de render via FFmpeg (filter_complex nativo).
+
+Compila a mesma timeline que o VisualEffectsSystem monta no MoviePy
+(imagens com duração própria + Ken Burns leve, legendas, narração + música)
+num único comando ffmpeg, sem passar quadro a quadro pelo Python:
+
+    imagem -> scale/crop/pad (centralizada em WxH) -> zoompan (1.00 -> 1.05)
+    segmentos -> concat -> drawtext (uma por linha de legenda, enable=between)
+    narração (apad/atrim) + música (volume) -> amix
+
+Uso:
+    timeline = RenderTimeline(width=1080, height=1920, fps=30, duration=42.0,
+                              narration_path="narracao.mp3",
+                              segments=[ImageSegment("img1.png", 0.0, 2.5), ...],
+                              subtitles=[SubtitleCue(0.0, 3.1, "Primeira frase"), ...])
+    render_timeline(timeline, "saida.mp4")
+
+    # Um composite, vários encoders (split/asplit): resolução, bitrate e duração por plataforma
+    render_timeline_outputs(timeline, [OutputSpec("tiktok.mp4", 1080, 1920, bitrate="2M", max_duration=180),
+                                       OutputSpec("shorts.mp4", 1080, 1920, bitrate="2.5M", max_duration=60)])
+"""
+
+import os
+import shutil
+import logging
+import tempfile
+import textwrap
+import threading
+import subprocess
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from progress_events import publish_progress
+from render_governor import encoder_threads, ffmpeg_slot, remaining_time, renice_child
+
+logger = logging.getLogger(__name__)
+
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+
+@dataclass
+class ImageSegment:
+    path: str
+    start: float
+    duration: float
+    zoom_start: float = 1.0
+    zoom_end: float = 1.05
+
+
+@dataclass
+class SubtitleCue:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class RenderTimeline:
+    width: int
+    height: int
+    fps: int
+    duration: float
+    narration_path: str
+    segments: List[ImageSegment]
+    subtitles: List[SubtitleCue] = field(default_factory=list)
+    subtitle_style: Dict[str, Any] = field(default_factory=dict)
+    music_path: Optional[str] = None
+    music_volume: float = 0.3
+
+
+@dataclass
+class OutputSpec:
+    """Uma saída do composite: tamanho, bitrate (ou CRF) e duração máxima próprios."""
+    path: str
+    width: int
+    height: int
+    bitrate: Optional[str] = None       # "2M", "2.5M"; None = CRF
+    crf: Optional[int] = None
+    max_duration: Optional[float] = None
+
+    def duration(self, total: float) -> float:
+        return min(total, self.max_duration) if self.max_duration else total
+
+
+# =========================
+# Helpers
+# =========================
+
+def _escape_value(value: str) -> str:
+    """Escapa um valor para uso entre aspas simples no filtergraph."""
+    return value.replace("'", r"'\''").replace(":", r"\:")
+
+
+def _color(value: str) -> str:
+    return "0x" + value[1:] if value.startswith("#") else value
+
+
+def _image_size(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        from PIL import Image
+        with Image.open(path) as img:
+            return img.size
+    except Exception:
+        return None
+
+
+def _frame_counts(timeline: RenderTimeline) -> List[int]:
+    """Quadros por segmento, com fronteiras arredondadas no tempo absoluto (sem drift)."""
+    fps = timeline.fps
+    starts = [seg.start for seg in timeline.segments] + [timeline.duration]
+    bounds = [round(t * fps) for t in starts]
+    bounds[0] = 0
+    return [max(1, bounds[i + 1] - bounds[i]) for i in range(len(timeline.segments))]
+
+
+def _fit_canvas(seg_path: str, width: int, height: int) -> str:
+    """Redimensiona para a altura do vídeo e centraliza em WxH (como resized(height=H) + 'center')."""
+    size = _image_size(seg_path)
+    if not size:
+        return f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height}"
+    iw, ih = size
+    sw = max(2, int(round(iw * height / ih / 2.0)) * 2)
+    if sw >= width:
+        return f"scale={sw}:{height},crop={width}:{height}:{(sw - width) // 2}:0"
+    return f"scale={sw}:{height},pad={width}:{height}:{(width - sw) // 2}:0:black"
+
+
+def _font_option(font: str) -> str:
+    if font and os.path.isfile(font):
+        return f"fontfile='{_escape_value(font)}'"
+    family = (font or "Sans").split("-")[0]
+    return f"font='{_escape_value(family)}'"
+
+
+def _subtitle_filters(timeline: RenderTimeline, text_dir: str) -> List[str]:
+    """Um drawtext por linha de legenda (quebra em ~90% da largura, ancorado embaixo)."""
+    style = timeline.subtitle_style or {}
+    fontsize = int(style.get("fontsize", 56))
+    chars_per_line = max(8, int(timeline.width * 0.9 / (fontsize * 0.55)))
+    line_height = int(fontsize * 1.2)
+    common = ":".join([
+        _font_option(str(style.get("font", "Arial-Bold"))),
+        f"fontsize={fontsize}",
+        f"fontcolor={_color(str(style.get('color', 'white')))}",
+        f"borderw={int(style.get('stroke_width', 2))}",
+        f"bordercolor={_color(str(style.get('stroke_color', 'black')))}",
+    ])
+
+    filters = []
+    for c, cue in enumerate(timeline.subtitles):
+        lines = textwrap.wrap(cue.text, chars_per_line) or [cue.text]
+        for k, line in enumerate(lines):
+            text_path = os.path.join(text_dir, f"sub_{c:03d}_{k:02d}.txt")
+            with open(text_path, "w", encoding="utf-8") as f:
+                f.write(line)
+            y = f"h-{(len(lines) - k) * line_height}"
+            filters.append(
+                f"drawtext=textfile='{_escape_value(text_path)}':{common}"
+                f":x=(w-text_w)/2:y={y}"
+                f":enable='between(t,{cue.start:.3f},{cue.end:.3f})'"
+            )
+    return filters
+
+
+# =========================
+# Compilação
+# =========================
+
+def _compose(timeline: RenderTimeline, text_dir: str, ffmpeg_bin: str) -> Tuple[List[str], List[str]]:
+    """Inputs e filter_complex da timeline, terminando nos rótulos [vout] e [aout]."""
+    if not timeline.segments:
+        raise ValueError("Timeline sem segmentos de imagem")
+
+    W, H, fps = timeline.width, timeline.height, timeline.fps
+    cmd = [ffmpeg_bin, "-y", "-hide_banner", "-nostats", "-progress", "pipe:1"]
+    graph: List[str] = []
+
+    for i, (seg, frames) in enumerate(zip(timeline.segments, _frame_counts(timeline))):
+        cmd += ["-i", seg.path]
+        dz = seg.zoom_end - seg.zoom_start
+        graph.append(
+            f"[{i}:v]{_fit_canvas(seg.path, W, H)},setsar=1,"
+            f"zoompan=z='{seg.zoom_start}+{dz:.4f}*on/{frames}'"
+            f":x='iw/2-(iw/zoom/2)':y='ih/2-(ih/zoom/2)'"
+            f":d={frames}:s={W}x{H}:fps={fps},format=yuv420p[v{i}]"
+        )
+
+    n = len(timeline.segments)
+    concat_in = "".join(f"[v{i}]" for i in range(n))
+    subtitle_filters = _subtitle_filters(timeline, text_dir)
+    if subtitle_filters:
+        graph.append(f"{concat_in}concat=n={n}:v=1:a=0[vbase]")
+        graph.append("[vbase]" + ",".join(subtitle_filters) + "[vout]")
+    else:
+        graph.append(f"{concat_in}concat=n={n}:v=1:a=0[vout]")
+
+    narration_idx = n
+    cmd += ["-i", timeline.narration_path]
+    D = f"{timeline.duration:.3f}"
+    if timeline.music_path:
+        music_idx = n + 1
+        cmd += ["-i", timeline.music_path]
+        graph.append(f"[{narration_idx}:a]apad,atrim=0:{D},asetpts=N/SR/TB[narr]")
+        graph.append(f"[{music_idx}:a]atrim=0:{D},asetpts=N/SR/TB,volume={timeline.music_volume}[bgm]")
+        graph.append("[narr][bgm]amix=inputs=2:duration=first:normalize=0[aout]")
+    else:
+        graph.append(f"[{narration_idx}:a]apad,atrim=0:{D},asetpts=N/SR/TB[aout]")
+    return cmd, graph
+
+
+def build_ffmpeg_command(timeline: RenderTimeline, out_path: str, text_dir: str,
+                         crf: int = 23, audio_bitrate_k: int = 128,
+                         ffmpeg_bin: str = FFMPEG_BIN, preset: str = "medium",
+                         threads: Optional[int] = None) -> List[str]:
+    """Monta o comando ffmpeg (inputs + filter_complex + encode) para a timeline."""
+    cmd, graph = _compose(timeline, text_dir, ffmpeg_bin)
+    cmd += [
+        "-filter_complex", ";".join(graph),
+        "-map", "[vout]", "-map", "[aout]",
+        "-r", str(timeline.fps), "-t", f"{timeline.duration:.3f}",
+        "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p",
+        *_thread_args(threads),
+        "-c:a", "aac", "-b:a", f"{audio_bitrate_k}k",
+        "-movflags", "+faststart",
+        out_path,
+    ]
+    return cmd
+
+
+# =========================
+# Várias saídas do mesmo composite
+# =========================
+
+def _encode_key(spec: OutputSpec, duration: float) -> Tuple:
+    return (spec.width, spec.height, spec.bitrate, spec.crf, round(spec.duration(duration), 3))
+
+
+def _unique_outputs(outputs: List[OutputSpec], duration: float) -> Tuple[List[OutputSpec], Dict[str, str]]:
+    """Saídas com encode idêntico viram um só encoder; retorna (encoders, caminho extra -> caminho codificado)."""
+    encoders: Dict[Tuple, OutputSpec] = {}
+    aliases: Dict[str, str] = {}
+    for spec in outputs:
+        key = _encode_key(spec, duration)
+        if key in encoders:
+            aliases[spec.path] = encoders[key].path
+        else:
+            encoders[key] = spec
+    return list(encoders.values()), aliases
+
+
+def _fit_output(spec: OutputSpec, width: int, height: int) -> str:
+    """Leva o composite WxH ao tamanho da saída: mesmo aspecto só escala; outro aspecto ganha barras."""
+    if (spec.width, spec.height) == (width, height):
+        return "null"
+    if spec.width * height == spec.height * width:
+        return f"scale={spec.width}:{spec.height},setsar=1"
+    return (f"scale={spec.width}:{spec.height}:force_original_aspect_ratio=decrease,"
+            f"pad={spec.width}:{spec.height}:(ow-iw)/2:(oh-ih)/2:black,setsar=1")
+
+
+def _thread_args(threads: Optional[int]) -> List[str]:
+    return ["-threads", str(max(1, threads))] if threads else []
+
+
+def _rate_control(spec: OutputSpec, crf: int) -> List[str]:
+    if not spec.bitrate:
+        return ["-crf", str(spec.crf if spec.crf is not None else crf)]
+    value = spec.bitrate.strip()
+    unit = {"k": 1e3, "K": 1e3, "m": 1e6, "M": 1e6}.get(value[-1], 1.0)
+    bufsize = int(float(value.rstrip("kKmM")) * unit * 2)
+    return ["-b:v", value, "-maxrate", value, "-bufsize", str(bufsize)]
+
+
+def _fan_out(graph: List[str], outputs: List[OutputSpec], video: str, audio: str, width: int, height: int,
+             fps: int, duration: float, crf: int, audio_bitrate_k: int,
+             threads: Optional[int] = None, preset: str = "medium") -> List[str]:
+    """Divide `video`/`audio` (split/asplit) num encoder por saída; retorna os argumentos de saída."""
+    n = len(outputs)
+    per_encoder = max(1, threads // n) if threads else None   # as threads do render divididas entre os encoders
+    if n > 1:
+        graph.append(f"{video}split={n}" + "".join(f"[vs{i}]" for i in range(n)))
+        graph.append(f"{audio}asplit={n}" + "".join(f"[as{i}]" for i in range(n)))
+    else:
+        # Com um encoder só, o áudio também sai do grafo: "-map [0:a]" (stream de entrada) é inválido
+        graph.append(f"{audio}anull[as0]")
+    args: List[str] = []
+    for i, spec in enumerate(outputs):
+        v_in = f"[vs{i}]" if n > 1 else video
+        graph.append(f"{v_in}{_fit_output(spec, width, height)}[vo{i}]")
+        args += [
+            "-map", f"[vo{i}]", "-map", f"[as{i}]",
+            "-r", str(fps), "-t", f"{spec.duration(duration):.3f}",
+            "-c:v", "libx264", "-preset", preset, *_rate_control(spec, crf), "-pix_fmt", "yuv420p",
+            *_thread_args(per_encoder),
+            "-c:a", "aac", "-b:a", f"{audio_bitrate_k}k",
+            "-movflags", "+faststart",
+            spec.path,
+        ]
+    return args
+
+
+def build_multi_output_command(timeline: RenderTimeline, outputs: List[OutputSpec], text_dir: str,
+                               crf: int = 23, audio_bitrate_k: int = 128,
+                               ffmpeg_bin: str = FFMPEG_BIN, threads: Optional[int] = None,
+                               preset: str = "medium") -> List[str]:
+    """Um composite da timeline dividido em vários encoders (resolução/bitrate/duração por saída)."""
+    if not outputs:
+        raise ValueError("Nenhuma saída informada")
+    cmd, graph = _compose(timeline, text_dir, ffmpeg_bin)
+    args = _fan_out(graph, outputs, "[vout]", "[aout]", timeline.width, timeline.height, timeline.fps,
+                    timeline.duration, crf, audio_bitrate_k, threads, preset)
+    return cmd + ["-filter_complex", ";".join(graph)] + args
+
+
+def build_transcode_command(src_path: str, outputs: List[OutputSpec], width: int, height: int, fps: int,
+                            duration: float, crf: int = 23, audio_bitrate_k: int = 128,
+                            ffmpeg_bin: str = FFMPEG_BIN, threads: Optional[int] = None,
+                            preset: str = "medium") -> List[str]:
+    """Decodifica um vídeo pronto uma vez e o codifica em todas as saídas (backend MoviePy)."""
+    if not outputs:
+        raise ValueError("Nenhuma saída informada")
+    cmd = [ffmpeg_bin, "-y", "-hide_banner", "-nostats", "-progress", "pipe:1", "-i", src_path]
+    graph: List[str] = []
+    args = _fan_out(graph, outputs, "[0:v]", "[0:a]", width, height, fps, duration, crf, audio_bitrate_k,
+                    threads, preset)
+    return cmd + ["-filter_complex", ";".join(graph)] + args
+
+
+# =========================
+# Execução
+# =========================
+
+def _execute(cmd: List[str], work_dir: str, duration: float, out_paths: List[str],
+             timeout: Optional[float], progress_stage: str):
+    """Roda o ffmpeg publicando o progresso (out_time_us) e os bytes já escritos em `out_paths`."""
+    timeout = remaining_time(timeout)         # o prazo do job (se houver) também limita o encode
+    stderr_path = os.path.join(work_dir, "ffmpeg.log")
+    with open(stderr_path, "w") as stderr, ffmpeg_slot():
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, text=True)
+        renice_child(proc)
+        # O stdout só fecha quando o ffmpeg termina; o prazo é garantido por um timer que mata o processo
+        timed_out = threading.Event()
+
+        def _kill():
+            timed_out.set()
+            proc.kill()
+
+        killer = threading.Timer(timeout, _kill) if timeout else None
+        if killer:
+            killer.start()
+        last_percent = -2.0
+        try:
+            for line in proc.stdout:
+                key, _, value = line.strip().partition("=")
+                if key != "out_time_us" or not value.isdigit():
+                    continue
+                percent = min(100.0, int(value) / 1e6 / max(0.001, duration) * 100.0)
+                if percent - last_percent >= 2.0:
+                    last_percent = percent
+                    written = sum(os.path.getsize(p) for p in out_paths if os.path.exists(p)) or None
+                    publish_progress(progress_stage, percent=percent, bytes_written=written,
+                                     message=f"ffmpeg: {percent:.0f}%")
+            proc.wait()
+        finally:
+            if killer:
+                killer.cancel()
+
+    if timed_out.is_set():
+        raise TimeoutError(f"ffmpeg excedeu o tempo limite ({timeout:.0f}s)")
+    if proc.returncode != 0:
+        with open(stderr_path, "r", errors="ignore") as f:
+            tail = f.read()[-1500:]
+        raise RuntimeError(f"ffmpeg falhou ({proc.returncode}): {tail}")
+
+
+def render_timeline(timeline: RenderTimeline, out_path: str, timeout: Optional[float] = None,
+                    crf: int = 23, audio_bitrate_k: int = 128, progress_stage: str = "encode",
+                    preset: str = "medium") -> str:
+    """Executa o ffmpeg publicando o progresso do encode. Levanta RuntimeError se falhar."""
+    if not shutil.which(FFMPEG_BIN):
+        raise RuntimeError(f"ffmpeg não encontrado ({FFMPEG_BIN})")
+
+    with tempfile.TemporaryDirectory(prefix="ffrender_") as work_dir:
+        cmd = build_ffmpeg_command(timeline, out_path, work_dir, crf=crf, audio_bitrate_k=audio_bitrate_k,
+                                   preset=preset, threads=encoder_threads())
+        logger.info(f"🎞️ FFmpeg: {len(timeline.segments)} segmentos, {len(timeline.subtitles)} legendas, "
+                    f"{timeline.duration:.1f}s -> {out_path}")
+        _execute(cmd, work_dir, timeline.duration, [out_path], timeout, progress_stage)
+
+    publish_progress(progress_stage, percent=100.0, bytes_written=os.path.getsize(out_path),
+                     message="ffmpeg: concluído")
+    return out_path
+
+
+def _link_aliases(aliases: Dict[str, str]):
+    """Saídas com encode idêntico a outra apontam para o mesmo arquivo (hardlink; cópia se não der)."""
+    for path, encoded in aliases.items():
+        if os.path.exists(path):
+            os.remove(path)
+        try:
+            os.link(encoded, path)
+        except OSError:
+            shutil.copy2(encoded, path)
+
+
+def _render_outputs(build, outputs: List[OutputSpec], duration: float, timeout: Optional[float],
+                    progress_stage: str, label: str) -> List[str]:
+    if not shutil.which(FFMPEG_BIN):
+        raise RuntimeError(f"ffmpeg não encontrado ({FFMPEG_BIN})")
+
+    encoders, aliases = _unique_outputs(outputs, duration)
+    with tempfile.TemporaryDirectory(prefix="ffrender_") as work_dir:
+        cmd = build(encoders, work_dir)
+        logger.info(f"🎞️ FFmpeg: {label}, {len(outputs)} saídas em {len(encoders)} encoders -> "
+                    + ", ".join(os.path.basename(s.path) for s in encoders))
+        longest = max(spec.duration(duration) for spec in encoders)
+        _execute(cmd, work_dir, longest, [s.path for s in encoders], timeout, progress_stage)
+    _link_aliases(aliases)
+
+    paths = [spec.path for spec in outputs]
+    publish_progress(progress_stage, percent=100.0, bytes_written=sum(os.path.getsize(p) for p in paths),
+                     message="ffmpeg: concluído")
+    return paths
+
+
+def render_timeline_outputs(timeline: RenderTimeline, outputs: List[OutputSpec], timeout: Optional[float] = None,
+                            crf: int = 23, audio_bitrate_k: int = 128,
+                            progress_stage: str = "encode", preset: str = "medium") -> List[str]:
+    """Compõe a timeline uma vez e codifica todas as saídas no mesmo processo ffmpeg."""
+    def build(encoders, work_dir):
+        return build_multi_output_command(timeline, encoders, work_dir, crf=crf, audio_bitrate_k=audio_bitrate_k,
+                                          threads=encoder_threads(), preset=preset)
+
+    label = f"{len(timeline.segments)} segmentos, {timeline.duration:.1f}s"
+    return _render_outputs(build, outputs, timeline.duration, timeout, progress_stage, label)
+
+
+def transcode_outputs(src_path: str, outputs: List[OutputSpec], width: int, height: int, fps: int,
+                      duration: float, timeout: Optional[float] = None, crf: int = 23,
+                      audio_bitrate_k: int = 128, progress_stage: str = "encode",
+                      preset: str = "medium") -> List[str]:
+    """Decodifica `src_path` uma vez e codifica todas as saídas no mesmo processo ffmpeg."""
+    def build(encoders, work_dir):
+        return build_transcode_command(src_path, encoders, width, height, fps, duration,
+                                       crf=crf, audio_bitrate_k=audio_bitrate_k, threads=encoder_threads(),
+                                       preset=preset)
+
+    return _render_outputs(build, outputs, duration, timeout, progress_stage, os.path.basename(src_path))
@@ -0,0 +1,301 @@
+# /var/www/tiktok-automation/backend/image_cache_index.py
+# -*- coding: utf-8 -*-
+
+"""
+Índice SQLite do cache de imagens por roteiro (/api/production/generate-images).
+
+Substitui os arquivos IMAGES_DIR/cache_<hash>.json (um por roteiro, regravado
+a cada hit só para atualizar `last_used`, e lidos todos a cada listagem):
+
+- uma linha por hash: prompt, provedor, estilo, título, caminhos, tamanho em
+  disco, criação, último uso e hits
+- `last_used`/hits de hits ficam em memória e são gravados em lote
+  (IMAGE_CACHE_FLUSH_S, antes de listar/despejar e na saída do processo)
+- listagem paginada pelo índice de `last_used`: custo proporcional à página
+- despejo LRU (entrada + imagens) quando o total passa de IMAGE_CACHE_MAX_MB
+- os JSON antigos são importados uma vez e removidos
+
+Uso:
+    index = get_image_cache_index()
+    entry = index.get(script_hash)           # dict com 'paths' (só existentes) ou None
+    if entry is None:
+        index.put(script_hash, images, prompt=..., provider=..., style=..., title=...)
+    page = index.list(limit=50, offset=0)
+"""
+
+import os
+import json
+import time
+import atexit
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_cache (
+    hash TEXT PRIMARY KEY,
+    prompt TEXT,
+    provider TEXT,
+    style TEXT,
+    title TEXT,
+    paths TEXT NOT NULL,
+    image_count INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    meta TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_image_cache_last_used ON image_cache(last_used);
+"""
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+
+def _ts(iso: Optional[str]) -> float:
+    try:
+        return datetime.fromisoformat(iso).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def _files_size(paths: Iterable[str]) -> int:
+    total = 0
+    for p in paths:
+        try:
+            total += os.path.getsize(p)
+        except OSError:
+            pass
+    return total
+
+
+class ImageCacheIndex:
+    """Índice SQLite (WAL) das imagens geradas por roteiro, com LRU por espaço em disco."""
+
+    def __init__(self, db_path: Union[str, Path], max_bytes: int = 4096 * 1024 * 1024,
+                 images_root: Optional[Union[str, Path]] = None, flush_interval: float = 5.0):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = int(max_bytes)
+        # Só apaga do disco imagens dentro desta pasta (None = qualquer caminho indexado)
+        self.images_root = Path(images_root).resolve() if images_root else None
+        self.flush_interval = float(flush_interval)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, List[float]] = {}  # hash -> [último uso, hits]
+        self._last_flush = time.monotonic()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "cache_hash": row["hash"],
+            "prompt": row["prompt"],
+            "provider": row["provider"],
+            "visual_style": row["style"],
+            "script_title": row["title"] or "N/A",
+            "paths": json.loads(row["paths"]),
+            "total_images": row["image_count"],
+            "size_bytes": row["size"],
+            "hits": row["hits"],
+            "generated_at": _iso(row["created_at"]),
+            "last_used": _iso(row["last_used"]),
+        }
+
+    # ---------- Último uso (em lote) ----------
+    def touch(self, cache_hash: str):
+        """Registra um hit; a gravação no SQLite é adiada e agrupada."""
+        with self._lock:
+            pending = self._pending.setdefault(cache_hash, [0.0, 0])
+            pending[0] = time.time()
+            pending[1] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Grava os hits pendentes numa única transação."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE image_cache SET last_used = MAX(last_used, ?), hits = hits + ? WHERE hash = ?",
+                [(ts, hits, h) for h, (ts, hits) in pending.items()],
+            )
+
+    # ---------- API pública ----------
+    def get(self, cache_hash: str) -> Optional[Dict[str, Any]]:
+        """Entrada com as imagens que ainda existem (registra o hit) ou None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM image_cache WHERE hash = ?", (cache_hash,)).fetchone()
+        if not row:
+            return None
+        entry = self._row_to_entry(row)
+        paths = [p for p in entry["paths"] if os.path.exists(p)]
+        if len(paths) < len(entry["paths"]):
+            logger.warning(f"⚠️ Cache {cache_hash}: {len(entry['paths']) - len(paths)} imagem(ns) não encontrada(s)")
+        if not paths:
+            self.delete(cache_hash)
+            return None
+        entry["paths"] = paths
+        self.touch(cache_hash)
+        return entry
+
+    def put(self, cache_hash: str, paths: List[str], prompt: Optional[str] = None,
+            provider: Optional[str] = None, style: Optional[str] = None, title: Optional[str] = None,
+            meta: Optional[Dict[str, Any]] = None, created_at: Optional[float] = None,
+            last_used: Optional[float] = None) -> Dict[str, Any]:
+        """Indexa (ou substitui) as imagens geradas para um hash e aplica o limite de disco."""
+        now = time.time()
+        paths = [str(p) for p in paths]
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO image_cache
+                   (hash, prompt, provider, style, title, paths, image_count, size, meta,
+                    created_at, last_used, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+                (cache_hash, prompt, provider, style, title, json.dumps(paths, ensure_ascii=False),
+                 len(paths), _files_size(paths), json.dumps(meta or {}, ensure_ascii=False, default=str),
+                 created_at or now, last_used or now),
+            )
+        self.evict(keep=cache_hash)
+        return {"cache_hash": cache_hash, "paths": paths}
+
+    def delete(self, cache_hash: str, delete_images: bool = False) -> Optional[Dict[str, Any]]:
+        """Remove a entrada (e, se pedido, as imagens). Retorna a entrada removida ou None."""
+        with self._lock:
+            self._pending.pop(cache_hash, None)
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM image_cache WHERE hash = ?", (cache_hash,)).fetchone()
+            if not row:
+                return None
+            conn.execute("DELETE FROM image_cache WHERE hash = ?", (cache_hash,))
+        entry = self._row_to_entry(row)
+        entry["deleted_images"] = self._unlink(entry["paths"]) if delete_images else 0
+        return entry
+
+    def list(self, limit: int = 50, offset: int = 0) -> Dict[str, Any]:
+        """Página de entradas, mais recentes primeiro (sem tocar no disco das imagens)."""
+        self.flush()
+        with self._connect() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM image_cache").fetchone()[0]
+            rows = conn.execute(
+                "SELECT * FROM image_cache ORDER BY last_used DESC LIMIT ? OFFSET ?",
+                (int(limit), int(offset)),
+            ).fetchall()
+        caches = []
+        for row in rows:
+            entry = self._row_to_entry(row)
+            entry.pop("paths")
+            caches.append(entry)
+        return {"total": total, "limit": int(limit), "offset": int(offset), "caches": caches}
+
+    def evict(self, keep: Optional[str] = None):
+        """Remove entradas (e imagens) menos usadas até o total caber em max_bytes."""
+        self.flush()
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM image_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for row in conn.execute(
+                    "SELECT hash, paths, size FROM image_cache ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                if row["hash"] == keep:
+                    continue
+                self._unlink(json.loads(row["paths"]))
+                conn.execute("DELETE FROM image_cache WHERE hash = ?", (row["hash"],))
+                total -= row["size"]
+                logger.info(f"🧹 Cache de imagens: removido {row['hash']} (LRU)")
+
+    def _unlink(self, paths: Iterable[str]) -> int:
+        removed = 0
+        for p in paths:
+            if self.images_root and self.images_root not in Path(p).resolve().parents:
+                continue
+            try:
+                os.remove(p)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"⚠️ Erro ao deletar imagem {p}: {e}")
+        return removed
+
+    def import_legacy(self, images_dir: Union[str, Path]) -> int:
+        """Importa os antigos cache_<hash>.json para o índice e os remove."""
+        imported = 0
+        for cache_file in Path(images_dir).glob("cache_*.json"):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                elements = data.get("script_elements", {})
+                self.put(
+                    data.get("script_hash") or cache_file.stem[len("cache_"):],
+                    data.get("images", []),
+                    provider=elements.get("image_provider"),
+                    style=data.get("visual_style"),
+                    title=elements.get("title"),
+                    meta={"script_elements": elements},
+                    created_at=_ts(data.get("generated_at")),
+                    last_used=_ts(data.get("last_used")),
+                )
+                cache_file.unlink()
+                imported += 1
+            except Exception as e:
+                logger.warning(f"⚠️ Erro ao importar cache {cache_file}: {e}")
+        if imported:
+            logger.info(f"📥 {imported} cache(s) de imagens importado(s) para o índice")
+        return imported
+
+    def stats(self) -> Dict[str, Any]:
+        self.flush()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes, "
+                "COALESCE(SUM(hits), 0) AS hits FROM image_cache"
+            ).fetchone()
+        return {"entries": row["entries"], "bytes": row["bytes"], "hits": row["hits"],
+                "max_bytes": self.max_bytes}
+
+
+_index: Optional[ImageCacheIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_image_cache_index() -> ImageCacheIndex:
+    """Índice único por processo em DATA_DIR/image_cache.db (limite IMAGE_CACHE_MAX_MB)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            from config_manager import get_config
+            config = get_config()
+            _index = ImageCacheIndex(config.DATA_DIR / "image_cache.db",
+                                     max_bytes=config.IMAGE_CACHE_MAX_MB * 1024 * 1024,
+                                     images_root=config.IMAGES_DIR,
+                                     flush_interval=float(os.getenv("IMAGE_CACHE_FLUSH_S", "5")))
+            _index.import_legacy(config.IMAGES_DIR)
+            atexit.register(_index.flush)
+        return _index
@@ -27,7 +27,8 @@ Uso:
 
 Observações:
 - 9:16 preferido para Shorts; mapeio tamanhos válidos automaticamente por provider.
-- Cache: não rebaixa se images/scene_XX.png já existir.
+- Cache: não rebaixa se images/scene_XX.png já existir; prompts já gerados (em qualquer
+  storyboard) vêm do cache por prompt (--no-cache desliga).
 """
 
 import os, io, json, base64, time, argparse
@@ -36,9 +37,29 @@ from typing import Dict, Any, List, Optional
 import requests
 from dotenv import load_dotenv
 
+from progress_events import publish_progress
+from provider_throttle import get_throttle, throttle
+from image_prompt_cache import ImagePromptCache, get_image_prompt_cache
+
 # Carregar variáveis de ambiente do .env
 load_dotenv()
 
+# Sessão HTTP compartilhada (keep-alive) entre cenas e entre jobs do mesmo processo
+_http = requests.Session()
+
+
+def _throttled_post(provider: str, url: str, **kwargs) -> requests.Response:
+    """POST sob o throttle global do provider; 429 pausa todos os chamadores do provider."""
+    with throttle(provider):
+        r = _http.post(url, **kwargs)
+    if r.status_code == 429:
+        try:
+            wait = float(r.headers.get("Retry-After", ""))
+        except ValueError:
+            wait = 10.0
+        get_throttle(provider).pause(wait)
+    return r
+
 # =========================
 # Helpers
 # =========================
@@ -60,8 +81,11 @@ def pick_scene_prompts(data: Dict[str, Any]) -> List[str]:
 
 def save_png_bytes(out_path: str, b: bytes):
     ensure_dir(os.path.dirname(out_path) or ".")
-    with open(out_path, "wb") as f:
+    # Grava ao lado e troca: nunca escreve através de um hardlink do cache por prompt
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
         f.write(b)
+    os.replace(tmp, out_path)
     return out_path
 
 # =========================
@@ -85,7 +109,7 @@ def openai_generate_image(prompt: str, api_key: str, size: str = "1024x1792") ->
         "size": size,  # "1024x1024", "1024x1792" (vertical), "1792x1024" (horizontal)
         "response_format": "b64_json"
     }
-    r = requests.post(url, headers=headers, json=payload, timeout=180)
+    r = _throttled_post("openai", url, headers=headers, json=payload, timeout=180)
     r.raise_for_status()
     data = r.json()
     b64 = data["data"][0]["b64_json"]
@@ -114,7 +138,7 @@ def google_imagen_generate_image(prompt: str, api_key: str, size: str = "1024x17
         },
         "cfgScale": 7  # leve guia
     }
-    r = requests.post(url, json=body, timeout=180)
+    r = _throttled_post("imagen", url, json=body, timeout=180)
     r.raise_for_status()
     data = r.json()
     # A resposta costuma vir como base64 PNG/JPEG em "images[0].data"
@@ -157,7 +181,7 @@ def leonardo_generate_image(prompt: str, api_key: str, size: str = "1024x1792")
         "num_images": 1,
         "presetStyle": "DYNAMIC"  # opcional
     }
-    r = requests.post(gen_url, headers=headers, json=payload, timeout=60)
+    r = _throttled_post("leonardo", gen_url, headers=headers, json=payload, timeout=60)
     r.raise_for_status()
     job = r.json()
     gen_id = job.get("sdGenerationJob", {}).get("generationId") or job.get("generationId") or job.get("id")
@@ -167,7 +191,7 @@ def leonardo_generate_image(prompt: str, api_key: str, size: str = "1024x1792")
     # 2) poll
     status_url = f"https://cloud.leonardo.ai/api/rest/v1/generations/{gen_id}"
     for _ in range(120):
-        rs = requests.get(status_url, headers=headers, timeout=30)
+        rs = _http.get(status_url, headers=headers, timeout=30)
         rs.raise_for_status()
         info = rs.json()
         # Os campos variam; normalmente vem em "generations_by_pk" ou "data"
@@ -180,7 +204,7 @@ def leonardo_generate_image(prompt: str, api_key: str, size: str = "1024x1792")
             url = outs[0].get("url") or outs[0].get("imageUrl")
             if not url:
                 raise RuntimeError(f"Saída sem URL: {outs[0]}")
-            img = requests.get(url, timeout=180)
+            img = _http.get(url, timeout=180)
             img.raise_for_status()
             return img.content
         time.sleep(2)
@@ -191,6 +215,64 @@ def leonardo_generate_image(prompt: str, api_key: str, size: str = "1024x1792")
 # Orquestrador
 # =========================
 
+def fetch_scene_image(
+    i: int,
+    prompt: str,
+    outdir: str,
+    provider: str,
+    size: str = "1024x1792",
+    ar_hint: str = "9:16",
+    openai_key: Optional[str] = None,
+    google_key: Optional[str] = None,
+    leonardo_key: Optional[str] = None,
+    overwrite: bool = False,
+    total: Optional[int] = None,
+    use_cache: bool = True
+) -> Optional[str]:
+    """Gera images/scene_XX.png de uma cena (cache por arquivo e por prompt). Retorna o caminho ou None."""
+    out_path = os.path.join(outdir, f"scene_{i:02d}.png")
+    if os.path.exists(out_path) and not overwrite:
+        print(f"[CACHE] {out_path}")
+        return out_path
+
+    if not prompt:
+        print(f"[SKIP] Cena {i} sem image_prompt.")
+        return None
+
+    # reforço leve de AR se o provider ignorar size
+    prompt_eff = prompt
+    if ar_hint and "9:16" in ar_hint and "vertical 9:16" not in prompt.lower():
+        prompt_eff += ", vertical 9:16"
+
+    cache = get_image_prompt_cache() if use_cache else None
+    cache_key = ImagePromptCache.make_key(prompt, provider, size, ar_hint) if cache else None
+    if cache and not overwrite and cache.lookup(cache_key, out_path, provider):
+        print(f"[CACHE] Cena {i}: prompt já gerado -> {out_path}")
+        return out_path
+
+    print(f"[GEN] Cena {i}/{total or '?'} via {provider} size={size}")
+    if provider == "openai":
+        if not openai_key:
+            raise ValueError("--openai-key requerido")
+        png = openai_generate_image(prompt_eff, api_key=openai_key, size=size)
+    elif provider == "google":
+        if not google_key:
+            raise ValueError("--google-key requerido")
+        png = google_imagen_generate_image(prompt_eff, api_key=google_key, size=size)
+    elif provider == "leonardo":
+        if not leonardo_key:
+            raise ValueError("--leonardo-key requerido")
+        png = leonardo_generate_image(prompt_eff, api_key=leonardo_key, size=size)
+    else:
+        raise ValueError("provider inválido. Use: openai | google | leonardo")
+
+    save_png_bytes(out_path, png)
+    if cache:
+        cache.store_file(cache_key, out_path, meta={"provider": provider})
+    print(f"[OK] {out_path}")
+    return out_path
+
+
 def fetch_images_for_storyboard(
     storyboard_path: str,
     outdir: str,
@@ -200,7 +282,8 @@ def fetch_images_for_storyboard(
     openai_key: Optional[str] = None,
     google_key: Optional[str] = None,
     leonardo_key: Optional[str] = None,
-    overwrite: bool = False
+    overwrite: bool = False,
+    use_cache: bool = True
 ):
     data = read_storyboard(storyboard_path)
     prompts = pick_scene_prompts(data)
@@ -209,38 +292,13 @@ def fetch_images_for_storyboard(
     total = len(prompts)
 
     for i, prompt in enumerate(prompts, start=1):
-        out_path = os.path.join(outdir, f"scene_{i:02d}.png")
-        if os.path.exists(out_path) and not overwrite:
-            print(f"[CACHE] {out_path}")
-            continue
-
-        if not prompt:
-            print(f"[SKIP] Cena {i} sem image_prompt.")
-            continue
-
-        # reforço leve de AR se o provider ignorar size
-        prompt_eff = prompt
-        if ar_hint and "9:16" in ar_hint and "vertical 9:16" not in prompt.lower():
-            prompt_eff += ", vertical 9:16"
-
-        print(f"[GEN] Cena {i}/{total} via {provider} size={size}")
-        if provider == "openai":
-            if not openai_key:
-                raise ValueError("--openai-key requerido")
-            png = openai_generate_image(prompt_eff, api_key=openai_key, size=size)
-        elif provider == "google":
-            if not google_key:
-                raise ValueError("--google-key requerido")
-            png = google_imagen_generate_image(prompt_eff, api_key=google_key, size=size)
-        elif provider == "leonardo":
-            if not leonardo_key:
-                raise ValueError("--leonardo-key requerido")
-            png = leonardo_generate_image(prompt_eff, api_key=leonardo_key, size=size)
-        else:
-            raise ValueError("provider inválido. Use: openai | google | leonardo")
-
-        save_png_bytes(out_path, png)
-        print(f"[OK] {out_path}")
+        out_path = fetch_scene_image(
+            i, prompt, outdir, provider, size=size, ar_hint=ar_hint,
+            openai_key=openai_key, google_key=google_key, leonardo_key=leonardo_key,
+            overwrite=overwrite, total=total, use_cache=use_cache
+        )
+        publish_progress("images", scene=i, total=total, percent=100.0 * i / max(1, total),
+                         bytes_written=os.path.getsize(out_path) if out_path else None)
 
 # =========================
 # CLI
@@ -257,6 +315,7 @@ if __name__ == "__main__":
     ap.add_argument("--google-key", default=os.getenv("GOOGLE_API_KEY"))   # Gemini (ai.google.dev)
     ap.add_argument("--leonardo-key", default=os.getenv("LEONARDO_API_KEY"))
     ap.add_argument("--overwrite", action="store_true")
+    ap.add_argument("--no-cache", action="store_true", help="não consultar/gravar o cache por prompt")
     args = ap.parse_args()
 
     fetch_images_for_storyboard(
@@ -268,5 +327,6 @@ if __name__ == "__main__":
         openai_key=args.openai_key,
         google_key=args.google_key,
         leonardo_key=args.leonardo_key,
-        overwrite=args.overwrite
+        overwrite=args.overwrite,
+        use_cache=not args.no_cache
     )
@@ -0,0 +1,203 @@
+# /var/www/tiktok-automation/backend/image_prompt_cache.py
+# -*- coding: utf-8 -*-
+
+"""
+Cache de imagens endereçado pelo prompt final, compartilhado entre roteiros.
+
+O cache por roteiro (image_cache_index) só acerta quando o roteiro inteiro se
+repete; aqui a chave é o SHA-256 de (prompt normalizado, provedor, tamanho,
+estilo), então cenas de roteiros diferentes com o mesmo prompt otimizado
+(séries recorrentes) reaproveitam a imagem sem nova chamada paga.
+
+- Blobs em DATA_DIR/image_prompt_cache/<k[:2]>/<chave>.<ext>
+- Índice SQLite (tamanho, último uso, hits, metadados do provedor) para LRU
+- Limite de tamanho (IMAGE_PROMPT_CACHE_MAX_MB); os menos usados são removidos
+- Métricas de hit/miss por provedor (`stats()`)
+- Fallbacks (procedural) não entram no cache: só imagens de provedor
+- Blob e arquivo de trabalho nunca compartilham inode (cópia nos dois sentidos):
+  quem edita a imagem no diretório do job não altera o cache
+
+Uso:
+    cache = get_image_prompt_cache()
+    key = ImagePromptCache.make_key(prompt, "openai", "1024x1792", "cinematic")
+    hit = cache.lookup(key, images_dir / f"dalle3_{key[:12]}.png")
+    if not hit:
+        path = gerar(...)
+        cache.store_file(key, path, meta={"provider": "openai"})
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_prompt_cache (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    meta TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_image_prompt_cache_last_used ON image_prompt_cache(last_used);
+"""
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt canônico para a chave (NFC, minúsculas, espaços colapsados, sem pontuação final)."""
+    text = " ".join(unicodedata.normalize("NFC", prompt or "").lower().split())
+    return text.strip(" ,.;")
+
+
+class ImagePromptCache:
+    """Cache de imagens por prompt em disco, com índice SQLite e despejo LRU por tamanho."""
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = 2048 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "index.db"
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, int]] = defaultdict(lambda: {"hits": 0, "misses": 0})
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------- Chave ----------
+    @staticmethod
+    def make_key(prompt: str, provider: str, size: Optional[str] = None,
+                 style: Optional[str] = None) -> str:
+        material = json.dumps({
+            "prompt": normalize_prompt(prompt),
+            "provider": (provider or "").lower(),
+            "size": size,
+            "style": style,
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _place(src: Path, dest: Path):
+        """Cópia atômica de `src` para `dest` (temporário ao lado + os.replace)."""
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+
+    def _count(self, provider: str, outcome: str):
+        with self._lock:
+            self._metrics[provider or "unknown"][outcome] += 1
+
+    # ---------- API pública ----------
+    def lookup(self, key: str, dest: Union[str, Path], provider: str = "") -> Optional[Dict[str, Any]]:
+        """Se o prompt estiver em cache, copia a imagem para `dest` (extensão do blob).
+
+        Cópia, não hardlink: o chamador pode reescrever `dest` no lugar sem tocar no blob.
+        Retorna {"path", "meta"} no hit (e conta hit/miss para `provider`) ou None.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT path, meta FROM image_prompt_cache WHERE key = ?", (key,)).fetchone()
+            if row and not Path(row["path"]).exists():
+                conn.execute("DELETE FROM image_prompt_cache WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute("UPDATE image_prompt_cache SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                             (time.time(), key))
+        if not row:
+            self._count(provider, "misses")
+            return None
+        blob = Path(row["path"])
+        dest = Path(dest).with_suffix(blob.suffix)
+        self._place(blob, dest)
+        self._count(provider, "hits")
+        logger.info(f"♻️ Image cache hit {key[:12]} -> {dest.name}")
+        return {"path": str(dest), "meta": json.loads(row["meta"] or "{}")}
+
+    def store_file(self, key: str, src: Union[str, Path], meta: Optional[Dict[str, Any]] = None) -> Path:
+        """Guarda uma cópia da imagem gerada em `src`. Retorna o caminho do blob.
+
+        Cópia (não hardlink), pelo mesmo motivo de `lookup`: arquivos de trabalho são
+        reescritos no lugar.
+        """
+        src = Path(src)
+        blob = self.root / key[:2] / f"{key}{src.suffix or '.png'}"
+        self._place(src, blob)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO image_prompt_cache (key, path, size, meta, created_at, last_used, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, 0)""",
+                (key, str(blob), blob.stat().st_size, json.dumps(meta or {}, ensure_ascii=False), now, now),
+            )
+        self.evict()
+        return blob
+
+    def evict(self):
+        """Remove entradas menos usadas até o total caber em max_bytes."""
+        with self._lock, self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM image_prompt_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for row in conn.execute(
+                    "SELECT key, path, size FROM image_prompt_cache ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    Path(row["path"]).unlink()
+                except FileNotFoundError:
+                    pass
+                conn.execute("DELETE FROM image_prompt_cache WHERE key = ?", (row["key"],))
+                total -= row["size"]
+                logger.info(f"🧹 Image cache: removido {row['key'][:12]} (LRU)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes FROM image_prompt_cache"
+            ).fetchone()
+        with self._lock:
+            by_provider = {p: dict(m) for p, m in self._metrics.items()}
+        hits = sum(m["hits"] for m in by_provider.values())
+        misses = sum(m["misses"] for m in by_provider.values())
+        return {"entries": row["entries"], "bytes": row["bytes"], "max_bytes": self.max_bytes,
+                "hits": hits, "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 3) if hits + misses else None,
+                "providers": by_provider}
+
+
+_cache: Optional[ImagePromptCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_image_prompt_cache() -> ImagePromptCache:
+    """Cache único por processo, em DATA_DIR/image_prompt_cache (limite IMAGE_PROMPT_CACHE_MAX_MB)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from config_manager import get_config
+            config = get_config()
+            _cache = ImagePromptCache(config.DATA_DIR / "image_prompt_cache",
+                                      max_bytes=config.IMAGE_PROMPT_CACHE_MAX_MB * 1024 * 1024)
+        return _cache
@@ -0,0 +1,176 @@
+# /var/www/tiktok-automation/backend/image_variations.py
+# -*- coding: utf-8 -*-
+
+"""
+Variações locais de uma imagem base (sem chamada a provedor).
+
+O roteiro é completado até 20 imagens com variações de câmera dos prompts
+base ("overhead view, 24mm lens", ...), cada uma gerada (e paga) à parte. Com
+IMAGE_LOCAL_VARIANTS=1, só as N imagens base vão ao provedor e as variações
+são derivadas aqui em alguns milissegundos cada:
+
+- enquadramento: reframes pelos terços, close-ups, pans, composição espelhada
+- grade de cor: LUTs por canal (quente, fria, teal & orange, noir, ...) + vinheta
+
+Tudo com OpenCV (recorte por fatia, um resize, um LUT); a saída mantém a
+resolução da base, então os efeitos de câmera (Ken Burns) seguem iguais.
+
+Uso:
+    paths = derive_variants("scene_1.png", 3, out_dir, prefix="scene_1", start=0)
+    images = await generate_with_local_variants(prompts, variant_of, gerar_remoto, out_dir)
+"""
+
+import os
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# IMAGE_LOCAL_VARIANTS=1 ativa o modo por padrão em generate_images_for_script
+LOCAL_VARIANTS = os.getenv("IMAGE_LOCAL_VARIANTS", "0") == "1"
+
+# (nome, fração do lado mantida, centro x, centro y, espelhar)
+FRAMINGS: List[Tuple[str, float, float, float, bool]] = [
+    ("reframe_left_third", 0.80, 0.33, 0.45, False),
+    ("mirror_wide", 0.92, 0.50, 0.50, True),
+    ("close_up", 0.62, 0.50, 0.40, False),
+    ("pan_right", 0.84, 0.80, 0.50, False),
+    ("top_reframe", 0.84, 0.50, 0.30, False),
+    ("mirror_close", 0.70, 0.45, 0.55, True),
+    ("reframe_right_third", 0.78, 0.67, 0.55, False),
+    ("low_reframe", 0.84, 0.50, 0.72, False),
+]
+
+
+def _curve(gamma: float = 1.0, gain: float = 1.0, lift: float = 0.0, contrast: float = 1.0) -> np.ndarray:
+    x = np.linspace(0.0, 1.0, 256)
+    y = (x ** gamma) * gain + lift
+    y = (y - 0.5) * contrast + 0.5
+    return np.clip(y * 255.0, 0, 255).astype(np.uint8)
+
+
+# Grades em BGR: curva por canal (azul, verde, vermelho) e saturação
+GRADES: Dict[str, Dict] = {
+    "warm": {"curves": (_curve(gain=0.92), _curve(gain=1.0), _curve(gain=1.08, lift=0.02)), "sat": 1.05},
+    "cool": {"curves": (_curve(gain=1.08, lift=0.02), _curve(gain=1.0), _curve(gain=0.92)), "sat": 0.95},
+    "teal_orange": {"curves": (_curve(gamma=0.9, gain=1.04), _curve(gain=1.0), _curve(gamma=1.1, gain=1.08)),
+                    "sat": 1.10},
+    "muted": {"curves": (_curve(lift=0.04, contrast=0.9),) * 3, "sat": 0.70},
+    "contrast": {"curves": (_curve(contrast=1.18),) * 3, "sat": 1.08},
+    "night": {"curves": (_curve(gamma=1.15, gain=1.0), _curve(gamma=1.25, gain=0.85),
+                         _curve(gamma=1.3, gain=0.75)), "sat": 0.80},
+    "golden": {"curves": (_curve(gain=0.85), _curve(gain=1.02, lift=0.02), _curve(gain=1.1, lift=0.04)),
+               "sat": 1.12},
+    "noir": {"curves": (_curve(contrast=1.25),) * 3, "sat": 0.0},
+}
+_GRADE_ORDER = list(GRADES)
+
+
+@lru_cache(maxsize=8)
+def _vignette(width: int, height: int, strength: float = 0.35) -> np.ndarray:
+    """Máscara (h, w, 3) uint8 de vinheta radial (255 = sem escurecer), cacheada por resolução."""
+    ys = np.linspace(-1.0, 1.0, height, dtype=np.float32)[:, None]
+    xs = np.linspace(-1.0, 1.0, width, dtype=np.float32)[None, :]
+    r = np.sqrt(xs * xs + ys * ys) / np.sqrt(2.0)
+    mask = np.round(255.0 * (1.0 - strength * np.clip(r, 0.0, 1.0) ** 2)).astype(np.uint8)
+    mask = cv2.merge([mask, mask, mask])
+    mask.setflags(write=False)
+    return mask
+
+
+def reframe(img: np.ndarray, keep: float, cx: float, cy: float, mirror: bool = False) -> np.ndarray:
+    """Recorte `keep` do lado centrado em (cx, cy) (limitado à imagem) e volta à resolução original."""
+    h, w = img.shape[:2]
+    cw, ch = max(1, int(w * keep)), max(1, int(h * keep))
+    x0 = int(np.clip(cx * w - cw / 2, 0, w - cw))
+    y0 = int(np.clip(cy * h - ch / 2, 0, h - ch))
+    out = img[y0:y0 + ch, x0:x0 + cw]
+    if mirror:
+        out = cv2.flip(out, 1)
+    return cv2.resize(out, (w, h), interpolation=cv2.INTER_CUBIC)
+
+
+def grade(img: np.ndarray, name: str, vignette: bool = True) -> np.ndarray:
+    """Aplica a grade de cor `name` (LUT por canal + saturação) e, opcionalmente, vinheta."""
+    spec = GRADES[name]
+    lut = np.stack(spec["curves"], axis=1)[:, None, :]  # (256, 1, 3) para cv2.LUT em BGR
+    out = cv2.LUT(img[:, :, :3], lut)
+    if spec["sat"] != 1.0:
+        # Saturação: mistura com a versão em cinza (aritmética saturada do OpenCV, em uint8)
+        gray = cv2.cvtColor(cv2.cvtColor(out, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR)
+        out = cv2.addWeighted(out, spec["sat"], gray, 1.0 - spec["sat"], 0.0)
+    if vignette:
+        h, w = out.shape[:2]
+        out = cv2.multiply(out, _vignette(w, h), scale=1.0 / 255.0)
+    return out
+
+
+def variant(img: np.ndarray, k: int) -> Tuple[np.ndarray, str]:
+    """k-ésima variação determinística: enquadramento e grade alternam em ciclos diferentes."""
+    name, keep, cx, cy, mirror = FRAMINGS[k % len(FRAMINGS)]
+    grade_name = _GRADE_ORDER[(3 * k + 1) % len(_GRADE_ORDER)]
+    out = grade(reframe(img, keep, cx, cy, mirror), grade_name)
+    return out, f"{name}+{grade_name}"
+
+
+def derive_variants(src_path: str, count: int, out_dir: str, prefix: Optional[str] = None,
+                    start: int = 0) -> List[str]:
+    """Gera `count` variações de `src_path` em `out_dir` (PNG). Retorna os caminhos (vazio se falhar)."""
+    img = cv2.imread(src_path, cv2.IMREAD_COLOR)
+    if img is None:
+        logger.warning(f"⚠️ Não foi possível ler a imagem base {src_path}")
+        return []
+    prefix = prefix or os.path.splitext(os.path.basename(src_path))[0]
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for k in range(start, start + count):
+        out, label = variant(img, k)
+        path = os.path.join(out_dir, f"{prefix}_var{k + 1:02d}.png")
+        tmp = f"{path}.{os.getpid()}.tmp.png"
+        cv2.imwrite(tmp, out, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        os.replace(tmp, path)
+        logger.debug(f"🪄 Variação local {label}: {os.path.basename(path)}")
+        paths.append(path)
+    return paths
+
+
+async def generate_with_local_variants(
+        prompts: List[str], variant_of: List[Optional[int]],
+        generate: Callable[[int, str], Awaitable[Optional[str]]], out_dir: str) -> List[Optional[str]]:
+    """Gera só os prompts base (`variant_of[i] is None`) e deriva os demais da sua base.
+
+    `generate(i, prompt)` é a geração remota; variações de uma base que falhou
+    voltam a ser geradas remotamente. Retorna os caminhos na ordem de `prompts`.
+    """
+    results: List[Optional[str]] = [None] * len(prompts)
+    remote = [i for i, base in enumerate(variant_of) if base is None]
+    for i, path in zip(remote, await asyncio.gather(*(generate(i, prompts[i]) for i in remote))):
+        results[i] = path
+
+    by_base: Dict[int, List[int]] = {}
+    for i, base in enumerate(variant_of):
+        if base is not None:
+            by_base.setdefault(base, []).append(i)
+
+    fallback: List[int] = []
+    for base, indices in by_base.items():
+        src = results[base]
+        if not src or not os.path.exists(src):
+            fallback.extend(indices)
+            continue
+        paths = await asyncio.to_thread(derive_variants, src, len(indices), out_dir)
+        for i, path in zip(indices, paths):
+            results[i] = path
+        fallback.extend(indices[len(paths):])
+
+    if fallback:
+        for i, path in zip(fallback, await asyncio.gather(*(generate(i, prompts[i]) for i in fallback))):
+            results[i] = path
+    logger.info(f"🪄 {len(prompts) - len(remote) - len(fallback)} variações derivadas localmente, "
+                f"{len(remote) + len(fallback)} imagens geradas no provedor")
+    return results
@@ -6,6 +6,7 @@ Combina TTS + Efeitos Visuais + Publicação Multi-Plataforma
 """
 
 import os
+import re
 import sys
 import asyncio
 import logging
@@ -15,6 +16,8 @@ from datetime import datetime, timedelta
 from pathlib import Path
 import json
 
+from job_workspace import unique_token
+
 # Adiciona o diretório do suaobra ao path para importar TTS
 suaobra_backend = "/var/www/tiktok-automation/backend"
 if suaobra_backend not in sys.path:
@@ -29,12 +32,19 @@ except ImportError:
     logging.warning("⚠️ Sistema TTS não disponível")
 
 try:
-    from visual_effects_system import VisualEffectsSystem, create_multi_platform_video
+    from visual_effects_system import VisualEffectsSystem
     VISUAL_EFFECTS_AVAILABLE = True
 except ImportError:
     VISUAL_EFFECTS_AVAILABLE = False
     logging.warning("⚠️ Sistema de Efeitos Visuais não disponível")
 
+try:
+    from services.image_generator import ImageGeneratorService
+    IMAGES_AVAILABLE = True
+except ImportError:
+    IMAGES_AVAILABLE = False
+    logging.warning("⚠️ Gerador de Imagens não disponível")
+
 try:
     from multi_platform_publisher import MultiPlatformPublisher, PublishRequest, Platform
     PUBLISHER_AVAILABLE = True
@@ -58,6 +68,7 @@ class ContentRequest:
     # Configurações visuais
     visual_style: str = "modern_tech"
     platform_specs: List[str] = None
+    images: List[str] = None
     
     # Configurações de publicação
     title: str = ""
@@ -73,6 +84,8 @@ class ContentRequest:
             self.platform_specs = ["tiktok", "instagram_reels", "youtube_shorts"]
         if self.tags is None:
             self.tags = []
+        if self.images is None:
+            self.images = []
         if self.platforms is None:
             self.platforms = [Platform.TIKTOK, Platform.INSTAGRAM_REELS, Platform.YOUTUBE_SHORTS]
 
@@ -106,6 +119,7 @@ class IntegratedContentSystem:
         # Inicializa subsistemas
         self.tts_system = None
         self.visual_system = None
+        self.image_service = None
         self.publisher = None
         
         self._initialize_subsystems()
@@ -138,6 +152,14 @@ class IntegratedContentSystem:
             except Exception as e:
                 logger.error(f"❌ Erro ao carregar Efeitos Visuais: {e}")
         
+        # Gerador de Imagens (quando a solicitação não traz imagens)
+        if IMAGES_AVAILABLE:
+            try:
+                self.image_service = ImageGeneratorService()
+                logger.info("✅ Gerador de Imagens carregado")
+            except Exception as e:
+                logger.error(f"❌ Erro ao carregar Gerador de Imagens: {e}")
+        
         # Sistema de Publicação
         if PUBLISHER_AVAILABLE:
             try:
@@ -224,7 +246,7 @@ class IntegratedContentSystem:
             
             if audio_path and os.path.exists(audio_path):
                 # Salva arquivo principal
-                main_audio_path = self.temp_dir / f"audio_main_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
+                main_audio_path = self.temp_dir / f"audio_main_{unique_token()}.mp3"
                 
                 # Copia o arquivo gerado
                 import shutil
@@ -237,7 +259,7 @@ class IntegratedContentSystem:
                 for i, platform in enumerate(request.platform_specs):
                     if platform != 'main':
                         # Copia o áudio principal para cada plataforma
-                        platform_audio_path = self.temp_dir / f"audio_{platform}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp3"
+                        platform_audio_path = self.temp_dir / f"audio_{platform}_{unique_token()}.mp3"
                         
                         shutil.copy2(main_audio_path, platform_audio_path)
                         audio_files[platform] = str(platform_audio_path)
@@ -258,44 +280,52 @@ class IntegratedContentSystem:
             return {}
         
         try:
-            video_files = {}
-            
-            for platform, audio_path in audio_files.items():
-                if platform == 'main':
-                    continue
-                    
-                logger.info(f"🎬 Criando vídeo para {platform}")
-                
-                # Configurações específicas da plataforma
-                platform_config = self._get_platform_video_config(platform)
-                
-                # Gera vídeo usando o sistema de efeitos visuais
-                video_result = await asyncio.to_thread(
-                    create_multi_platform_video,
-                    audio_path,
-                    {
-                        "text": request.text,
-                        "platforms": [platform],
-                        "style": request.visual_style
-                    }
-                )
-                
-                if video_result and video_result.get('success'):
-                    platform_videos = video_result.get('videos', {})
-                    if platform in platform_videos:
-                        video_files[platform] = platform_videos[platform]
-                        logger.info(f"✅ Vídeo criado para {platform}: {platform_videos[platform]}")
-                    else:
-                        logger.warning(f"⚠️ Vídeo não gerado para {platform}")
+            images = request.images or await self._generate_images(request)
+            if not images:
+                logger.error("❌ Nenhuma imagem disponível para os vídeos")
+                return {}
+
+            # Todas as plataformas usam a mesma narração: compõe uma vez e codifica cada saída
+            platforms = [p for p in audio_files if p != 'main']
+            logger.info(f"🎬 Criando vídeos para {', '.join(platforms)} (um único composite)")
+            video_files = await self.visual_system.create_platform_videos(
+                audio_files['main'],
+                images,
+                request.text,
+                {
+                    "visual_style": request.visual_style,
+                    "platform_configs": {p: self._get_platform_video_config(p) for p in platforms},
+                },
+                platforms,
+            )
+            for platform in platforms:
+                if platform in video_files:
+                    logger.info(f"✅ Vídeo criado para {platform}: {video_files[platform]}")
                 else:
-                    logger.error(f"❌ Falha na criação de vídeo para {platform}")
-            
+                    logger.warning(f"⚠️ Vídeo não gerado para {platform}")
             return video_files
             
         except Exception as e:
             logger.error(f"❌ Erro na criação de vídeos: {e}")
             return {}
 
+    async def _generate_images(self, request: ContentRequest) -> List[str]:
+        """Gera as imagens a partir do texto quando a solicitação não traz `images`"""
+        if not self.image_service:
+            logger.error("❌ Gerador de Imagens não disponível")
+            return []
+        
+        try:
+            # Cada frase do texto vira um conceito visual (visual_cues)
+            cues = [c.strip() for c in re.split(r"(?<=[.!?])\s+", request.text) if c.strip()]
+            logger.info(f"🖼️ Gerando imagens a partir de {len(cues)} frases do texto")
+            return await self.image_service.generate_images_for_script(
+                {"visual_cues": cues}, visual_style=request.visual_style
+            ) or []
+        except Exception as e:
+            logger.error(f"❌ Erro na geração de imagens: {e}")
+            return []
+
     def _get_platform_video_config(self, platform: str) -> Dict[str, Any]:
         """Retorna configurações específicas de vídeo por plataforma"""
         configs = {
@@ -428,6 +458,7 @@ class IntegratedContentSystem:
             "systems": {
                 "tts": TTS_AVAILABLE and self.tts_system is not None,
                 "visual_effects": VISUAL_EFFECTS_AVAILABLE and self.visual_system is not None,
+                "images": IMAGES_AVAILABLE and self.image_service is not None,
                 "publisher": PUBLISHER_AVAILABLE and self.publisher is not None
             },
             "content_history_count": len(self.content_history),
@@ -465,7 +496,8 @@ async def create_content_from_text(
     tags: List[str] = None,
     voice: str = "pt-BR-Neural2-A",
     style: str = "modern_tech",
-    platforms: List[str] = None
+    platforms: List[str] = None,
+    images: List[str] = None
 ) -> ContentResult:
     """Função de conveniência para criação rápida de conteúdo"""
     
@@ -499,7 +531,8 @@ async def create_content_from_text(
         voice_name=voice,
         visual_style=style,
         platform_specs=platforms,
-        platforms=platform_enums
+        platforms=platform_enums,
+        images=images
     )
     
     return await integrated_system.create_and_publish_content(request)
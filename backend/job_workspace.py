@@ -0,0 +1,164 @@
+# /var/www/tiktok-automation/backend/job_workspace.py
+# -*- coding: utf-8 -*-
+
+"""
+Workspace por job de render: temporários isolados e nomes de mídia sem colisão.
+
+Dois renders simultâneos se atropelavam: o MoviePy gravava o áudio temporário
+em "temp-audio.m4a" no diretório corrente (o backend, para todos os jobs) e os
+arquivos de mídia eram nomeados pelo segundo (`video_final_%Y%m%d_%H%M%S.mp4`).
+Aqui:
+
+- `job_workspace(job_id)`: diretório TEMP_DIR/jobs/<job_id>, ativo no contexto
+  (contextvars, como `progress_events.job_context`; vale para `asyncio.to_thread`
+  e tasks filhas) e apagado ao sair
+- `temp_path(prefix, ext)`: temporário dentro do workspace atual (sem workspace:
+  TEMP_DIR com nome único)
+- `media_name(prefix, ext)`: `<prefix>_<timestamp>_<aleatório>.ext` para saídas
+  em MEDIA_DIR (continua ordenável por data, mas não colide no mesmo segundo)
+- `production_dir(key)`: diretório PERSISTENTE da produção em DATA_DIR/productions/<key>
+  (imagens, TTS, motions e segmentos reaproveitados entre jobs do mesmo storyboard,
+  base do re-render incremental); jobs da mesma produção rodam um de cada vez
+
+Uso:
+    with job_workspace(job_id) as ws, production_dir(key) as work_dir:
+        run_pipeline(storyboard, work_dir=work_dir, out=ws.temp_path("final.mp4"))
+        ...
+        clip.write_videofile(out, temp_audiofile=temp_path("audio", ".m4a"))
+    output = config.VIDEO_DIR / media_name("video_final", ".mp4")
+"""
+
+import os
+import re
+import time
+import uuid
+import shutil
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+
+from progress_events import current_job_id
+
+logger = logging.getLogger(__name__)
+
+_current_workspace: contextvars.ContextVar[Optional["JobWorkspace"]] = contextvars.ContextVar(
+    "job_workspace", default=None)
+
+_production_locks: Dict[str, threading.Lock] = {}
+_production_locks_guard = threading.Lock()
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def unique_token() -> str:
+    """Timestamp (ordenável) + sufixo aleatório: único mesmo entre jobs no mesmo segundo."""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def media_name(prefix: str, ext: str) -> str:
+    """Nome de arquivo de saída único: `<prefix>_<timestamp>_<aleatório><ext>`."""
+    return f"{prefix}_{unique_token()}{ext}"
+
+
+def _default_root() -> Path:
+    from config_manager import get_config
+    return get_config().TEMP_DIR / "jobs"
+
+
+def _productions_root() -> Path:
+    from config_manager import get_config
+    return get_config().DATA_DIR / "productions"
+
+
+class JobWorkspace:
+    """Diretório exclusivo de um job (temporários e artefatos intermediários)."""
+
+    def __init__(self, job_id: str, root: Optional[Union[str, Path]] = None):
+        self.job_id = job_id
+        self.path = Path(root or _default_root()) / job_id
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def temp_path(self, name: str) -> str:
+        return str(self.path / name)
+
+    def cleanup(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __repr__(self) -> str:
+        return f"JobWorkspace({self.job_id!r}, {str(self.path)!r})"
+
+
+def current_workspace() -> Optional[JobWorkspace]:
+    return _current_workspace.get()
+
+
+@contextmanager
+def job_workspace(job_id: Optional[str] = None, root: Optional[Union[str, Path]] = None,
+                  keep: bool = False) -> Iterator[JobWorkspace]:
+    """Ativa o workspace do job (padrão: job do progress_events ou um id novo); apaga ao sair, salvo `keep`."""
+    workspace = JobWorkspace(job_id or current_job_id() or new_job_id(), root)
+    token = _current_workspace.set(workspace)
+    try:
+        yield workspace
+    finally:
+        _current_workspace.reset(token)
+        if not keep:
+            workspace.cleanup()
+
+
+def temp_path(prefix: str, ext: str = "") -> str:
+    """Caminho temporário único no workspace do job atual (sem workspace: em TEMP_DIR)."""
+    workspace = current_workspace()
+    if workspace is not None:
+        return workspace.temp_path(f"{prefix}_{uuid.uuid4().hex[:8]}{ext}")
+    from config_manager import get_config
+    temp_dir = get_config().TEMP_DIR
+    os.makedirs(temp_dir, exist_ok=True)
+    return str(temp_dir / media_name(prefix, ext))
+
+
+@contextmanager
+def production_dir(key: str, root: Optional[Union[str, Path]] = None) -> Iterator[Path]:
+    """Diretório persistente da produção `key` (não é apagado ao sair).
+
+    Dois jobs da mesma produção (ex.: draft e final) compartilham os artefatos,
+    então são serializados por um lock por chave.
+    """
+    safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", key).strip(".")[:80] or "default"
+    with _production_locks_guard:
+        lock = _production_locks.setdefault(safe_key, threading.Lock())
+    with lock:
+        path = Path(root or _productions_root()) / safe_key
+        path.mkdir(parents=True, exist_ok=True)
+        os.utime(path)  # uso recente: fora do alcance de prune_productions
+        yield path
+
+
+def prune_productions(max_age_days: float, root: Optional[Union[str, Path]] = None) -> int:
+    """Apaga produções sem uso há mais de `max_age_days`. Retorna quantas foram removidas."""
+    base = Path(root or _productions_root())
+    if not base.exists():
+        return 0
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for path in base.iterdir():
+        if not path.is_dir() or path.stat().st_mtime >= cutoff:
+            continue
+        with _production_locks_guard:
+            lock = _production_locks.setdefault(path.name, threading.Lock())
+        if not lock.acquire(blocking=False):
+            continue  # job da produção rodando agora
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+        finally:
+            lock.release()
+    if removed:
+        logger.info(f"🧹 {removed} produção(ões) sem uso removida(s) de {base}")
+    return removed
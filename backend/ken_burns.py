@@ -0,0 +1,109 @@
+# /var/www/tiktok-automation/backend/ken_burns.py
+# -*- coding: utf-8 -*-
+
+"""
+Motor de Ken Burns (zoom lento) sem resize de quadro inteiro por frame.
+
+Antes, cada quadro (30/s) fazia cv2.resize do frame completo (ou resized(lambda t)
+do MoviePy) e depois recortava o centro. Aqui:
+
+1) a imagem é enquadrada e escalada UMA vez para o zoom máximo (buffer fonte)
+2) cada quadro é uma transformação afim (escala + translação sub-pixel) do
+   buffer direto para um array de saída pré-alocado (cv2.warpAffine, bilinear)
+
+O buffer fica em RGBA: o warpAffine do OpenCV tem caminho vetorizado para 4
+canais (~2x mais rápido que 3), e a volta para RGB é uma cópia barata.
+
+O recorte sub-pixel também elimina o "tremido" do crop em pixels inteiros.
+
+Uso:
+    kb = KenBurns("scene_01.png", duration=4.0, size=(1080, 1920))
+    clip = kb.clip()                       # VideoClip do MoviePy
+    frame = kb.frame(2.0)                  # np.ndarray RGB (reutilizado entre chamadas)
+"""
+
+from typing import Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def _load_rgb(image: Union[str, np.ndarray]) -> np.ndarray:
+    if isinstance(image, np.ndarray):
+        return image[..., :3] if image.ndim == 3 else np.dstack([image] * 3)
+    with Image.open(image) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+def _crop_to_aspect(src: np.ndarray, width: int, height: int) -> np.ndarray:
+    """Recorte central para a proporção width:height (equivalente a 'cover')."""
+    h, w = src.shape[:2]
+    target = width / float(height)
+    if w / float(h) > target:
+        cw = max(1, int(round(h * target)))
+        x0 = (w - cw) // 2
+        return src[:, x0:x0 + cw]
+    ch = max(1, int(round(w / target)))
+    y0 = (h - ch) // 2
+    return src[y0:y0 + ch]
+
+
+class KenBurns:
+    """Zoom central de zoom_start a zoom_end ao longo de `duration` segundos.
+
+    size=(W, H): preenche WxH (recorte central, como 'cover').
+    height=H: mantém a proporção da imagem com altura H (largura derivada).
+    """
+
+    def __init__(self, image: Union[str, np.ndarray], duration: float,
+                 size: Optional[Tuple[int, int]] = None, height: Optional[int] = None,
+                 zoom_start: float = 1.0, zoom_end: float = 1.05):
+        src = _load_rgb(image)
+        if size is not None:
+            out_w, out_h = int(size[0]), int(size[1])
+            src = _crop_to_aspect(src, out_w, out_h)
+        else:
+            ih, iw = src.shape[:2]
+            out_h = int(height or ih)
+            out_w = max(2, int(round(iw * out_h / float(ih))))
+
+        self.size = (out_w, out_h)
+        self.duration = max(0.001, float(duration))
+        self.zoom_start = float(zoom_start)
+        self.zoom_end = float(zoom_end)
+        self._zoom_max = max(self.zoom_start, self.zoom_end, 1e-3)
+
+        # (1) Escala única para o zoom máximo
+        buf_w = max(1, int(round(out_w * self._zoom_max)))
+        buf_h = max(1, int(round(out_h * self._zoom_max)))
+        interp = cv2.INTER_AREA if buf_w < src.shape[1] else cv2.INTER_CUBIC
+        self._buffer = cv2.cvtColor(cv2.resize(src, (buf_w, buf_h), interpolation=interp), cv2.COLOR_RGB2RGBA)
+        self._warped = np.empty((out_h, out_w, 4), dtype=np.uint8)
+        self._out = np.empty((out_h, out_w, 3), dtype=np.uint8)
+        self._matrix = np.zeros((2, 3), dtype=np.float64)
+
+    def zoom_at(self, t: float) -> float:
+        alpha = min(1.0, max(0.0, t / self.duration))
+        return self.zoom_start + (self.zoom_end - self.zoom_start) * alpha
+
+    def frame(self, t: float) -> np.ndarray:
+        """Quadro RGB no instante t. O array é reutilizado: copie se precisar guardá-lo."""
+        out_w, out_h = self.size
+        buf_h, buf_w = self._buffer.shape[:2]
+        # k = pixels do buffer por pixel de saída (1.0 no zoom máximo)
+        kx = buf_w / (out_w * self.zoom_at(t))
+        ky = buf_h / (out_h * self.zoom_at(t))
+        m = self._matrix
+        # Mapeia o centro dos pixels de saída para o buffer (saída -> fonte), janela centralizada
+        m[0, 0], m[0, 2] = kx, buf_w / 2.0 - kx * out_w / 2.0 + 0.5 * kx - 0.5
+        m[1, 1], m[1, 2] = ky, buf_h / 2.0 - ky * out_h / 2.0 + 0.5 * ky - 0.5
+        # (2) Transformação afim sub-pixel direto para o array pré-alocado
+        cv2.warpAffine(self._buffer, m, (out_w, out_h), dst=self._warped,
+                       flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
+        return cv2.cvtColor(self._warped, cv2.COLOR_RGBA2RGB, dst=self._out)
+
+    def clip(self):
+        """VideoClip (MoviePy 2.x) gerado quadro a quadro pelo motor."""
+        from moviepy import VideoClip
+        return VideoClip(self.frame, duration=self.duration)
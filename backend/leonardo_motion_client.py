@@ -10,6 +10,9 @@ Fluxo:
   3) poll_job(job_id) -> { status, video_url? }
   4) download_video(video_url, out_path)
 
+Para várias cenas, use start_motion_job/check_video com motion_batch.MotionBatch
+(jobs concorrentes com polling único).
+
 Config:
   - LEONARDO_API_KEY via env var ou parâmetro
   - Endpoints podem mudar. Substitua os PLACEHOLDER_* pelos endpoints da sua conta.
@@ -23,6 +26,9 @@ import time
 import requests
 from typing import Optional
 
+from provider_throttle import throttle
+
+
 class LeonardoMotionClient:
     def __init__(self, api_key: str, base_url: str = "https://cloud.leonardo.ai/api"):
         self.api_key = api_key
@@ -73,7 +79,8 @@ class LeonardoMotionClient:
         if model:
             payload["model"] = model
 
-        r = self.session.post(url, json=payload, timeout=60)
+        with throttle("leonardo"):
+            r = self.session.post(url, json=payload, timeout=60)
         r.raise_for_status()
         data = r.json()
         job_id = data.get("generationId") or data.get("id") or data.get("job_id")
@@ -82,33 +89,72 @@ class LeonardoMotionClient:
         return job_id
 
     # ---------- 3) POLL ----------
+    def fetch_job(self, job_id: str) -> Optional[dict]:
+        """
+        Uma única consulta de status. Retorna o payload final se concluído,
+        None se ainda pendente; levanta RuntimeError se o job falhou.
+        """
+        url = f"{self.base_url}/rest/v1/generations/{job_id}"  # Endpoint atualizado
+        r = self.session.get(url, timeout=30)
+        r.raise_for_status()
+        data = r.json()
+
+        # Para Leonardo AI, o status está na estrutura de generations
+        generation = data.get("generations_by_pk", data)
+        status = (generation.get("status") or "").upper()
+
+        # Status do Leonardo: PENDING, PROCESSING, COMPLETE, FAILED
+        if status in ("COMPLETE", "COMPLETED"):
+            return data
+        if status in ("FAILED", "ERROR"):
+            raise RuntimeError(f"Job falhou: {data}")
+        return None
+
     def poll_job(self, job_id: str, poll_interval: float = 3.0, timeout: int = 600) -> dict:
         """
         Faz polling até concluir. Retorna o payload final (espera conter a URL do vídeo).
         Substitua a rota/campos abaixo conforme a API oficial.
         """
-        url = f"{self.base_url}/rest/v1/generations/{job_id}"  # Endpoint atualizado
         t0 = time.time()
         while True:
-            r = self.session.get(url, timeout=30)
-            r.raise_for_status()
-            data = r.json()
-
-            # Para Leonardo AI, o status está na estrutura de generations
-            generation = data.get("generations_by_pk", data)
-            status = (generation.get("status") or "").upper()
-            
-            # Status do Leonardo: PENDING, PROCESSING, COMPLETE, FAILED
-            if status in ("COMPLETE", "COMPLETED"):
+            data = self.fetch_job(job_id)
+            if data is not None:
                 return data
-            if status in ("FAILED", "ERROR"):
-                raise RuntimeError(f"Job falhou: {data}")
 
             if time.time() - t0 > timeout:
                 raise TimeoutError(f"Timeout polling job {job_id}")
 
             time.sleep(poll_interval)
 
+    @staticmethod
+    def extract_video_url(result: dict) -> str:
+        """Extrai a URL do vídeo do payload final do job."""
+        generation = result.get("generations_by_pk", result)
+        generated_videos = generation.get("generated_videos", [])
+
+        if not generated_videos:
+            raise RuntimeError(f"No video generated: {result}")
+
+        video_url = generated_videos[0].get("url")
+        if not video_url:
+            raise RuntimeError(f"No video URL in result: {result}")
+        return video_url
+
+    def check_video(self, job_id: str) -> Optional[str]:
+        """Consulta não bloqueante para lotes (motion_batch): URL do vídeo ou None se pendente."""
+        data = self.fetch_job(job_id)
+        return self.extract_video_url(data) if data is not None else None
+
+    def start_motion_job(self, image_path: str, duration_sec: float,
+                         prompt: str = "slow cinematic zoom in, 9:16 vertical") -> str:
+        """Upload + criação do job, sem esperar (usado pelo lote concorrente)."""
+        asset_id = self.upload_image(image_path)
+        return self.create_motion_job(
+            asset_id_or_url=asset_id,
+            prompt=prompt,
+            duration_sec=duration_sec
+        )
+
     # ---------- 4) DOWNLOAD ----------
     def download_video(self, video_url: str, out_path: str) -> str:
         r = self.session.get(video_url, stream=True, timeout=300)
@@ -147,15 +193,7 @@ class LeonardoMotionClient:
         result = self.poll_job(job_id)
         
         # Extrair URL do vídeo do resultado
-        generation = result.get("generations_by_pk", result)
-        generated_videos = generation.get("generated_videos", [])
-        
-        if not generated_videos:
-            raise RuntimeError(f"No video generated: {result}")
-            
-        video_url = generated_videos[0].get("url")
-        if not video_url:
-            raise RuntimeError(f"No video URL in result: {result}")
+        video_url = self.extract_video_url(result)
         
         print(f"[Leonardo] Downloading: {out_path}")
         return self.download_video(video_url, out_path)
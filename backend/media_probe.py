@@ -0,0 +1,252 @@
+# /var/www/tiktok-automation/backend/media_probe.py
+# -*- coding: utf-8 -*-
+
+"""
+Probe rápido de mídia (duração / taxa / canais / codec) sem decodificar.
+
+- WAV: cabeçalho RIFF (chunks fmt/data)
+- MP3: primeiro frame MPEG + cabeçalho Xing/Info/VBRI (VBR) ou bitrate (CBR)
+- demais formatos (ou cabeçalho inválido): uma chamada ao ffprobe
+- resultados memorizados por caminho + tamanho + mtime
+
+Antes, cada duração abria um AudioFileClip (processo ffmpeg) ou decodificava o
+MP3 inteiro com pydub; aqui são alguns KB lidos do disco.
+
+Uso:
+    d = audio_duration("scene_01.mp3")                  # float | None
+    infos = probe_many(["a.mp3", "b.wav", "c.m4a"])     # {path: MediaInfo | None}
+"""
+
+import os
+import json
+import struct
+import logging
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+PROBE_WORKERS = int(os.getenv("MEDIA_PROBE_WORKERS", "4"))
+_MEMO_MAX = 4096
+
+
+@dataclass(frozen=True)
+class MediaInfo:
+    duration: float
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+    codec: Optional[str] = None
+    source: str = "header"  # "header" | "ffprobe"
+
+
+# =========================
+# WAV
+# =========================
+
+_WAV_CODECS = {1: "pcm_s{bits}le", 3: "pcm_f{bits}le", 6: "pcm_alaw", 7: "pcm_mulaw"}
+
+
+def _probe_wav(f: BinaryIO, size: int) -> Optional[MediaInfo]:
+    head = f.read(12)
+    if len(head) < 12 or head[:4] not in (b"RIFF", b"RF64") or head[8:12] != b"WAVE":
+        return None
+    fmt = None
+    pos = 12
+    while pos + 8 <= size:
+        f.seek(pos)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"fmt ":
+            fmt = struct.unpack("<HHIIHH", f.read(16))
+        elif chunk_id == b"data" and fmt:
+            audio_format, channels, sample_rate, byte_rate, _, bits = fmt
+            data_size = chunk_size
+            if data_size == 0xFFFFFFFF or pos + 8 + data_size > size:
+                data_size = size - pos - 8  # streaming / RF64 / truncado: até o fim do arquivo
+            if audio_format == 0xFFFE:  # WAVE_FORMAT_EXTENSIBLE: PCM na prática
+                audio_format = 1
+            codec = _WAV_CODECS.get(audio_format, "wav_0x{fmt:04x}").format(bits=bits, fmt=audio_format)
+            return MediaInfo(duration=data_size / float(byte_rate) if byte_rate else 0.0,
+                             sample_rate=sample_rate, channels=channels, codec=codec)
+        pos += 8 + chunk_size + (chunk_size & 1)
+    return None
+
+
+# =========================
+# MP3
+# =========================
+
+_MP3_BITRATES = {  # kbps por (versão MPEG-1?, layer)
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _mp3_header(b: bytes) -> Optional[Tuple[int, int, int, int, int]]:
+    """(bitrate bps, sample_rate, samples por frame, tamanho do frame, canais) ou None."""
+    if len(b) < 4 or b[0] != 0xFF or (b[1] & 0xE0) != 0xE0:
+        return None
+    version = (b[1] >> 3) & 0x03        # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+    layer = 4 - ((b[1] >> 1) & 0x03)    # 1..3
+    br_idx, sr_idx = (b[2] >> 4) & 0x0F, (b[2] >> 2) & 0x03
+    if version == 1 or layer == 4 or br_idx in (0, 15) or sr_idx == 3:
+        return None
+    mpeg1 = version == 3
+    bitrate = _MP3_BITRATES[(mpeg1, layer)][br_idx] * 1000
+    sample_rate = _MP3_RATES[version][sr_idx]
+    padding = (b[2] >> 1) & 0x01
+    channels = 1 if (b[3] >> 6) == 3 else 2
+    if layer == 1:
+        return bitrate, sample_rate, 384, (12 * bitrate // sample_rate + padding) * 4, channels
+    spf = 1152 if (layer == 2 or mpeg1) else 576
+    return bitrate, sample_rate, spf, spf // 8 * bitrate // sample_rate + padding, channels
+
+
+def _probe_mp3(f: BinaryIO, size: int) -> Optional[MediaInfo]:
+    f.seek(0)
+    start = 0
+    tag = f.read(10)
+    if tag[:3] == b"ID3" and len(tag) == 10:  # ID3v2: tamanho "synchsafe" (7 bits por byte)
+        start = 10 + ((tag[6] << 21) | (tag[7] << 14) | (tag[8] << 7) | tag[9])
+        if tag[5] & 0x10:
+            start += 10  # rodapé
+    f.seek(start)
+    buf = f.read(64 * 1024)
+
+    i = buf.find(b"\xff")
+    while 0 <= i < len(buf) - 4:
+        hdr = _mp3_header(buf[i:i + 4])
+        if not hdr:
+            i = buf.find(b"\xff", i + 1)
+            continue
+        bitrate, sample_rate, spf, frame_len, channels = hdr
+        # Confirma o sync com o frame seguinte (evita falso positivo em lixo/arte de capa)
+        nxt = buf[i + frame_len:i + frame_len + 4]
+        if len(nxt) == 4 and not _mp3_header(nxt):
+            i = buf.find(b"\xff", i + 1)
+            continue
+        frame = buf[i:i + frame_len]
+        mpeg1 = spf == 1152 and (buf[i + 1] >> 3) & 0x03 == 3
+        side = (32 if channels == 2 else 17) if mpeg1 else (17 if channels == 2 else 9)
+        frames = None
+        xing = frame[4 + side:4 + side + 12]
+        if xing[:4] in (b"Xing", b"Info"):
+            flags = struct.unpack(">I", xing[4:8])[0]
+            if flags & 0x01:
+                frames = struct.unpack(">I", xing[8:12])[0]
+        elif frame[36:40] == b"VBRI":
+            frames = struct.unpack(">I", frame[50:54])[0]
+
+        if frames:
+            duration = frames * spf / float(sample_rate)
+        else:
+            f.seek(max(0, size - 128))
+            tail = size - (128 if f.read(3) == b"TAG" else 0)
+            duration = (tail - (start + i)) * 8.0 / bitrate
+        return MediaInfo(duration=duration, sample_rate=sample_rate, channels=channels, codec="mp3")
+    return None
+
+
+# =========================
+# ffprobe (fallback)
+# =========================
+
+def _ffprobe(path: str) -> Optional[MediaInfo]:
+    try:
+        proc = subprocess.run(
+            [FFPROBE_BIN, "-v", "error", "-show_entries",
+             "format=duration:stream=codec_type,codec_name,sample_rate,channels", "-of", "json", path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.warning(f"⚠️ ffprobe indisponível para {path}: {e}")
+        return None
+    if proc.returncode != 0:
+        return None
+    data = json.loads(proc.stdout or b"{}")
+    duration = data.get("format", {}).get("duration")
+    if duration in (None, "N/A"):
+        return None
+    audio = next((s for s in data.get("streams", []) if s.get("codec_type") == "audio"), {})
+    return MediaInfo(duration=float(duration),
+                     sample_rate=int(audio["sample_rate"]) if audio.get("sample_rate") else None,
+                     channels=audio.get("channels"), codec=audio.get("codec_name"), source="ffprobe")
+
+
+# =========================
+# API pública
+# =========================
+
+_memo: Dict[Tuple[str, int, int], MediaInfo] = {}
+_memo_lock = threading.Lock()
+
+
+def _memo_key(path: str) -> Optional[Tuple[str, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return os.path.abspath(path), st.st_size, st.st_mtime_ns
+
+
+def _probe_headers(path: str, size: int) -> Optional[MediaInfo]:
+    ext = os.path.splitext(path)[1].lower()
+    # Busca de sync MP3 só em .mp3 (em outros containers daria falso positivo)
+    parsers = (_probe_mp3, _probe_wav) if ext == ".mp3" else (_probe_wav,)
+    with open(path, "rb") as f:
+        for parser in parsers:
+            try:
+                f.seek(0)
+                info = parser(f, size)
+            except (struct.error, OSError, IndexError):
+                info = None
+            if info and info.duration > 0:
+                return info
+    return None
+
+
+def probe(path: str, use_ffprobe: bool = True) -> Optional[MediaInfo]:
+    """Informações da mídia (memorizadas por caminho/tamanho/mtime). None se não for possível ler."""
+    key = _memo_key(path)
+    if key is None:
+        return None
+    with _memo_lock:
+        cached = _memo.get(key)
+    if cached:
+        return cached
+
+    info = _probe_headers(path, key[1])
+    if info is None and use_ffprobe:
+        info = _ffprobe(path)
+    if info is not None:
+        with _memo_lock:
+            if len(_memo) >= _MEMO_MAX:
+                _memo.clear()
+            _memo[key] = info
+    return info
+
+
+def probe_many(paths: Iterable[str]) -> Dict[str, Optional[MediaInfo]]:
+    """Probe de vários arquivos: cabeçalhos primeiro; os que sobrarem vão ao ffprobe em paralelo."""
+    paths = list(dict.fromkeys(paths))
+    result = {p: probe(p, use_ffprobe=False) for p in paths}
+    pending = [p for p, info in result.items() if info is None and os.path.exists(p)]
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(PROBE_WORKERS, len(pending))) as pool:
+            for p, info in zip(pending, pool.map(probe, pending)):
+                result[p] = info
+    return result
+
+
+def audio_duration(path: str) -> Optional[float]:
+    """Duração em segundos (None se o arquivo não existir ou não puder ser lido)."""
+    info = probe(path)
+    return info.duration if info else None
@@ -0,0 +1,211 @@
+# /var/www/tiktok-automation/backend/motion_batch.py
+# -*- coding: utf-8 -*-
+
+"""
+Lote concorrente de jobs de motion (Leonardo image->video).
+
+Em vez de upload -> job -> poll (sleep 3s) -> download cena a cena:
+- até `max_in_flight` jobs ficam ativos no provider ao mesmo tempo
+- uploads/criação de jobs e downloads rodam num pool pequeno de threads
+- UM único loop de polling consulta todos os jobs ativos a cada rodada
+- backoff adaptativo: o intervalo cresce enquanto nada muda (e em 429)
+  e volta ao mínimo quando algum job termina
+- cada resultado é baixado assim que fica pronto
+
+O lote é agnóstico de cliente; recebe três funções:
+    start_job(image_path, duration_sec, prompt) -> job_id
+    check_job(job_id) -> video_url | None (pendente); levanta exceção se falhou
+    download(video_url, out_path) -> out_path
+
+Uso:
+    batch = MotionBatch(client.start_motion_job, client.check_motion, client.download)
+    fut = batch.submit(image_path, out_path, duration_sec=6.2)   # Future[str]
+    results = batch.run_all([...])                             # {out_path: caminho | Exception}
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MotionRequest:
+    image_path: str
+    out_path: str
+    duration_sec: float
+    prompt: str = ""
+    future: Future = field(default_factory=Future)
+    job_id: Optional[str] = None
+    submitted_at: float = 0.0
+    context: Optional[contextvars.Context] = None
+
+
+def _is_rate_limited(exc: BaseException) -> bool:
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+class MotionBatch:
+    """Janela limitada de jobs de motion com polling multiplexado."""
+
+    def __init__(self,
+                 start_job: Callable[[str, float, str], str],
+                 check_job: Callable[[str], Optional[str]],
+                 download: Callable[[str, str], Any],
+                 max_in_flight: int = 4,
+                 min_interval: float = 2.0,
+                 max_interval: float = 15.0,
+                 backoff_factor: float = 1.5,
+                 job_timeout: float = 900.0):
+        self.start_job = start_job
+        self.check_job = check_job
+        self.download = download
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_factor = backoff_factor
+        self.job_timeout = job_timeout
+
+        self._pending: Deque[MotionRequest] = deque()
+        self._starting: List[MotionRequest] = []
+        self._active: Dict[str, MotionRequest] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._io = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="motion-io")
+        self._thread: Optional[threading.Thread] = None
+        self._interval = min_interval
+
+    # ---------- API pública ----------
+    def submit(self, image_path: str, out_path: str, duration_sec: float, prompt: str = "") -> Future:
+        """Enfileira uma cena; o Future resolve com out_path (ou a exceção do provider)."""
+        req = MotionRequest(image_path, out_path, float(duration_sec), prompt,
+                            context=contextvars.copy_context())
+        with self._lock:
+            self._pending.append(req)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="motion-poll", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return req.future
+
+    def run_all(self, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Submete vários itens {image_path, out_path, duration_sec, prompt} e espera todos.
+
+        Retorna {out_path: caminho baixado | Exception}.
+        """
+        futures = {item["out_path"]: self.submit(**item) for item in items}
+        results: Dict[str, Any] = {}
+        for out_path, fut in futures.items():
+            try:
+                results[out_path] = fut.result()
+            except Exception as e:
+                results[out_path] = e
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "starting": len(self._starting),
+                "in_flight": len(self._active),
+                "poll_interval": round(self._interval, 2),
+            }
+
+    # ---------- Loop ----------
+    def _in_flight(self) -> int:
+        return len(self._starting) + len(self._active)
+
+    def _fill_window(self):
+        with self._lock:
+            while self._pending and self._in_flight() < self.max_in_flight:
+                req = self._pending.popleft()
+                self._starting.append(req)
+                self._io.submit(req.context.copy().run, self._start, req)
+
+    def _start(self, req: MotionRequest):
+        try:
+            job_id = self.start_job(req.image_path, req.duration_sec, req.prompt)
+        except Exception as e:
+            with self._lock:
+                self._starting.remove(req)
+            req.future.set_exception(e)
+            self._wakeup.set()
+            return
+        req.job_id = job_id
+        req.submitted_at = time.time()
+        with self._lock:
+            self._starting.remove(req)
+            self._active[job_id] = req
+        logger.info(f"🎞️ Motion job {job_id} enviado ({req.out_path})")
+        self._wakeup.set()
+
+    def _download(self, req: MotionRequest, video_url: str):
+        try:
+            self.download(video_url, req.out_path)
+            req.future.set_result(req.out_path)
+        except Exception as e:
+            req.future.set_exception(e)
+        finally:
+            self._wakeup.set()
+
+    def _finish(self, req: MotionRequest):
+        with self._lock:
+            self._active.pop(req.job_id, None)
+
+    def _poll_once(self) -> bool:
+        """Consulta todos os jobs ativos uma vez. Retorna True se algum mudou de estado."""
+        with self._lock:
+            active = list(self._active.values())
+        changed = False
+        for req in active:
+            try:
+                video_url = self.check_job(req.job_id)
+            except Exception as e:
+                if _is_rate_limited(e):
+                    self._interval = min(self.max_interval, self._interval * 2)
+                    logger.warning(f"⏳ Polling de motion limitado (429); intervalo {self._interval:.1f}s")
+                    return changed
+                self._finish(req)
+                req.future.set_exception(e)
+                changed = True
+                continue
+
+            if video_url:
+                self._finish(req)
+                self._io.submit(req.context.copy().run, self._download, req, video_url)
+                changed = True
+            elif time.time() - req.submitted_at > self.job_timeout:
+                self._finish(req)
+                req.future.set_exception(TimeoutError(f"Timeout no job {req.job_id}"))
+                changed = True
+        return changed
+
+    def _loop(self):
+        while True:
+            # Limpa o evento antes de olhar o estado: um submit() que chegue depois
+            # do clear() deixa o evento setado e o wait() abaixo retorna na hora
+            self._wakeup.clear()
+            self._fill_window()
+            with self._lock:
+                idle = not (self._pending or self._starting or self._active)
+            if idle:
+                # Sem trabalho: dorme até um novo submit (encerra após inatividade longa)
+                if not self._wakeup.wait(timeout=60):
+                    with self._lock:
+                        if not (self._pending or self._starting or self._active):
+                            self._thread = None
+                            return
+                continue
+
+            if self._poll_once():
+                self._interval = self.min_interval
+                continue  # janela liberou: envia os próximos antes de dormir
+            self._wakeup.wait(timeout=self._interval)
+            self._interval = min(self.max_interval, self._interval * self.backoff_factor)
@@ -0,0 +1,393 @@
+# /var/www/tiktok-automation/backend/music_library.py
+# -*- coding: utf-8 -*-
+
+"""
+Biblioteca de música de fundo gerenciada.
+
+Antes, cada render baixava a música de novo (requests.get) e gravava uma cópia
+com timestamp em MUSIC_DIR. Agora cada faixa é ingerida UMA vez:
+
+- decodificada para WAV PCM 16-bit a 44.1 kHz estéreo (sem decode no render)
+- normalizada em loudness (MUSIC_LIBRARY_LUFS, padrão -16 LUFS)
+- indexada em SQLite por categoria / mood / duração
+
+No render, `bed(track, duration)` faz loop (crossfade nas emendas) ou corte
+para a duração exata, com fade-out, e o resultado fica num cache limitado
+(MUSIC_DIR/library/beds, MUSIC_BED_CACHE arquivos).
+
+Fontes: URLs do catálogo padrão (ingeridas na primeira vez que a categoria é
+pedida; uma falha não é tentada de novo por MUSIC_RETRY_SECONDS) e arquivos
+soltos em MUSIC_DIR/inbox/<categoria>/ (ingeridos na criação da biblioteca).
+Fontes vindas da API passam por `check_source`: só URLs http(s) de hosts em
+MUSIC_ALLOWED_HOSTS (padrão: os do catálogo) e arquivos dentro do inbox.
+
+Uso:
+    library = get_music_library()
+    track = library.pick("chill", duration=42.0)
+    bed_path = library.bed_path(track, 42.0)
+"""
+
+import os
+import re
+import time
+from urllib.parse import urljoin, urlparse
+import sqlite3
+import hashlib
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+import requests
+
+from audio_dsp import (SAMPLE_RATE, decode_audio, integrated_loudness, loop_to_length, normalize_loudness,
+                       write_wav)
+
+logger = logging.getLogger(__name__)
+
+LIBRARY_LUFS = float(os.getenv("MUSIC_LIBRARY_LUFS", "-16"))
+BED_CACHE_FILES = int(os.getenv("MUSIC_BED_CACHE", "32"))
+# Beds usados há menos que isso não são removidos (um render pode ter recebido o caminho e ainda não lido)
+BED_MIN_AGE_SECONDS = 300.0
+AUDIO_EXTS = (".mp3", ".wav", ".m4a", ".aac", ".ogg", ".flac")
+
+# Catálogo padrão (ingerido sob demanda): categoria -> [(url, nome, mood)]
+DEFAULT_SOURCES: Dict[str, List[tuple]] = {
+    "upbeat": [("https://www.soundjay.com/misc/sounds/gaming_music_loop.wav", "Gaming Loop", "energetic")],
+    "chill": [("https://www.soundjay.com/misc/sounds/chill_background.wav", "Chill Background", "relaxing")],
+    "energetic": [("https://www.soundjay.com/misc/sounds/upbeat_loop.wav", "Upbeat Loop", "energetic")],
+    "ambient": [("https://www.soundjay.com/misc/sounds/ambient_music.wav", "Ambient", "peaceful")],
+    "misterio": [("https://www.soundhelix.com/examples/mp3/SoundHelix-Song-2.mp3", "SoundHelix 2", "suspenseful")],
+    "inspiracional": [("https://www.soundhelix.com/examples/mp3/SoundHelix-Song-3.mp3", "SoundHelix 3", "inspirational")],
+    "educativo": [("https://www.soundhelix.com/examples/mp3/SoundHelix-Song-4.mp3", "SoundHelix 4", "neutral")],
+}
+DEFAULT_CATEGORY = "upbeat"
+
+# Hosts de onde a API aceita baixar faixas (separados por vírgula)
+ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv(
+    "MUSIC_ALLOWED_HOSTS",
+    ",".join(sorted({urlparse(url).hostname for sources in DEFAULT_SOURCES.values() for url, *_ in sources})),
+).split(",") if h.strip()}
+# Fonte do catálogo que falhou não é baixada de novo antes disso (cada render chamava ensure_category)
+RETRY_SECONDS = float(os.getenv("MUSIC_RETRY_SECONDS", "3600"))
+MAX_REDIRECTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS music_tracks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    mood TEXT,
+    duration REAL NOT NULL,
+    loudness REAL,
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    uses INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_music_tracks_category ON music_tracks(category, mood, duration);
+"""
+
+# Downloads antigos do _process_audio: bg_music_<categoria>_<YYYYmmdd_HHMMSS>.<ext>
+_LEGACY_DOWNLOAD = re.compile(r"^bg_music_.+_\d{8}_\d{6}\.(mp3|wav)$")
+
+
+def _finite(value: float) -> Optional[float]:
+    return round(value, 2) if np.isfinite(value) else None
+
+
+def _check_url(url: str):
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or (parsed.hostname or "").lower() not in ALLOWED_HOSTS:
+        raise ValueError(f"URL de música fora da lista permitida (MUSIC_ALLOWED_HOSTS): {url}")
+
+
+def check_source(source: str, inbox: Union[str, Path]) -> str:
+    """Valida uma fonte vinda de fora (API): URL http(s) de host permitido ou arquivo dentro de `inbox`.
+
+    Levanta ValueError; retorna a fonte normalizada (caminho real para arquivos).
+    """
+    if re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*://", source):
+        _check_url(source)
+        return source
+    inbox = os.path.realpath(inbox)
+    path = os.path.realpath(os.path.join(inbox, source))
+    if os.path.commonpath([inbox, path]) != inbox or not os.path.isfile(path):
+        raise ValueError(f"Arquivo de música deve estar em {inbox}: {source}")
+    if os.path.splitext(path)[1].lower() not in AUDIO_EXTS:
+        raise ValueError(f"Formato de áudio não suportado: {source}")
+    return path
+
+
+def _download(url: str, dest: str):
+    """GET sem seguir redirects automaticamente: cada destino também precisa estar na lista permitida."""
+    for _ in range(MAX_REDIRECTS + 1):
+        _check_url(url)
+        resp = requests.get(url, timeout=60, allow_redirects=False)
+        if resp.is_redirect:
+            url = urljoin(url, resp.headers["Location"])
+            continue
+        resp.raise_for_status()
+        with open(dest, "wb") as f:
+            f.write(resp.content)
+        return
+    raise ValueError(f"Redirecionamentos demais: {url}")
+
+
+@dataclass
+class MusicTrack:
+    id: str
+    name: str
+    category: str
+    mood: Optional[str]
+    duration: float
+    loudness: Optional[float]
+    source: str
+    path: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class MusicLibrary:
+    """Faixas normalizadas em disco + índice SQLite (categoria/mood/duração)."""
+
+    def __init__(self, root: Union[str, Path], target_lufs: float = LIBRARY_LUFS,
+                 bed_cache_files: int = BED_CACHE_FILES):
+        self.root = Path(root)
+        self.tracks_dir = self.root / "tracks"
+        self.beds_dir = self.root / "beds"
+        self.tracks_dir.mkdir(parents=True, exist_ok=True)
+        self.beds_dir.mkdir(parents=True, exist_ok=True)
+        self.target_lufs = target_lufs
+        self.bed_cache_files = bed_cache_files
+        self.db_path = self.root / "index.db"
+        self._lock = threading.Lock()
+        self._failed_sources: Dict[str, float] = {}      # URL do catálogo -> time.monotonic() da falha
+        self._bed_locks: Dict[str, threading.Lock] = {}   # um render gera o bed; o outro espera e reusa
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_track(row: sqlite3.Row) -> MusicTrack:
+        return MusicTrack(id=row["id"], name=row["name"], category=row["category"], mood=row["mood"],
+                          duration=row["duration"], loudness=row["loudness"], source=row["source"],
+                          path=row["path"])
+
+    @staticmethod
+    def source_id(source: str) -> str:
+        """ID estável da fonte (URL, ou caminho + tamanho + mtime para arquivos locais)."""
+        if os.path.exists(source):
+            st = os.stat(source)
+            source = f"{os.path.abspath(source)}:{st.st_size}:{int(st.st_mtime)}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+    # ---------- Ingestão ----------
+    def get(self, track_id: str) -> Optional[MusicTrack]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM music_tracks WHERE id = ?", (track_id,)).fetchone()
+        if row and os.path.exists(row["path"]):
+            return self._row_to_track(row)
+        return None
+
+    def ingest(self, source: str, category: str, mood: Optional[str] = None,
+               name: Optional[str] = None) -> MusicTrack:
+        """Ingere uma faixa (URL ou arquivo): decodifica, normaliza e indexa. Idempotente."""
+        track_id = self.source_id(source)
+        existing = self.get(track_id)
+        if existing:
+            return existing
+
+        with tempfile.TemporaryDirectory(prefix="music_ingest_") as work:
+            local = source
+            if re.match(r"^https?://", source):
+                logger.info(f"🎵 Baixando faixa para a biblioteca: {source}")
+                local = os.path.join(work, "source" + (os.path.splitext(source.split("?")[0])[1] or ".mp3"))
+                _download(source, local)
+            samples = decode_audio(local, SAMPLE_RATE)
+
+        if not len(samples):
+            raise ValueError(f"Faixa sem áudio: {source}")
+        samples = normalize_loudness(samples, SAMPLE_RATE, self.target_lufs)
+        path = str(self.tracks_dir / f"{track_id}.wav")
+        write_wav(path, samples, SAMPLE_RATE)
+
+        track = MusicTrack(id=track_id, name=name or Path(source.split("?")[0]).stem, category=category,
+                           mood=mood, duration=round(len(samples) / SAMPLE_RATE, 3),
+                           loudness=_finite(integrated_loudness(samples, SAMPLE_RATE)),
+                           source=source, path=path)
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO music_tracks
+                   (id, name, category, mood, duration, loudness, source, path, created_at, uses)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)""",
+                (track.id, track.name, track.category, track.mood, track.duration, track.loudness,
+                 track.source, track.path, time.time()),
+            )
+        logger.info(f"✅ Faixa ingerida: {track.name} [{category}] {track.duration:.1f}s")
+        return track
+
+    def ingest_directory(self, inbox: Union[str, Path]) -> List[MusicTrack]:
+        """Ingere arquivos de <inbox>/<categoria>/*.mp3|wav|... (já ingeridos são ignorados)."""
+        inbox = Path(inbox)
+        tracks = []
+        if not inbox.is_dir():
+            return tracks
+        for category_dir in sorted(p for p in inbox.iterdir() if p.is_dir()):
+            for f in sorted(category_dir.iterdir()):
+                if f.suffix.lower() not in AUDIO_EXTS:
+                    continue
+                try:
+                    tracks.append(self.ingest(str(f), category_dir.name, name=f.stem))
+                except Exception as e:
+                    logger.warning(f"⚠️ Não foi possível ingerir {f.name}: {e}")
+        return tracks
+
+    def ensure_category(self, category: str) -> List[MusicTrack]:
+        """Faixas da categoria; ingere o catálogo padrão dela na primeira vez.
+
+        Fontes que falharam só são tentadas de novo depois de RETRY_SECONDS.
+        """
+        tracks = self.tracks(category=category)
+        if tracks:
+            return tracks
+        for url, name, mood in DEFAULT_SOURCES.get(category, []):
+            with self._lock:
+                failed_at = self._failed_sources.get(url)
+            if failed_at is not None and time.monotonic() - failed_at < RETRY_SECONDS:
+                continue
+            try:
+                self.ingest(url, category, mood=mood, name=name)
+            except Exception as e:
+                logger.warning(f"⚠️ Falha ao ingerir '{name}' ({category}): {e}")
+                with self._lock:
+                    self._failed_sources[url] = time.monotonic()
+        return self.tracks(category=category)
+
+    # ---------- Consulta ----------
+    def tracks(self, category: Optional[str] = None, mood: Optional[str] = None,
+               min_duration: Optional[float] = None) -> List[MusicTrack]:
+        query, args = "SELECT * FROM music_tracks WHERE 1 = 1", []
+        if category:
+            query += " AND category = ?"
+            args.append(category)
+        if mood:
+            query += " AND mood = ?"
+            args.append(mood)
+        if min_duration:
+            query += " AND duration >= ?"
+            args.append(min_duration)
+        with self._connect() as conn:
+            rows = conn.execute(query + " ORDER BY category, name", args).fetchall()
+        return [self._row_to_track(r) for r in rows if os.path.exists(r["path"])]
+
+    def pick(self, category: str, mood: Optional[str] = None,
+             duration: Optional[float] = None) -> Optional[MusicTrack]:
+        """Faixa da categoria (e mood, se houver): a mais curta que cobre a duração, senão a mais longa."""
+        candidates = self.ensure_category(category)
+        if mood:
+            candidates = [t for t in candidates if t.mood == mood] or candidates
+        if not candidates:
+            return None
+        covering = [t for t in candidates if duration and t.duration >= duration]
+        track = min(covering, key=lambda t: t.duration) if covering else max(candidates, key=lambda t: t.duration)
+        with self._connect() as conn:
+            conn.execute("UPDATE music_tracks SET uses = uses + 1 WHERE id = ?", (track.id,))
+        return track
+
+    def catalog(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Faixas por categoria (categorias do catálogo padrão ainda não ingeridas aparecem vazias)."""
+        result: Dict[str, List[Dict[str, Any]]] = {c: [] for c in DEFAULT_SOURCES}
+        for t in self.tracks():
+            result.setdefault(t.category, []).append(
+                {"id": t.id, "name": t.name, "duration": t.duration, "mood": t.mood})
+        return result
+
+    # ---------- Render ----------
+    def bed(self, track: MusicTrack, duration: float) -> np.ndarray:
+        """Faixa em loop/cortada para `duration` segundos (float32, 44.1 kHz estéreo)."""
+        samples = decode_audio(track.path, SAMPLE_RATE)
+        return loop_to_length(samples, int(round(duration * SAMPLE_RATE)), SAMPLE_RATE)
+
+    def bed_path(self, track: MusicTrack, duration: float) -> str:
+        """WAV do `bed` (cacheado por faixa + duração, cache limitado a bed_cache_files)."""
+        path = self.beds_dir / f"{track.id}_{int(round(duration * 1000))}.wav"
+        with self._lock:
+            bed_lock = self._bed_locks.setdefault(path.name, threading.Lock())
+        with bed_lock:
+            if path.exists():
+                os.utime(path)
+                return str(path)
+            write_wav(str(path), self.bed(track, duration), SAMPLE_RATE)
+        self._trim_beds()
+        return str(path)
+
+    def _trim_beds(self):
+        """Mantém os bed_cache_files mais recentes; nunca remove um bed usado há menos de BED_MIN_AGE_SECONDS."""
+        cutoff = time.time() - BED_MIN_AGE_SECONDS
+        with self._lock:
+            beds = []
+            for bed in self.beds_dir.glob("*.wav"):
+                try:
+                    beds.append((bed.stat().st_mtime, bed))
+                except FileNotFoundError:
+                    pass
+            beds.sort(reverse=True)
+            for mtime, old in beds[self.bed_cache_files:]:
+                if mtime >= cutoff:
+                    continue
+                try:
+                    old.unlink()
+                except FileNotFoundError:
+                    pass
+                self._bed_locks.pop(old.name, None)
+
+
+def purge_legacy_downloads(music_dir: Union[str, Path]) -> int:
+    """Remove as cópias com timestamp que o fluxo antigo gravava a cada render."""
+    removed = 0
+    music_dir = Path(music_dir)
+    if not music_dir.is_dir():
+        return 0
+    for f in music_dir.iterdir():
+        if f.is_file() and _LEGACY_DOWNLOAD.match(f.name):
+            try:
+                f.unlink()
+                removed += 1
+            except OSError:
+                pass
+    if removed:
+        logger.info(f"🧹 {removed} downloads antigos de música removidos de {music_dir}")
+    return removed
+
+
+_library: Optional[MusicLibrary] = None
+_library_lock = threading.Lock()
+
+
+def get_music_library() -> MusicLibrary:
+    """Biblioteca única por processo, em MUSIC_DIR/library (ingere MUSIC_DIR/inbox na criação)."""
+    global _library
+    with _library_lock:
+        if _library is None:
+            from config_manager import get_config
+            music_dir = get_config().MUSIC_DIR
+            _library = MusicLibrary(music_dir / "library")
+            purge_legacy_downloads(music_dir)
+            _library.ingest_directory(music_dir / "inbox")
+        return _library
@@ -0,0 +1,185 @@
+# /var/www/tiktok-automation/backend/progress_events.py
+# -*- coding: utf-8 -*-
+
+"""
+Barramento de eventos de progresso do pipeline de vídeo.
+
+Serviços (imagens, TTS, motion, montagem) publicam eventos estruturados:
+    {job_id, stage, scene, total, percent, eta_seconds, bytes_written, message, timestamp}
+
+O job atual é propagado por contextvars (`job_context`), então o código dos
+serviços não precisa receber job_id como parâmetro. A API registra um
+assinante que reemite os eventos na sala SocketIO do job.
+
+Como imagens, TTS e motion rodam em paralelo, o bus também guarda o maior
+percentual já visto de cada estágio do job (`stage_progress`), para que o
+progresso global seja calculado sobre todos os estágios e nunca retroceda.
+Por isso uma chamada unitária (uma narração de TTS) publica só `status`
+("started"/"done"), sem `percent`: o percentual do estágio vem de quem conhece
+o total de cenas (ex.: SceneGraph), senão a primeira cena já levaria o pico a 100.
+"""
+
+import os
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_current_job: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "progress_job_id", default=None)
+
+
+class ProgressBus:
+    """Pub/sub em processo, thread-safe, com estimativa de ETA por estágio."""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._stage_started: Dict[tuple, float] = {}
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._stage_peak: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def latest(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Último evento publicado para o job (usado pelo endpoint de status)."""
+        with self._lock:
+            return self._latest.get(job_id)
+
+    def stage_progress(self, job_id: str) -> Dict[str, float]:
+        """Maior percentual publicado por estágio do job ({stage: percent})."""
+        with self._lock:
+            return dict(self._stage_peak.get(job_id, {}))
+
+    def forget(self, job_id: str):
+        with self._lock:
+            self._latest.pop(job_id, None)
+            self._stage_peak.pop(job_id, None)
+            for key in [k for k in self._stage_started if k[0] == job_id]:
+                self._stage_started.pop(key, None)
+
+    def publish(
+        self,
+        stage: str,
+        percent: Optional[float] = None,
+        scene: Optional[int] = None,
+        total: Optional[int] = None,
+        bytes_written: Optional[int] = None,
+        message: Optional[str] = None,
+        job_id: Optional[str] = None,
+        **extra: Any,
+    ) -> Dict[str, Any]:
+        job_id = job_id or _current_job.get()
+        now = time.time()
+
+        # ETA medido desde o último 0% do estágio (ele pode recomeçar); sem job, sem estado
+        started = None
+        if job_id is not None:
+            with self._lock:
+                key = (job_id, stage)
+                if key not in self._stage_started or (percent is not None and percent <= 0):
+                    self._stage_started[key] = now
+                started = self._stage_started[key]
+
+        eta = None
+        if started is not None and percent is not None and 0 < percent < 100:
+            elapsed = now - started
+            eta = round(elapsed * (100.0 - percent) / percent, 1)
+
+        event = {
+            "job_id": job_id,
+            "stage": stage,
+            "scene": scene,
+            "total": total,
+            "percent": round(float(percent), 1) if percent is not None else None,
+            "eta_seconds": eta,
+            "bytes_written": bytes_written,
+            "message": message,
+            "timestamp": now,
+        }
+        event.update(extra)
+        self.dispatch(event)
+        return event
+
+    def dispatch(self, event: Dict[str, Any]):
+        """Entrega um evento já montado (também usado para repassar eventos dos workers de segment_render)."""
+        with self._lock:
+            if event.get("job_id"):
+                self._latest[event["job_id"]] = event
+                if event.get("percent") is not None:
+                    peaks = self._stage_peak.setdefault(event["job_id"], {})
+                    stage = event.get("stage")
+                    peaks[stage] = max(peaks.get(stage, 0.0), float(event["percent"]))
+            subscribers = list(self._subscribers)
+
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.warning(f"⚠️ Assinante de progresso falhou: {e}")
+
+
+progress_bus = ProgressBus()
+
+
+def publish_progress(stage: str, **kwargs: Any) -> Dict[str, Any]:
+    """Atalho para `progress_bus.publish`."""
+    return progress_bus.publish(stage, **kwargs)
+
+
+def current_job_id() -> Optional[str]:
+    return _current_job.get()
+
+
+@contextmanager
+def job_context(job_id: Optional[str]) -> Iterator[None]:
+    """Associa os eventos publicados neste contexto (e em tasks asyncio filhas) ao job."""
+    token = _current_job.set(job_id)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+try:
+    from proglog import ProgressBarLogger
+
+    class MoviePyProgressLogger(ProgressBarLogger):
+        """Logger do MoviePy (`write_videofile(logger=...)`) que publica o progresso do encode."""
+
+        def __init__(self, stage: str = "encode", output_path: Optional[str] = None, min_step: float = 2.0):
+            super().__init__()
+            self.stage = stage
+            self.output_path = output_path
+            self.min_step = min_step
+            self._last_percent = -min_step
+
+        def bars_callback(self, bar, attr, value, old_value=None):
+            if attr != "index":
+                return
+            total = self.bars.get(bar, {}).get("total") or 0
+            if not total:
+                return
+            percent = min(100.0, 100.0 * value / total)
+            if percent - self._last_percent < self.min_step and percent < 100.0:
+                return
+            self._last_percent = percent
+            written = None
+            if self.output_path and os.path.exists(self.output_path):
+                written = os.path.getsize(self.output_path)
+            publish_progress(self.stage, percent=percent, bytes_written=written,
+                             message=f"{bar}: {value}/{total}")
+
+except ImportError:  # proglog vem com o MoviePy; sem ele, o encode segue com o logger padrão
+    MoviePyProgressLogger = None
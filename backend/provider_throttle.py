@@ -0,0 +1,243 @@
+# /var/www/tiktok-automation/backend/provider_throttle.py
+# -*- coding: utf-8 -*-
+
+"""
+Throttle global por provider externo (OpenAI, Leonardo, ElevenLabs, Gemini...).
+
+Todas as chamadas do processo ao mesmo provider passam pelo mesmo limitador:
+- max_concurrent: chamadas simultâneas
+- requests_per_minute + burst: token bucket (rajada inicial, depois ritmo constante)
+- pause(s): pausa compartilhada após 429 (todos os chamadores esperam)
+- métricas: chamadas, tempo de espera total/máximo, em andamento
+
+Aquisição síncrona (threads) e assíncrona (asyncio) sobre o mesmo estado:
+
+    from provider_throttle import throttle, athrottle
+
+    with throttle("leonardo"):
+        r = session.post(...)
+
+    async with athrottle("openai"):
+        response = await asyncio.to_thread(client.images.generate, ...)
+
+Só as chamadas que criam trabalho no provider (geração, síntese, completions)
+passam pelo throttle; polling de status e downloads ficam de fora.
+
+Limites padrão em DEFAULT_LIMITS; sobrescreva por ambiente com
+THROTTLE_<PROVIDER>="max_concurrent,requests_per_minute,burst" (ex.: THROTTLE_OPENAI="2,20,2").
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProviderLimits:
+    max_concurrent: int = 4
+    requests_per_minute: float = 60.0
+    burst: int = 4
+
+
+DEFAULT_LIMITS: Dict[str, ProviderLimits] = {
+    "openai": ProviderLimits(max_concurrent=4, requests_per_minute=50, burst=5),
+    "leonardo": ProviderLimits(max_concurrent=4, requests_per_minute=30, burst=4),
+    # ElevenLabs limita sobretudo a concorrência (depende do plano contratado)
+    "elevenlabs": ProviderLimits(
+        max_concurrent=int(os.getenv("ELEVENLABS_MAX_CONCURRENCY", "3")), requests_per_minute=600, burst=10),
+    "gemini": ProviderLimits(max_concurrent=4, requests_per_minute=60, burst=5),
+    "imagen": ProviderLimits(max_concurrent=2, requests_per_minute=20, burst=2),
+    "google_tts": ProviderLimits(max_concurrent=4, requests_per_minute=300, burst=10),
+    "claude": ProviderLimits(max_concurrent=4, requests_per_minute=50, burst=5),
+    "gpt": ProviderLimits(max_concurrent=4, requests_per_minute=50, burst=5),
+    # APIs de tendências (antes contadas por hora no RateLimiter)
+    "youtube": ProviderLimits(max_concurrent=2, requests_per_minute=100 / 60, burst=5),
+    "news": ProviderLimits(max_concurrent=2, requests_per_minute=500 / 60, burst=10),
+    "reddit": ProviderLimits(max_concurrent=1, requests_per_minute=1, burst=5),
+    "twitter": ProviderLimits(max_concurrent=2, requests_per_minute=5, burst=5),
+}
+
+
+def _limits_from_env(provider: str, default: ProviderLimits) -> ProviderLimits:
+    raw = os.getenv(f"THROTTLE_{provider.upper()}")
+    if not raw:
+        return default
+    try:
+        concurrent, rpm, burst = (p.strip() for p in raw.split(","))
+        return ProviderLimits(int(concurrent), float(rpm), int(burst))
+    except ValueError:
+        logger.warning(f"⚠️ THROTTLE_{provider.upper()} inválido ('{raw}'); usando padrão")
+        return default
+
+
+class ProviderThrottle:
+    """Semáforo + token bucket de um provider, thread-safe e utilizável por asyncio."""
+
+    def __init__(self, name: str, limits: ProviderLimits):
+        self.name = name
+        self.limits = limits
+        self._cond = threading.Condition()
+        self._tokens = float(max(1, limits.burst))
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        # Métricas
+        self.calls = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    # ---------- Núcleo não bloqueante ----------
+    def _refill(self, now: float):
+        rate = self.limits.requests_per_minute / 60.0
+        self._tokens = min(float(max(1, self.limits.burst)),
+                           self._tokens + (now - self._last_refill) * rate)
+        self._last_refill = now
+
+    def _try_acquire(self) -> Tuple[bool, float]:
+        """Tenta reservar uma vaga. Retorna (ok, segundos sugeridos até tentar de novo)."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return False, self._paused_until - now
+        if self._in_flight >= self.limits.max_concurrent:
+            return False, 0.05
+        self._refill(now)
+        if self._tokens < 1.0:
+            rate = self.limits.requests_per_minute / 60.0
+            return False, (1.0 - self._tokens) / rate if rate > 0 else 1.0
+        self._tokens -= 1.0
+        self._in_flight += 1
+        return True, 0.0
+
+    def _record(self, waited: float):
+        self.calls += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if waited > 1.0:
+            logger.info(f"⏳ Throttle {self.name}: aguardou {waited:.1f}s")
+
+    def release(self):
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._cond.notify_all()
+
+    def pause(self, seconds: float):
+        """Pausa todas as chamadas ao provider (ex.: após 429 / Retry-After)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logger.warning(f"⏳ Throttle {self.name}: pausado por {seconds:.1f}s (rate limit)")
+
+    # ---------- Aquisição ----------
+    def acquire(self, timeout: Optional[float] = None):
+        """Bloqueia até obter uma vaga (TimeoutError se `timeout` expirar)."""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                ok, wait = self._try_acquire()
+                if ok:
+                    break
+                if timeout is not None:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        raise TimeoutError(f"Throttle {self.name}: sem vaga em {timeout}s")
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+            self._record(time.monotonic() - start)
+
+    async def acquire_async(self, timeout: Optional[float] = None):
+        """Versão asyncio de acquire (não bloqueia o event loop)."""
+        start = time.monotonic()
+        while True:
+            with self._cond:
+                ok, wait = self._try_acquire()
+                if ok:
+                    self._record(time.monotonic() - start)
+                    return
+            if timeout is not None and time.monotonic() - start + wait > timeout:
+                raise TimeoutError(f"Throttle {self.name}: sem vaga em {timeout}s")
+            await asyncio.sleep(min(wait, 0.5))
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[None]:
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @asynccontextmanager
+    async def slot_async(self, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        await self.acquire_async(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "calls": self.calls,
+                "in_flight": self._in_flight,
+                "total_wait_seconds": round(self.total_wait, 3),
+                "avg_wait_seconds": round(self.total_wait / self.calls, 3) if self.calls else 0.0,
+                "max_wait_seconds": round(self.max_wait, 3),
+                "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 3),
+                "max_concurrent": self.limits.max_concurrent,
+                "requests_per_minute": self.limits.requests_per_minute,
+                "burst": self.limits.burst,
+            }
+
+
+class ThrottleRegistry:
+    """Registro único por processo: um ProviderThrottle por nome de provider."""
+
+    def __init__(self):
+        self._throttles: Dict[str, ProviderThrottle] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> ProviderThrottle:
+        provider = provider.lower()
+        with self._lock:
+            throttle = self._throttles.get(provider)
+            if throttle is None:
+                limits = _limits_from_env(provider, DEFAULT_LIMITS.get(provider, ProviderLimits()))
+                throttle = self._throttles[provider] = ProviderThrottle(provider, limits)
+            return throttle
+
+    def configure(self, provider: str, limits: ProviderLimits) -> ProviderThrottle:
+        with self._lock:
+            throttle = self._throttles[provider.lower()] = ProviderThrottle(provider.lower(), limits)
+            return throttle
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            throttles = dict(self._throttles)
+        return {name: t.metrics() for name, t in throttles.items()}
+
+
+registry = ThrottleRegistry()
+
+
+def get_throttle(provider: str) -> ProviderThrottle:
+    return registry.get(provider)
+
+
+def throttle(provider: str, timeout: Optional[float] = None):
+    """`with throttle("openai"): ...` — aquisição síncrona."""
+    return registry.get(provider).slot(timeout)
+
+
+def athrottle(provider: str, timeout: Optional[float] = None):
+    """`async with athrottle("openai"): ...` — aquisição assíncrona."""
+    return registry.get(provider).slot_async(timeout)
+
+
+def throttle_metrics() -> Dict[str, Dict[str, Any]]:
+    """Métricas de todos os providers já usados no processo."""
+    return registry.metrics()
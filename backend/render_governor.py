@@ -0,0 +1,477 @@
+# /var/www/tiktok-automation/backend/render_governor.py
+# -*- coding: utf-8 -*-
+
+"""
+Governador de recursos de render: núcleos, memória e processos ffmpeg.
+
+Nada limitava quantos renders MoviePy, subprocessos ffmpeg e threads de encoder
+rodavam ao mesmo tempo: dois /api/production/create-video e um pipeline
+completo disputavam a máquina (OOM kill, API travada). Aqui, todo render é
+admitido contra um orçamento do processo:
+
+- núcleos: cada render recebe até `cores_per_render` núcleos livres; o número
+  concedido vira a contagem de threads do encoder (`encoder_threads()`)
+- memória: pico de RSS estimado pela resolução/duração (`estimate_render_mb`);
+  o render espera enquanto a estimativa não couber no que sobra
+- ffmpeg: no máximo `ffmpeg_processes` subprocessos ffmpeg abertos (`ffmpeg_slot`);
+  os leitores/writers do MoviePy (um ffmpeg por VideoFileClip/AudioFileClip aberto)
+  são reservados na admissão do render (`ffmpeg=estimate_ffmpeg_processes(...)`)
+- prioridade: threads/processos de render e os ffmpeg filhos rodam com nice
+  (`lower_priority`, `run_process`/`renice_child`), então a API continua respondendo
+- prazo: o job define um prazo total (`render_deadline`); esperas de provider,
+  admissão e subprocessos ffmpeg usam `remaining_time()` como timeout
+
+Um render sozinho é sempre admitido (mesmo acima do orçamento), para não travar;
+um render aninhado (ex.: Ken Burns dentro da montagem) usa o ticket do render externo.
+O ticket admitido fica no contexto (contextvars, como `job_workspace`), então
+as camadas internas descobrem as threads sem receber parâmetros novos.
+
+Orçamento por ambiente (0 = automático):
+RENDER_MAX_CORES (núcleos - 1), RENDER_CORES_PER_JOB (metade do orçamento),
+RENDER_MAX_MEMORY_MB (70% da RAM), RENDER_MAX_FFMPEG (= núcleos), RENDER_NICE (10).
+
+Uso:
+    governor = get_render_governor()
+    with governor.admit(estimate_render_mb(60, 1080, 1920), label="create_video",
+                        ffmpeg=estimate_ffmpeg_processes(readers=2)) as ticket:
+        clip.write_videofile(out, threads=ticket.threads)
+
+    with ffmpeg_slot():
+        run_process(cmd, timeout=remaining_time(), capture_output=True)
+
+    with render_deadline(1800):     # job inteiro; TimeoutError quando vencer
+        ...
+
+    render_governor_metrics()   # uso atual (GET /api/render/governor)
+"""
+
+import os
+import sys
+import time
+import asyncio
+import subprocess
+import logging
+import itertools
+import threading
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+# Interpretador + MoviePy/numpy/PIL carregados, antes de qualquer frame
+BASE_RSS_MB = 300
+# Frames RGB vivos num render: camadas do compose, fila do writer e lookahead do x264
+FRAMES_IN_FLIGHT = 48
+# MoviePy decodifica o áudio inteiro em float64 estéreo a 44.1 kHz
+AUDIO_MB_PER_SECOND = 44100 * 2 * 8 / MB
+
+
+def _env_int(name: str, default: int = 0) -> int:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning(f"⚠️ {name} inválido ('{raw}'); usando padrão")
+        return default
+
+
+def total_memory_mb() -> int:
+    """RAM física da máquina (sem psutil: sysconf; 4 GB se indisponível)."""
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / MB)
+    except (AttributeError, ValueError, OSError):
+        return 4096
+
+
+def estimate_render_mb(duration: float, width: int, height: int, workers: int = 1) -> int:
+    """Pico de RSS estimado de um render (`workers` processos MoviePy em paralelo)."""
+    frame_mb = width * height * 3 / MB
+    per_worker = BASE_RSS_MB + frame_mb * FRAMES_IN_FLIGHT
+    return int(per_worker * max(1, workers) + max(0.0, duration) * AUDIO_MB_PER_SECOND)
+
+
+def estimate_ffmpeg_processes(readers: int, workers: int = 1) -> int:
+    """ffmpeg abertos pelo MoviePy num render: um por leitor (VideoFileClip/AudioFileClip)
+    e dois pelo write_videofile (vídeo + áudio temporário), em cada um dos `workers` processos."""
+    return (max(0, readers) + 2) * max(1, workers)
+
+
+@dataclass
+class RenderBudget:
+    cores: int
+    memory_mb: int
+    ffmpeg_processes: int
+    cores_per_render: int
+    nice: int = 10
+
+
+def budget_from_env() -> RenderBudget:
+    """Orçamento do processo: variáveis RENDER_* ou valores derivados da máquina."""
+    cores = _env_int("RENDER_MAX_CORES") or max(1, (os.cpu_count() or 2) - 1)   # um núcleo fica para a API
+    per_render = _env_int("RENDER_CORES_PER_JOB") or max(1, cores // 2)
+    return RenderBudget(
+        cores=cores,
+        memory_mb=_env_int("RENDER_MAX_MEMORY_MB") or int(total_memory_mb() * 0.7),
+        ffmpeg_processes=_env_int("RENDER_MAX_FFMPEG") or max(2, cores),
+        cores_per_render=min(per_render, cores),
+        nice=_env_int("RENDER_NICE", 10),
+    )
+
+
+@dataclass
+class RenderTicket:
+    id: int
+    label: str
+    cores: int
+    memory_mb: int
+    ffmpeg: int = 0                         # ffmpeg do MoviePy reservados na admissão
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def threads(self) -> int:
+        """Threads do encoder (x264/MoviePy) para este render."""
+        return self.cores
+
+
+_current_ticket: contextvars.ContextVar[Optional[RenderTicket]] = contextvars.ContextVar(
+    "render_ticket", default=None)
+
+
+def current_ticket() -> Optional[RenderTicket]:
+    return _current_ticket.get()
+
+
+# Prazo absoluto (time.monotonic) do job atual; propagado às threads de cena pelo contexto
+_current_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "render_deadline", default=None)
+
+
+@contextmanager
+def render_deadline(timeout: Optional[float]) -> Iterator[None]:
+    """Define o prazo total do job neste contexto (aninhado, vale o mais curto)."""
+    if not timeout:
+        yield
+        return
+    deadline = time.monotonic() + timeout
+    outer = _current_deadline.get()
+    token = _current_deadline.set(min(deadline, outer) if outer is not None else deadline)
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining_time(default: Optional[float] = None) -> Optional[float]:
+    """Segundos até o prazo do job (limitado a `default`); sem prazo, `default`.
+
+    Levanta TimeoutError se o prazo já venceu, então serve também de checkpoint.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return default
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise TimeoutError("Pipeline timeout - renderização muito longa")
+    return left if default is None else min(left, default)
+
+
+class RenderGovernor:
+    """Admissão de renders por núcleos/memória e limite de ffmpeg abertos, thread-safe e asyncio."""
+
+    def __init__(self, budget: RenderBudget):
+        self.budget = budget
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._active: Dict[int, RenderTicket] = {}
+        self._cores_used = 0
+        self._memory_used = 0
+        self._ffmpeg_open = 0
+        self._waiting = 0
+        # Métricas
+        self.admitted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.ffmpeg_started = 0
+        self.peak_memory_mb = 0
+
+    # ---------- Núcleo não bloqueante ----------
+    def _try_admit(self, label: str, cores: int, memory_mb: int, ffmpeg: int = 0) -> Optional[RenderTicket]:
+        ffmpeg = min(ffmpeg, self.budget.ffmpeg_processes)
+        if self._active:
+            free_cores = self.budget.cores - self._cores_used
+            if free_cores < 1 or self._memory_used + memory_mb > self.budget.memory_mb:
+                return None
+            if ffmpeg and self._ffmpeg_open + ffmpeg > self.budget.ffmpeg_processes:
+                return None
+            granted = min(cores, free_cores)
+        else:
+            granted = min(cores, self.budget.cores)   # sozinho sempre entra
+        ticket = RenderTicket(next(self._ids), label, max(1, granted), memory_mb, ffmpeg)
+        self._active[ticket.id] = ticket
+        self._cores_used += ticket.cores
+        self._memory_used += memory_mb
+        self._ffmpeg_open += ffmpeg
+        self.peak_memory_mb = max(self.peak_memory_mb, self._memory_used)
+        return ticket
+
+    def _record(self, ticket: RenderTicket, waited: float):
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        logger.info(f"🎛️ Render '{ticket.label}' admitido: {ticket.cores} núcleos, ~{ticket.memory_mb} MB, "
+                    f"{ticket.ffmpeg} ffmpeg"
+                    + (f" (aguardou {waited:.1f}s)" if waited > 1.0 else ""))
+
+    def release(self, ticket: RenderTicket):
+        with self._cond:
+            if self._active.pop(ticket.id, None) is not None:
+                self._cores_used -= ticket.cores
+                self._memory_used -= ticket.memory_mb
+                self._ffmpeg_open -= ticket.ffmpeg
+            self._cond.notify_all()
+
+    # ---------- Admissão ----------
+    def acquire(self, memory_mb: int, cores: Optional[int] = None, label: str = "render",
+                timeout: Optional[float] = None, ffmpeg: int = 0) -> RenderTicket:
+        """Bloqueia até o render caber no orçamento (TimeoutError se `timeout` expirar)."""
+        cores = cores or self.budget.cores_per_render
+        start = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    ticket = self._try_admit(label, cores, memory_mb, ffmpeg)
+                    if ticket:
+                        break
+                    wait = 1.0
+                    if timeout is not None:
+                        remaining = timeout - (time.monotonic() - start)
+                        if remaining <= 0:
+                            raise TimeoutError(f"Render '{label}': sem recursos em {timeout}s")
+                        wait = min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self._waiting -= 1
+            self._record(ticket, time.monotonic() - start)
+            return ticket
+
+    async def acquire_async(self, memory_mb: int, cores: Optional[int] = None, label: str = "render",
+                            timeout: Optional[float] = None, ffmpeg: int = 0) -> RenderTicket:
+        """Versão asyncio de acquire (não bloqueia o event loop)."""
+        cores = cores or self.budget.cores_per_render
+        start = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+        try:
+            while True:
+                with self._cond:
+                    ticket = self._try_admit(label, cores, memory_mb, ffmpeg)
+                    if ticket:
+                        self._record(ticket, time.monotonic() - start)
+                        return ticket
+                if timeout is not None and time.monotonic() - start > timeout:
+                    raise TimeoutError(f"Render '{label}': sem recursos em {timeout}s")
+                await asyncio.sleep(0.5)
+        finally:
+            with self._cond:
+                self._waiting -= 1
+
+    @contextmanager
+    def admit(self, memory_mb: int, cores: Optional[int] = None, label: str = "render",
+              timeout: Optional[float] = None, ffmpeg: int = 0) -> Iterator[RenderTicket]:
+        """Admite o render; dentro de outro render admitido, reaproveita o ticket dele (sem deadlock).
+
+        `ffmpeg`: processos ffmpeg que o MoviePy mantém abertos durante o render
+        (leitores e writer, ver estimate_ffmpeg_processes); contam no limite de `ffmpeg_slot`.
+        """
+        parent = current_ticket()
+        if parent is not None:
+            yield parent
+            return
+        ticket = self.acquire(memory_mb, cores, label, remaining_time(timeout), ffmpeg)
+        token = _current_ticket.set(ticket)
+        try:
+            yield ticket
+        finally:
+            _current_ticket.reset(token)
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def admit_async(self, memory_mb: int, cores: Optional[int] = None, label: str = "render",
+                          timeout: Optional[float] = None, ffmpeg: int = 0) -> AsyncIterator[RenderTicket]:
+        parent = current_ticket()
+        if parent is not None:
+            yield parent
+            return
+        ticket = await self.acquire_async(memory_mb, cores, label, remaining_time(timeout), ffmpeg)
+        token = _current_ticket.set(ticket)
+        try:
+            yield ticket
+        finally:
+            _current_ticket.reset(token)
+            self.release(ticket)
+
+    # ---------- Processos ffmpeg ----------
+    @contextmanager
+    def ffmpeg_slot(self) -> Iterator[None]:
+        """Reserva um dos `ffmpeg_processes` subprocessos ffmpeg simultâneos.
+
+        Dentro de um render que reservou ffmpeg na admissão, o subprocesso usa essa reserva.
+        """
+        ticket = current_ticket()
+        if ticket is not None and ticket.ffmpeg:
+            with self._cond:
+                self.ffmpeg_started += 1
+            yield
+            return
+        with self._cond:
+            while self._ffmpeg_open >= self.budget.ffmpeg_processes:
+                remaining_time()            # não espera vaga além do prazo do job
+                self._cond.wait(1.0)
+            self._ffmpeg_open += 1
+            self.ffmpeg_started += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._ffmpeg_open -= 1
+                self._cond.notify_all()
+
+    def encoder_threads(self, default: Optional[int] = None) -> int:
+        """Threads do encoder: núcleos do render atual (fora de um render: `default` ou cores_per_render)."""
+        ticket = current_ticket()
+        if ticket is not None:
+            return ticket.threads
+        return default or self.budget.cores_per_render
+
+    def metrics(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._cond:
+            return {
+                "cores": {"used": self._cores_used, "budget": self.budget.cores,
+                          "per_render": self.budget.cores_per_render},
+                "memory_mb": {"reserved": self._memory_used, "budget": self.budget.memory_mb,
+                              "peak_reserved": self.peak_memory_mb},
+                "ffmpeg_processes": {"open": self._ffmpeg_open, "budget": self.budget.ffmpeg_processes,
+                                     "started": self.ffmpeg_started},
+                "renders": [
+                    {"id": t.id, "label": t.label, "cores": t.cores, "memory_mb": t.memory_mb,
+                     "ffmpeg": t.ffmpeg, "running_seconds": round(now - t.started, 1)}
+                    for t in self._active.values()
+                ],
+                "waiting": self._waiting,
+                "admitted": self.admitted,
+                "avg_wait_seconds": round(self.total_wait / self.admitted, 3) if self.admitted else 0.0,
+                "max_wait_seconds": round(self.max_wait, 3),
+                "nice": self.budget.nice,
+            }
+
+
+# =========================
+# Prioridade (nice)
+# =========================
+
+def _set_nice(who: int, nice: int) -> bool:
+    if nice <= 0 or not hasattr(os, "setpriority"):
+        return False
+    try:
+        current = os.getpriority(os.PRIO_PROCESS, who)
+        if current < nice:                 # só reduz a prioridade (voltar exige privilégio)
+            os.setpriority(os.PRIO_PROCESS, who, nice)
+        return True
+    except OSError as e:
+        logger.debug(f"Não foi possível ajustar nice: {e}")
+        return False
+
+
+def lower_priority(nice: Optional[int] = None) -> bool:
+    """Reduz a prioridade da thread atual (no Linux o nice é por thread; nos demais, do processo).
+
+    Use só em threads/processos dedicados a render (workers da fila, pool de
+    segmentos): não dá para restaurar a prioridade sem privilégio. Os
+    subprocessos criados depois herdam o nice.
+    """
+    who = threading.get_native_id() if sys.platform.startswith("linux") else 0
+    return _set_nice(who, get_render_governor().budget.nice if nice is None else nice)
+
+
+def renice_child(proc: subprocess.Popen) -> bool:
+    """Aplica o nice do orçamento ao ffmpeg filho logo após o Popen.
+
+    Sem preexec_fn: ele não é seguro com threads (a API e os workers têm várias)
+    e impede o subprocess de usar posix_spawn/vfork.
+    """
+    return _set_nice(proc.pid, get_render_governor().budget.nice)
+
+
+def run_process(cmd: List[str], timeout: Optional[float] = None, **kwargs: Any) -> subprocess.CompletedProcess:
+    """subprocess.run com o filho em nice (`renice_child`); mata o processo e levanta
+    subprocess.TimeoutExpired se `timeout` expirar."""
+    if kwargs.pop("capture_output", False):
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    with subprocess.Popen(cmd, **kwargs) as proc:
+        renice_child(proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+    return subprocess.CompletedProcess(proc.args, proc.returncode, stdout, stderr)
+
+
+# =========================
+# Instância do processo
+# =========================
+
+_governor: Optional[RenderGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_render_governor() -> RenderGovernor:
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = RenderGovernor(budget_from_env())
+            b = _governor.budget
+            logger.info(f"🎛️ Orçamento de render: {b.cores} núcleos ({b.cores_per_render}/render), "
+                        f"{b.memory_mb} MB, {b.ffmpeg_processes} ffmpeg, nice {b.nice}")
+        return _governor
+
+
+def configure_render_governor(budget: RenderBudget) -> RenderGovernor:
+    global _governor
+    with _governor_lock:
+        _governor = RenderGovernor(budget)
+        return _governor
+
+
+def admit_render(memory_mb: int, cores: Optional[int] = None, label: str = "render",
+                 timeout: Optional[float] = None, ffmpeg: int = 0):
+    """`with admit_render(mb, label=...) as ticket: ...` — admissão síncrona."""
+    return get_render_governor().admit(memory_mb, cores, label, timeout, ffmpeg)
+
+
+def aadmit_render(memory_mb: int, cores: Optional[int] = None, label: str = "render",
+                  timeout: Optional[float] = None, ffmpeg: int = 0):
+    """`async with aadmit_render(mb, label=...) as ticket: ...` — admissão assíncrona."""
+    return get_render_governor().admit_async(memory_mb, cores, label, timeout, ffmpeg)
+
+
+def ffmpeg_slot():
+    """`with ffmpeg_slot(): subprocess.run(...)` — limita os ffmpeg abertos no processo."""
+    return get_render_governor().ffmpeg_slot()
+
+
+def encoder_threads(default: Optional[int] = None) -> int:
+    return get_render_governor().encoder_threads(default)
+
+
+def render_governor_metrics() -> Dict[str, Any]:
+    """Uso atual do orçamento de render (núcleos, memória, ffmpeg, renders ativos)."""
+    return get_render_governor().metrics()
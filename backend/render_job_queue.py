@@ -0,0 +1,331 @@
+# /var/www/tiktok-automation/backend/render_job_queue.py
+# -*- coding: utf-8 -*-
+
+"""
+Fila persistente de jobs de renderização (SQLite).
+
+- Persiste os jobs na tabela `video_generations` de data/tiktok_automation.db
+- Pool fixo de workers (threads) consome a fila
+- Idempotência: o mesmo `request_id` (hash estável do payload) reaproveita o job
+- Recuperação após crash: jobs 'queued' entram na fila no start(); um 'running' só
+  volta para a fila se o heartbeat do processo dono parou (> stale_seconds), então
+  um segundo processo no mesmo banco (reloader, outra instância) não re-renderiza
+  jobs que ainda estão em execução. Os workers renovam o heartbeat dos seus jobs
+  e recuperam periodicamente os órfãos de processos que morreram.
+
+Status possíveis: queued -> running -> completed | failed
+
+Uso:
+    queue = RenderJobQueue(db_path, workers=2)
+    queue.register_handler("complete_video", handler)  # handler(job_id, payload) -> dict
+    queue.start()
+    job_id, created = queue.submit("complete_video", payload, request_id=job_key)
+    queue.get(job_id)
+"""
+
+import os
+import json
+import time
+import queue
+import socket
+import sqlite3
+import logging
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from render_governor import lower_priority
+
+logger = logging.getLogger(__name__)
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+HEARTBEAT_SECONDS = 15.0
+STALE_SECONDS = 90.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS video_generations (
+    id TEXT PRIMARY KEY,
+    request_id TEXT,
+    status TEXT,
+    settings TEXT,
+    result TEXT,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_video_generations_status
+    ON video_generations(status);
+CREATE INDEX IF NOT EXISTS idx_video_generations_request_id
+    ON video_generations(request_id);
+"""
+
+
+class RenderJobQueue:
+    """Fila de renderização durável com pool fixo de workers."""
+
+    def __init__(self, db_path: Path, workers: int = 2, completed_ttl_seconds: int = 15 * 60,
+                 heartbeat_seconds: float = HEARTBEAT_SECONDS, stale_seconds: float = STALE_SECONDS):
+        self.db_path = Path(db_path)
+        self.workers = max(1, int(workers))
+        self.completed_ttl_seconds = completed_ttl_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        # Identifica este processo/instância como dono dos jobs que ele executa
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stop_event = threading.Event()
+        self._handlers: Dict[str, Callable[[str, Dict[str, Any]], Dict[str, Any]]] = {}
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._threads: list[threading.Thread] = []
+        self._submit_lock = threading.Lock()
+        self._status_listeners: list[Callable[[Dict[str, Any]], None]] = []
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._started = False
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            # Bancos anteriores ao heartbeat: colunas de dono adicionadas no lugar
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(video_generations)")}
+            if "owner" not in columns:
+                conn.execute("ALTER TABLE video_generations ADD COLUMN owner TEXT")
+            if "heartbeat_at" not in columns:
+                conn.execute("ALTER TABLE video_generations ADD COLUMN heartbeat_at REAL")
+
+    # ---------- SQLite ----------
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Conexão curta por operação (commit ao sair, sempre fechada)."""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        settings = json.loads(row["settings"] or "{}")
+        return {
+            "job_id": row["id"],
+            "request_id": row["request_id"],
+            "kind": settings.get("kind"),
+            "status": row["status"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "completed_at": row["completed_at"],
+        }
+
+    # ---------- API pública ----------
+    def register_handler(self, kind: str, handler: Callable[[str, Dict[str, Any]], Dict[str, Any]]):
+        """Registra a função que executa jobs de um tipo. Deve retornar um dict serializável."""
+        self._handlers[kind] = handler
+
+    def add_status_listener(self, callback: Callable[[Dict[str, Any]], None]):
+        """Registra callback(job) chamado a cada mudança de status (running/completed/failed)."""
+        self._status_listeners.append(callback)
+
+    def _notify(self, job_id: str):
+        if not self._status_listeners:
+            return
+        job = self.get(job_id)
+        for callback in self._status_listeners:
+            try:
+                callback(job)
+            except Exception as e:
+                logger.warning(f"⚠️ Listener de status do job falhou: {e}")
+
+    def start(self):
+        """Recupera jobs pendentes/órfãos e inicia os workers e o heartbeat (idempotente)."""
+        if self._started:
+            return
+        self._started = True
+        self._stop_event.clear()
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id FROM video_generations WHERE status = ? ORDER BY created_at",
+                (STATUS_QUEUED,),
+            ).fetchall()
+        for row in rows:
+            self._queue.put(row["id"])
+        recovered = self._recover_stale()
+        if rows or recovered:
+            logger.info(f"♻️ {len(rows) + recovered} job(s) de renderização recuperados da fila persistente")
+
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f"render-worker-{i+1}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        t = threading.Thread(target=self._heartbeat_loop, name="render-heartbeat", daemon=True)
+        t.start()
+        self._heartbeat_thread = t
+        logger.info(f"🧵 Fila de renderização iniciada com {self.workers} worker(s)")
+
+    def stop(self, timeout: Optional[float] = None):
+        """Sinaliza os workers para encerrar (jobs pendentes continuam persistidos)."""
+        self._stop_event.set()
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads.clear()
+        if self._heartbeat_thread:
+            self._heartbeat_thread.join(timeout)
+            self._heartbeat_thread = None
+        self._started = False
+
+    def submit(self, kind: str, payload: Dict[str, Any], request_id: Optional[str] = None) -> Tuple[str, bool]:
+        """Enfileira um job. Retorna (job_id, created).
+
+        Se `request_id` já tiver um job em andamento (ou concluído dentro do TTL),
+        retorna o job existente com created=False.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Tipo de job sem handler registrado: {kind}")
+
+        with self._submit_lock, self._connect() as conn:
+            if request_id:
+                row = conn.execute(
+                    """SELECT id FROM video_generations
+                       WHERE request_id = ?
+                         AND (status IN (?, ?)
+                              OR (status = ? AND completed_at >= datetime('now', ?)))
+                       ORDER BY created_at DESC LIMIT 1""",
+                    (request_id, STATUS_QUEUED, STATUS_RUNNING, STATUS_COMPLETED,
+                     f"-{int(self.completed_ttl_seconds)} seconds"),
+                ).fetchone()
+                if row:
+                    return row["id"], False
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO video_generations (id, request_id, status, settings) VALUES (?, ?, ?, ?)",
+                (job_id, request_id, STATUS_QUEUED,
+                 json.dumps({"kind": kind, "payload": payload}, ensure_ascii=False)),
+            )
+
+        self._queue.put(job_id)
+        logger.info(f"📥 Job {job_id} ({kind}) enfileirado")
+        return job_id, True
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM video_generations WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """Posição (1-based) de um job 'queued' na fila; None se não estiver aguardando."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT created_at FROM video_generations WHERE id = ? AND status = ?",
+                (job_id, STATUS_QUEUED),
+            ).fetchone()
+            if not row:
+                return None
+            ahead = conn.execute(
+                "SELECT COUNT(*) FROM video_generations WHERE status = ? AND created_at < ?",
+                (STATUS_QUEUED, row["created_at"]),
+            ).fetchone()[0]
+        return int(ahead) + 1
+
+    # ---------- Heartbeat / recuperação ----------
+    def _recover_stale(self) -> int:
+        """Devolve à fila os jobs 'running' cujo dono parou de renovar o heartbeat."""
+        cutoff = time.time() - self.stale_seconds
+        with self._connect() as conn:
+            rows = conn.execute(
+                """SELECT id FROM video_generations
+                   WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)
+                   ORDER BY created_at""",
+                (STATUS_RUNNING, cutoff),
+            ).fetchall()
+            recovered = []
+            for row in rows:
+                cur = conn.execute(
+                    """UPDATE video_generations SET status = ?, owner = NULL
+                       WHERE id = ? AND status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)""",
+                    (STATUS_QUEUED, row["id"], STATUS_RUNNING, cutoff),
+                )
+                if cur.rowcount == 1:
+                    recovered.append(row["id"])
+        for job_id in recovered:
+            logger.warning(f"♻️ Job {job_id} sem heartbeat há mais de {self.stale_seconds:.0f}s: reenfileirado")
+            self._queue.put(job_id)
+        return len(recovered)
+
+    def _heartbeat_loop(self):
+        """Renova o heartbeat dos jobs deste processo e recupera os órfãos de outros."""
+        while not self._stop_event.wait(self.heartbeat_seconds):
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "UPDATE video_generations SET heartbeat_at = ? WHERE owner = ? AND status = ?",
+                        (time.time(), self.owner, STATUS_RUNNING),
+                    )
+                self._recover_stale()
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ Heartbeat da fila de renderização falhou: {e}")
+
+    # ---------- Workers ----------
+    def _claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Marca o job como 'running' (deste dono) se ainda estiver 'queued' (evita execução dupla)."""
+        with self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE video_generations SET status = ?, owner = ?, heartbeat_at = ? WHERE id = ? AND status = ?",
+                (STATUS_RUNNING, self.owner, time.time(), job_id, STATUS_QUEUED),
+            )
+            if cur.rowcount != 1:
+                return None
+            row = conn.execute("SELECT settings FROM video_generations WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["settings"] or "{}")
+
+    def _finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE video_generations SET status = ?, result = ?, error = ?, completed_at = ? WHERE id = ?",
+                (status,
+                 json.dumps(result, ensure_ascii=False) if result is not None else None,
+                 error,
+                 datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+                 job_id),
+            )
+        self._notify(job_id)
+
+    def _worker_loop(self):
+        # Workers só executam renders: nice reduzido (herdado pelo ffmpeg/pool) para a API seguir responsiva
+        lower_priority()
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                break
+            try:
+                settings = self._claim(job_id)
+                if settings is None:
+                    continue
+                kind = settings.get("kind")
+                handler = self._handlers.get(kind)
+                if not handler:
+                    self._finish(job_id, STATUS_FAILED, error=f"Handler não registrado: {kind}")
+                    continue
+
+                logger.info(f"🚀 Job {job_id} ({kind}) iniciado em {threading.current_thread().name}")
+                self._notify(job_id)
+                try:
+                    result = handler(job_id, settings.get("payload") or {})
+                    self._finish(job_id, STATUS_COMPLETED, result=result)
+                    logger.info(f"✅ Job {job_id} concluído")
+                except Exception as e:
+                    logger.error(f"❌ Job {job_id} falhou: {e}", exc_info=True)
+                    self._finish(job_id, STATUS_FAILED, error=str(e))
+            finally:
+                self._queue.task_done()
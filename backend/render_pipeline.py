@@ -21,7 +21,6 @@ import os
 import sys
 import json
 import argparse
-import time
 import hashlib
 from typing import Dict, List, Any, Optional
 from pathlib import Path
@@ -44,6 +43,7 @@ except ImportError:
 # Leonardo Motion Client
 try:
     from leonardo_motion_client import LeonardoMotionClient
+    from motion_batch import MotionBatch
     LEONARDO_AVAILABLE = True
 except ImportError:
     LEONARDO_AVAILABLE = False
@@ -56,6 +56,7 @@ TARGET_W, TARGET_H, FPS = 1080, 1920, 30
 CROSSFADE_S = 0.20           # crossfade leve entre cenas (0 = corte seco)
 DEFAULT_MUSIC_VOL = 0.25     # volume de música de fundo
 ALLOW_SPEED_ADJUST = True    # ajustar levemente a velocidade do vídeo para casar a duração
+MOTION_MAX_IN_FLIGHT = int(os.getenv("LEONARDO_MOTION_CONCURRENCY", "4"))  # jobs simultâneos no Leonardo
 
 EXPORT_OPTS = dict(
     fps=FPS,
@@ -65,14 +66,16 @@ EXPORT_OPTS = dict(
     preset="medium",
     bitrate="8000k",
     threads=4,
-    temp_audiofile="temp-audio.m4a",
     remove_temp=True
 )
 
 # =========================
 # ELEVENLABS (TTS)
 # =========================
-import requests
+from elevenlabs_pool import get_tts_pool
+from tts_cache import TTSCache, get_tts_cache
+from job_workspace import temp_path
+from render_governor import admit_render, estimate_ffmpeg_processes, estimate_render_mb
 
 ELEVEN_TTS_URL_FMT = "https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
 ELEVEN_MODEL_ID = "eleven_multilingual_v2"  # geralmente funciona muito bem em PT-BR
@@ -119,22 +122,16 @@ def elevenlabs_tts(
         }
     }
 
-    last_err = None
-    for attempt in range(retries + 1):
-        try:
-            r = requests.post(url, headers=headers, json=payload, timeout=timeout)
-            if r.status_code != 200:
-                raise RuntimeError(f"ElevenLabs TTS falhou ({r.status_code}): {r.text[:300]}")
-            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-            with open(out_path, "wb") as f:
-                f.write(r.content)
-            return out_path
-        except Exception as e:
-            last_err = e
-            if attempt < retries:
-                time.sleep(backoff_sec * (2 ** attempt))
-            else:
-                raise last_err
+    # Mesma narração/voz/config: reaproveita o áudio do cache em vez de sintetizar de novo
+    cache = get_tts_cache()
+    cache_key = TTSCache.make_key(text, voice_id, model_id, payload["voice_settings"], audio_format)
+    if cache.lookup(cache_key, out_path):
+        return out_path
+    # Sessão keep-alive, limite de concorrência e backoff de 429 compartilhados entre cenas
+    audio = get_tts_pool().post_tts(url, headers, payload, timeout=timeout,
+                                    retries=retries, backoff_sec=backoff_sec)
+    cache.store(cache_key, audio, out_path, meta={"provider": "elevenlabs", "voice_id": voice_id})
+    return out_path
 
 # =========================
 # MOVIEPY (MONTAGEM)
@@ -209,6 +206,7 @@ def ensure_motion_clips(
     Para cada cena, se não existir scene_XX.mp4:
       - procura scene_XX.(png|jpg|jpeg) em images_dir
       - upload -> create job -> poll -> download scene_XX.mp4
+        (todas as cenas concorrentes via MotionBatch, até MOTION_MAX_IN_FLIGHT jobs)
       - duração = t_end - t_start
       - motion_prompt = scene["motion_prompt"] ou padrão
     """
@@ -223,6 +221,7 @@ def ensure_motion_clips(
 
     os.makedirs(assets_dir, exist_ok=True)
 
+    items = []
     for i, s in enumerate(scenes, start=1):
         vpath = os.path.join(assets_dir, f"scene_{i:02d}.mp4")
         if os.path.exists(vpath):
@@ -250,21 +249,36 @@ def ensure_motion_clips(
             )
 
         print(f"[MOTION] Cena {i}: processando {os.path.basename(img)}")
-        
-        motion_prompt = s.get("motion_prompt") or "slow cinematic zoom in, 9:16 vertical"
-        duration = _scene_duration(s)
-        
-        try:
-            client.image_to_motion(
-                image_path=img,
-                out_path=vpath,
-                prompt=motion_prompt,
-                duration_sec=duration
-            )
-            print(f"[MOTION] Cena {i}: ✅ salvo em {vpath}")
-        except Exception as e:
-            print(f"[MOTION] Cena {i}: ❌ erro: {e}")
-            raise
+        items.append({
+            "image_path": img,
+            "out_path": vpath,
+            "duration_sec": _scene_duration(s),
+            "prompt": s.get("motion_prompt") or "slow cinematic zoom in, 9:16 vertical",
+        })
+
+    if not items:
+        return
+
+    # Todos os jobs em paralelo (janela limitada), polling único e download conforme terminam
+    batch = MotionBatch(
+        start_job=client.start_motion_job,
+        check_job=client.check_video,
+        download=client.download_video,
+        max_in_flight=MOTION_MAX_IN_FLIGHT,
+    )
+    results = batch.run_all(items)
+
+    errors = []
+    for item in items:
+        result = results[item["out_path"]]
+        name = os.path.basename(item["out_path"])
+        if isinstance(result, Exception):
+            print(f"[MOTION] {name}: ❌ erro: {result}")
+            errors.append(result)
+        else:
+            print(f"[MOTION] {name}: ✅ salvo em {result}")
+    if errors:
+        raise errors[0]
 
 def assemble_video(
     storyboard: Dict[str, Any],
@@ -323,7 +337,13 @@ def assemble_video(
 
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     print(f"[EXPORT] Exportando para {out_path}")
-    final.write_videofile(out_path, **EXPORT_OPTS)
+    # Leitores abertos pelo MoviePy: vídeo + áudio de cada cena e a música
+    readers = 2 * len(clips) + (1 if music_path else 0)
+    with admit_render(estimate_render_mb(final.duration, final.w, final.h),
+                      label=f"export:{os.path.basename(out_path)}",
+                      ffmpeg=estimate_ffmpeg_processes(readers)) as ticket:
+        final.write_videofile(out_path, temp_audiofile=temp_path("audio", ".m4a"),
+                              **dict(EXPORT_OPTS, threads=ticket.threads))
     return out_path
 
 # =========================
@@ -346,6 +366,7 @@ def generate_tts_per_scene_if_needed(
 
     os.makedirs(assets_dir, exist_ok=True)
 
+    pending = []
     for i, s in enumerate(scenes, start=1):
         base = f"scene_{i:02d}"
         out_path = os.path.join(assets_dir, f"{base}.{audio_format}")
@@ -359,13 +380,22 @@ def generate_tts_per_scene_if_needed(
             continue
             
         print(f"[TTS] Cena {i}: gerando ({len(text)} chars)")
-        elevenlabs_tts(
-            text=text,
+        pending.append((text, out_path))
+
+    # Cenas em paralelo (limite ELEVENLABS_MAX_CONCURRENCY do pool compartilhado)
+    results = get_tts_pool().synthesize_many(
+        lambda job: elevenlabs_tts(
+            text=job[0],
             voice_id=voice_id,
             api_key=elevenlabs_api_key,
-            out_path=out_path,
+            out_path=job[1],
             audio_format=audio_format
-        )
+        ),
+        pending
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
 
 # =========================
 # FUNÇÃO PRINCIPAL
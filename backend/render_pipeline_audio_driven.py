@@ -7,7 +7,11 @@ Pipeline áudio-dirigido (MoviePy 2.1.1):
 2) Gera TTS (ElevenLabs) por cena -> mede duração real do áudio
 3) Gera vídeo por cena no Leonardo (image->video). Tenta "duration"; se o endpoint não aceitar,
    faz fallback e depois repete o clipe até cobrir a duração do áudio.
+   As etapas 2-3 rodam num grafo por cena (scene_scheduler): a motion da cena N
+   começa assim que o áudio (e a imagem) da cena N ficam prontos.
 4) Monta tudo (9:16, 30fps), mixa música e exporta MP4 final
+   --render-quality draft: prévia 540x960 a 15 fps (ultrafast), sem gerar motion
+   (Ken Burns local onde não há motion em cache); o render final reaproveita os assets
 
 Requisitos:
   pip install moviepy requests
@@ -33,11 +37,31 @@ import json
 import argparse
 import time
 import requests
-from typing import Dict, Any, Optional
-from math import ceil
+from functools import partial
+from typing import Callable, Dict, Any, Optional, Tuple
+
+from progress_events import MoviePyProgressLogger
+from scene_scheduler import SceneGraph
+from motion_batch import MotionBatch
+from elevenlabs_pool import get_tts_pool
+from tts_cache import TTSCache, get_tts_cache
+from provider_throttle import throttle
+from segment_render import (PARALLEL_SEGMENTS, SEGMENT_WORKERS, clamp_crossfade, join_segments, prune_segments,
+                            render_segments_parallel, run_bounded, write_scene_segment)
+from scene_fingerprint import file_digest, fingerprint, is_fresh, mark_fresh
+from subtitle_sprites import sprite_clip
+from ken_burns import KenBurns
+from media_probe import audio_duration
+from clip_loop import looped_clip
+from render_quality import QUALITIES, RenderProfile, get_profile
+from job_workspace import temp_path
+from audio_dsp import SAMPLE_RATE
+from audio_mixer import mix_to_wav
+from render_governor import (admit_render, encoder_threads, estimate_ffmpeg_processes, estimate_render_mb,
+                             get_render_governor, remaining_time)
 
 # ====== IMPORTS MoviePy (versão 2.x) ======
-from moviepy import VideoFileClip, AudioFileClip, CompositeAudioClip, ImageClip, concatenate_videoclips, vfx, TextClip, CompositeVideoClip
+from moviepy import VideoFileClip, AudioFileClip, ImageClip, concatenate_videoclips, vfx, CompositeVideoClip
 
 # ====== CONFIG ======
 TARGET_W, TARGET_H, FPS = 1080, 1920, 30
@@ -63,10 +87,18 @@ EXPORT_OPTS = dict(
     preset="medium",
     bitrate="8000k",
     threads=4,
-    temp_audiofile="temp-audio.m4a",
     remove_temp=True
 )
 
+# Perfil do render final (os rascunhos derivam dele, ver render_quality)
+FINAL_PROFILE = RenderProfile("final", TARGET_W, TARGET_H, FPS, preset=EXPORT_OPTS["preset"],
+                              video_bitrate=EXPORT_OPTS["bitrate"], audio_bitrate_k=192)
+
+# Concorrência por estágio no grafo de cenas (imagens/TTS/motion em paralelo)
+# (motion só aguarda o lote; quem limita os jobs no Leonardo é MOTION_MAX_IN_FLIGHT)
+SCENE_STAGE_LIMITS = {"images": 4, "tts": 4, "motion": 8}
+MOTION_MAX_IN_FLIGHT = int(os.getenv("LEONARDO_MOTION_CONCURRENCY", "4"))
+
 ELEVEN_TTS_URL_FMT = "https://api.elevenlabs.io/v1/text-to-speech/{voice_id}"
 ELEVEN_MODEL_ID = "eleven_multilingual_v2"
 
@@ -99,20 +131,24 @@ def elevenlabs_tts_to_file(text: str, voice_id: str, api_key: str, out_path: str
             "use_speaker_boost": True
         }
     }
-    r = requests.post(url, headers=headers, json=payload, timeout=timeout)
-    if r.status_code != 200:
-        raise RuntimeError(
-            f"ElevenLabs TTS error {r.status_code}: {r.text[:300]}")
-    ensure_dir(os.path.dirname(out_path) or ".")
-    with open(out_path, "wb") as f:
-        f.write(r.content)
+    # Mesma narração/voz/config: reaproveita o áudio do cache em vez de sintetizar de novo
+    cache = get_tts_cache()
+    cache_key = TTSCache.make_key(text, voice_id, ELEVEN_MODEL_ID, payload["voice_settings"], "mp3")
+    if cache.lookup(cache_key, out_path):
+        return out_path
+    # Sessão keep-alive, limite de concorrência e backoff de 429 compartilhados entre cenas
+    audio = get_tts_pool().post_tts(url, headers, payload, timeout=timeout)
+    cache.store(cache_key, audio, out_path, meta={"provider": "elevenlabs", "voice_id": voice_id})
     return out_path
 
 
 def get_audio_duration(path: str) -> float:
-    clip = AudioFileClip(path)
-    d = float(clip.duration)
-    clip.close()
+    # Cabeçalho MP3/WAV (memorizado) em vez de abrir um AudioFileClip/ffmpeg por cena
+    d = audio_duration(path)
+    if d is None:
+        clip = AudioFileClip(path)
+        d = float(clip.duration)
+        clip.close()
     return max(0.5, round(d, 3))
 
 # ====== Leonardo Motion Client (init-image + image-to-video) ======
@@ -181,9 +217,10 @@ class LeonardoMotionClient:
             "duration": 6
         }
         print("[DEBUG] Payload enviado para Leonardo AI (motion):", payload)
-        r = requests.post(f"{self.base}/rest/v1/generations-motion-svd",
-                         headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
-                         json=payload, timeout=60)
+        with throttle("leonardo"):
+            r = self.s.post(f"{self.base}/rest/v1/generations-motion-svd",
+                            headers={"Content-Type": "application/json"},
+                            json=payload, timeout=60)
         print("[DEBUG] Status code:", r.status_code)
         if r.status_code != 200:
             print("[DEBUG] Response text:", r.text)
@@ -195,39 +232,46 @@ class LeonardoMotionClient:
             raise RuntimeError(f"Job creation failed: {job_data}")
         return job_id
 
-    def poll_motion(self, job_id: str, timeout=900, interval=3) -> str:
+    def check_motion(self, job_id: str) -> Optional[str]:
+        """Uma consulta de status: video_url se concluído, None se pendente; levanta se falhou."""
         url = f"{self.base}/rest/v1/generations/{job_id}"
+        r = self.s.get(url, timeout=30)
+        r.raise_for_status()
+        data = r.json()
+
+        status = (data.get("status") or data.get(
+            "generations_by_pk", {}).get("status") or "").lower()
+        if status in ("succeeded", "completed", "complete"):
+            video_url = (
+                data.get("video_url")
+                or data.get("data", {}).get("video_url")
+                or data.get("result", {}).get("video_url")
+            )
+            if not video_url:
+                outs = (
+                    data.get("generated_images")
+                    or data.get("generations_by_pk", {}).get("generated_images")
+                    or data.get("outputs") or []
+                )
+                if outs and isinstance(outs, list):
+                    video_url = outs[0].get(
+                        "url") or outs[0].get("video_url")
+            if not video_url:
+                raise RuntimeError(
+                    f"Job {job_id} finalizado sem video_url: {data}")
+            return video_url
+
+        if status in ("failed", "error"):
+            raise RuntimeError(f"Job {job_id} falhou: {data}")
+        return None
+
+    def poll_motion(self, job_id: str, timeout=900, interval=3) -> str:
         t0 = time.time()
         while True:
-            r = self.s.get(url, timeout=30)
-            r.raise_for_status()
-            data = r.json()
-
-            status = (data.get("status") or data.get(
-                "generations_by_pk", {}).get("status") or "").lower()
-            if status in ("succeeded", "completed", "complete"):
-                video_url = (
-                    data.get("video_url")
-                    or data.get("data", {}).get("video_url")
-                    or data.get("result", {}).get("video_url")
-                )
-                if not video_url:
-                    outs = (
-                        data.get("generated_images")
-                        or data.get("generations_by_pk", {}).get("generated_images")
-                        or data.get("outputs") or []
-                    )
-                    if outs and isinstance(outs, list):
-                        video_url = outs[0].get(
-                            "url") or outs[0].get("video_url")
-                if not video_url:
-                    raise RuntimeError(
-                        f"Job {job_id} finalizado sem video_url: {data}")
+            video_url = self.check_motion(job_id)
+            if video_url:
                 return video_url
 
-            if status in ("failed", "error"):
-                raise RuntimeError(f"Job {job_id} falhou: {data}")
-
             if time.time() - t0 > timeout:
                 raise TimeoutError(f"Timeout no job {job_id}")
 
@@ -243,70 +287,102 @@ class LeonardoMotionClient:
                     f.write(chunk)
         return out_path
 
+_motion_clients: Dict[str, LeonardoMotionClient] = {}
+_motion_batches: Dict[str, MotionBatch] = {}
+
+
+def get_motion_client(api_key: str) -> LeonardoMotionClient:
+    """Reaproveita o cliente (e sua sessão HTTP) por API key dentro do processo."""
+    client = _motion_clients.get(api_key)
+    if client is None:
+        client = _motion_clients[api_key] = LeonardoMotionClient(api_key)
+    return client
+
+
+def get_motion_batch(api_key: str) -> MotionBatch:
+    """Lote de motion por API key: janela de jobs e polling compartilhados entre cenas e jobs."""
+    batch = _motion_batches.get(api_key)
+    if batch is None:
+        client = get_motion_client(api_key)
+        batch = _motion_batches[api_key] = MotionBatch(
+            start_job=lambda image_path, duration_sec, prompt: client.create_image_to_video(image_path, duration_sec),
+            check_job=client.check_motion,
+            download=client.download,
+            max_in_flight=MOTION_MAX_IN_FLIGHT,
+        )
+    return batch
+
 # ====== Helpers de vídeo ======
 
 def create_local_motion_from_image(image_path: str, duration_sec: float, out_path: str) -> str:
     """Gera um vídeo com efeito Ken Burns (zoom/pan leve) localmente, sem API externa."""
     ensure_dir(os.path.dirname(out_path) or ".")
-    img = ImageClip(image_path).with_duration(max(0.5, float(duration_sec)))
-    # Ajusta para 9:16 mantendo proporção e aplica zoom suave
-    if img.h != TARGET_H:
-        img = img.resized(height=TARGET_H)
-    if img.w < TARGET_W:
-        # se sobrar borda, faz um leve zoom para cobrir
-        scale = TARGET_W / float(img.w)
-        img = img.resized(scale)
-    # zoom progressivo de ~5%
-    dur = img.duration
-    img = img.resized(lambda t: 1.0 + 0.05 * (t / max(0.001, dur)))
-    # recorta exatamente 1080x1920, centralizado
-    x_center = img.w / 2
-    y_center = img.h / 2
-    x1 = int(x_center - TARGET_W / 2)
-    y1 = int(y_center - TARGET_H / 2)
-    img = img.cropped(x1=max(0, x1), y1=max(0, y1), width=TARGET_W, height=TARGET_H)
-
-    # Exporta clipe mudo
-    img.with_fps(FPS).write_videofile(out_path, codec="libx264", audio=False, fps=FPS, preset="medium", bitrate="6000k")
+    # Exporta clipe mudo (com prazo de job, num processo que pode ser morto)
+    with admit_render(estimate_render_mb(duration_sec, TARGET_W, TARGET_H),
+                      label=f"motion:{os.path.basename(out_path)}") as ticket:
+        run_bounded(_write_local_motion, image_path, duration_sec, out_path, ticket.threads,
+                    threads=ticket.threads)
     return out_path
 
 
-def fit_vertical(clip: VideoFileClip) -> VideoFileClip:
-    c = clip.with_fps(FPS)
-    if c.h != TARGET_H:
-        c = c.resized(height=TARGET_H)
-    if c.w != TARGET_W:
-        c = c.resized(width=TARGET_W)
+def _write_local_motion(image_path: str, duration_sec: float, out_path: str, threads: int):
+    # Enquadra 9:16 (recorte central) uma única vez; zoom progressivo de ~5% por crop afim
+    motion = KenBurns(image_path, max(0.5, float(duration_sec)), size=(TARGET_W, TARGET_H),
+                      zoom_start=1.0, zoom_end=1.05)
+    motion.clip().with_fps(FPS).write_videofile(out_path, codec="libx264", audio=False, fps=FPS,
+                                                preset="medium", bitrate="6000k", threads=threads)
+
+
+def export_opts(profile: RenderProfile = FINAL_PROFILE) -> Dict[str, Any]:
+    """EXPORT_OPTS com fps/preset/bitrates do perfil (idêntico a EXPORT_OPTS no perfil final)."""
+    return dict(EXPORT_OPTS, fps=profile.fps, preset=profile.preset,
+                bitrate=profile.video_bitrate, audio_bitrate=profile.audio_bitrate)
+
+
+def fit_vertical(clip: VideoFileClip, profile: RenderProfile = FINAL_PROFILE) -> VideoFileClip:
+    c = clip.with_fps(profile.fps)
+    if c.h != profile.height:
+        c = c.resized(height=profile.height)
+    if c.w != profile.width:
+        c = c.resized(width=profile.width)
     return c
 
 
-def ensure_min_duration_loop(videopath: str, min_dur: float) -> VideoFileClip:
+def ensure_min_duration_loop(videopath: str, min_dur: float, pingpong: Optional[bool] = None) -> VideoFileClip:
     """
     Abre videopath e retorna um clip com pelo menos min_dur,
-    repetindo o original quantas vezes for preciso e cortando no final.
-    Útil quando o endpoint entrega vídeo curto (~5s).
+    repetindo (ou ida-e-volta, SCENE_LOOP_MODE=pingpong) o original e cortando no final.
+    Útil quando o endpoint entrega vídeo curto (~5s). Um único leitor por arquivo.
     """
-    base = VideoFileClip(videopath)
-    if base.duration >= min_dur:
-        return base.subclipped(0, min_dur)
-
-    reps = ceil(min_dur / max(0.1, base.duration))
-    # concat de cópias do mesmo arquivo para cobrir a duração
-    clips = [VideoFileClip(videopath) for _ in range(reps)]
-    concat = concatenate_videoclips(clips, method="compose")
-    return concat.subclipped(0, min_dur)
+    return looped_clip(videopath, min_dur, pingpong=pingpong)
 
 
-def build_scene_clip(i: int, s: Dict[str, Any], assets_dir: str, enable_subtitles: bool = False) -> VideoFileClip:
-    dur_target = max(0.5, float(s["t_end"]) - float(s["t_start"]))
-    base = f"scene_{i:02d}"
-    vpath = os.path.join(assets_dir, f"{base}.mp4")
+def scene_video_source(i: int, s: Dict[str, Any], assets_dir: str, profile: RenderProfile = FINAL_PROFILE,
+                       images_dir: Optional[str] = None) -> Tuple[str, str]:
+    """Origem do vídeo da cena: ("motion", scene_XX.mp4) ou, no rascunho sem motion atual, ("still", imagem)."""
+    vpath = os.path.join(assets_dir, f"scene_{i:02d}.mp4")
+    if profile.static_motion and images_dir:
+        img = find_scene_image(images_dir, i)
+        if img and not scene_motion_is_fresh(vpath, img, s):
+            return "still", img
     if not os.path.exists(vpath):
         raise FileNotFoundError(f"Falta vídeo da cena {i}: {vpath}")
+    return "motion", vpath
 
-    # Caso o vídeo seja curto, estende com loop para cobrir a narração
-    clip = ensure_min_duration_loop(vpath, dur_target)
-    clip = fit_vertical(clip)
+
+def build_scene_clip(i: int, s: Dict[str, Any], assets_dir: str, enable_subtitles: bool = False,
+                     profile: RenderProfile = FINAL_PROFILE, images_dir: Optional[str] = None) -> VideoFileClip:
+    dur_target = max(0.5, float(s["t_end"]) - float(s["t_start"]))
+    base = f"scene_{i:02d}"
+    kind, src = scene_video_source(i, s, assets_dir, profile, images_dir)
+    if kind == "still":
+        # Rascunho: Ken Burns local direto no tamanho da prévia (sem motion gerada)
+        clip = KenBurns(src, dur_target, size=(profile.width, profile.height),
+                        zoom_start=1.0, zoom_end=1.05).clip().with_fps(profile.fps)
+    else:
+        # Caso o vídeo seja curto, estende com loop para cobrir a narração
+        clip = ensure_min_duration_loop(src, dur_target)
+        clip = fit_vertical(clip, profile)
 
     # Áudio: prioriza MP3 > WAV
     apath_mp3 = os.path.join(assets_dir, f"{base}.mp3")
@@ -328,42 +404,136 @@ def build_scene_clip(i: int, s: Dict[str, Any], assets_dir: str, enable_subtitle
         narration_text = s.get("narration", "").strip()
         if narration_text:
             print(f"[SUBTITLE] Adicionando legendas à cena {i}")
-            clip = add_subtitles_to_scene(clip, narration_text)
+            clip = add_subtitles_to_scene(clip, narration_text, profile=profile)
 
     return clip
 
 
+def render_scene_segment(i: int, s: Dict[str, Any], assets_dir: str, out_path: str,
+                         enable_subtitles: bool = False, profile: RenderProfile = FINAL_PROFILE,
+                         images_dir: Optional[str] = None, crossfade_s: float = CROSSFADE_S) -> Dict[str, Any]:
+    """Cena (vídeo + áudio + legendas) -> segmento intermediário. Roda no pool de processos."""
+    clip = build_scene_clip(i, s, assets_dir, enable_subtitles, profile, images_dir)
+    try:
+        return write_scene_segment(clip, out_path, fps=profile.fps, crossfade_s=crossfade_s,
+                                   export_opts=export_opts(profile))
+    finally:
+        clip.close()
+
+
+def scene_segment_key(i: int, s: Dict[str, Any], assets_dir: str, enable_subtitles: bool = False,
+                      profile: RenderProfile = FINAL_PROFILE, images_dir: Optional[str] = None,
+                      crossfade_s: float = CROSSFADE_S) -> str:
+    """Hash de tudo que entra no segmento da cena: mídia, duração, legendas e parâmetros de export."""
+    base = os.path.join(assets_dir, f"scene_{i:02d}")
+    audio = base + ".mp3" if os.path.exists(base + ".mp3") else base + ".wav"
+    narration = (s.get("narration") or "").strip() if enable_subtitles else ""
+    style = dict(fps=profile.fps, size=(profile.width, profile.height), crossfade=crossfade_s,
+                 export=export_opts(profile),
+                 subtitles=enable_subtitles, font=SUBTITLE_FONT, fontsize=SUBTITLE_FONTSIZE,
+                 color=SUBTITLE_COLOR, stroke=(SUBTITLE_STROKE_COLOR, SUBTITLE_STROKE_WIDTH),
+                 margin=SUBTITLE_MARGIN_BOTTOM, chars=SUBTITLE_MAX_CHARS_PER_LINE,
+                 wps=SUBTITLE_WORDS_PER_SECOND)
+    dur_target = max(0.5, float(s["t_end"]) - float(s["t_start"]))
+    video = base + ".mp4"
+    if profile.static_motion:
+        kind, video = scene_video_source(i, s, assets_dir, profile, images_dir)
+        style["source"] = kind
+    return fingerprint(file_digest(video), file_digest(audio), narration, round(dur_target, 3), style)
+
+
+def assemble_video_segments(scenes: list, assets_dir: str, out_path: str,
+                            music_path: Optional[str] = None, enable_subtitles: bool = False,
+                            profile: RenderProfile = FINAL_PROFILE, images_dir: Optional[str] = None) -> str:
+    """Montagem paralela: um segmento por cena no pool de processos + junção por stream copy.
+
+    Segmentos são nomeados pelo hash das entradas da cena: num re-render, só as
+    cenas alteradas (imagem/motion, narração, timing) são re-codificadas. Rascunhos
+    usam um diretório próprio, para não podarem os segmentos do render final.
+    """
+    seg_dir = os.path.join(assets_dir, "segments" if not profile.is_draft else f"segments_{profile.name}")
+    # Crossfade já limitado pela menor cena: os keyframes dos segmentos caem nos cortes da junção
+    crossfade_s = clamp_crossfade(CROSSFADE_S, [max(0.5, float(s["t_end"]) - float(s["t_start"])) for s in scenes])
+    out_paths = [os.path.join(seg_dir, f"scene_{i:02d}_"
+                              f"{scene_segment_key(i, s, assets_dir, enable_subtitles, profile, images_dir, crossfade_s)[:16]}.mp4")
+                 for i, s in enumerate(scenes, start=1)]
+    jobs = [(i, s, assets_dir, seg_path, enable_subtitles, profile, images_dir, crossfade_s)
+            for (i, s), seg_path in zip(enumerate(scenes, start=1), out_paths)]
+    prune_segments(seg_dir, keep=out_paths)
+    segments = render_segments_parallel(render_scene_segment, jobs, out_paths=out_paths)
+    print(f"[EXPORT] {out_path} ({len(segments)} segmentos, {profile.name})")
+    return join_segments(segments, out_path, crossfade_s=crossfade_s, fps=profile.fps,
+                         music_path=music_path, music_volume=DEFAULT_MUSIC_VOL,
+                         video_bitrate=profile.video_bitrate, audio_bitrate=profile.audio_bitrate,
+                         preset=profile.preset)
+
+
 def assemble_video(storyboard: Dict[str, Any], assets_dir: str, out_path: str,
-                   music_path: Optional[str] = None, enable_subtitles: bool = False) -> str:
+                   music_path: Optional[str] = None, enable_subtitles: bool = False,
+                   parallel_segments: Optional[bool] = None, render_quality: Optional[str] = None,
+                   images_dir: Optional[str] = None) -> str:
+    """Monta o vídeo final. render_quality='draft' gera a prévia rápida (ver render_quality);
+    com images_dir, cenas sem motion atual entram como Ken Burns local da imagem."""
     scenes = storyboard.get("scenes") or storyboard.get("storyboard") or []
     if not scenes:
         raise ValueError("Storyboard sem 'scenes'.")
-
+    profile = get_profile(render_quality, FINAL_PROFILE)
+    duration = sum(max(0.5, float(s["t_end"]) - float(s["t_start"])) for s in scenes)
+
+    # Admissão no orçamento de render: segmentos = um processo MoviePy por núcleo concedido.
+    # Leitores do MoviePy: vídeo + áudio por cena (um segmento por worker; no compose, todas as cenas)
+    parallel = PARALLEL_SEGMENTS if parallel_segments is None else parallel_segments
+    workers = min(len(scenes), SEGMENT_WORKERS, get_render_governor().budget.cores_per_render) if parallel else 1
+    readers = 2 if parallel else 2 * len(scenes) + (1 if music_path else 0)
+    with admit_render(estimate_render_mb(duration, profile.width, profile.height, workers),
+                      label=f"assemble:{os.path.basename(out_path)}",
+                      ffmpeg=estimate_ffmpeg_processes(readers, workers)) as ticket:
+        if parallel:
+            try:
+                return assemble_video_segments(scenes, assets_dir, out_path, music_path, enable_subtitles,
+                                               profile, images_dir)
+            except TimeoutError:
+                raise
+            except Exception as e:
+                print(f"[WARN] Montagem por segmentos falhou ({e}); usando montagem única")
+        # Com prazo de job, o encode MoviePy roda num processo que pode ser morto
+        return run_bounded(_assemble_compose, scenes, assets_dir, out_path, music_path, enable_subtitles,
+                           profile, images_dir, ticket.threads, threads=ticket.threads)
+
+
+def _assemble_compose(scenes: list, assets_dir: str, out_path: str, music_path: Optional[str],
+                      enable_subtitles: bool, profile: RenderProfile, images_dir: Optional[str],
+                      threads: Optional[int] = None) -> str:
+    """Montagem num só processo (concatenate compose + write_videofile)."""
     clips = []
     for i, s in enumerate(scenes, start=1):
-        c = build_scene_clip(i, s, assets_dir, enable_subtitles)
+        c = build_scene_clip(i, s, assets_dir, enable_subtitles, profile, images_dir)
         if clips and CROSSFADE_S > 0:
-            c = c.crossfadein(CROSSFADE_S)
+            c = c.with_effects([vfx.CrossFadeIn(CROSSFADE_S)])
         clips.append(c)
 
     final = concatenate_videoclips(
         clips, method="compose",
         padding=(-CROSSFADE_S if CROSSFADE_S > 0 else 0)
-    ).with_fps(FPS)
+    ).with_fps(profile.fps)
 
-    # Música opcional
-    if music_path and os.path.exists(music_path):
+    # Narração + música opcional: ducking e loudness alvo num único WAV (mesmo mix do modo por segmentos)
+    if final.audio is not None:
         try:
-            bg = AudioFileClip(music_path).volumex(
-                DEFAULT_MUSIC_VOL).set_start(0).set_duration(final.duration)
-            final = final.set_audio(CompositeAudioClip(
-                [final.audio, bg]) if final.audio else bg)
+            narration = temp_path("narration", ".wav")
+            final.audio.write_audiofile(narration, fps=SAMPLE_RATE, logger=None)
+            mixed = mix_to_wav(narration, temp_path("mix", ".wav"), duration=final.duration,
+                               music_path=music_path if music_path and os.path.exists(music_path) else None,
+                               music_volume=DEFAULT_MUSIC_VOL)
+            final = final.with_audio(AudioFileClip(mixed))
         except Exception as e:
-            print(f"[WARN] Música: {e}")
+            print(f"[WARN] Mix de áudio (seguindo só com a narração): {e}")
 
     ensure_dir(os.path.dirname(out_path) or ".")
-    print(f"[EXPORT] {out_path}")
-    final.write_videofile(out_path, **EXPORT_OPTS)
+    print(f"[EXPORT] {out_path} ({profile.name})")
+    encode_logger = MoviePyProgressLogger("encode", out_path) if MoviePyProgressLogger else "bar"
+    opts = dict(export_opts(profile), threads=threads or encoder_threads())
+    final.write_videofile(out_path, logger=encode_logger, temp_audiofile=temp_path("audio", ".m4a"), **opts)
     return out_path
 
 # ====== SISTEMA DE LEGENDAS ======
@@ -426,54 +596,27 @@ def create_subtitle_segments(text: str, duration: float) -> list:
 
 def create_subtitle_clip(text: str, start_time: float, duration: float, 
                          font: str = SUBTITLE_FONT, fontsize: int = SUBTITLE_FONTSIZE, 
-                         color: str = SUBTITLE_COLOR, position_type: str = "bottom") -> TextClip:
-    """Cria um clip de legenda individual"""
-    try:
-        # Configurar posição baseada no parâmetro
-        if position_type == "top":
-            position = ('center', 100)
-        elif position_type == "middle":
-            position = ('center', 'center')
-        else:  # bottom
-            position = ('center', TARGET_H - SUBTITLE_MARGIN_BOTTOM)
-        
-        subtitle_clip = TextClip(
-            text,
-            font=font,
-            fontsize=fontsize,
-            color=color,
-            stroke_color=SUBTITLE_STROKE_COLOR,
-            stroke_width=SUBTITLE_STROKE_WIDTH,
-            method='caption',
-            size=(TARGET_W - 100, None),  # Margem lateral
-            align='center'
-        ).set_start(start_time).set_duration(duration).set_position(position)
-        
-        return subtitle_clip
-        
-    except Exception as e:
-        print(f"[WARN] Erro criando legenda '{text[:30]}...': {e}")
-        # Fallback simples sem stroke
-        if position_type == "top":
-            fallback_pos = ('center', 100)
-        elif position_type == "middle":
-            fallback_pos = ('center', 'center')
-        else:  # bottom
-            fallback_pos = ('center', TARGET_H - SUBTITLE_MARGIN_BOTTOM)
-            
-        return TextClip(
-            text,
-            font=font,
-            fontsize=fontsize,
-            color=color,
-            method='caption',
-            size=(TARGET_W - 100, None),
-            align='center'
-        ).set_start(start_time).set_duration(duration).set_position(fallback_pos)
+                         color: str = SUBTITLE_COLOR, position_type: str = "bottom",
+                         profile: RenderProfile = FINAL_PROFILE) -> ImageClip:
+    """Cria um clip de legenda individual (sprite RGBA rasterizado uma vez e cacheado)"""
+    # Configurar posição baseada no parâmetro (medidas do 1080x1920, escaladas no rascunho)
+    if position_type == "top":
+        position = ('center', profile.px(100))
+    elif position_type == "middle":
+        position = ('center', 'center')
+    else:  # bottom
+        position = ('center', profile.height - profile.px(SUBTITLE_MARGIN_BOTTOM))
+
+    style = dict(font=font, fontsize=profile.px(fontsize), color=color,
+                 stroke_color=SUBTITLE_STROKE_COLOR, stroke_width=profile.px(SUBTITLE_STROKE_WIDTH))
+    return sprite_clip(text, start_time, duration, style,
+                       width=profile.width - profile.px(100),  # Margem lateral
+                       position=position)
 
 def add_subtitles_to_scene(video_clip, narration_text: str, scene_start: float = 0.0,
                            font: str = SUBTITLE_FONT, fontsize: int = SUBTITLE_FONTSIZE, 
-                           color: str = SUBTITLE_COLOR, position: str = "bottom") -> CompositeVideoClip:
+                           color: str = SUBTITLE_COLOR, position: str = "bottom",
+                           profile: RenderProfile = FINAL_PROFILE) -> CompositeVideoClip:
     """Adiciona legendas a um clip de vídeo de uma cena"""
     if not narration_text or not narration_text.strip():
         return video_clip
@@ -489,7 +632,8 @@ def add_subtitles_to_scene(video_clip, narration_text: str, scene_start: float =
         subtitle_clip = create_subtitle_clip(
             segment['text'], 
             segment['start'], 
-            segment['duration']
+            segment['duration'],
+            profile=profile
         )
         subtitle_clips.append(subtitle_clip)
     
@@ -499,6 +643,154 @@ def add_subtitles_to_scene(video_clip, narration_text: str, scene_start: float =
 # ====== Orquestração ======
 
 
+def find_scene_image(images_dir: str, i: int) -> Optional[str]:
+    """Imagem base da cena (scene_XX.png/jpg/jpeg/webp) ou None."""
+    for ext in ("png", "jpg", "jpeg", "webp"):
+        cand = os.path.join(images_dir, f"scene_{i:02d}.{ext}")
+        if os.path.exists(cand):
+            return cand
+    return None
+
+
+def synthesize_scene_audio(i: int, s: Dict[str, Any], assets_dir: str, voice_id: str,
+                           eleven_key: str) -> Optional[float]:
+    """TTS da cena i (refeito só se narração/voz mudarem). Retorna a duração real do áudio, ou None sem narração."""
+    ensure_dir(assets_dir)
+    apath = os.path.join(assets_dir, f"scene_{i:02d}.mp3")
+    text = (s.get("narration") or "").strip()
+    fp = fingerprint(text, voice_id, ELEVEN_MODEL_ID)
+    if text and not is_fresh(apath, fp, adopt_legacy=True):
+        print(f"[TTS] Cena {i}")
+        elevenlabs_tts_to_file(
+            text, voice_id, eleven_key, apath)
+        mark_fresh(apath, fp)
+    if os.path.exists(apath):
+        return get_audio_duration(apath)
+    return None
+
+
+def retime_scenes(scenes: list, durations: Dict[int, Optional[float]]):
+    """Reancora t_start/t_end encadeados pela duração real do áudio de cada cena."""
+    for i, s in enumerate(scenes, start=1):
+        dur = durations.get(i)
+        if dur is None:
+            continue
+        if i == 1:
+            s["t_start"] = 0.0
+        else:
+            prev_end = float(scenes[i-2]["t_end"])
+            s["t_start"] = round(prev_end, 3)
+        s["t_end"] = round(float(s["t_start"]) + dur, 3)
+
+
+def scene_motion_fingerprint(img: str, s: Dict[str, Any]) -> str:
+    """Fingerprint da motion da cena: imagem base + motion prompt."""
+    motion_prompt = s.get(
+        "motion_prompt") or "slow cinematic zoom in, subtle parallax, 9:16 vertical"
+    return fingerprint(file_digest(img), motion_prompt)
+
+
+def scene_motion_is_fresh(vpath: str, img: str, s: Dict[str, Any]) -> bool:
+    """Motion da cena gerada a partir da imagem/prompt atuais."""
+    # Motion antigo sem .src só é adotado se for mais novo que a imagem (não foi trocada depois)
+    legacy_ok = os.path.exists(vpath) and os.path.getmtime(vpath) >= os.path.getmtime(img)
+    return is_fresh(vpath, scene_motion_fingerprint(img, s), adopt_legacy=legacy_ok)
+
+
+def render_scene_motion(i: int, s: Dict[str, Any], audio_dur: Optional[float], assets_dir: str,
+                        images_dir: str, leonardo_key: str, generate: bool = True) -> Optional[str]:
+    """Image->Video da cena i com a duração do seu áudio (fallback: motion local).
+
+    Reaproveitado enquanto imagem e motion prompt não mudarem (a duração é coberta
+    pelo loop em build_scene_clip, então não invalida o motion). Com generate=False
+    (rascunho), só devolve a motion em cache; sem ela, retorna None.
+    """
+    vpath = os.path.join(assets_dir, f"scene_{i:02d}.mp4")
+    img = find_scene_image(images_dir, i)
+    if not img:
+        if os.path.exists(vpath):
+            return vpath  # cache
+        raise FileNotFoundError(
+            f"[MOTION] Sem imagem scene_{i:02d} em {images_dir}")
+
+    motion_prompt = s.get(
+        "motion_prompt") or "slow cinematic zoom in, subtle parallax, 9:16 vertical"
+    if scene_motion_is_fresh(vpath, img, s):
+        return vpath  # cache
+    if not generate:
+        print(f"[MOTION] Cena {i}: rascunho, Ken Burns local (motion não gerada)")
+        return None
+
+    if audio_dur is None:
+        audio_dur = float(s["t_end"]) - float(s["t_start"])
+    dur = max(0.5, audio_dur)
+
+    print(f"[MOTION] Cena {i}: upload -> job (target {dur:.2f}s)")
+    try:
+        # Janela de jobs + polling únicos por API key (motion_batch)
+        # Espera limitada ao prazo do job (um poll/download travado não segura o pipeline)
+        get_motion_batch(leonardo_key).submit(img, vpath, dur, motion_prompt).result(timeout=remaining_time())
+    except Exception as e:
+        remaining_time()  # prazo do job vencido: propaga em vez de cair no motion local
+        print(f"[MOTION-LOCAL] Falha Leonardo ({e}). Gerando motion local...")
+        create_local_motion_from_image(img, dur, vpath)
+    mark_fresh(vpath, scene_motion_fingerprint(img, s))
+    return vpath
+
+
+def build_scene_graph(scenes: list, assets_dir: str, images_dir: str, voice_id: str,
+                      eleven_key: str, leonardo_key: str,
+                      image_fn: Optional[Callable[[int, Dict[str, Any]], Any]] = None,
+                      stage_limits: Optional[Dict[str, int]] = None,
+                      generate_motion: bool = True) -> SceneGraph:
+    """Monta o DAG por cena: [images(i)] + tts(i) -> motion(i).
+
+    `image_fn(i, scene)` é opcional (o orquestrador completo gera as imagens no
+    mesmo grafo); sem ela, as imagens já devem existir em images_dir.
+    generate_motion=False (rascunho) só reaproveita motion em cache.
+    """
+    graph = SceneGraph(stage_limits=stage_limits or SCENE_STAGE_LIMITS)
+    for i, s in enumerate(scenes, start=1):
+        deps = []
+        if image_fn is not None:
+            deps.append(graph.add("images", i, partial(image_fn, i, s)))
+        tts_key = graph.add("tts", i, partial(synthesize_scene_audio, i, s, assets_dir, voice_id, eleven_key))
+
+        def motion(audio_dur, *_image, i=i, s=s):
+            return render_scene_motion(i, s, audio_dur, assets_dir, images_dir, leonardo_key,
+                                       generate=generate_motion)
+
+        graph.add("motion", i, motion, deps=[tts_key] + deps)
+    return graph
+
+
+def render_audio_driven(storyboard: Dict[str, Any], assets_dir: str, images_dir: str, out_path: str,
+                        voice_id: str, eleven_key: str, leonardo_key: str,
+                        music_path: Optional[str] = None, enable_subtitles: bool = False,
+                        image_fn: Optional[Callable[[int, Dict[str, Any]], Any]] = None,
+                        render_quality: Optional[str] = None) -> str:
+    """Pipeline áudio-dirigido em processo: (imagens +) TTS -> Image2Video por cena, depois montagem.
+
+    render_quality='draft': prévia sem gerar motion; imagens e TTS ficam em cache para o render final.
+    """
+    scenes = storyboard.get("scenes") or storyboard.get("storyboard")
+    if not scenes:
+        raise ValueError("Storyboard sem scenes.")
+
+    ensure_dir(assets_dir)
+    profile = get_profile(render_quality, FINAL_PROFILE)
+    # (1)+(2) Cada cena avança assim que suas dependências terminam
+    results = build_scene_graph(scenes, assets_dir, images_dir, voice_id, eleven_key,
+                                leonardo_key, image_fn=image_fn,
+                                generate_motion=not profile.static_motion).run()
+    retime_scenes(scenes, {i: results[("tts", i)] for i in range(1, len(scenes) + 1)})
+
+    # (3) Montagem final
+    return assemble_video(storyboard, assets_dir,
+                          out_path, music_path=music_path, enable_subtitles=enable_subtitles,
+                          render_quality=profile.name, images_dir=images_dir)
+
+
 def main():
     ap = argparse.ArgumentParser(
         description="Áudio-dirigido: TTS -> Image2Video -> Montagem (MoviePy 2.1.1)")
@@ -513,6 +805,8 @@ def main():
     ap.add_argument("--subtitle-size", type=int, default=80, help="Tamanho da fonte das legendas")
     ap.add_argument("--subtitle-color", default="white", help="Cor das legendas")
     ap.add_argument("--subtitle-position", default="bottom", choices=["top", "middle", "bottom"], help="Posição das legendas")
+    ap.add_argument("--render-quality", default=None, choices=QUALITIES,
+                    help="final (padrão, RENDER_QUALITY) ou draft: prévia 540x960 sem gerar motion")
 
     # ElevenLabs
     ap.add_argument("--voice-id", required=True)
@@ -523,67 +817,18 @@ def main():
 
     args = ap.parse_args()
 
-    storyboard = load_storyboard(args.storyboard)
-    scenes = storyboard.get("scenes") or storyboard.get("storyboard")
-    if not scenes:
-        raise ValueError("Storyboard sem scenes.")
-
-    ensure_dir(args.assets_dir)
-
-    # (1) TTS por cena -> reancora t_start/t_end pela duração real do áudio
-    for i, s in enumerate(scenes, start=1):
-        base = os.path.join(args.assets_dir, f"scene_{i:02d}")
-        apath = base + ".mp3"
-        if not os.path.exists(apath):
-            text = (s.get("narration") or "").strip()
-            if text:
-                print(f"[TTS] Cena {i}")
-                elevenlabs_tts_to_file(
-                    text, args.voice_id, args.eleven_key, apath)
-        # Recalcula tempos encadeados
-        if os.path.exists(apath):
-            dur = get_audio_duration(apath)
-            if i == 1:
-                s["t_start"] = 0.0
-            else:
-                prev_end = float(scenes[i-2]["t_end"])
-                s["t_start"] = round(prev_end, 3)
-            s["t_end"] = round(float(s["t_start"]) + dur, 3)
-
-    # (2) Image->Video por cena (tenta duração; se o endpoint não aceitar, segue sem)
-    client = LeonardoMotionClient(args.leonardo_key)
-    for i, s in enumerate(scenes, start=1):
-        vpath = os.path.join(args.assets_dir, f"scene_{i:02d}.mp4")
-        if os.path.exists(vpath):
-            continue  # cache
-
-        # encontra imagem base
-        img = None
-        for ext in ("png", "jpg", "jpeg", "webp"):
-            cand = os.path.join(args.images_dir, f"scene_{i:02d}.{ext}")
-            if os.path.exists(cand):
-                img = cand
-                break
-        if not img:
-            raise FileNotFoundError(
-                f"[MOTION] Sem imagem scene_{i:02d} em {args.images_dir}")
-
-        dur = max(0.5, float(s["t_end"]) - float(s["t_start"]))
-        motion_prompt = s.get(
-            "motion_prompt") or "slow cinematic zoom in, subtle parallax, 9:16 vertical"
-
-        print(f"[MOTION] Cena {i}: upload -> job (target {dur:.2f}s)")
-        try:
-            job_id = client.create_image_to_video(img, dur)
-            video_url = client.poll_motion(job_id)
-            client.download(video_url, vpath)
-        except Exception as e:
-            print(f"[MOTION-LOCAL] Falha Leonardo ({e}). Gerando motion local...")
-            create_local_motion_from_image(img, dur, vpath)
-
-    # (3) Montagem final
-    assemble_video(storyboard, args.assets_dir,
-                   args.out, music_path=args.music, enable_subtitles=args.subtitles)
+    render_audio_driven(
+        load_storyboard(args.storyboard),
+        assets_dir=args.assets_dir,
+        images_dir=args.images_dir,
+        out_path=args.out,
+        voice_id=args.voice_id,
+        eleven_key=args.eleven_key,
+        leonardo_key=args.leonardo_key,
+        music_path=args.music,
+        enable_subtitles=args.subtitles,
+        render_quality=args.render_quality,
+    )
 
 
 if __name__ == "__main__":
@@ -27,6 +27,8 @@ import hashlib
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
+from job_workspace import temp_path
+
 # MoviePy imports with compatibility
 try:
     from moviepy.editor import (
@@ -61,7 +63,6 @@ EXPORT_OPTS = dict(
     preset="medium",
     bitrate="8000k",
     threads=4,
-    temp_audiofile="temp-audio.m4a",
     remove_temp=True
 )
 
@@ -316,7 +317,7 @@ def assemble_video(
 
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
     print(f"[EXPORT] Exportando para {out_path}")
-    final.write_videofile(out_path, **EXPORT_OPTS)
+    final.write_videofile(out_path, temp_audiofile=temp_path("audio", ".m4a"), **EXPORT_OPTS)
     return out_path
 
 # =========================
@@ -521,7 +522,6 @@ EXPORT_OPTS = dict(
     preset="medium",
     bitrate="8000k",          # 8 Mb/s
     threads=4,
-    temp_audiofile="temp-audio.m4a",
     remove_temp=True
 )
 
@@ -809,7 +809,7 @@ def assemble_video_from_storyboard(
     print(f"  Resolução: {TARGET_W}x{TARGET_H} @ {FPS}fps")
     print(f"  Duração: {final.duration:.2f}s")
     
-    final.write_videofile(out_path, **EXPORT_OPTS)
+    final.write_videofile(out_path, temp_audiofile=temp_path("audio", ".m4a"), **EXPORT_OPTS)
     print(f"[OK] Vídeo final gerado: {out_path}")
     return out_path
 
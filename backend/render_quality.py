@@ -0,0 +1,86 @@
+# /var/www/tiktok-automation/backend/render_quality.py
+# -*- coding: utf-8 -*-
+
+"""
+Perfis de qualidade de render: final e rascunho (draft) para prévias.
+
+Conferir o ritmo de um vídeo exigia o export completo (1080x1920, 30 fps,
+preset medium). Com render_quality=draft, os pipelines renderizam uma prévia
+a partir do perfil final de cada um:
+
+- metade da resolução (RENDER_DRAFT_SCALE), RENDER_DRAFT_FPS quadros/s
+- preset ultrafast, CRF/bitrate baixos, áudio 96k
+- sem geração de motion (Leonardo): a cena usa a motion em cache, se houver,
+  ou Ken Burns local sobre a imagem
+
+O rascunho só lê os assets em cache (imagens, TTS, motion, música, sprites) e
+grava os seus próprios segmentos/saídas, então o render final os reaproveita.
+
+Padrão: RENDER_QUALITY=final | draft.
+
+Uso:
+    FINAL = RenderProfile("final", 1080, 1920, 30, video_bitrate="8000k", audio_bitrate_k=192)
+    profile = get_profile(settings.get("render_quality"), FINAL)
+    clip.write_videofile(out, fps=profile.fps, preset=profile.preset, bitrate=profile.video_bitrate)
+"""
+
+import os
+from dataclasses import dataclass, replace
+from typing import Optional
+
+DEFAULT_QUALITY = os.getenv("RENDER_QUALITY", "final")
+DRAFT_SCALE = float(os.getenv("RENDER_DRAFT_SCALE", "0.5"))
+DRAFT_FPS = int(os.getenv("RENDER_DRAFT_FPS", "15"))
+DRAFT_CRF = 30
+DRAFT_VIDEO_BITRATE = "1200k"
+DRAFT_AUDIO_BITRATE_K = 96
+
+QUALITIES = ("final", "draft")
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    name: str
+    width: int
+    height: int
+    fps: int
+    preset: str = "medium"
+    video_bitrate: Optional[str] = None     # None = CRF
+    audio_bitrate_k: int = 128
+    crf: int = 23
+    scale: float = 1.0                      # em relação ao perfil final (fontes, margens)
+    static_motion: bool = False             # não gera motion: Ken Burns local sobre a imagem
+
+    @property
+    def is_draft(self) -> bool:
+        return self.name == "draft"
+
+    @property
+    def audio_bitrate(self) -> str:
+        return f"{self.audio_bitrate_k}k"
+
+    def px(self, value: float) -> int:
+        """Medida em pixels do perfil final convertida para este perfil."""
+        return max(1, int(round(value * self.scale)))
+
+
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2.0)) * 2)
+
+
+def draft_of(final: RenderProfile) -> RenderProfile:
+    """Perfil de rascunho derivado do final: resolução reduzida, fps baixo, encode ultrafast."""
+    return replace(
+        final, name="draft",
+        width=_even(final.width * DRAFT_SCALE), height=_even(final.height * DRAFT_SCALE),
+        fps=min(final.fps, DRAFT_FPS), preset="ultrafast",
+        video_bitrate=DRAFT_VIDEO_BITRATE if final.video_bitrate else None,
+        audio_bitrate_k=min(final.audio_bitrate_k, DRAFT_AUDIO_BITRATE_K),
+        crf=max(final.crf, DRAFT_CRF), scale=DRAFT_SCALE, static_motion=True,
+    )
+
+
+def get_profile(quality: Optional[str], final: RenderProfile) -> RenderProfile:
+    """Perfil para `quality` ('final' | 'draft'; None = RENDER_QUALITY). Valor desconhecido -> final."""
+    name = str(quality or DEFAULT_QUALITY).strip().lower()
+    return draft_of(final) if name == "draft" else final
@@ -0,0 +1,78 @@
+# /var/www/tiktok-automation/backend/scene_fingerprint.py
+# -*- coding: utf-8 -*-
+
+"""
+Impressões digitais de artefatos por cena, para re-render incremental.
+
+Cada artefato derivado (áudio TTS, motion, segmento codificado) guarda ao
+lado um arquivo `<artefato>.src` com o hash das entradas que o geraram.
+Quando o editor troca a imagem ou a narração de UMA cena, só os artefatos
+dessa cena ficam desatualizados; o resto é reaproveitado.
+
+Uso:
+    fp = fingerprint(file_digest(img), motion_prompt)
+    if not is_fresh(vpath, fp):
+        gerar(vpath)
+        mark_fresh(vpath, fp)
+"""
+
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+_digest_memo: Dict[Tuple[str, int, int], str] = {}
+_memo_lock = threading.Lock()
+
+
+def file_digest(path: Optional[str]) -> Optional[str]:
+    """SHA-256 do conteúdo do arquivo (memorizado por caminho/tamanho/mtime). None se não existir."""
+    if not path or not os.path.exists(path):
+        return None
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    with _memo_lock:
+        cached = _digest_memo.get(memo_key)
+    if cached:
+        return cached
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    with _memo_lock:
+        _digest_memo[memo_key] = digest
+    return digest
+
+
+def fingerprint(*parts: Any) -> str:
+    """Hash estável de valores JSON-serializáveis (textos, números, dicts de estilo, digests)."""
+    material = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _sidecar(artifact: str) -> str:
+    return f"{artifact}.src"
+
+
+def is_fresh(artifact: str, fp: str, adopt_legacy: bool = False) -> bool:
+    """True se o artefato existe e foi gerado pelas mesmas entradas.
+
+    adopt_legacy: artefato antigo sem `.src` é considerado atual (e passa a ser rastreado).
+    """
+    if not os.path.exists(artifact):
+        return False
+    try:
+        with open(_sidecar(artifact), "r", encoding="utf-8") as f:
+            return f.read().strip() == fp
+    except FileNotFoundError:
+        if adopt_legacy:
+            mark_fresh(artifact, fp)
+            return True
+        return False
+
+
+def mark_fresh(artifact: str, fp: str):
+    with open(_sidecar(artifact), "w", encoding="utf-8") as f:
+        f.write(fp)
@@ -0,0 +1,180 @@
+# /var/www/tiktok-automation/backend/scene_scheduler.py
+# -*- coding: utf-8 -*-
+
+"""
+Executor de grafo de dependências por cena (DAG).
+
+Cada nó é um estágio de uma cena, ex.: ("images", 3), ("tts", 3), ("motion", 3).
+Um nó roda assim que suas dependências terminam, então a motion da cena 1
+começa enquanto a imagem da cena 5 ainda está sendo gerada. O tempo total
+tende à cadeia mais longa de uma cena, e não à soma dos estágios.
+
+- Limite de concorrência por estágio (respeita limites de cada provider)
+- Falha rápida: o primeiro erro cancela o que ainda não começou e é relançado
+- Contexto (job_id do progress_events) propagado para as threads
+- Prazo do job (render_governor.remaining_time): vencido, o grafo levanta
+  TimeoutError sem esperar as tarefas travadas
+- Publica progresso agregado no estágio "scenes"
+
+Uso:
+    graph = SceneGraph(stage_limits={"images": 4, "tts": 4, "motion": 3})
+    graph.add("images", 1, lambda: gerar_imagem(1))
+    graph.add("tts", 1, lambda: gerar_audio(1))
+    graph.add("motion", 1, lambda img, dur: gerar_motion(1, img, dur),
+              deps=[("images", 1), ("tts", 1)])
+    results = graph.run()   # {("motion", 1): ..., ...}
+
+Nós com dependências recebem os resultados delas como argumentos posicionais,
+na ordem de `deps`.
+"""
+
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from progress_events import publish_progress
+from render_governor import remaining_time
+
+logger = logging.getLogger(__name__)
+
+TaskKey = Tuple[str, int]
+
+
+@dataclass
+class SceneTask:
+    stage: str
+    scene: int
+    fn: Callable[..., Any]
+    deps: List[TaskKey] = field(default_factory=list)
+
+    @property
+    def key(self) -> TaskKey:
+        return (self.stage, self.scene)
+
+
+class SceneGraph:
+    """DAG de tarefas (estágio, cena) executado num pool de threads."""
+
+    def __init__(self, stage_limits: Optional[Dict[str, int]] = None, default_limit: int = 4,
+                 progress_stage: Optional[str] = "scenes"):
+        self.stage_limits = dict(stage_limits or {})
+        self.default_limit = max(1, int(default_limit))
+        self.progress_stage = progress_stage
+        self._tasks: Dict[TaskKey, SceneTask] = {}
+
+    def add(self, stage: str, scene: int, fn: Callable[..., Any],
+            deps: Sequence[TaskKey] = ()) -> TaskKey:
+        task = SceneTask(stage, scene, fn, list(deps))
+        if task.key in self._tasks:
+            raise ValueError(f"Tarefa duplicada no grafo: {task.key}")
+        self._tasks[task.key] = task
+        return task.key
+
+    def _limit(self, stage: str) -> int:
+        return max(1, int(self.stage_limits.get(stage, self.default_limit)))
+
+    def _validate(self):
+        for task in self._tasks.values():
+            for dep in task.deps:
+                if dep not in self._tasks:
+                    raise ValueError(f"Dependência inexistente {dep} em {task.key}")
+
+    def run(self) -> Dict[TaskKey, Any]:
+        """Executa o grafo e retorna {(estágio, cena): resultado}."""
+        self._validate()
+        if not self._tasks:
+            return {}
+
+        remaining = {key: set(task.deps) for key, task in self._tasks.items()}
+        dependents: Dict[TaskKey, List[TaskKey]] = {key: [] for key in self._tasks}
+        for key, task in self._tasks.items():
+            for dep in task.deps:
+                dependents[dep].append(key)
+
+        stages = sorted({t.stage for t in self._tasks.values()})
+        totals = {s: sum(1 for t in self._tasks.values() if t.stage == s) for s in stages}
+        done_count = {s: 0 for s in stages}
+        running_count = {s: 0 for s in stages}
+
+        ready: List[TaskKey] = sorted((k for k, deps in remaining.items() if not deps),
+                                      key=lambda k: (k[1], k[0]))
+        results: Dict[TaskKey, Any] = {}
+        running: Dict[Future, TaskKey] = {}
+        error: Optional[BaseException] = None
+
+        max_workers = sum(min(self._limit(s), totals[s]) for s in stages)
+        pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scene")
+        timed_out = False
+        try:
+            while ready or running:
+                # Despacha o que estiver pronto, respeitando o limite de cada estágio
+                if error is None:
+                    for key in list(ready):
+                        stage = key[0]
+                        if running_count[stage] >= self._limit(stage):
+                            continue
+                        task = self._tasks[key]
+                        args = [results[d] for d in task.deps]
+                        ctx = contextvars.copy_context()
+                        running[pool.submit(ctx.run, task.fn, *args)] = key
+                        running_count[stage] += 1
+                        ready.remove(key)
+                else:
+                    ready.clear()
+
+                if not running:
+                    break
+
+                finished, _ = wait(list(running), timeout=remaining_time(), return_when=FIRST_COMPLETED)
+                if not finished:
+                    stuck = sorted(running.values())
+                    raise TimeoutError(f"Pipeline timeout - tarefas sem resposta no prazo: {stuck}")
+                for fut in finished:
+                    key = running.pop(fut)
+                    stage, scene = key
+                    running_count[stage] -= 1
+                    try:
+                        results[key] = fut.result()
+                    except Exception as e:
+                        if error is None:
+                            logger.error(f"❌ Tarefa {stage} da cena {scene} falhou: {e}")
+                            error = e
+                        continue
+
+                    done_count[stage] += 1
+                    self._publish(stage, scene, done_count, totals)
+                    for child in dependents[key]:
+                        remaining[child].discard(key)
+                        if not remaining[child]:
+                            ready.append(child)
+                    ready.sort(key=lambda k: (k[1], k[0]))
+        except TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            # No prazo vencido, não espera threads travadas (ficam órfãs até a chamada de rede/encode voltar)
+            pool.shutdown(wait=not timed_out, cancel_futures=timed_out)
+
+        if error is not None:
+            raise error
+        if len(results) != len(self._tasks):
+            pending = sorted(set(self._tasks) - set(results))
+            raise RuntimeError(f"Grafo com dependências cíclicas; tarefas não executadas: {pending}")
+        return results
+
+    def _publish(self, stage: str, scene: int, done_count: Dict[str, int], totals: Dict[str, int]):
+        if not self.progress_stage:
+            return
+        done = sum(done_count.values())
+        total = sum(totals.values())
+        publish_progress(
+            self.progress_stage,
+            scene=scene,
+            total=total,
+            percent=100.0 * done / max(1, total),
+            message=f"{stage} cena {scene}",
+            task=stage,
+            stages={s: f"{done_count[s]}/{totals[s]}" for s in totals},
+        )
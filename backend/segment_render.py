@@ -0,0 +1,368 @@
+# /var/www/tiktok-automation/backend/segment_render.py
+# -*- coding: utf-8 -*-
+
+"""
+Render paralelo por segmentos de cena + junção por stream copy.
+
+Em vez de um único concatenate_videoclips(method="compose") codificado num
+só processo:
+1) cada cena (vídeo + áudio + legendas) vira um segmento intermediário,
+   codificado num pool de processos (escala com o número de núcleos)
+2) os segmentos são gravados com keyframes forçados em `crossfade_s` e
+   `dur - crossfade_s`, então o "miolo" de cada cena é cortado sem re-encode
+3) só as junções (crossfade de `crossfade_s`) são re-codificadas (xfade)
+4) miolos + junções são unidos pelo concat demuxer do ffmpeg (-c copy);
+   a narração (acrossfade entre cenas) é extraída à parte, mixada com a música
+   em audio_mixer (ducking + loudness alvo) e muxada no fim
+5) segmentos nomeados pelo hash das entradas da cena (ver scene_fingerprint)
+   são reaproveitados: num re-render só as cenas alteradas são re-codificadas
+
+Duração final = soma das cenas - (N-1) * crossfade, igual ao compose com padding negativo.
+O crossfade é limitado a 1/3 da menor cena (`clamp_crossfade`); os pipelines aplicam o
+mesmo limite antes de gravar os segmentos, para os keyframes caírem nos pontos de corte.
+Um segmento gravado com outro valor tem o miolo re-codificado na junção.
+
+Uso (a função de render precisa ser de módulo, para ir ao pool de processos):
+    segments = render_segments_parallel(render_scene_segment, jobs)   # [{"path", "duration", "has_audio"}]
+    join_segments(segments, "final.mp4", crossfade_s=0.18, fps=30, music_path=...)
+"""
+
+import os
+import json
+import queue
+import logging
+import threading
+import subprocess
+import tempfile
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from audio_mixer import mix_to_wav
+from ffmpeg_render import FFMPEG_BIN
+from progress_events import current_job_id, progress_bus, publish_progress
+from render_governor import (current_ticket, encoder_threads, ffmpeg_slot, get_render_governor,
+                             lower_priority, remaining_time, run_process)
+
+logger = logging.getLogger(__name__)
+
+# RENDER_PARALLEL_SEGMENTS=1 ativa o modo por segmentos nos pipelines de montagem
+PARALLEL_SEGMENTS = os.getenv("RENDER_PARALLEL_SEGMENTS", "0") == "1"
+SEGMENT_WORKERS = int(os.getenv("RENDER_SEGMENT_WORKERS", "0")) or max(1, (os.cpu_count() or 2) // 2)
+# Threads do x264 por segmento (o paralelismo principal vem do pool)
+SEGMENT_THREADS = max(1, (os.cpu_count() or 2) // SEGMENT_WORKERS)
+
+# Threads por segmento definidas pelo pai (núcleos do render admitido / processos do pool)
+_worker_threads: Optional[int] = None
+
+
+def _init_worker(threads: int, nice: int, events=None):
+    """Inicializador do pool: threads do encoder, prioridade reduzida (a API continua responsiva)
+    e progresso publicado no filho repassado ao processo pai por `events`."""
+    global _worker_threads
+    _worker_threads = threads
+    lower_priority(nice)
+    if events is not None and multiprocessing.parent_process() is not None:
+        progress_bus.subscribe(events.put)
+
+
+@contextmanager
+def render_pool(workers: int, threads: int) -> Iterator[ProcessPoolExecutor]:
+    """Pool de processos de render (spawn) que pode ser abortado.
+
+    Se o bloco sai com erro (inclusive o prazo do job, `remaining_time`), os
+    workers são mortos em vez de aguardados: um encode travado não segura a
+    thread do job nem o ticket do governador. O progresso publicado nos
+    workers é repassado ao barramento do pai, no job atual.
+    """
+    # spawn: o processo da API tem threads (Flask/SocketIO); fork poderia herdar locks travados
+    ctx = multiprocessing.get_context("spawn")
+    events = ctx.Queue()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                               initargs=(threads, get_render_governor().budget.nice, events))
+    job_id = current_job_id()
+    stop = threading.Event()
+
+    def relay():
+        while True:
+            try:
+                event = events.get(timeout=0.5)
+            except queue.Empty:
+                if stop.is_set():
+                    return
+                continue
+            progress_bus.dispatch(dict(event, job_id=job_id))
+
+    relay_thread = threading.Thread(target=relay, name="render-pool-progress", daemon=True)
+    relay_thread.start()
+    ok = False
+    try:
+        yield pool
+        ok = True
+    finally:
+        if not ok:
+            for proc in list((getattr(pool, "_processes", None) or {}).values()):
+                proc.terminate()
+        pool.shutdown(wait=ok, cancel_futures=not ok)
+        stop.set()
+        relay_thread.join()
+        events.close()
+
+
+def run_bounded(fn: Callable[..., Any], *args: Any, threads: Optional[int] = None) -> Any:
+    """fn(*args) num processo de render separado, morto se o prazo do job vencer.
+
+    Sem prazo no contexto, roda fn no próprio processo (sem custo de spawn).
+    """
+    timeout = remaining_time()
+    if timeout is None:
+        return fn(*args)
+    with render_pool(1, threads or encoder_threads()) as pool:
+        return pool.submit(fn, *args).result(timeout=timeout)
+
+
+# =========================
+# Segmentos (executa no pool)
+# =========================
+
+def clamp_crossfade(crossfade_s: float, durations: Sequence[float]) -> float:
+    """Crossfade efetivo da junção: no máximo 1/3 da menor cena (0 com uma cena só), em ms."""
+    if len(durations) < 2:
+        return 0.0
+    return round(max(0.0, min(crossfade_s, min(durations) / 3.0)), 3)
+
+
+def write_scene_segment(clip, out_path: str, fps: int, crossfade_s: float,
+                        export_opts: Dict[str, Any]) -> Dict[str, Any]:
+    """Grava o clip da cena como segmento intermediário, com keyframes nos pontos de corte.
+
+    `crossfade_s` deve ser o valor já limitado por `clamp_crossfade` (o mesmo passado a join_segments).
+    """
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    duration = float(clip.duration)
+    cuts = [t for t in (crossfade_s, duration - crossfade_s) if 0 < t < duration]
+    params = ["-pix_fmt", "yuv420p"]
+    if cuts:
+        params += ["-force_key_frames", ",".join(f"{t:.3f}" for t in cuts)]
+
+    opts = dict(export_opts)
+    opts.update(fps=fps, threads=_worker_threads or SEGMENT_THREADS, ffmpeg_params=params,
+                temp_audiofile=f"{out_path}.tmp-audio.m4a", remove_temp=True, logger=None)
+    tmp_path = f"{out_path}.tmp.mp4"
+    clip.write_videofile(tmp_path, **opts)
+    os.replace(tmp_path, out_path)
+    segment = {"path": out_path, "duration": duration, "has_audio": clip.audio is not None,
+               "keyframes_s": crossfade_s}
+    with open(f"{out_path}.json", "w", encoding="utf-8") as f:
+        json.dump(segment, f)
+    return segment
+
+
+def load_segment(out_path: str) -> Optional[Dict[str, Any]]:
+    """Segmento já codificado (vídeo + metadados) ou None."""
+    try:
+        with open(f"{out_path}.json", "r", encoding="utf-8") as f:
+            segment = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not os.path.exists(out_path):
+        return None
+    segment["path"] = out_path
+    return segment
+
+
+def prune_segments(seg_dir: str, keep: Sequence[str]):
+    """Remove segmentos (e metadados) que não fazem mais parte da timeline."""
+    keep_names = {os.path.basename(p) for p in keep}
+    if not os.path.isdir(seg_dir):
+        return
+    for name in os.listdir(seg_dir):
+        base = name[:-len(".json")] if name.endswith(".json") else name
+        if base.endswith(".mp4") and base not in keep_names:
+            try:
+                os.remove(os.path.join(seg_dir, name))
+            except FileNotFoundError:
+                pass
+
+
+def render_segments_parallel(render_fn: Callable[..., Dict[str, Any]], jobs: Sequence[Sequence[Any]],
+                             max_workers: Optional[int] = None, out_paths: Optional[Sequence[str]] = None,
+                             progress_stage: str = "encode") -> List[Dict[str, Any]]:
+    """Executa render_fn(*job) num pool de processos; retorna os segmentos na ordem dos jobs.
+
+    Com `out_paths` (caminho do segmento de cada job, nomeado pelo hash das entradas),
+    segmentos já codificados são reaproveitados e só os alterados vão para o pool.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    if out_paths is not None:
+        for k, path in enumerate(out_paths):
+            results[k] = load_segment(path)
+    pending = [k for k in range(len(jobs)) if results[k] is None]
+    reused = len(jobs) - len(pending)
+    if reused:
+        logger.info(f"♻️ {reused}/{len(jobs)} segmentos reaproveitados (cenas sem alteração)")
+    if not pending:
+        return results  # type: ignore[return-value]
+
+    workers = min(len(pending), max_workers or SEGMENT_WORKERS)
+    ticket = current_ticket()
+    if ticket is not None:
+        workers = min(workers, ticket.cores)          # não passa dos núcleos concedidos ao render
+    threads = max(1, encoder_threads(SEGMENT_THREADS * workers) // workers)
+    logger.info(f"🧩 Renderizando {len(pending)} segmentos em {workers} processos ({threads} threads cada)")
+    with render_pool(workers, threads) as pool:
+        futures = {pool.submit(render_fn, *jobs[k]): k for k in pending}
+        done = reused
+        for fut in as_completed(futures, timeout=remaining_time()):
+            results[futures[fut]] = fut.result()
+            done += 1
+            publish_progress(progress_stage, percent=90.0 * done / len(jobs),
+                             message=f"Segmentos: {done}/{len(jobs)}")
+    return results  # type: ignore[return-value]
+
+
+# =========================
+# Junção
+# =========================
+
+def _run(cmd: List[str]):
+    with ffmpeg_slot():
+        try:
+            proc = run_process(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                               timeout=remaining_time())
+        except subprocess.TimeoutExpired:
+            raise TimeoutError("Pipeline timeout - ffmpeg excedeu o prazo do job")
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg falhou ({proc.returncode}): {proc.stderr[-1500:]}")
+
+
+def _cut_copy(src: str, start: float, length: float, out_path: str):
+    """Recorte sem re-encode (o início cai num keyframe forçado)."""
+    cmd = [FFMPEG_BIN, "-y", "-v", "error"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", src, "-t", f"{length:.3f}", "-map", "0:v", "-c", "copy", out_path]
+    _run(cmd)
+
+
+def _cut_encode(src: str, start: float, length: float, fps: int, video_bitrate: str, out_path: str,
+                preset: str = "medium"):
+    """Recorte re-codificado (segmento sem keyframe no ponto de corte), no formato das junções."""
+    _run([
+        FFMPEG_BIN, "-y", "-v", "error", "-ss", f"{start:.3f}", "-t", f"{length:.3f}", "-i", src,
+        "-map", "0:v", "-vf", f"fps={fps},format=yuv420p", "-an",
+        "-c:v", "libx264", "-preset", preset, "-b:v", video_bitrate, "-r", str(fps),
+        "-threads", str(encoder_threads()), out_path,
+    ])
+
+
+def _encode_joint(a: Dict[str, Any], b: Dict[str, Any], crossfade_s: float, fps: int,
+                  video_bitrate: str, out_path: str, preset: str = "medium"):
+    """Re-codifica só a junção: cauda de `a` + cabeça de `b` com xfade."""
+    c = f"{crossfade_s:.3f}"
+    # fps por último: setpts zera a taxa de quadros que o xfade exige constante
+    graph = (
+        f"[0:v]settb=AVTB,setpts=PTS-STARTPTS,fps={fps}[a];"
+        f"[1:v]settb=AVTB,setpts=PTS-STARTPTS,fps={fps}[b];"
+        f"[a][b]xfade=transition=fade:duration={c}:offset=0,format=yuv420p[v]"
+    )
+    _run([
+        FFMPEG_BIN, "-y", "-v", "error",
+        "-ss", f"{a['duration'] - crossfade_s:.3f}", "-t", c, "-i", a["path"],
+        "-t", c, "-i", b["path"],
+        "-filter_complex", graph, "-map", "[v]", "-an",
+        "-c:v", "libx264", "-preset", preset, "-b:v", video_bitrate, "-r", str(fps),
+        "-threads", str(encoder_threads()), out_path,
+    ])
+
+
+def _narration_audio(segments: List[Dict[str, Any]], crossfade_s: float, out_path: str):
+    """Narração contínua (WAV PCM): áudio das cenas com acrossfade nas junções."""
+    cmd = [FFMPEG_BIN, "-y", "-v", "error"]
+    graph: List[str] = []
+    for k, seg in enumerate(segments):
+        d = f"{seg['duration']:.3f}"
+        cmd += ["-i", seg["path"]]
+        if seg.get("has_audio"):
+            graph.append(f"[{k}:a]aresample=44100,aformat=channel_layouts=stereo,"
+                         f"apad=whole_dur={d},atrim=0:{d}[a{k}]")
+        else:
+            graph.append(f"anullsrc=r=44100:cl=stereo,atrim=0:{d}[a{k}]")
+
+    n = len(segments)
+    if n == 1:
+        graph.append("[a0]anull[amain]")
+    elif crossfade_s > 0:
+        prev = "a0"
+        for k in range(1, n):
+            label = "amain" if k == n - 1 else f"x{k}"
+            graph.append(f"[{prev}][a{k}]acrossfade=d={crossfade_s:.3f}:c1=tri:c2=tri[{label}]")
+            prev = label
+    else:
+        graph.append("".join(f"[a{k}]" for k in range(n)) + f"concat=n={n}:v=0:a=1[amain]")
+
+    cmd += ["-filter_complex", ";".join(graph), "-map", "[amain]", "-vn", "-c:a", "pcm_s16le", out_path]
+    _run(cmd)
+
+
+def join_segments(segments: List[Dict[str, Any]], out_path: str, crossfade_s: float, fps: int,
+                  music_path: Optional[str] = None, music_volume: float = 0.22,
+                  video_bitrate: str = "8000k", audio_bitrate: str = "192k",
+                  progress_stage: str = "encode", preset: str = "medium") -> str:
+    """Une os segmentos: miolos por stream copy, junções re-codificadas, áudio mixado à parte."""
+    if not segments:
+        raise ValueError("Nenhum segmento para unir")
+    n = len(segments)
+    # Cenas muito curtas: o crossfade não pode passar de 1/3 da menor cena
+    crossfade_s = clamp_crossfade(crossfade_s, [s["duration"] for s in segments])
+    total = sum(s["duration"] for s in segments) - (n - 1) * crossfade_s
+
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="segjoin_") as work:
+        parts: List[str] = []
+        for k, seg in enumerate(segments):
+            head = crossfade_s if k > 0 else 0.0
+            tail = crossfade_s if k < n - 1 else 0.0
+            body = os.path.join(work, f"body_{k:03d}.mp4")
+            # Metadados sem keyframes_s (anteriores ao campo): assume o crossfade atual
+            keyframes = seg.get("keyframes_s", crossfade_s)
+            if (head or tail) and abs(keyframes - crossfade_s) > 1e-3:
+                # Keyframes forçados noutro ponto (crossfade limitado depois): cópia cortaria fora deles
+                logger.info(f"🔁 Segmento {k + 1}: keyframes em {keyframes}s, corte em {crossfade_s:.3f}s; re-codificando")
+                _cut_encode(seg["path"], head, seg["duration"] - head - tail, fps, video_bitrate, body, preset)
+            else:
+                _cut_copy(seg["path"], head, seg["duration"] - head - tail, body)
+            parts.append(body)
+            if tail:
+                joint = os.path.join(work, f"joint_{k:03d}.mp4")
+                _encode_joint(seg, segments[k + 1], crossfade_s, fps, video_bitrate, joint, preset)
+                parts.append(joint)
+        publish_progress(progress_stage, percent=94.0, message="Junções codificadas")
+
+        list_path = os.path.join(work, "concat.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for part in parts:
+                f.write("file '{}'\n".format(part.replace("'", r"'\''")))
+        video_path = os.path.join(work, "video.mp4")
+        _run([FFMPEG_BIN, "-y", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_path,
+              "-c", "copy", video_path])
+
+        narration_path = os.path.join(work, "narration.wav")
+        _narration_audio(segments, crossfade_s, narration_path)
+        audio_path = mix_to_wav(narration_path, os.path.join(work, "audio.wav"), duration=total,
+                                music_path=music_path if music_path and os.path.exists(music_path) else None,
+                                music_volume=music_volume)
+        publish_progress(progress_stage, percent=97.0, message="Áudio mixado")
+
+        _run([FFMPEG_BIN, "-y", "-v", "error", "-i", video_path, "-i", audio_path,
+              "-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", "-b:a", audio_bitrate,
+              "-shortest", "-movflags", "+faststart", out_path])
+
+    publish_progress(progress_stage, percent=100.0, bytes_written=os.path.getsize(out_path),
+                     message="Segmentos unidos")
+    logger.info(f"✅ {n} segmentos unidos ({total:.1f}s): {out_path}")
+    return out_path
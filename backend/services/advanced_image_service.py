@@ -8,6 +8,9 @@ import openai
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime
 from config_manager import get_config
+from provider_throttle import athrottle
+from image_prompt_cache import ImagePromptCache, get_image_prompt_cache
+from job_workspace import unique_token
 import json
 import base64
 from PIL import Image
@@ -69,8 +72,15 @@ class AdvancedImageService:
         logger.error("❌ Falha em todas as tentativas de geração de imagem")
         return None
 
-    async def generate_with_dalle3(self, prompt: str, style: str = "realistic") -> Optional[str]:
-        """Gera imagem com DALL-E 3"""
+    async def generate_with_dalle3(self, prompt: str, style: str = "realistic", use_cache: bool = True) -> Optional[str]:
+        """Gera imagem com DALL-E 3 (cache por prompt, salvo se `use_cache=False`)"""
+        if use_cache:
+            cache = get_image_prompt_cache()
+            cache_key = ImagePromptCache.make_key(prompt, "openai", "1024x1792", style)
+            hit = cache.lookup(cache_key, config.IMAGES_DIR / f"dalle3_{cache_key[:12]}.png", "openai")
+            if hit:
+                return hit["path"]
+
         if not self.openai_client:
             logger.error("❌ OpenAI client não configurado")
             return None
@@ -81,14 +91,15 @@ class AdvancedImageService:
             # Adaptar o prompt para DALL-E 3
             dalle_prompt = self._adapt_prompt_for_dalle(prompt, style)
             
-            response = await asyncio.to_thread(
-                self.openai_client.images.generate,
-                model="dall-e-3",
-                prompt=dalle_prompt,
-                size="1024x1792",  # Formato vertical para TikTok
-                quality="hd",
-                n=1
-            )
+            async with athrottle("openai"):
+                response = await asyncio.to_thread(
+                    self.openai_client.images.generate,
+                    model="dall-e-3",
+                    prompt=dalle_prompt,
+                    size="1024x1792",  # Formato vertical para TikTok
+                    quality="hd",
+                    n=1
+                )
             
             if response.data and len(response.data) > 0:
                 image_url = response.data[0].url
@@ -98,6 +109,8 @@ class AdvancedImageService:
                 
                 if local_path:
                     logger.info(f"✅ Imagem DALL-E 3 salva: {local_path}")
+                    if use_cache:
+                        cache.store_file(cache_key, local_path, meta={"provider": "openai", "style": style})
                     return local_path
                     
         except Exception as e:
@@ -105,14 +118,25 @@ class AdvancedImageService:
             
         return None
 
-    async def generate_with_leonardo_static(self, prompt: str, style: str = "realistic", size: str = "1024x1792") -> Optional[str]:
+    async def generate_with_leonardo_static(self, prompt: str, style: str = "realistic", size: str = "1024x1792",
+                                            use_cache: bool = True) -> Optional[str]:
         """Gera imagem estática com Leonardo AI e salva em IMAGES_DIR.
 
         Observações importantes:
         - Leonardo limita width/height entre 32 e 1536.
         - Muitos modelos gerativos funcionam melhor com dimensões múltiplas de 32.
         - Esta função normaliza o parâmetro "size" para respeitar esses limites e manter o aspecto.
+        - Com `use_cache`, o mesmo prompt/tamanho reaproveita a imagem (e o image_id) do cache.
         """
+        if use_cache:
+            cache = get_image_prompt_cache()
+            cache_key = ImagePromptCache.make_key(prompt, "leonardo", size, style)
+            hit = cache.lookup(cache_key, config.IMAGES_DIR / f"leonardo_{cache_key[:12]}.png", "leonardo")
+            if hit:
+                if hit["meta"].get("image_id"):
+                    await self._store_image_metadata(hit["path"], hit["meta"]["image_id"])
+                return hit["path"]
+
         if not self.leonardo_api_key:
             logger.error("❌ Leonardo AI não configurado")
             return None
@@ -140,7 +164,7 @@ class AdvancedImageService:
             logger.info(f"📡 Enviando payload para Leonardo: {payload}")
 
             # 1) Criar geração
-            async with aiohttp.ClientSession() as session:
+            async with athrottle("leonardo"), aiohttp.ClientSession() as session:
                 async with session.post(f"{self.leonardo_base_url}/generations", headers=headers, json=payload) as r:
                     logger.info(f"📡 Leonardo API status: {r.status}")
                     if r.status != 200:
@@ -177,7 +201,7 @@ class AdvancedImageService:
                             async with aiohttp.ClientSession() as s2:
                                 async with s2.get(url) as img_resp:
                                     if img_resp.status == 200:
-                                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                                        timestamp = unique_token()
                                         filename = f"leonardo_{timestamp}.png"
                                         local_path = config.IMAGES_DIR / filename
                                         with open(local_path, 'wb') as f:
@@ -186,6 +210,10 @@ class AdvancedImageService:
                                         # Armazenar image_id para uso posterior
                                         if image_id:
                                             await self._store_image_metadata(str(local_path), image_id)
+                                        if use_cache:
+                                            cache.store_file(cache_key, local_path,
+                                                             meta={"provider": "leonardo", "style": style,
+                                                                   "image_id": image_id})
                                         
                                         return str(local_path)
             return None
@@ -402,7 +430,7 @@ class AdvancedImageService:
                 "promptEnhance": True       # Otimização automática do prompt
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with athrottle("leonardo"), aiohttp.ClientSession() as session:
                 async with session.post(
                     f"{self.leonardo_base_url}/generations-image-to-video",
                     headers=headers,
@@ -451,7 +479,7 @@ class AdvancedImageService:
                 "isVariation": False
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with athrottle("leonardo"), aiohttp.ClientSession() as session:
                 async with session.post(
                     f"{self.leonardo_base_url}/generations-motion-svd",
                     headers=headers,
@@ -512,7 +540,7 @@ class AdvancedImageService:
     async def _download_and_save_image(self, url: str, prefix: str) -> Optional[str]:
         """Baixa e salva imagem e retorna caminho absoluto salvo no disco"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = unique_token()
             filename = f"{prefix}_{timestamp}.png"
             local_path = config.IMAGES_DIR / filename
 
@@ -533,7 +561,7 @@ class AdvancedImageService:
     async def _download_and_save_video(self, url: str, prefix: str) -> Optional[str]:
         """Baixa e salva vídeo"""
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = unique_token()
             filename = f"{prefix}_{timestamp}.mp4"
             local_path = config.VIDEO_DIR / filename
             
@@ -596,7 +624,7 @@ class AdvancedImageService:
             
             logger.info(f"🎬 Criando vídeo Leonardo AI com novo endpoint: {motion_prompt[:50]}...")
             
-            async with aiohttp.ClientSession() as session:
+            async with athrottle("leonardo"), aiohttp.ClientSession() as session:
                 async with session.post(
                     f"{self.leonardo_base_url}/generations-image-to-video",
                     headers=headers,
@@ -5,8 +5,10 @@ import logging
 import aiohttp
 import asyncio
 from typing import Dict, List, Optional, Any
-from datetime import datetime
 from config_manager import get_config
+from progress_events import publish_progress
+from tts_cache import TTSCache, get_tts_cache
+from provider_throttle import athrottle
 import json
 
 logger = logging.getLogger(__name__)
@@ -91,6 +93,7 @@ class ElevenLabsTTS:
             
             logger.info(f"🎤 Gerando áudio ElevenLabs - Perfil: {voice_profile}")
             logger.info(f"📝 Texto (primeiros 100 chars): {clean_text[:100]}...")
+            publish_progress("tts", status="started", provider="elevenlabs", message="Sintetizando narração")
             
             voice_config = self.voices.get(voice_profile, self.voices["male-professional"])
             voice_id = voice_config["voice_id"]
@@ -106,10 +109,23 @@ class ElevenLabsTTS:
             if voice_settings:
                 default_settings.update(voice_settings)
             
+            model_id = "eleven_multilingual_v2"  # Modelo que suporta português
+
+            # Cache por conteúdo: mesma narração/voz/config não é sintetizada de novo
+            cache = get_tts_cache()
+            cache_key = TTSCache.make_key(clean_text, voice_id, model_id, default_settings, "mp3")
+            filename = f"elevenlabs_tts_{cache_key[:16]}.mp3"
+            file_path = config.AUDIO_DIR / filename
+            if cache.lookup(cache_key, file_path):
+                logger.info(f"♻️ Áudio ElevenLabs reaproveitado do cache: {filename}")
+                publish_progress("tts", status="done", provider="elevenlabs", cached=True,
+                                 bytes_written=file_path.stat().st_size)
+                return f"/media/audio/{filename}"
+            
             # Preparar payload
             payload = {
                 "text": clean_text,
-                "model_id": "eleven_multilingual_v2",  # Modelo que suporta português
+                "model_id": model_id,
                 "voice_settings": default_settings
             }
             
@@ -120,22 +136,19 @@ class ElevenLabsTTS:
             }
             
             # Fazer requisição para ElevenLabs
-            async with aiohttp.ClientSession() as session:
+            async with athrottle("elevenlabs"), aiohttp.ClientSession() as session:
                 url = f"{self.base_url}/text-to-speech/{voice_id}"
                 
                 async with session.post(url, json=payload, headers=headers) as response:
                     if response.status == 200:
-                        # Salvar áudio
+                        # Salvar áudio (cache + mídia)
                         audio_data = await response.read()
-                        
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        filename = f"elevenlabs_tts_{timestamp}.mp3"
-                        file_path = config.AUDIO_DIR / filename
-                        
-                        with open(file_path, 'wb') as f:
-                            f.write(audio_data)
+                        cache.store(cache_key, audio_data, file_path,
+                                    meta={"provider": "elevenlabs", "voice_id": voice_id})
                         
                         logger.info(f"✅ Áudio ElevenLabs gerado: {filename} ({len(audio_data)} bytes)")
+                        publish_progress("tts", status="done", provider="elevenlabs",
+                                         bytes_written=len(audio_data))
                         
                         # Retornar caminho relativo para API
                         return f"/media/audio/{filename}"
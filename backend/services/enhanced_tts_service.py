@@ -4,11 +4,11 @@ import os
 import logging
 import json
 from typing import Dict, Any, Optional
-from datetime import datetime
 
 from services.optimized_tts_service import OptimizedTTSService
 from services.gemini_tts_service import GeminiTTSService
 from config_manager import get_config
+from job_workspace import unique_token
 
 logger = logging.getLogger(__name__)
 config = get_config()
@@ -82,7 +82,7 @@ class EnhancedTTSService:
             }
         """
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = unique_token()
             service_type = config.get("service", "google")
             
             logger.info(f"🎤 Gerando áudio manual - Serviço: {service_type}")
@@ -244,7 +244,7 @@ class EnhancedTTSService:
             )
             
             # Salvar arquivo
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = unique_token()
             filename = f"google_manual_{timestamp}.mp3"
             file_path = os.path.join(self.audio_dir, filename)
             
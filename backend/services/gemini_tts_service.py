@@ -6,7 +6,12 @@ import tempfile
 import uuid
 from typing import Dict, Any, Optional
 from pathlib import Path
-from datetime import datetime
+
+from progress_events import publish_progress
+from tts_cache import TTSCache, get_tts_cache
+from provider_throttle import athrottle
+from media_probe import audio_duration
+from job_workspace import unique_token
 
 try:
     import google.generativeai as genai
@@ -272,7 +277,26 @@ TEXTO PARA NARRAÇÃO:
 Gere um áudio natural, humanizado e expressivo seguindo exatamente as instruções de voz fornecidas.
 """
             
+            # Cache por conteúdo: mesmo texto/instruções/voz reaproveitam o áudio
+            cache = get_tts_cache()
+            cache_key = TTSCache.make_key(processed_text, voice_profile, "gemini-2.5-pro-preview-tts",
+                                          {"instructions": instructions, "emotion": emotion}, "mp3")
+            filename = f"gemini_tts_{cache_key[:16]}.mp3"
+            audio_path = self.media_dir / filename
+            if cache.lookup(cache_key, audio_path):
+                publish_progress("tts", status="done", provider="gemini", cached=True,
+                                 bytes_written=audio_path.stat().st_size)
+                return {
+                    "success": True,
+                    "audio_path": str(audio_path),
+                    "audio_url": f"/media/audio/{filename}",
+                    "duration": await self._estimate_duration(processed_text, audio_path),
+                    "cached": True,
+                    "message": "Audio ultra-humanizado reaproveitado do cache"
+                }
+
             logger.info("Enviando para Gemini TTS...")
+            publish_progress("tts", status="started", provider="gemini", message="Sintetizando narração")
             
             # Configurar para resposta de áudio (obrigatório para modelos TTS)
             generation_config = genai.GenerationConfig(
@@ -281,33 +305,32 @@ Gere um áudio natural, humanizado e expressivo seguindo exatamente as instruç
             )
             
             # Gerar áudio com o modelo TTS
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                full_prompt,
-                generation_config=generation_config
-            )
+            async with athrottle("gemini"):
+                response = await asyncio.to_thread(
+                    self.model.generate_content,
+                    full_prompt,
+                    generation_config=generation_config
+                )
             
             # O Gemini TTS retorna dados de áudio
             if hasattr(response, 'audio_data') or hasattr(response, 'audio'):
-                # Salvar arquivo de áudio
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"gemini_tts_{timestamp}.mp3"
-                audio_path = self.media_dir / filename
-                
                 # Extrair dados de áudio
                 audio_data = getattr(response, 'audio_data', None) or getattr(response, 'audio', None)
                 
                 if audio_data:
-                    with open(audio_path, "wb") as f:
-                        f.write(audio_data)
+                    # Salvar arquivo de áudio (cache + mídia)
+                    cache.store(cache_key, audio_data, audio_path,
+                                meta={"provider": "gemini", "voice_profile": voice_profile})
                     
                     logger.info(f"Audio Gemini TTS gerado: {filename}")
+                    publish_progress("tts", status="done", provider="gemini",
+                                     bytes_written=len(audio_data))
                     
                     return {
                         "success": True,
                         "audio_path": str(audio_path),
                         "audio_url": f"/media/audio/{filename}",
-                        "duration": await self._estimate_duration(processed_text),
+                        "duration": await self._estimate_duration(processed_text, audio_path),
                         "message": "Audio ultra-humanizado gerado com Gemini TTS"
                     }
                 else:
@@ -321,8 +344,12 @@ Gere um áudio natural, humanizado e expressivo seguindo exatamente as instruç
             logger.error(f"Erro no Gemini TTS: {e}")
             return await self._generate_fallback_audio(processed_text)
 
-    async def _estimate_duration(self, text: str) -> float:
-        """Estima duração do áudio baseado no texto"""
+    async def _estimate_duration(self, text: str, audio_path: Optional[Path] = None) -> float:
+        """Duração real do arquivo (cabeçalho); sem arquivo legível, estima pelo texto"""
+        if audio_path is not None:
+            duration = audio_duration(str(audio_path))
+            if duration is not None:
+                return duration
         # Média de 150 palavras por minuto para fala natural
         words = len(text.split())
         duration = (words / 150) * 60  # em segundos
@@ -353,7 +380,7 @@ Gere um áudio natural, humanizado e expressivo seguindo exatamente as instruç
                 # Renomear para indicar fallback humanizado
                 original_path = result.get('audio_path')
                 if original_path and os.path.exists(original_path):
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    timestamp = unique_token()
                     new_filename = f"humanized_fallback_{timestamp}.mp3"
                     new_path = self.media_dir / new_filename
                     
@@ -9,15 +9,52 @@ from typing import List, Dict, Optional, Tuple, Any
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
 import numpy as np
 import requests
-from datetime import datetime
+from functools import lru_cache
 from config_manager import get_config
 import asyncio  
 import random 
 from services.advanced_image_service import AdvancedImageService
+from progress_events import publish_progress
+from provider_throttle import athrottle, throttle
+from image_prompt_cache import ImagePromptCache, get_image_prompt_cache
+import image_variations
+from job_workspace import unique_token
 
 logger = logging.getLogger(__name__)
 config = get_config()
 
+# Tamanho das imagens do serviço (vertical 9:16), parte da chave do cache por prompt
+IMAGE_SIZE = "1024x1792"
+
+
+# Esquemas de cores do fallback procedural, por tipo de conteúdo
+PROCEDURAL_COLOR_SCHEMES = {
+    'misterio': {'gradient': [(5, 5, 15), (25, 20, 45), (40, 30, 60)], 'accent': (100, 80, 140), 'glow': (150, 130, 200)},
+    'tecnologia': {'gradient': [(0, 0, 10), (10, 5, 30), (20, 10, 50)], 'accent': (0, 255, 255), 'glow': (50, 200, 255)},
+    'ciencia': {'gradient': [(2, 10, 2), (10, 40, 10), (30, 80, 30)], 'accent': (100, 255, 100), 'glow': (150, 255, 150)},
+    'historia': {'gradient': [(20, 15, 5), (50, 40, 15), (80, 60, 20)], 'accent': (255, 200, 50), 'glow': (255, 230, 150)},
+    'curiosidade': {'gradient': [(15, 15, 30), (30, 30, 60), (45, 45, 90)], 'accent': (255, 150, 50), 'glow': (255, 200, 100)},
+    'default': {'gradient': [(30, 30, 30), (60, 60, 60), (90, 90, 90)], 'accent': (180, 180, 180), 'glow': (220, 220, 220)}
+}
+
+
+@lru_cache(maxsize=32)
+def radial_gradient(width: int, height: int, inner: Tuple[int, int, int], outer: Tuple[int, int, int]) -> np.ndarray:
+    """
+    Gradiente radial HxWx3 (uint8): `inner` até 30% do raio, transição linear até `outer` nos cantos.
+    Vetorizado com broadcast (sem loop por pixel) e cacheado por estilo/resolução; o array
+    retornado é somente leitura.
+    """
+    center_x, center_y = width // 2, height // 2
+    dx = np.arange(width, dtype=np.float64) - center_x
+    dy = np.arange(height, dtype=np.float64)[:, None] - center_y
+    ratio = np.sqrt(dx ** 2 + dy ** 2) / np.sqrt(center_x ** 2 + center_y ** 2)
+    t = np.clip((ratio - 0.3) / 0.7, 0.0, 1.0)[..., None]
+    gradient = (np.asarray(inner, dtype=np.float64) * (1 - t)
+                + np.asarray(outer, dtype=np.float64) * t).astype(np.uint8)
+    gradient.flags.writeable = False
+    return gradient
+
 
 class ImageGeneratorService:
     def __init__(self):
@@ -97,7 +134,8 @@ class ImageGeneratorService:
             }
         }
 
-    async def generate_images_for_script(self, script_data: Dict, visual_style: str = "misterio", provider: str = "hybrid") -> List[str]:
+    async def generate_images_for_script(self, script_data: Dict, visual_style: str = "misterio", provider: str = "hybrid",
+                                         local_variants: Optional[bool] = None) -> List[str]:
         """
         Gera imagens inteligentes baseadas no contexto do roteiro.
         
@@ -105,11 +143,18 @@ class ImageGeneratorService:
             script_data: Dicionário contendo o roteiro e metadados.
             visual_style: Estilo visual escolhido.
             provider: Provedor desejado ("imagen" | "openai" | "hybrid")
+            local_variants: Se True, só as imagens base vão ao provedor e as variações de
+                preenchimento (até 20) são derivadas localmente (padrão: IMAGE_LOCAL_VARIANTS).
             
         Returns:
             Lista de caminhos dos arquivos de imagem gerados.
         """
+        if local_variants is None:
+            local_variants = image_variations.LOCAL_VARIANTS
         try:
+            # Índice do prompt base de cada prompt de preenchimento (None = prompt base)
+            variant_of: List[Optional[int]] = []
+
             # Verificar se temos visual_prompts estruturados
             visual_prompts = script_data.get('visual_prompts', [])
             visual_cues = script_data.get('visual_cues', [])
@@ -167,14 +212,17 @@ class ImageGeneratorService:
                             out.append(f"{src}, {preset}")
                         return out
                     idx = 0
+                    n_base = len(image_prompts)
+                    variant_of = [None] * n_base
                     while len(image_prompts) < min_count:
-                        for b in base:
+                        for b_idx, b in enumerate(base):
                             need = min_count - len(image_prompts)
                             if need <= 0:
                                 break
                             vars_batch = _make_variations(b, min(3, need), start_idx=idx)
                             idx += 3
                             image_prompts.extend(vars_batch)
+                            variant_of.extend([b_idx if b_idx < n_base else None] * len(vars_batch))
                             if len(image_prompts) >= min_count:
                                 break
                 # Ajustar num_images ao total final de prompts
@@ -185,11 +233,14 @@ class ImageGeneratorService:
                 logger.info(f"⚠️ Usando {len(visual_cues)} visual_cues (formato antigo)")
                 num_images = max(len(visual_cues), 20)
                 image_prompts = self._create_image_prompts(visual_cues, visual_style, num_images)
+                # _create_image_prompts completa com variações do primeiro conceito
+                variant_of = [None if i < len(visual_cues) else 0 for i in range(num_images)]
             else:
                 # Fallback padrão
                 logger.warning("❌ Nenhum visual_prompts ou visual_cues encontrado, usando fallback")
                 num_images = 20
                 image_prompts = self._create_image_prompts([], visual_style, num_images)
+                variant_of = [None] + [0] * (num_images - 1)
 
             logger.info(f"🎨 Gerando {num_images} imagens para o roteiro...")
 
@@ -213,9 +264,28 @@ class ImageGeneratorService:
                 per_image_providers = [normalized_provider] * num_images
 
             # Gera imagens em paralelo com provedores variados (se aplicável)
-            tasks = [self._generate_single_image(
-                prompt, f"scene_{i+1}", visual_style, per_image_providers[i]) for i, prompt in enumerate(image_prompts)]
-            generated_images = await asyncio.gather(*tasks)
+            completed = 0
+            publish_progress("images", percent=0.0, total=num_images,
+                             message=f"Gerando {num_images} imagens")
+
+            async def _tracked(i: int, prompt: str) -> Optional[str]:
+                nonlocal completed
+                path = await self._generate_single_image(
+                    prompt, f"scene_{i+1}", visual_style, per_image_providers[i])
+                completed += 1
+                publish_progress("images", scene=i + 1, total=num_images,
+                                 percent=100.0 * completed / num_images,
+                                 bytes_written=os.path.getsize(path) if path and os.path.exists(path) else None)
+                return path
+
+            if local_variants and any(v is not None for v in variant_of[:num_images]):
+                generated_images = await image_variations.generate_with_local_variants(
+                    image_prompts, variant_of, _tracked, str(self.images_dir))
+                publish_progress("images", percent=100.0, total=num_images,
+                                 message="Variações locais prontas")
+            else:
+                tasks = [_tracked(i, prompt) for i, prompt in enumerate(image_prompts)]
+                generated_images = await asyncio.gather(*tasks)
 
             valid_images = [path for path in generated_images if path]
 
@@ -253,8 +323,13 @@ class ImageGeneratorService:
 
         return prompts[:num_images]
 
-    async def _generate_single_image(self, prompt: str, filename_prefix: str, visual_style: str, provider: str = "hybrid") -> Optional[str]:
-        """Gera uma única imagem usando o provedor selecionado e fallbacks."""
+    async def _generate_single_image(self, prompt: str, filename_prefix: str, visual_style: str, provider: str = "hybrid",
+                                     use_cache: bool = True) -> Optional[str]:
+        """Gera uma única imagem usando o provedor selecionado e fallbacks.
+
+        use_cache=False ignora o cache por prompt (ex.: substituir a imagem de uma cena
+        pede uma imagem nova), mas a nova imagem passa a ser a entrada do cache.
+        """
         # Normalizar alias 'dalle' -> 'openai'
         provider = (provider or "hybrid").lower()
         if provider == 'dalle':
@@ -272,19 +347,29 @@ class ImageGeneratorService:
         }
         dalle_style = dalle_style_map.get(visual_style, "realistic")
 
+        # Cache por prompt final: a mesma cena em outro roteiro não gera (nem cobra) de novo
+        prompt_cache = get_image_prompt_cache()
+        cache_key = ImagePromptCache.make_key(prompt, provider, IMAGE_SIZE, visual_style)
+        hit = prompt_cache.lookup(
+            cache_key, os.path.join(self.images_dir, f"{filename_prefix}_{cache_key[:12]}.png"), provider) \
+            if use_cache else None
+        if hit:
+            return hit["path"]
+
         async def try_imagen_chain() -> Optional[str]:
             path = None
             if self.vertex_available:
-                path = self._generate_with_imagen4(prompt, filename_prefix)
+                path = await self._imagen_call(self._generate_with_imagen4, prompt, filename_prefix)
             if not path and self.api_key_available:
-                path = self._generate_with_api(prompt, filename_prefix)
+                path = await self._imagen_call(self._generate_with_api, prompt, filename_prefix)
             return path
 
         async def try_dalle3() -> Optional[str]:
             if not self.advanced_service:
                 return None
             try:
-                return await self.advanced_service.generate_with_dalle3(prompt, style=dalle_style)
+                return await self.advanced_service.generate_with_dalle3(
+                    prompt, style=dalle_style, use_cache=False)
             except Exception as e:
                 logger.warning(f"⚠️ Falha no DALL·E 3: {e}")
                 return None
@@ -297,7 +382,7 @@ class ImageGeneratorService:
         elif provider == "leonardo":
             if self.advanced_service:
                 try:
-                    image_path = await self.advanced_service.generate_with_leonardo_static(prompt)
+                    image_path = await self.advanced_service.generate_with_leonardo_static(prompt, use_cache=False)
                 except Exception as e:
                     logger.warning(f"⚠️ Falha no Leonardo estático: {e}")
         else:  # hybrid
@@ -305,13 +390,17 @@ class ImageGeneratorService:
             # Priorizar Leonardo antes de DALL·E se disponível
             if not image_path and self.advanced_service:
                 try:
-                    image_path = await self.advanced_service.generate_with_leonardo_static(prompt)
+                    image_path = await self.advanced_service.generate_with_leonardo_static(prompt, use_cache=False)
                 except Exception as e:
                     logger.warning(f"⚠️ Falha no Leonardo estático: {e}")
             if not image_path:
                 image_path = await try_dalle3()
 
-        # Fallback procedural
+        if image_path:
+            prompt_cache.store_file(cache_key, image_path,
+                                    meta={"provider": provider, "style": visual_style})
+
+        # Fallback procedural (fora do cache: a próxima tentativa deve ir ao provedor)
         if not image_path:
             logger.info(f"   Usando fallback procedural para {filename_prefix}")
             image_path = self._create_procedural_image(
@@ -337,14 +426,14 @@ class ImageGeneratorService:
             
             # Tentar Vertex AI primeiro
             if self.vertex_available:
-                path = self._generate_with_imagen4(prompt, filename_prefix)
+                path = await self._imagen_call(self._generate_with_imagen4, prompt, filename_prefix)
                 if path:
                     results.append(path)
                     continue
                     
             # Fallback para API REST
             if self.api_key_available:
-                path = self._generate_with_api(prompt, filename_prefix)
+                path = await self._imagen_call(self._generate_with_api, prompt, filename_prefix)
                 if path:
                     results.append(path)
                     continue
@@ -354,6 +443,11 @@ class ImageGeneratorService:
         logger.info(f"✅ Imagen 4: {len(results)}/{count} imagens geradas")
         return results
 
+    async def _imagen_call(self, fn, prompt: str, filename_prefix: str) -> Optional[str]:
+        """Chama um gerador Imagen síncrono numa thread, sob o throttle global "imagen"."""
+        async with athrottle("imagen"):
+            return await asyncio.to_thread(fn, prompt, filename_prefix)
+
     def _generate_with_imagen4(self, prompt: str, filename_prefix: str) -> Optional[str]:
         """Gera imagem usando Vertex AI Imagen 4."""
         if not self.vertex_available:
@@ -371,7 +465,7 @@ class ImageGeneratorService:
                 add_watermark=False
             )
             output_path = self.images_dir / \
-                f"{filename_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+                f"{filename_prefix}_{unique_token()}.png"
             response.images[0].save(location=str(output_path))
             return str(output_path)
         except Exception as e:
@@ -395,7 +489,7 @@ class ImageGeneratorService:
                 if 'images' in result and result['images']:
                     image_data = base64.b64decode(result['images'][0]['image'])
                     output_path = self.images_dir / \
-                        f"{filename_prefix}_api_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+                        f"{filename_prefix}_api_{unique_token()}.png"
                     with open(output_path, 'wb') as f:
                         f.write(image_data)
                     return str(output_path)
@@ -407,34 +501,10 @@ class ImageGeneratorService:
     def _create_procedural_image(self, prompt: str, content_type: str, index: int) -> str:
         """Cria imagem procedural de alta qualidade como fallback."""
         width, height = config.VIDEO_WIDTH, config.VIDEO_HEIGHT
+        colors = PROCEDURAL_COLOR_SCHEMES.get(content_type, PROCEDURAL_COLOR_SCHEMES['default'])
 
-        # Esquemas de cores melhorados por tipo
-        color_schemes = {
-            'misterio': {'gradient': [(5, 5, 15), (25, 20, 45), (40, 30, 60)], 'accent': (100, 80, 140), 'glow': (150, 130, 200)},
-            'tecnologia': {'gradient': [(0, 0, 10), (10, 5, 30), (20, 10, 50)], 'accent': (0, 255, 255), 'glow': (50, 200, 255)},
-            'ciencia': {'gradient': [(2, 10, 2), (10, 40, 10), (30, 80, 30)], 'accent': (100, 255, 100), 'glow': (150, 255, 150)},
-            'historia': {'gradient': [(20, 15, 5), (50, 40, 15), (80, 60, 20)], 'accent': (255, 200, 50), 'glow': (255, 230, 150)},
-            'curiosidade': {'gradient': [(15, 15, 30), (30, 30, 60), (45, 45, 90)], 'accent': (255, 150, 50), 'glow': (255, 200, 100)},
-            'default': {'gradient': [(30, 30, 30), (60, 60, 60), (90, 90, 90)], 'accent': (180, 180, 180), 'glow': (220, 220, 220)}
-        }
-
-        colors = color_schemes.get(content_type, color_schemes['default'])
-        img = Image.new('RGB', (width, height), colors['gradient'][0])
-        img_array = np.zeros((height, width, 3), dtype=np.uint8)
-        center_x, center_y = width // 2, height // 2
-        for y in range(height):
-            for x in range(width):
-                dist = np.sqrt((x - center_x)**2 + (y - center_y)**2)
-                max_dist = np.sqrt(center_x**2 + center_y**2)
-                ratio = dist / max_dist
-                t = min(1.0, max(0.0, (ratio - 0.3) / 0.7))
-                color = tuple(
-                    int(colors['gradient'][0][i] * (1 - t) +
-                        colors['gradient'][1][i] * t)
-                    for i in range(3)
-                )
-                img_array[y, x] = color
-        img = Image.fromarray(img_array)
+        # Gradiente base vem do cache (calculado uma vez por estilo/resolução)
+        img = Image.fromarray(radial_gradient(width, height, colors['gradient'][0], colors['gradient'][1]))
         draw = ImageDraw.Draw(img, 'RGBA')
         for _ in range(50):
             x = random.randint(0, width)
@@ -446,7 +516,7 @@ class ImageGeneratorService:
         img = img.filter(ImageFilter.GaussianBlur(radius=1))
 
         output_path = self.images_dir / \
-            f"procedural_{index}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+            f"procedural_{index}_{unique_token()}.png"
         img.save(output_path, quality=95)
 
         return str(output_path)
@@ -490,7 +560,8 @@ class ImageGeneratorService:
                 
             # Fallback para API se Vertex AI falhar
             if not image_path and self.api_key_available:
-                image_path = self._generate_with_api(enhanced_prompt, "single_gen")
+                with throttle("imagen"):
+                    image_path = self._generate_with_api(enhanced_prompt, "single_gen")
                 
             # Fallback procedural se ambos falharem
             if not image_path:
@@ -5,9 +5,13 @@ import logging
 import re
 from typing import Dict, Any, Optional
 from pathlib import Path
-from datetime import datetime
 import random
 
+from progress_events import publish_progress
+from tts_cache import TTSCache, get_tts_cache
+from provider_throttle import athrottle
+from media_probe import audio_duration
+
 try:
     from google.cloud import texttospeech
 except ImportError:
@@ -254,32 +258,43 @@ class OptimizedTTSService:
                 volume_gain_db=max(-96.0, min(16.0, voice_config["volume"]))
             )
             
-            # Executar síntese
-            logger.info("🎙️ Executando síntese TTS otimizada...")
-            response = await asyncio.to_thread(
-                self.client.synthesize_speech,
-                input=synthesis_input,
-                voice=voice_params,
-                audio_config=audio_config
-            )
-            
-            # Salvar arquivo
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"optimized_tts_{timestamp}.mp3"
+            # Cache por conteúdo: mesmo SSML/voz/parâmetros reaproveitam o áudio
+            cache = get_tts_cache()
+            cache_key = TTSCache.make_key(
+                ssml_text, voice_config["voice_name"], "google-cloud-tts",
+                {"rate": audio_config.speaking_rate, "pitch": audio_config.pitch,
+                 "volume": audio_config.volume_gain_db}, "mp3")
+            filename = f"optimized_tts_{cache_key[:16]}.mp3"
             audio_path = self.media_dir / filename
-            
-            with open(audio_path, "wb") as f:
-                f.write(response.audio_content)
+
+            if cache.lookup(cache_key, audio_path):
+                logger.info(f"♻️ Áudio otimizado reaproveitado do cache: {filename}")
+            else:
+                # Executar síntese
+                logger.info("🎙️ Executando síntese TTS otimizada...")
+                publish_progress("tts", status="started", provider="google", message="Sintetizando narração")
+                async with athrottle("google_tts"):
+                    response = await asyncio.to_thread(
+                        self.client.synthesize_speech,
+                        input=synthesis_input,
+                        voice=voice_params,
+                        audio_config=audio_config
+                    )
+                
+                # Salvar arquivo (cache + mídia)
+                cache.store(cache_key, response.audio_content, audio_path,
+                            meta={"provider": "google", "voice_name": voice_config["voice_name"]})
             
             file_size = os.path.getsize(audio_path)
             
             logger.info(f"✅ Áudio otimizado gerado: {filename} ({file_size} bytes)")
+            publish_progress("tts", status="done", provider="google", bytes_written=file_size)
             
             return {
                 "success": True,
                 "audio_path": str(audio_path),
                 "audio_url": f"/media/audio/{filename}",
-                "duration": self._estimate_duration(text),
+                "duration": self._estimate_duration(text, audio_path),
                 "voice_used": voice_config["description"],
                 "emotion_detected": voice_config["emotion"],
                 "message": f"Áudio gerado com {voice_config['description']}"
@@ -293,8 +308,12 @@ class OptimizedTTSService:
                 "audio_path": None
             }
 
-    def _estimate_duration(self, text: str) -> float:
-        """Estima duração baseada no texto"""
+    def _estimate_duration(self, text: str, audio_path: Optional[Path] = None) -> float:
+        """Duração real do arquivo (cabeçalho); sem arquivo legível, estima pelo texto"""
+        if audio_path is not None:
+            duration = audio_duration(str(audio_path))
+            if duration is not None:
+                return duration
         # Média de 150 palavras por minuto para português brasileiro
         words = len(text.split())
         duration = (words / 150) * 60
@@ -5,7 +5,6 @@ import logging
 import re
 from typing import Dict, Any, Optional
 from pathlib import Path
-from datetime import datetime
 import tempfile
 
 try:
@@ -20,6 +19,9 @@ except ImportError:
     pydub = None
     AudioSegment = None
 
+from media_probe import audio_duration
+from job_workspace import unique_token
+
 logger = logging.getLogger(__name__)
 
 class EnhancedTTSService:
@@ -114,7 +116,7 @@ class EnhancedTTSService:
             )
             
             # Salvar arquivo
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = unique_token()
             filename = f"tts_audio_{timestamp}.mp3"
             audio_path = self.media_dir / filename
             
@@ -353,7 +355,7 @@ class EnhancedTTSService:
                 audio = audio + volume_gain
                 
             # Salvar arquivo processado
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = unique_token()
             processed_filename = f"tts_processed_{timestamp}.mp3"
             processed_path = self.media_dir / processed_filename
             
@@ -371,6 +373,11 @@ class EnhancedTTSService:
     async def _get_audio_duration(self, audio_path: Path) -> float:
         """Obtem duracao do audio em segundos"""
         
+        # Cabeçalho do arquivo (sem decodificar o MP3 inteiro)
+        duration = audio_duration(str(audio_path))
+        if duration is not None:
+            return duration
+
         if not AudioSegment:
             return 0.0
             
@@ -2,11 +2,11 @@ import os
 import io
 import json
 import logging
-from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
 from config_manager import get_config
+from job_workspace import unique_token
 
 logger = logging.getLogger(__name__)
 config = get_config()
@@ -60,7 +60,7 @@ class VeoVideoService:
         return image_path
 
     def _save_video_bytes(self, data: bytes, prefix: str = "veo2") -> str:
-        ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+        ts = unique_token()
         filename = f"{prefix}_{ts}.mp4"
         out_path = Path(config.VIDEO_DIR) / filename
         with open(out_path, 'wb') as f:
@@ -132,7 +132,7 @@ class VeoVideoService:
 
                 # Alguns SDKs oferecem método save diretamente
                 if hasattr(response, 'save'):
-                    ts = datetime.now().strftime('%Y%m%d_%H%M%S')
+                    ts = unique_token()
                     filename = f"veo2_{ts}.mp4"
                     out_path = Path(config.VIDEO_DIR) / filename
                     response.save(str(out_path))
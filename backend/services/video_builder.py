@@ -3,7 +3,6 @@
 import os
 import logging
 from typing import List, Dict, Optional, Tuple, Any
-from datetime import datetime
 from moviepy import (
     AudioFileClip, ImageClip, TextClip, CompositeVideoClip, 
     CompositeAudioClip, concatenate_videoclips
@@ -14,6 +13,9 @@ import numpy as np
 import requests
 import moviepy.config as mpy_config
 
+from job_workspace import temp_path, unique_token
+from render_governor import aadmit_render, estimate_render_mb
+
 logger = logging.getLogger(__name__)
 
 # Configurar ImageMagick para MoviePy
@@ -140,21 +142,23 @@ class VideoBuilderService:
             final_video = final_video.set_duration(video_duration)
             
             # Salvar vídeo
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            timestamp = unique_token()
             output_filename = f"video_final_{timestamp}.mp4"
             output_path = os.path.join(self.videos_dir, output_filename)
             
-            # Renderizar com configurações otimizadas
-            final_video.write_videofile(
-                output_path,
-                fps=30,
-                codec='libx264',
-                audio_codec='aac',
-                temp_audiofile='temp-audio.m4a',
-                remove_temp=True,
-                verbose=False,
-                logger=None
-            )
+            # Renderizar com configurações otimizadas (admitido no orçamento de render)
+            async with aadmit_render(estimate_render_mb(video_duration, 1080, 1920), label="video_builder") as ticket:
+                final_video.write_videofile(
+                    output_path,
+                    fps=30,
+                    codec='libx264',
+                    audio_codec='aac',
+                    threads=ticket.threads,
+                    temp_audiofile=temp_path('audio', '.m4a'),
+                    remove_temp=True,
+                    verbose=False,
+                    logger=None
+                )
             
             # Limpar recursos
             audio_clip.close()
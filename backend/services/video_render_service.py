@@ -14,7 +14,8 @@ import tempfile
 import shutil
 from typing import Dict, Any, List, Optional
 import logging
-from datetime import datetime
+
+from job_workspace import unique_token
 
 # Importa o pipeline TTS/MoviePy
 try:
@@ -95,7 +96,7 @@ class VideoRenderService:
 
     def _create_workspace(self, storyboard_data: Dict[str, Any]) -> Dict[str, str]:
         """Cria workspace temporário para renderização"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = unique_token()
         title_safe = "".join(c for c in storyboard_data.get("title", "video")[:20] if c.isalnum() or c in "_-")
         
         temp_dir = os.path.join(self.base_output_dir, f"render_{title_safe}_{timestamp}")
@@ -211,19 +212,15 @@ class VideoRenderService:
         else:
             actual_voice_id = voice_id
         
-        for i, scene in enumerate(scenes, 1):
-            narration = scene.get("narration", "").strip()
-            if not narration:
-                logger.warning(f"Cena {i} sem narração - pulando")
-                continue
-            
+        async def synthesize(i: int, narration: str):
             audio_path = os.path.join(workspace["audio_dir"], f"scene_{i:02d}.wav")
             
             try:
                 if TTS_AVAILABLE:
-                    # Usar módulo TTS direto
+                    # Usar módulo TTS direto (pool ElevenLabs compartilhado limita a concorrência)
                     from tts_sync_pipeline import elevenlabs_tts
-                    elevenlabs_tts(
+                    await asyncio.to_thread(
+                        elevenlabs_tts,
                         text=narration,
                         voice_id=actual_voice_id,
                         api_key=elevenlabs_key,
@@ -242,6 +239,17 @@ class VideoRenderService:
             except Exception as e:
                 logger.error(f"❌ Erro ao gerar áudio da cena {i}: {e}")
 
+        tasks = []
+        for i, scene in enumerate(scenes, 1):
+            narration = scene.get("narration", "").strip()
+            if not narration:
+                logger.warning(f"Cena {i} sem narração - pulando")
+                continue
+            tasks.append(synthesize(i, narration))
+
+        # Todas as cenas em paralelo: leva o tempo da cena mais longa, não a soma
+        await asyncio.gather(*tasks)
+
     async def _assemble_final_video(
         self, 
         storyboard_data: Dict[str, Any], 
@@ -0,0 +1,219 @@
+# /var/www/tiktok-automation/backend/subtitle_sprites.py
+# -*- coding: utf-8 -*-
+
+"""
+Cache de sprites de legenda pré-rasterizados.
+
+Em vez de um TextClip novo por frase em cada render (layout de texto + contorno
+refeitos toda vez, dentro de um CompositeVideoClip do tamanho da tela), cada
+legenda é rasterizada UMA vez num sprite RGBA recortado ao texto:
+
+- chave = hash de (texto, estilo, largura da caixa)
+- memória: LRU por processo (SUBTITLE_SPRITE_MEMORY itens)
+- disco: DATA_DIR/subtitle_sprites/<k[:2]>/<chave>.png (compartilhado entre
+  processos do pool de segmentos e entre re-renders)
+
+O sprite vira um ImageClip estático com máscara alfa, posicionado direto no
+composite final: o MoviePy só mistura a área do texto e só enquanto a legenda
+está ativa (start/duration).
+
+Uso:
+    clip = sprite_clip("Primeira frase", start=0.0, duration=2.5,
+                       style={"font": "Arial-Bold", "fontsize": 56}, width=972,
+                       position=("center", "bottom"))
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from scene_fingerprint import fingerprint
+
+logger = logging.getLogger(__name__)
+
+SPRITE_MEMORY_ITEMS = int(os.getenv("SUBTITLE_SPRITE_MEMORY", "256"))
+
+DEFAULT_STYLE = {
+    "font": "Arial-Bold",
+    "fontsize": 56,
+    "color": "white",
+    "stroke_color": "black",
+    "stroke_width": 2,
+    "line_spacing": 4,
+}
+
+# Nomes no estilo ImageMagick ("Arial-Bold") -> arquivos TrueType comuns
+_FONT_FALLBACKS = {
+    "bold": ["arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf",
+             "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+             "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf"],
+    "regular": ["arial.ttf", "Arial.ttf", "DejaVuSans.ttf",
+                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+                "/usr/share/fonts/dejavu/DejaVuSans.ttf"],
+}
+
+
+def normalize_style(style: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Estilo completo (padrões + overrides), só com os campos que afetam o raster."""
+    merged = dict(DEFAULT_STYLE)
+    for key in DEFAULT_STYLE:
+        if style and style.get(key) is not None:
+            merged[key] = style[key]
+    merged["fontsize"] = int(merged["fontsize"])
+    merged["stroke_width"] = int(merged["stroke_width"])
+    merged["line_spacing"] = int(merged["line_spacing"])
+    merged["font"] = str(merged["font"])
+    merged["color"] = str(merged["color"])
+    merged["stroke_color"] = str(merged["stroke_color"])
+    return merged
+
+
+def _load_font(font: str, size: int) -> ImageFont.ImageFont:
+    candidates = [font, f"{font}.ttf"]
+    candidates += _FONT_FALLBACKS["bold" if "bold" in font.lower() else "regular"]
+    for cand in candidates:
+        try:
+            return ImageFont.truetype(cand, size)
+        except (OSError, ValueError):
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def _wrap(text: str, font: ImageFont.ImageFont, max_width: int) -> List[str]:
+    """Quebra gulosa por largura medida (equivalente ao method='caption')."""
+    lines: List[str] = []
+    for paragraph in text.splitlines() or [text]:
+        current = ""
+        for word in paragraph.split():
+            trial = f"{current} {word}" if current else word
+            if current and font.getlength(trial) > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = trial
+        lines.append(current)
+    return [line for line in lines if line] or [text]
+
+
+def rasterize(text: str, style: Dict[str, Any], width: int) -> np.ndarray:
+    """Texto centralizado com contorno -> array RGBA (uint8) recortado à área do texto."""
+    font = _load_font(style["font"], style["fontsize"])
+    stroke = style["stroke_width"]
+    lines = _wrap(text.strip(), font, max(1, width - 2 * stroke))
+
+    ascent, descent = font.getmetrics()
+    line_h = ascent + descent + style["line_spacing"]
+    line_widths = [font.getlength(line) for line in lines]
+    sprite_w = int(min(width, max(line_widths) + 2 * stroke + 2))
+    sprite_h = int(line_h * len(lines) - style["line_spacing"] + 2 * stroke + 2)
+
+    img = Image.new("RGBA", (max(1, sprite_w), max(1, sprite_h)), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    for k, line in enumerate(lines):
+        draw.text((sprite_w / 2, stroke + 1 + k * line_h), line, font=font, anchor="ma",
+                  fill=style["color"], stroke_width=stroke, stroke_fill=style["stroke_color"])
+    return np.asarray(img)
+
+
+class SubtitleSpriteCache:
+    """Sprites RGBA por (texto, estilo, largura): LRU em memória + PNG em disco."""
+
+    def __init__(self, cache_dir: Optional[Union[str, Path]] = None,
+                 memory_items: int = SPRITE_MEMORY_ITEMS):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.memory_items = memory_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(text: str, style: Dict[str, Any], width: int) -> str:
+        return fingerprint("subtitle-sprite/1", text.strip(), normalize_style(style), int(width))
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        return self.cache_dir / key[:2] / f"{key}.png"
+
+    def _remember(self, key: str, sprite: np.ndarray):
+        sprite.setflags(write=False)  # compartilhado entre clips: somente leitura
+        with self._lock:
+            self._memory[key] = sprite
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, text: str, style: Optional[Dict[str, Any]], width: int) -> np.ndarray:
+        """Sprite da legenda (rasteriza só na primeira vez)."""
+        style = normalize_style(style)
+        key = self.make_key(text, style, width)
+        with self._lock:
+            sprite = self._memory.get(key)
+            if sprite is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return sprite
+
+        path = self._disk_path(key)
+        if path is not None and path.exists():
+            try:
+                with Image.open(path) as img:
+                    sprite = np.asarray(img.convert("RGBA"))
+                self._remember(key, sprite)
+                with self._lock:
+                    self.hits += 1
+                return sprite
+            except OSError as e:
+                logger.warning(f"⚠️ Sprite de legenda corrompido ({path.name}): {e}")
+
+        sprite = rasterize(text, style, width)
+        with self._lock:
+            self.misses += 1
+        if path is not None:
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+                Image.fromarray(sprite).save(tmp, format="PNG")
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.warning(f"⚠️ Não foi possível gravar sprite de legenda: {e}")
+        self._remember(key, sprite)
+        return sprite
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "memory_items": len(self._memory)}
+
+
+_cache: Optional[SubtitleSpriteCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_sprite_cache() -> SubtitleSpriteCache:
+    """Cache único por processo, em DATA_DIR/subtitle_sprites."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from config_manager import get_config
+            _cache = SubtitleSpriteCache(get_config().DATA_DIR / "subtitle_sprites")
+        return _cache
+
+
+def sprite_clip(text: str, start: float, duration: float, style: Optional[Dict[str, Any]],
+                width: int, position: Tuple[Any, Any] = ("center", "bottom")):
+    """ImageClip (MoviePy 2.x) do sprite, com máscara alfa, ativo só em [start, start+duration]."""
+    from moviepy import ImageClip
+
+    sprite = get_sprite_cache().get(text, style, width)
+    clip = ImageClip(sprite, transparent=True)
+    return clip.with_start(start).with_duration(duration).with_position(position)
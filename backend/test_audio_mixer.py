@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do mixer de áudio
+=======================
+Valida o ducking da música pela narração, o loudness final no alvo, o teto
+de pico do limitador e a gravação do WAV único para o encoder.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from audio_dsp import SAMPLE_RATE, decode_audio, integrated_loudness, write_wav
+from audio_mixer import duck_gain, limit_peaks, mix, mix_to_wav
+
+SR = SAMPLE_RATE
+
+
+def _speech_like(seconds, on_s=2.5, period_s=4.0, amplitude=0.2):
+    """Tom de 200 Hz ligado `on_s` a cada `period_s` segundos (voz com pausas)."""
+    t = np.arange(int(seconds * SR)) / SR
+    mono = (amplitude * np.sin(2 * np.pi * 200 * t) * ((t % period_s) < on_s)).astype(np.float32)
+    return np.stack([mono, mono], axis=1)
+
+
+def _tone(seconds, amplitude, freq=330.0):
+    t = np.arange(int(seconds * SR)) / SR
+    mono = (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+    return np.stack([mono, mono], axis=1)
+
+
+def test_music_is_ducked_only_under_speech():
+    narration = _speech_like(12.0)
+    gain = duck_gain(narration, len(narration), SR, duck_db=-10.0)
+    assert abs(gain[int(1.0 * SR)] - 10 ** (-10 / 20)) < 1e-3            # voz: -10 dB
+    assert abs(gain[int(3.5 * SR)] - 1.0) < 1e-3                            # pausa longa: volta
+    assert gain[int(2.6 * SR)] < 0.5                                        # pausa curta: segura (hold)
+
+
+def test_final_mix_hits_loudness_target_under_ceiling():
+    for amplitude in (0.02, 0.5):                                           # narração baixa e alta
+        out = mix(_speech_like(20.0, amplitude=amplitude), _tone(7.0, 0.3), SR,
+                  duration=20.0, music_volume=0.3, target_lufs=-14.0)
+        assert out.shape == (20 * SR, 2)
+        assert abs(integrated_loudness(out, SR) + 14.0) < 0.5
+        assert np.abs(out).max() <= 10 ** (-1 / 20) + 1e-6
+
+
+def test_limiter_reduces_only_peaks():
+    x = _tone(1.0, 0.5)
+    x[SR // 2: SR // 2 + 10] = 1.5
+    y = limit_peaks(x, -1.0, SR)
+    assert np.abs(y).max() <= 10 ** (-1 / 20) + 1e-6
+    assert np.allclose(y[: SR // 4], x[: SR // 4])                         # longe do pico: intacto
+
+
+def test_mix_to_wav_writes_single_pcm_track():
+    with tempfile.TemporaryDirectory() as tmp:
+        narration = write_wav(str(Path(tmp) / "narracao.wav"), _speech_like(5.0))
+        music = write_wav(str(Path(tmp) / "bed.wav"), _tone(2.0, 0.3))
+        out_path = mix_to_wav(narration, str(Path(tmp) / "mix.wav"), duration=6.0, music_path=music)
+        out = decode_audio(out_path)
+        assert out.shape == (6 * SR, 2)
+        assert np.abs(out[int(5.4 * SR): int(5.5 * SR)]).max() > 0.01           # música cobre o fim
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do loop de clipes
+=======================
+Valida o mapeamento de frames (loop e ping-pong sem repetir as pontas) e o
+arquivo em loop do ffmpeg: um único `-stream_loop` com stream copy,
+reaproveitado enquanto o clipe de origem não muda.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+import clip_loop
+from clip_loop import frame_index, loop_file
+
+
+def test_frame_index_loop_and_pingpong():
+    fps, n = 10, 4
+    loop = [frame_index(k / fps, fps, n) for k in range(10)]
+    assert loop == [0, 1, 2, 3, 0, 1, 2, 3, 0, 1]
+    pingpong = [frame_index(k / fps, fps, n, pingpong=True) for k in range(10)]
+    assert pingpong == [0, 1, 2, 3, 2, 1, 0, 1, 2, 3]
+    assert frame_index(3.7, fps, 1, pingpong=True) == 0
+
+
+def test_loop_file_runs_ffmpeg_once_per_source(monkeypatch):
+    commands = []
+
+    def fake_run(cmd):
+        commands.append(cmd)
+        Path(cmd[-1]).write_bytes(b"video")
+
+    monkeypatch.setattr(clip_loop, "_run", fake_run)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / "scene_01.mp4"
+        src.write_bytes(b"motion")
+
+        assert loop_file(str(src), 5.0, 4.0) == str(src)                    # já cobre: sem ffmpeg
+        out = loop_file(str(src), 5.0, 18.0)
+        assert out.endswith("scene_01.loop4.mp4") and Path(out).exists()
+        assert commands[0][commands[0].index("-stream_loop") + 1] == "3"
+        assert commands[0][commands[0].index("-c") + 1] == "copy"            # sem re-encode
+
+        assert loop_file(str(src), 5.0, 18.0) == out and len(commands) == 1  # reaproveitado
+        src.write_bytes(b"motion nova")
+        loop_file(str(src), 5.0, 18.0)
+        assert len(commands) == 2                                            # origem mudou
+
+        pp = loop_file(str(src), 5.0, 18.0, pingpong=True)
+        assert pp.endswith("scene_01.pingpong.loop2.mp4")
+        assert "reverse" in " ".join(commands[2]) and "-stream_loop" in commands[3]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do pool ElevenLabs
+========================
+Valida o limite de concorrência, o paralelismo por cena e a pausa compartilhada em 429.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from elevenlabs_pool import ElevenLabsPool
+
+
+class FakeResponse:
+    def __init__(self, status_code, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode("utf-8", "ignore")
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Responde 200 após `delay`; as primeiras `limited` chamadas recebem 429."""
+
+    def __init__(self, delay=0.05, limited=0, retry_after="0.1"):
+        self.delay = delay
+        self.limited = limited
+        self.retry_after = retry_after
+        self.active = 0
+        self.max_active = 0
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        with self._lock:
+            self.calls.append(time.time())
+            if self.limited > 0:
+                self.limited -= 1
+                return FakeResponse(429, b"rate limited", {"Retry-After": self.retry_after})
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return FakeResponse(200, json["text"].encode("utf-8"))
+
+
+def test_scenes_run_in_parallel_up_to_the_limit():
+    pool = ElevenLabsPool(max_concurrency=3)
+    pool.session = FakeSession(delay=0.1)
+
+    t0 = time.time()
+    results = pool.synthesize_many(
+        lambda text: pool.post_tts("https://tts", {}, {"text": text}),
+        [f"cena {i}" for i in range(6)],
+        max_workers=6,
+    )
+    elapsed = time.time() - t0
+
+    assert results == [f"cena {i}".encode("utf-8") for i in range(6)]
+    assert pool.session.max_active == 3
+    assert elapsed < 0.45  # 2 rodadas de 0.1s, não 6
+
+
+def test_rate_limit_pauses_all_workers():
+    pool = ElevenLabsPool(max_concurrency=2)
+    pool.session = FakeSession(delay=0.0, limited=1, retry_after="0.2")
+
+    t0 = time.time()
+    results = pool.synthesize_many(
+        lambda text: pool.post_tts("https://tts", {}, {"text": text}, backoff_sec=0.01),
+        ["a", "b", "c"],
+    )
+
+    assert results == [b"a", b"b", b"c"]
+    # Depois do 429, nenhuma requisição sai antes do fim da pausa compartilhada
+    first = pool.session.calls[0]
+    assert all(t - first >= 0.19 for t in pool.session.calls[2:])
+    assert time.time() - t0 >= 0.2
+
+
+if __name__ == "__main__":
+    test_scenes_run_in_parallel_up_to_the_limit()
+    test_rate_limit_pauses_all_workers()
+    print("✅ Pool ElevenLabs OK")
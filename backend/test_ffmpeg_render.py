@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do backend de render FFmpeg
+=================================
+Valida a compilação da timeline (segmentos, zoom, legendas, mix de áudio) em filter_complex
+e a divisão de um único composite em várias saídas por plataforma; e um transcode real com o
+binário do ffmpeg (PATH ou o do imageio-ffmpeg).
+"""
+
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from PIL import Image
+
+from ffmpeg_render import (ImageSegment, OutputSpec, RenderTimeline, SubtitleCue, build_ffmpeg_command,
+                           build_multi_output_command, build_transcode_command, _frame_counts,
+                           _unique_outputs)
+
+
+def _timeline(tmp, music=None, subtitles=()):
+    wide = Path(tmp) / "wide.png"
+    narrow = Path(tmp) / "narrow.png"
+    Image.new("RGB", (1600, 900)).save(wide)
+    Image.new("RGB", (400, 800)).save(narrow)
+    return RenderTimeline(
+        width=1080, height=1920, fps=30, duration=5.0, narration_path="narracao.mp3",
+        segments=[ImageSegment(str(wide), 0.0, 2.23), ImageSegment(str(narrow), 2.23, 2.77)],
+        subtitles=list(subtitles), subtitle_style={"fontsize": 60, "color": "#FFD700"},
+        music_path=music,
+    )
+
+
+def test_frames_cover_the_whole_duration():
+    with tempfile.TemporaryDirectory() as tmp:
+        timeline = _timeline(tmp)
+        frames = _frame_counts(timeline)
+        assert frames == [67, 83]
+        assert sum(frames) == int(timeline.duration * timeline.fps)
+
+
+def test_graph_has_ken_burns_canvas_and_narration_only_audio():
+    with tempfile.TemporaryDirectory() as tmp:
+        cmd = build_ffmpeg_command(_timeline(tmp), "out.mp4", tmp)
+        graph = cmd[cmd.index("-filter_complex") + 1]
+
+        assert "scale=3414:1920,crop=1080:1920:1167:0" in graph   # imagem larga: corta as laterais
+        assert "scale=960:1920,pad=1080:1920:60:0" in graph        # imagem estreita: barras pretas
+        assert "zoompan=z='1.0+0.0500*on/67'" in graph and ":d=83:" in graph
+        assert "concat=n=2:v=1:a=0[vout]" in graph
+        assert "amix" not in graph and "[2:a]apad,atrim=0:5.000" in graph
+        assert cmd[-1] == "out.mp4" and cmd[cmd.index("-t") + 1] == "5.000"
+
+
+def test_subtitles_and_music_mix():
+    with tempfile.TemporaryDirectory() as tmp:
+        cues = [SubtitleCue(0.0, 2.5, "Uma frase curta"),
+                SubtitleCue(2.5, 5.0, "Uma frase bem mais longa que precisa quebrar em mais de uma linha no vídeo")]
+        cmd = build_ffmpeg_command(_timeline(tmp, music="musica.mp3", subtitles=cues), "out.mp4", tmp)
+        graph = cmd[cmd.index("-filter_complex") + 1]
+
+        assert graph.count("drawtext=") >= 3
+        assert "enable='between(t,2.500,5.000)'" in graph
+        assert "fontcolor=0xFFD700" in graph
+        assert "[3:a]atrim=0:5.000,asetpts=N/SR/TB,volume=0.3[bgm]" in graph
+        assert "amix=inputs=2:duration=first:normalize=0[aout]" in graph
+        assert (Path(tmp) / "sub_001_00.txt").read_text(encoding="utf-8").startswith("Uma frase")
+
+
+def test_one_composite_split_into_platform_encoders():
+    with tempfile.TemporaryDirectory() as tmp:
+        outputs = [OutputSpec("tiktok.mp4", 1080, 1920, bitrate="2M", max_duration=180),
+                   OutputSpec("shorts.mp4", 1080, 1920, bitrate="2.5M", max_duration=3),
+                   OutputSpec("twitter.mp4", 1920, 1080, max_duration=140)]
+        cmd = build_multi_output_command(_timeline(tmp), outputs, tmp, crf=21)
+        graph = cmd[cmd.index("-filter_complex") + 1]
+
+        assert cmd.count("-filter_complex") == 1 and graph.count("zoompan=") == 2   # composite uma vez
+        assert "[vout]split=3[vs0][vs1][vs2]" in graph and "[aout]asplit=3[as0][as1][as2]" in graph
+        assert "[vs0]null[vo0]" in graph
+        assert "[vs2]scale=1920:1080:force_original_aspect_ratio=decrease,pad=1920:1080" in graph
+        outs = [i for i, arg in enumerate(cmd) if arg.endswith(".mp4")]
+        assert [cmd[i] for i in outs] == ["tiktok.mp4", "shorts.mp4", "twitter.mp4"]
+        shorts = cmd[outs[0] + 1:outs[1]]
+        assert shorts[shorts.index("-t") + 1] == "3.000" and shorts[shorts.index("-b:v") + 1] == "2.5M"
+        assert shorts[shorts.index("-bufsize") + 1] == "5000000"
+        twitter = cmd[outs[1] + 1:outs[2]]
+        assert twitter[twitter.index("-crf") + 1] == "21" and "-b:v" not in twitter
+
+
+def test_identical_encodes_are_deduplicated():
+    outputs = [OutputSpec("tiktok.mp4", 1080, 1920, bitrate="2M", max_duration=180),
+               OutputSpec("reels.mp4", 1080, 1920, bitrate="2M", max_duration=90),
+               OutputSpec("facebook.mp4", 1080, 1920, bitrate="2M", max_duration=60)]
+    encoders, aliases = _unique_outputs(outputs, 45.0)                           # todos cabem: um encoder
+    assert [s.path for s in encoders] == ["tiktok.mp4"]
+    assert aliases == {"reels.mp4": "tiktok.mp4", "facebook.mp4": "tiktok.mp4"}
+    encoders, aliases = _unique_outputs(outputs, 120.0)                          # cortes diferentes
+    assert len(encoders) == 3 and not aliases
+
+
+def _ffmpeg_binary():
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+def test_single_output_transcode_runs_on_real_ffmpeg():
+    ffmpeg = _ffmpeg_binary()
+    if not ffmpeg:
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        src = str(Path(tmp) / "master.mp4")
+        subprocess.run([
+            ffmpeg, "-y", "-v", "error",
+            "-f", "lavfi", "-i", "testsrc=size=64x112:rate=30:duration=1",
+            "-f", "lavfi", "-i", "sine=frequency=440:duration=1",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", src,
+        ], check=True)
+        out = str(Path(tmp) / "tiktok.mp4")
+        cmd = build_transcode_command(src, [OutputSpec(out, 64, 112)], 64, 112, 30, 1.0,
+                                      ffmpeg_bin=ffmpeg, preset="ultrafast")   # um encoder só (sem asplit)
+        assert "[0:a]anull[as0]" in cmd[cmd.index("-filter_complex") + 1]
+        assert cmd[cmd.index("-preset") + 1] == "ultrafast"
+        subprocess.run(cmd, check=True, capture_output=True)
+
+        probe = subprocess.run([ffmpeg, "-i", out], capture_output=True, text=True).stderr
+        assert "Video: h264" in probe and "Audio: aac" in probe
+
+
+if __name__ == "__main__":
+    test_frames_cover_the_whole_duration()
+    test_graph_has_ken_burns_canvas_and_narration_only_audio()
+    test_subtitles_and_music_mix()
+    test_one_composite_split_into_platform_encoders()
+    test_identical_encodes_are_deduplicated()
+    test_single_output_transcode_runs_on_real_ffmpeg()
+    print("✅ Backend FFmpeg OK")
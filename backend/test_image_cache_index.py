@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do índice do cache de imagens
+===================================
+Valida o hit (só imagens existentes), os hits gravados em lote, a listagem
+paginada por último uso, o despejo LRU por espaço e a importação dos JSON antigos.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from image_cache_index import ImageCacheIndex
+
+
+def _images(folder, prefix, count, size=1000):
+    paths = []
+    for i in range(count):
+        p = Path(folder) / f"{prefix}_{i}.png"
+        p.write_bytes(b"\0" * size)
+        paths.append(str(p))
+    return paths
+
+
+def test_hit_touch_is_batched_and_listing_is_paginated():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ImageCacheIndex(Path(tmp) / "index.db", flush_interval=3600)
+        for n in range(5):
+            index.put(f"h{n}", _images(tmp, f"s{n}", 2), provider="openai", style="misterio",
+                      title=f"Roteiro {n}", created_at=1000 + n, last_used=1000 + n)
+
+        Path(tmp, "s0_1.png").unlink()
+        entry = index.get("h0")
+        assert entry["paths"] == [str(Path(tmp, "s0_0.png"))]          # só as existentes
+        assert index.list(limit=1)["caches"][0]["hits"] == 1             # list() grava os pendentes
+
+        page = index.list(limit=2, offset=1)
+        assert page["total"] == 5
+        assert [c["cache_hash"] for c in page["caches"]] == ["h4", "h3"]  # h0 acabou de ser usado
+        assert page["caches"][0]["size_bytes"] == 2000
+        assert "paths" not in page["caches"][0]
+
+        assert index.get("nao_existe") is None
+        assert index.delete("h1", delete_images=True)["deleted_images"] == 2
+        assert not Path(tmp, "s1_0.png").exists()
+
+
+def test_lru_eviction_under_disk_budget():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = ImageCacheIndex(Path(tmp) / "index.db", max_bytes=5000, images_root=tmp,
+                                flush_interval=0)
+        index.put("a", _images(tmp, "a", 2), last_used=1)
+        index.put("b", _images(tmp, "b", 2), last_used=2)
+        index.get("a")                                                    # 'a' passa a ser o mais recente
+        index.put("c", _images(tmp, "c", 2))
+        hashes = {c["cache_hash"] for c in index.list()["caches"]}
+        assert hashes == {"a", "c"}
+        assert not Path(tmp, "b_0.png").exists()
+        assert index.stats()["bytes"] == 4000
+
+
+def test_import_legacy_json_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        images = _images(tmp, "old", 3)
+        legacy = Path(tmp) / "cache_abc123.json"
+        legacy.write_text(json.dumps({
+            "script_hash": "abc123",
+            "script_elements": {"title": "Antigo", "image_provider": "hybrid"},
+            "images": images,
+            "generated_at": "2025-01-01T12:00:00",
+            "last_used": "2025-01-02T12:00:00",
+            "visual_style": "historia",
+        }), encoding="utf-8")
+        index = ImageCacheIndex(Path(tmp) / "index.db")
+        assert index.import_legacy(tmp) == 1
+        assert not legacy.exists()
+        entry = index.get("abc123")
+        assert entry["paths"] == images and entry["script_title"] == "Antigo"
+        assert entry["generated_at"] == "2025-01-01T12:00:00"
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do cache de imagens por prompt
+====================================
+Valida a chave normalizada (prompt/provedor/tamanho/estilo), o hit entre
+roteiros com métricas de hit/miss, a independência do blob em relação ao
+arquivo de trabalho (nos dois sentidos), o despejo LRU, o uso em image_fetcher.fetch_scene_image
+a substituição de imagem que ignora o cache mas grava a nova imagem e a
+imagem do editor semeada sobre um hit do cache sem alterar o blob.
+"""
+
+import argparse
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+import complete_pipeline
+import image_fetcher
+from image_prompt_cache import ImagePromptCache
+
+
+def test_key_normalizes_prompt_but_not_provider_size_style():
+    key = ImagePromptCache.make_key("Ancient  ruins at DUSK, ", "openai", "1024x1792", "cinematic")
+    assert key == ImagePromptCache.make_key("ancient ruins at dusk", "OpenAI", "1024x1792", "cinematic")
+    assert key != ImagePromptCache.make_key("ancient ruins at dusk", "leonardo", "1024x1792", "cinematic")
+    assert key != ImagePromptCache.make_key("ancient ruins at dusk", "openai", "1024x1024", "cinematic")
+    assert key != ImagePromptCache.make_key("ancient ruins at dusk", "openai", "1024x1792", "realistic")
+
+
+def test_hit_across_scripts_with_metrics_and_lru():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImagePromptCache(Path(tmp) / "cache", max_bytes=2500)
+        key = ImagePromptCache.make_key("ruins", "openai", "1024x1792")
+        assert cache.lookup(key, Path(tmp) / "roteiro_a.png", "openai") is None
+
+        work = Path(tmp) / "dalle3_gerada.jpg"
+        work.write_bytes(b"J" * 1000)
+        cache.store_file(key, work, meta={"image_id": "abc"})
+        work.write_bytes(b"X" * 1000)                                       # reescrita no lugar
+        hit = cache.lookup(key, Path(tmp) / "roteiro_b.png", "openai")
+        assert hit["path"].endswith("roteiro_b.jpg") and hit["meta"]["image_id"] == "abc"
+        assert Path(hit["path"]).read_bytes() == b"J" * 1000
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+        assert stats["providers"]["openai"] == {"hits": 1, "misses": 1}
+
+        for name in ("b", "c"):
+            src = Path(tmp) / f"{name}.png"
+            src.write_bytes(b"\0" * 1000)
+            cache.store_file(ImagePromptCache.make_key(name, "openai"), src)
+        assert cache.stats()["entries"] == 2
+        assert cache.lookup(key, Path(tmp) / "again.png") is None          # o mais antigo saiu
+
+
+def test_editing_a_hit_in_place_leaves_the_blob_intact():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImagePromptCache(Path(tmp) / "cache")
+        key = ImagePromptCache.make_key("ruins", "openai")
+        work = Path(tmp) / "gerada.png"
+        work.write_bytes(b"PNG1")
+        cache.store_file(key, work)
+        hit = Path(cache.lookup(key, Path(tmp) / "job" / "scene_01.png")["path"])
+        with open(hit, "r+b") as f:                                         # reescrita no mesmo inode
+            f.write(b"EDIT")
+        assert Path(cache.lookup(key, Path(tmp) / "outro.png")["path"]).read_bytes() == b"PNG1"
+
+
+def test_fetch_scene_image_reuses_prompt_from_other_storyboard(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImagePromptCache(Path(tmp) / "cache")
+        monkeypatch.setattr(image_fetcher, "get_image_prompt_cache", lambda: cache)
+        monkeypatch.setattr(image_fetcher, "openai_generate_image", lambda prompt, api_key, size: b"PNG1")
+
+        first = image_fetcher.fetch_scene_image(1, "castle in fog", str(Path(tmp) / "a"), "openai",
+                                                openai_key="k")
+        monkeypatch.setattr(image_fetcher, "openai_generate_image",
+                            lambda *a, **k: (_ for _ in ()).throw(AssertionError("chamada paga")))
+        second = image_fetcher.fetch_scene_image(3, "Castle in fog.", str(Path(tmp) / "b"), "openai",
+                                                 openai_key="k")
+        assert Path(second).read_bytes() == Path(first).read_bytes() == b"PNG1"
+        assert cache.stats()["hits"] == 1
+
+
+def test_replacement_bypasses_the_cache_and_stores_the_new_image(monkeypatch):
+    image_generator = pytest.importorskip("services.image_generator")
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImagePromptCache(Path(tmp) / "cache")
+        monkeypatch.setattr(image_generator, "get_image_prompt_cache", lambda: cache)
+        generated = iter([b"PNG1", b"PNG2"])
+
+        class FakeAdvanced:
+            async def generate_with_dalle3(self, prompt, style, use_cache):
+                path = Path(tmp) / f"dalle_{len(list(Path(tmp).glob('dalle_*')))}.png"
+                path.write_bytes(next(generated))
+                return str(path)
+
+        service = image_generator.ImageGeneratorService.__new__(image_generator.ImageGeneratorService)
+        service.images_dir = tmp
+        service.vertex_available = service.api_key_available = False
+        service.advanced_service = FakeAdvanced()
+
+        def generate(**kwargs):
+            return asyncio.run(service._generate_single_image("castle", "scene_1", "misterio", "openai", **kwargs))
+
+        assert Path(generate()).read_bytes() == b"PNG1"
+        assert Path(generate()).read_bytes() == b"PNG1"                     # hit do cache
+        assert Path(generate(use_cache=False)).read_bytes() == b"PNG2"      # substituição: imagem nova
+        assert Path(generate()).read_bytes() == b"PNG2"                     # e ela passa a ser o cache
+
+
+def test_seeded_editor_image_does_not_touch_the_cached_blob(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImagePromptCache(Path(tmp) / "cache")
+        monkeypatch.setattr(image_fetcher, "get_image_prompt_cache", lambda: cache)
+        monkeypatch.setattr(image_fetcher, "openai_generate_image", lambda prompt, api_key, size: b"PNG1")
+        image_fetcher.fetch_scene_image(1, "castle in fog", str(Path(tmp) / "a"), "openai", openai_key="k")
+
+        args = argparse.Namespace(work_dir=str(Path(tmp) / "b"), image_provider="openai", openai_key="k",
+                                  google_key=None, leonardo_key="k", eleven_key="k")
+        pipeline = complete_pipeline.CompletePipeline(args)
+        image_fetcher.fetch_scene_image(1, "castle in fog", str(pipeline.images_dir), "openai", openai_key="k")
+        editor = Path(tmp) / "editor.png"
+        editor.write_bytes(b"EDITOR")
+        pipeline.seed_images([str(editor)])
+
+        blob = next((Path(tmp) / "cache").glob("*/*.png"))
+        assert blob.read_bytes() == b"PNG1"
+        assert (pipeline.images_dir / "scene_01.png").read_bytes() == b"EDITOR"
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
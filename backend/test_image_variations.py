@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste das variações locais de imagem
+====================================
+Valida que as variações mantêm a resolução da base, são distintas entre si e
+determinísticas, e que só se chama o provedor para as imagens base.
+"""
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from image_variations import derive_variants, generate_with_local_variants
+
+
+def _base_image(path, w=216, h=384):
+    ys, xs = np.mgrid[0:h, 0:w]
+    img = np.stack([xs * 255 // w, ys * 255 // h, (xs + ys) * 255 // (w + h)], axis=2).astype(np.uint8)
+    cv2.imwrite(str(path), img)
+    return str(path)
+
+
+def test_variants_keep_size_and_differ():
+    with tempfile.TemporaryDirectory() as tmp:
+        src = _base_image(Path(tmp) / "scene_1.png")
+        paths = derive_variants(src, 8, tmp)
+        assert len(paths) == 8
+        imgs = [cv2.imread(p) for p in paths]
+        assert all(img.shape == (384, 216, 3) for img in imgs)
+        base = cv2.imread(src).astype(np.int16)
+        for i, img in enumerate(imgs):
+            assert np.abs(img.astype(np.int16) - base).mean() > 5
+            for other in imgs[i + 1:]:
+                assert np.abs(img.astype(np.int16) - other.astype(np.int16)).mean() > 2
+
+        again = derive_variants(src, 2, tmp, prefix="again")
+        assert np.array_equal(cv2.imread(again[1]), imgs[1])                  # determinístico
+        assert derive_variants(str(Path(tmp) / "nao_existe.png"), 3, tmp) == []
+
+
+def test_provider_is_called_only_for_base_images():
+    with tempfile.TemporaryDirectory() as tmp:
+        calls = []
+
+        async def generate(i, prompt):
+            calls.append(i)
+            return None if i == 1 else _base_image(Path(tmp) / f"scene_{i + 1}.png")
+
+        prompts = ["a", "b", "a, v1", "a, v2", "b, v1", "a, v3"]
+        variant_of = [None, None, 0, 0, 1, 0]
+        results = asyncio.run(generate_with_local_variants(prompts, variant_of, generate, tmp))
+        assert sorted(calls) == [0, 1, 4]                                     # base 'b' falhou: refaz remoto
+        assert [Path(p).name for p in results[2:4]] == ["scene_1_var01.png", "scene_1_var02.png"]
+        assert results[5].endswith("scene_1_var03.png") and results[4].endswith("scene_5.png")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do workspace por job
+==========================
+Valida nomes de mídia únicos no mesmo segundo e temporários isolados por job
+(inclusive em threads concorrentes e em asyncio.to_thread), com limpeza ao sair;
+e o diretório persistente por produção (sobrevive ao job, um job por vez, poda por idade).
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from job_workspace import (current_workspace, job_workspace, media_name, production_dir,
+                           prune_productions, temp_path)
+from progress_events import job_context
+
+
+def test_media_names_do_not_collide_within_a_second():
+    names = {media_name("video_final", ".mp4") for _ in range(200)}
+    assert len(names) == 200
+    assert all(n.startswith("video_final_") and n.endswith(".mp4") for n in names)
+
+
+def test_concurrent_jobs_get_separate_temp_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        seen = {}
+        barrier = threading.Barrier(2)
+
+        def job(job_id):
+            with job_workspace(job_id, root=tmp) as ws:
+                barrier.wait()                                       # os dois jobs ativos ao mesmo tempo
+                path = temp_path("audio", ".m4a")
+                Path(path).write_bytes(job_id.encode())
+                in_thread = asyncio.run(asyncio.to_thread(lambda: current_workspace()))
+                seen[job_id] = (path, Path(path).read_bytes(), in_thread is ws, ws.path.exists())
+
+        threads = [threading.Thread(target=job, args=(j,)) for j in ("job_a", "job_b")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for job_id, (path, content, propagated, existed) in seen.items():
+            assert Path(path).parent == Path(tmp) / job_id and content == job_id.encode()
+            assert propagated and existed
+        assert not any(Path(tmp).iterdir())                          # apagados ao sair
+        assert current_workspace() is None
+
+
+def test_workspace_defaults_to_the_progress_job_and_can_be_kept():
+    with tempfile.TemporaryDirectory() as tmp:
+        with job_context("fila_42"):
+            with job_workspace(root=tmp, keep=True) as ws:
+                assert ws.job_id == "fila_42"
+        assert (Path(tmp) / "fila_42").is_dir()
+
+
+def test_production_dir_persists_and_serializes_jobs():
+    with tempfile.TemporaryDirectory() as tmp:
+        order = []
+
+        def job(name):
+            with production_dir("roteiro/../42", root=tmp) as path:
+                order.append(f"{name}:in")
+                time.sleep(0.05)
+                (path / "images").mkdir(exist_ok=True)
+                order.append(f"{name}:out")
+
+        threads = [threading.Thread(target=job, args=(n,)) for n in ("a", "b")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert [e.split(":")[1] for e in order] == ["in", "out", "in", "out"]
+        kept = list(Path(tmp).iterdir())
+        assert len(kept) == 1 and kept[0].parent == Path(tmp)        # chave saneada, sem sair da raiz
+        assert (kept[0] / "images").is_dir()                           # não é apagado ao sair
+
+
+def test_prune_removes_only_stale_productions():
+    with tempfile.TemporaryDirectory() as tmp:
+        with production_dir("antiga", root=tmp) as old:
+            pass
+        with production_dir("recente", root=tmp):
+            pass
+        stale = time.time() - 30 * 86400
+        os.utime(old, (stale, stale))
+
+        assert prune_productions(14, root=tmp) == 1
+        assert sorted(p.name for p in Path(tmp).iterdir()) == ["recente"]
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do probe de mídia
+=======================
+Valida a duração lida do cabeçalho (WAV, MP3 CBR, MP3 VBR com Xing, tag ID3v2)
+sem decodificar, a memorização por mtime e o probe em lote.
+"""
+
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+import media_probe
+from audio_dsp import write_wav
+from media_probe import audio_duration, probe, probe_many
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, sem padding, estéreo: frame de 417 bytes
+HDR_128K = b"\xff\xfb\x90\x00"
+FRAME_LEN = 144 * 128000 // 44100
+SPF = 1152 / 44100.0
+
+
+def _cbr(frames):
+    return (HDR_128K + b"\0" * (FRAME_LEN - 4)) * frames
+
+
+def _xing(frames):
+    body = b"\0" * 32 + b"Xing" + struct.pack(">II", 0x01, frames)
+    return HDR_128K + body + b"\0" * (FRAME_LEN - 4 - len(body))
+
+
+def test_wav_duration_from_header():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_wav(str(Path(tmp) / "a.wav"), np.zeros((44100 * 3 // 2, 2), dtype=np.float32))
+        info = probe(path, use_ffprobe=False)
+        assert abs(info.duration - 1.5) < 1e-6
+        assert (info.sample_rate, info.channels, info.source) == (44100, 2, "header")
+
+
+def test_mp3_cbr_vbr_and_id3():
+    with tempfile.TemporaryDirectory() as tmp:
+        cbr = Path(tmp) / "cbr.mp3"
+        cbr.write_bytes(_cbr(100))
+        assert abs(audio_duration(str(cbr)) - 100 * FRAME_LEN * 8 / 128000) < 1e-6
+
+        # Xing: conta de frames vale mais que o tamanho (frames de bitrate variável)
+        vbr = Path(tmp) / "vbr.mp3"
+        vbr.write_bytes(_xing(250) + _cbr(20))
+        assert abs(audio_duration(str(vbr)) - 250 * SPF) < 1e-6
+
+        tag = b"ID3\x04\x00\x00" + bytes([0, 0, 0x08, 0x00]) + b"\xff" * 1024  # 1024 bytes synchsafe
+        tagged = Path(tmp) / "tagged.mp3"
+        tagged.write_bytes(tag + _cbr(100) + b"TAG" + b"\0" * 125)
+        assert abs(audio_duration(str(tagged)) - audio_duration(str(cbr))) < 1e-6
+
+
+def test_memo_invalidated_on_change_and_probe_many(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "scene.mp3"
+        path.write_bytes(_cbr(50))
+        first = probe(str(path))
+        assert probe(str(path)) is first                                   # memorizado
+
+        path.write_bytes(_cbr(80))
+        os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10**9))
+        assert probe(str(path)).duration > first.duration
+
+        junk = Path(tmp) / "junk.bin"
+        junk.write_bytes(b"\0" * 64)
+        monkeypatch.setattr(media_probe, "FFPROBE_BIN", str(Path(tmp) / "sem-ffprobe"))  # sem fallback
+        result = probe_many([str(path), str(junk), str(Path(tmp) / "nao_existe.mp3")])
+        assert result[str(path)].duration > 0
+        assert result[str(junk)] is None and result[str(Path(tmp) / "nao_existe.mp3")] is None
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
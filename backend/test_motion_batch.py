@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do lote de motion
+=======================
+Valida a janela de jobs simultâneos, o polling multiplexado e a propagação de falhas.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from motion_batch import MotionBatch
+
+
+class FakeMotionProvider:
+    """Provider falso: cada job fica pronto após `ready_after` consultas."""
+
+    def __init__(self, ready_after=2, fail_image=None):
+        self.ready_after = ready_after
+        self.fail_image = fail_image
+        self.checks = {}
+        self.active = 0
+        self.max_active = 0
+        self.poll_threads = set()
+        self.downloads = []
+        self._lock = threading.Lock()
+
+    def start_job(self, image_path, duration_sec, prompt):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            job_id = f"job-{image_path}"
+            self.checks[job_id] = 0
+        return job_id
+
+    def check_job(self, job_id):
+        self.poll_threads.add(threading.current_thread().name)
+        with self._lock:
+            self.checks[job_id] += 1
+            if self.fail_image and job_id.endswith(self.fail_image):
+                self.active -= 1
+                raise RuntimeError("job falhou")
+            if self.checks[job_id] >= self.ready_after:
+                self.active -= 1
+                return f"https://cdn/{job_id}.mp4"
+        return None
+
+    def download(self, video_url, out_path):
+        self.downloads.append(out_path)
+        return out_path
+
+
+def _batch(provider, **kwargs):
+    return MotionBatch(provider.start_job, provider.check_job, provider.download,
+                       min_interval=0.01, max_interval=0.05, **kwargs)
+
+
+def test_window_is_bounded_and_all_results_download():
+    provider = FakeMotionProvider(ready_after=3)
+    batch = _batch(provider, max_in_flight=3)
+    items = [{"image_path": f"img{i}", "out_path": f"out{i}.mp4", "duration_sec": 5.0}
+             for i in range(8)]
+
+    t0 = time.time()
+    results = batch.run_all(items)
+
+    assert time.time() - t0 < 5
+    assert results == {f"out{i}.mp4": f"out{i}.mp4" for i in range(8)}
+    assert sorted(provider.downloads) == sorted(results)
+    assert provider.max_active == 3
+    assert provider.poll_threads == {"motion-poll"}
+
+
+def test_failed_job_resolves_future_with_error():
+    provider = FakeMotionProvider(ready_after=1, fail_image="img1")
+    batch = _batch(provider, max_in_flight=2)
+    ok = batch.submit("img0", "out0.mp4", 5.0)
+    bad = batch.submit("img1", "out1.mp4", 5.0)
+
+    assert ok.result(timeout=5) == "out0.mp4"
+    try:
+        bad.result(timeout=5)
+    except RuntimeError as e:
+        assert "falhou" in str(e)
+    else:
+        raise AssertionError("erro não propagado")
+
+
+if __name__ == "__main__":
+    test_window_is_bounded_and_all_results_download()
+    test_failed_job_resolves_future_with_error()
+    print("✅ Lote de motion OK")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste da biblioteca de música
+=============================
+Valida o loudness BS.1770, a ingestão (normalização + índice, idempotente),
+a escolha de faixa por duração, o loop/corte do bed (gerado uma vez sob concorrência e
+preservado enquanto recente), a limpeza dos downloads antigos,
+a validação das fontes vindas da API e o cache de falhas do catálogo padrão.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from audio_dsp import SAMPLE_RATE, decode_audio, integrated_loudness, loop_to_length, write_wav
+import music_library
+from music_library import MusicLibrary, check_source, purge_legacy_downloads
+
+
+def _tone(seconds, amplitude=0.5, freq=440.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    mono = (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+    return np.stack([mono, mono], axis=1)
+
+
+def test_loudness_reference_levels():
+    sr = 48000
+    t = np.arange(sr * 3) / sr
+    sine = np.sin(2 * np.pi * 997 * t)
+    # Seno de 1 kHz a 0 dBFS num canal = -3.01 LUFS (BS.1770)
+    assert abs(integrated_loudness(np.stack([sine, 0 * sine], axis=1), sr) + 3.01) < 0.05
+    assert integrated_loudness(np.zeros((sr, 2)), sr) == float("-inf")
+
+
+def test_ingest_normalizes_and_is_idempotent():
+    with tempfile.TemporaryDirectory() as tmp:
+        quiet = write_wav(str(Path(tmp) / "quiet.wav"), _tone(6.0, amplitude=0.05))
+        loud = write_wav(str(Path(tmp) / "loud.wav"), _tone(20.0, amplitude=0.6, freq=220.0))
+        library = MusicLibrary(Path(tmp) / "library", target_lufs=-16.0)
+
+        a = library.ingest(quiet, "chill", mood="relaxing")
+        b = library.ingest(loud, "chill")
+        assert library.ingest(quiet, "chill").id == a.id                 # não re-ingere
+        assert len(library.tracks(category="chill")) == 2
+        for track in (a, b):
+            assert abs(integrated_loudness(decode_audio(track.path), SAMPLE_RATE) + 16.0) < 0.3
+
+        assert library.pick("chill", duration=10.0).id == b.id           # a mais curta que cobre
+        assert library.pick("chill", duration=30.0).id == b.id           # nenhuma cobre: a mais longa
+        assert library.pick("chill", duration=4.0).id == a.id
+        assert library.catalog()["chill"][0]["duration"] in (6.0, 20.0)
+
+
+def test_bed_loops_to_exact_length_and_cache_is_bounded():
+    with tempfile.TemporaryDirectory() as tmp:
+        src = write_wav(str(Path(tmp) / "loop.wav"), _tone(3.0, amplitude=0.3))
+        library = MusicLibrary(Path(tmp) / "library", bed_cache_files=2)
+        track = library.ingest(src, "upbeat")
+
+        bed = library.bed(track, 10.0)
+        assert bed.shape == (10 * SAMPLE_RATE, 2)
+        assert np.abs(bed[-1]).max() < 1e-3                               # fade-out
+        # Emendas com crossfade de potência constante: sem buracos no meio
+        rms = np.sqrt(np.mean(bed[: 8 * SAMPLE_RATE, 0].reshape(-1, SAMPLE_RATE // 10) ** 2, axis=1))
+        assert rms.min() > 0.5 * rms.max()
+
+        old = time.time() - 3600
+        for seconds in (5.0, 6.0):
+            os.utime(library.bed_path(track, seconds), (old, old))
+        library.bed_path(track, 7.0)
+        assert len(list(library.beds_dir.glob("*.wav"))) == 2              # saiu o mais antigo
+        library.bed_path(track, 6.0)                                       # reuso renova o mtime
+        library.bed_path(track, 8.0)
+        assert len(list(library.beds_dir.glob("*.wav"))) == 3              # recentes não são removidos
+
+        short = loop_to_length(_tone(1.0), SAMPLE_RATE // 2, SAMPLE_RATE, fade_out_s=0.0)
+        assert short.shape == (SAMPLE_RATE // 2, 2)
+
+
+def test_concurrent_renders_share_one_bed(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        library = MusicLibrary(Path(tmp) / "library")
+        track = library.ingest(write_wav(str(Path(tmp) / "loop.wav"), _tone(2.0)), "upbeat")
+        real_bed, calls = library.bed, []
+
+        def slow_bed(track, duration):
+            calls.append(duration)
+            time.sleep(0.1)
+            return real_bed(track, duration)
+
+        monkeypatch.setattr(library, "bed", slow_bed)
+        paths, errors = [], []
+
+        def render():
+            try:
+                paths.append(library.bed_path(track, 4.0))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=render) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors and calls == [4.0] and len(set(paths)) == 1
+        assert decode_audio(paths[0]).shape == (4 * SAMPLE_RATE, 2)
+
+
+def test_purge_legacy_downloads():
+    with tempfile.TemporaryDirectory() as tmp:
+        (Path(tmp) / "bg_music_upbeat_20250101_120000.wav").write_bytes(b"\0")
+        (Path(tmp) / "minha_faixa.mp3").write_bytes(b"\0")
+        assert purge_legacy_downloads(tmp) == 1
+        assert [p.name for p in Path(tmp).iterdir()] == ["minha_faixa.mp3"]
+
+
+def test_check_source_allows_only_listed_hosts_and_inbox_files():
+    with tempfile.TemporaryDirectory() as tmp:
+        inbox = Path(tmp) / "inbox"
+        (inbox / "chill").mkdir(parents=True)
+        track = write_wav(str(inbox / "chill" / "a.wav"), _tone(1.0))
+        (Path(tmp) / "secret.wav").write_bytes(b"\0")
+
+        assert check_source("https://www.soundhelix.com/x.mp3", inbox) == "https://www.soundhelix.com/x.mp3"
+        assert check_source("chill/a.wav", inbox) == str(Path(track).resolve())
+        assert check_source(track, inbox) == str(Path(track).resolve())
+        for bad in ("http://169.254.169.254/latest/meta-data", "file:///etc/passwd",
+                    "ftp://www.soundhelix.com/x.mp3", "../secret.wav", str(Path(tmp) / "secret.wav"),
+                    "/etc/passwd", "chill/missing.wav"):
+            with pytest.raises(ValueError):
+                check_source(bad, inbox)
+
+
+def test_redirect_to_unlisted_host_is_refused(monkeypatch):
+    class Redirect:
+        is_redirect = True
+        headers = {"Location": "http://127.0.0.1:5000/admin"}
+
+    calls = []
+    monkeypatch.setattr(music_library.requests, "get", lambda url, **kw: calls.append(url) or Redirect())
+    with tempfile.TemporaryDirectory() as tmp:
+        with pytest.raises(ValueError):
+            music_library._download("https://www.soundhelix.com/x.mp3", str(Path(tmp) / "x.mp3"))
+    assert calls == ["https://www.soundhelix.com/x.mp3"]
+
+
+def test_failed_default_sources_are_not_retried_every_render(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        library = MusicLibrary(Path(tmp) / "library")
+        attempts = []
+
+        def failing_ingest(source, category, mood=None, name=None):
+            attempts.append(source)
+            raise IOError("offline")
+
+        monkeypatch.setattr(library, "ingest", failing_ingest)
+        assert library.ensure_category("upbeat") == []
+        first = len(attempts)
+        assert first == len(music_library.DEFAULT_SOURCES["upbeat"])
+        assert library.ensure_category("upbeat") == []
+        assert len(attempts) == first                                    # dentro do cooldown
+
+        monkeypatch.setattr(music_library, "RETRY_SECONDS", 0.0)
+        library.ensure_category("upbeat")
+        assert len(attempts) == 2 * first
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
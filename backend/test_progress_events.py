@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do barramento de progresso
+================================
+Valida propagação do job por contexto, ETA e pico de progresso por estágio.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from progress_events import ProgressBus, progress_bus, job_context, publish_progress
+
+
+def test_job_context_propagates_to_async_tasks():
+    received = []
+    progress_bus.subscribe(received.append)
+    try:
+        async def scene(i):
+            publish_progress("images", scene=i, percent=50.0)
+
+        async def main():
+            await asyncio.gather(*(scene(i) for i in range(3)))
+
+        with job_context("job-ctx"):
+            asyncio.run(main())
+    finally:
+        progress_bus.unsubscribe(received.append)
+
+    assert len(received) == 3
+    assert {e["job_id"] for e in received} == {"job-ctx"}
+    assert progress_bus.latest("job-ctx")["stage"] == "images"
+    progress_bus.forget("job-ctx")
+
+
+def test_eta_is_estimated_from_stage_elapsed_time():
+    bus = ProgressBus()
+    bus.publish("tts", percent=0.0, job_id="j")
+    bus._stage_started[("j", "tts")] -= 10  # estágio começou há 10s
+    event = bus.publish("tts", percent=25.0, job_id="j")
+    assert 29.0 <= event["eta_seconds"] <= 31.0
+
+
+def test_eta_restarts_with_the_stage_and_is_not_tracked_without_job():
+    bus = ProgressBus()
+    bus.publish("encode", percent=50.0, job_id="j")
+    bus._stage_started[("j", "encode")] -= 600  # encode anterior, há 10 min
+    bus.publish("encode", percent=0.0, job_id="j")  # novo encode do mesmo job
+    bus._stage_started[("j", "encode")] -= 10
+    assert 9.0 <= bus.publish("encode", percent=50.0, job_id="j")["eta_seconds"] <= 11.0
+
+    assert bus.publish("tts", percent=50.0)["eta_seconds"] is None
+    assert all(job_id is not None for job_id, _ in bus._stage_started)
+
+
+def test_stage_progress_keeps_peak_per_stage():
+    bus = ProgressBus()
+    bus.publish("images", percent=50.0, job_id="j")
+    bus.publish("tts", percent=100.0, job_id="j")
+    bus.publish("tts", percent=0.0, job_id="j")  # próxima cena começando
+    bus.publish("images", percent=60.0, job_id="j")
+    assert bus.stage_progress("j") == {"images": 60.0, "tts": 100.0}
+    bus.forget("j")
+    assert bus.stage_progress("j") == {}
+
+
+
+def test_status_only_events_do_not_move_the_stage_peak():
+    bus = ProgressBus()
+    bus.publish("tts", status="started", provider="elevenlabs", job_id="j")
+    bus.publish("tts", status="done", provider="elevenlabs", job_id="j")  # 1ª de N cenas
+    bus.publish("pipeline", scene=1, total=4, percent=25.0, job_id="j")
+    assert bus.stage_progress("j") == {"pipeline": 25.0}
+    assert bus.latest("j")["stage"] == "pipeline"
+
+
+if __name__ == "__main__":
+    test_job_context_propagates_to_async_tasks()
+    test_eta_is_estimated_from_stage_elapsed_time()
+    test_eta_restarts_with_the_stage_and_is_not_tracked_without_job()
+    test_stage_progress_keeps_peak_per_stage()
+    test_status_only_events_do_not_move_the_stage_peak()
+    print("✅ Barramento de progresso OK")
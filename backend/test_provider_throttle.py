@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do throttle global por provider
+=====================================
+Valida o limite de concorrência, o token bucket, a pausa compartilhada e o uso via asyncio.
+"""
+
+import os
+import sys
+import time
+import asyncio
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from provider_throttle import ProviderLimits, ProviderThrottle, ThrottleRegistry
+
+
+def test_concurrency_limit_across_threads():
+    throttle = ProviderThrottle("teste", ProviderLimits(max_concurrent=2, requests_per_minute=6000, burst=10))
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def call(_):
+        with throttle.slot():
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(0.05)
+            with lock:
+                active["now"] -= 1
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(call, range(6)))
+
+    metrics = throttle.metrics()
+    assert active["max"] == 2
+    assert metrics["calls"] == 6 and metrics["in_flight"] == 0
+    assert metrics["max_wait_seconds"] > 0
+
+
+def test_token_bucket_spaces_requests_after_burst():
+    # 2 de rajada, depois 1 a cada 0.1s (600/min)
+    throttle = ProviderThrottle("teste", ProviderLimits(max_concurrent=10, requests_per_minute=600, burst=2))
+    t0 = time.monotonic()
+    for _ in range(4):
+        with throttle.slot():
+            pass
+    elapsed = time.monotonic() - t0
+    assert 0.17 <= elapsed < 0.5
+
+
+def test_pause_blocks_sync_and_async_callers():
+    throttle = ProviderThrottle("teste", ProviderLimits(max_concurrent=4, requests_per_minute=6000, burst=10))
+    throttle.pause(0.2)
+
+    t0 = time.monotonic()
+    with throttle.slot():
+        pass
+    assert time.monotonic() - t0 >= 0.19
+
+    async def main():
+        throttle.pause(0.2)
+        t1 = time.monotonic()
+        async with throttle.slot_async():
+            pass
+        return time.monotonic() - t1
+
+    assert asyncio.run(main()) >= 0.19
+
+
+def test_timeout_and_registry_env_override():
+    throttle = ProviderThrottle("teste", ProviderLimits(max_concurrent=1, requests_per_minute=6000, burst=10))
+    throttle.acquire()
+    try:
+        throttle.acquire(timeout=0.05)
+        assert False, "esperava TimeoutError"
+    except TimeoutError:
+        pass
+    throttle.release()
+
+    os.environ["THROTTLE_FAKEPROVIDER"] = "3,30,2"
+    try:
+        registry = ThrottleRegistry()
+        limits = registry.get("fakeprovider").limits
+        assert (limits.max_concurrent, limits.requests_per_minute, limits.burst) == (3, 30.0, 2)
+        assert registry.get("FakeProvider") is registry.get("fakeprovider")
+        assert "fakeprovider" in registry.metrics()
+    finally:
+        del os.environ["THROTTLE_FAKEPROVIDER"]
+
+
+if __name__ == "__main__":
+    test_concurrency_limit_across_threads()
+    test_token_bucket_spaces_requests_after_burst()
+    test_pause_blocks_sync_and_async_callers()
+    test_timeout_and_registry_env_override()
+    print("✅ Throttle por provider OK")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do governador de render
+=============================
+Valida a admissão por memória/núcleos (render sozinho sempre entra, o segundo
+espera a memória), as threads do encoder vindas do ticket (inclusive em render
+aninhado e em asyncio.to_thread), o limite de ffmpeg abertos (inclusive os
+leitores do MoviePy reservados na admissão), o nice aplicado ao filho depois do
+Popen, as métricas e o prazo do job.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+import render_governor
+from render_governor import (RenderBudget, RenderGovernor, current_ticket, estimate_ffmpeg_processes,
+                             estimate_render_mb, remaining_time, render_deadline, run_process)
+
+
+def _governor(**kwargs) -> RenderGovernor:
+    budget = dict(cores=4, memory_mb=1000, ffmpeg_processes=2, cores_per_render=2, nice=0)
+    budget.update(kwargs)
+    return RenderGovernor(RenderBudget(**budget))
+
+
+def test_memory_estimate_grows_with_resolution_duration_and_workers():
+    full = estimate_render_mb(60, 1080, 1920)
+    assert 500 < full < 1000
+    assert estimate_render_mb(60, 540, 960) < full < estimate_render_mb(180, 1080, 1920)
+    assert estimate_render_mb(60, 1080, 1920, workers=3) > 2 * full
+
+
+def test_second_render_waits_for_memory_and_gets_remaining_cores():
+    governor = _governor()
+    first = governor.acquire(700, label="a")
+    assert first.cores == 2
+
+    with pytest.raises(TimeoutError):
+        governor.acquire(700, label="b", timeout=0.2)              # não cabe na memória restante
+
+    small = governor.acquire(200, cores=8, label="c")              # cabe; só restam 2 núcleos
+    assert small.cores == 2 and governor.encoder_threads(default=3) == 3
+
+    admitted = []
+    waiter = threading.Thread(target=lambda: admitted.append(governor.acquire(700, label="d")))
+    waiter.start()
+    time.sleep(0.1)
+    assert not admitted and governor.metrics()["waiting"] == 1
+    governor.release(first)
+    governor.release(small)
+    waiter.join(timeout=2)
+    assert admitted and admitted[0].cores == 2
+
+
+def test_lone_render_is_admitted_even_above_budget():
+    governor = _governor(memory_mb=500)
+    ticket = governor.acquire(5000, cores=16)
+    assert ticket.cores == 4
+    governor.release(ticket)
+
+
+def test_ticket_threads_propagate_and_nested_renders_reuse_it():
+    governor = _governor()
+
+    async def render():
+        async with governor.admit_async(300, label="outer") as ticket:
+            with governor.admit(300, label="inner") as inner:
+                assert inner is ticket
+            return ticket.threads, await asyncio.to_thread(governor.encoder_threads)
+
+    assert asyncio.run(render()) == (2, 2)
+    assert current_ticket() is None and governor.metrics()["admitted"] == 1
+
+
+def test_ffmpeg_slots_cap_open_processes_and_metrics_report_usage():
+    governor = _governor(ffmpeg_processes=1)
+    order = []
+
+    def run(name):
+        with governor.ffmpeg_slot():
+            order.append(f"{name}+")
+            time.sleep(0.05)
+            order.append(f"{name}-")
+
+    threads = [threading.Thread(target=run, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert order[1].endswith("-") and order[3].endswith("-")         # nunca dois abertos
+
+    with governor.admit(400, label="export"):
+        metrics = governor.metrics()
+    assert metrics["cores"]["used"] == 2 and metrics["memory_mb"]["reserved"] == 400
+    assert metrics["ffmpeg_processes"] == {"open": 0, "budget": 1, "started": 2}
+    assert [r["label"] for r in metrics["renders"]] == ["export"]
+    assert governor.metrics()["renders"] == []
+
+
+def test_moviepy_readers_are_reserved_against_the_ffmpeg_cap():
+    assert estimate_ffmpeg_processes(readers=2) == 4 and estimate_ffmpeg_processes(2, workers=3) == 12
+    governor = _governor(ffmpeg_processes=4)
+    first = governor.acquire(100, label="compose", ffmpeg=estimate_ffmpeg_processes(readers=8))
+    assert first.ffmpeg == 4                                         # limitado ao orçamento
+    with pytest.raises(TimeoutError):
+        governor.acquire(100, label="segments", timeout=0.2, ffmpeg=2)   # sem ffmpeg livre
+    assert governor.acquire(100, label="ffmpeg_only").ffmpeg == 0      # quem não lê com MoviePy entra
+
+    opened, done = [], threading.Event()
+
+    def standalone_ffmpeg():
+        with governor.ffmpeg_slot():
+            opened.append(True)
+            done.wait(2)
+
+    standalone = threading.Thread(target=standalone_ffmpeg)
+    standalone.start()
+    time.sleep(0.1)
+    assert not opened                                                # ffmpeg avulso espera a reserva
+    token = render_governor._current_ticket.set(first)
+    try:
+        with governor.ffmpeg_slot():                                 # o do próprio render usa a reserva
+            assert governor.metrics()["ffmpeg_processes"]["open"] == 4
+    finally:
+        render_governor._current_ticket.reset(token)
+    governor.release(first)
+    time.sleep(0.1)
+    assert opened and governor.metrics()["ffmpeg_processes"]["open"] == 1
+    done.set()
+    standalone.join(timeout=2)
+
+
+@pytest.mark.skipif(not hasattr(os, "setpriority"), reason="sem nice")
+def test_run_process_renices_the_child_after_popen(monkeypatch):
+    monkeypatch.setattr(render_governor, "_governor", _governor(nice=os.getpriority(os.PRIO_PROCESS, 0) + 5))
+    proc = run_process([sys.executable, "-c",
+                        "import os, time; time.sleep(0.3); print(os.getpriority(os.PRIO_PROCESS, 0))"],
+                       capture_output=True, text=True, timeout=10)
+    assert int(proc.stdout) == os.getpriority(os.PRIO_PROCESS, 0) + 5
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_process([sys.executable, "-c", "import time; time.sleep(5)"], timeout=0.2)
+
+
+def test_deadline_bounds_waits_and_admission():
+    assert remaining_time() is None and remaining_time(5) == 5
+    governor = _governor()
+    first = governor.acquire(700, label="a")
+    with render_deadline(10):
+        with render_deadline(0.3):                                   # aninhado: vale o mais curto
+            assert remaining_time(60) <= 0.3
+            t0 = time.monotonic()
+            with pytest.raises(TimeoutError):
+                with governor.admit(700, label="b"):               # sem memória: espera só o prazo
+                    pass
+            assert time.monotonic() - t0 < 1.0
+            time.sleep(0.05)
+            with pytest.raises(TimeoutError):
+                remaining_time()
+        assert remaining_time() > 5
+    governor.release(first)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste da fila persistente de renderização
+=========================================
+Valida idempotência, execução pelos workers, recuperação após restart e o heartbeat
+que impede um segundo processo de re-enfileirar jobs ainda em execução.
+"""
+
+import sqlite3
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from render_job_queue import RenderJobQueue, STATUS_COMPLETED, STATUS_FAILED, STATUS_QUEUED, STATUS_RUNNING
+
+
+def _wait_status(q: RenderJobQueue, job_id: str, status: str, timeout: float = 5.0) -> dict:
+    t0 = time.time()
+    while time.time() - t0 < timeout:
+        job = q.get(job_id)
+        if job and job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job {job_id} não chegou em '{status}': {q.get(job_id)}")
+
+
+def test_submit_is_idempotent_and_runs():
+    with tempfile.TemporaryDirectory() as tmp:
+        q = RenderJobQueue(Path(tmp) / "jobs.db", workers=2)
+        q.register_handler("double", lambda job_id, p: {"value": p["n"] * 2})
+        q.start()
+
+        job_id, created = q.submit("double", {"n": 21}, request_id="abc")
+        again, created_again = q.submit("double", {"n": 21}, request_id="abc")
+        assert created and not created_again
+        assert again == job_id
+
+        job = _wait_status(q, job_id, STATUS_COMPLETED)
+        assert job["result"] == {"value": 42}
+        q.stop(timeout=1)
+
+
+def test_failed_job_records_error():
+    def boom(job_id, payload):
+        raise RuntimeError("falhou")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        q = RenderJobQueue(Path(tmp) / "jobs.db", workers=1)
+        q.register_handler("boom", boom)
+        q.start()
+        job_id, _ = q.submit("boom", {})
+        job = _wait_status(q, job_id, STATUS_FAILED)
+        assert "falhou" in job["error"]
+        q.stop(timeout=1)
+
+
+def test_pending_jobs_are_recovered_on_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "jobs.db"
+        # Primeira instância aceita o job mas "morre" antes de iniciar workers
+        first = RenderJobQueue(db, workers=1)
+        first.register_handler("echo", lambda job_id, p: p)
+        job_id, _ = first.submit("echo", {"ok": True})
+        assert first.get(job_id)["status"] == STATUS_QUEUED
+
+        second = RenderJobQueue(db, workers=1)
+        second.register_handler("echo", lambda job_id, p: p)
+        second.start()
+        job = _wait_status(second, job_id, STATUS_COMPLETED)
+        assert job["result"] == {"ok": True}
+        second.stop(timeout=1)
+
+
+def _mark_running(db: Path, job_id: str, owner: str, heartbeat_at: float):
+    conn = sqlite3.connect(str(db))
+    with conn:
+        conn.execute("UPDATE video_generations SET status = ?, owner = ?, heartbeat_at = ? WHERE id = ?",
+                     (STATUS_RUNNING, owner, heartbeat_at, job_id))
+    conn.close()
+
+
+def test_only_stale_running_jobs_are_recovered():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "jobs.db"
+        first = RenderJobQueue(db, workers=1)
+        first.register_handler("echo", lambda job_id, p: p)
+        live, _ = first.submit("echo", {"n": 1})
+        stale, _ = first.submit("echo", {"n": 2})
+        _mark_running(db, live, "outro-processo", time.time())            # ainda renderizando
+        _mark_running(db, stale, "processo-morto", time.time() - 600)
+
+        second = RenderJobQueue(db, workers=1, stale_seconds=60)
+        second.register_handler("echo", lambda job_id, p: p)
+        second.start()
+        assert _wait_status(second, stale, STATUS_COMPLETED)["result"] == {"n": 2}
+        time.sleep(0.1)
+        assert second.get(live)["status"] == STATUS_RUNNING
+        second.stop(timeout=1)
+
+
+def test_heartbeat_keeps_long_jobs_and_recovers_dead_owners():
+    release = []
+
+    def slow(job_id, payload):
+        while not release:
+            time.sleep(0.01)
+        return {"ok": True}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "jobs.db"
+        q = RenderJobQueue(db, workers=1, heartbeat_seconds=0.05, stale_seconds=0.3)
+        q.register_handler("slow", slow)
+        q.register_handler("echo", lambda job_id, p: p)
+        q.start()
+        job_id, _ = q.submit("slow", {})
+        _wait_status(q, job_id, STATUS_RUNNING)
+        orphan, _ = q.submit("echo", {"orphan": True})
+        _mark_running(db, orphan, "processo-morto", time.time() - 600)  # antes de algum worker pegar
+        time.sleep(0.6)                                                   # > stale_seconds
+        assert q.get(job_id)["status"] == STATUS_RUNNING                 # heartbeat renovado
+        release.append(True)
+        _wait_status(q, job_id, STATUS_COMPLETED)
+        assert _wait_status(q, orphan, STATUS_COMPLETED)["result"] == {"orphan": True}
+        q.stop(timeout=1)
+
+
+if __name__ == "__main__":
+    test_submit_is_idempotent_and_runs()
+    test_failed_job_records_error()
+    test_pending_jobs_are_recovered_on_restart()
+    test_only_stale_running_jobs_are_recovered()
+    test_heartbeat_keeps_long_jobs_and_recovers_dead_owners()
+    print("✅ Fila de renderização OK")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste dos perfis de qualidade de render
+=======================================
+Valida o rascunho derivado do perfil final (metade da resolução, fps baixo,
+ultrafast, sem motion gerada), o padrão/valores desconhecidos, o preset no
+comando do backend ffmpeg (inclusive nas saídas por plataforma) e o
+render_quality repassado pelo run_pipeline.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from PIL import Image
+
+import complete_pipeline
+from ffmpeg_render import (ImageSegment, OutputSpec, RenderTimeline, build_ffmpeg_command,
+                           build_multi_output_command)
+from render_quality import RenderProfile, get_profile
+
+FINAL = RenderProfile("final", 1080, 1920, 30, video_bitrate="8000k", audio_bitrate_k=192)
+
+
+def test_draft_is_derived_from_the_final_profile():
+    draft = get_profile("draft", FINAL)
+    assert (draft.width, draft.height, draft.fps) == (540, 960, 15)
+    assert draft.preset == "ultrafast" and draft.video_bitrate == "1200k" and draft.audio_bitrate == "96k"
+    assert draft.static_motion and draft.is_draft and not FINAL.static_motion
+    assert draft.px(80) == 40 and FINAL.px(80) == 80
+
+    crf_final = RenderProfile("final", 720, 1280, 24, crf=23)
+    crf_draft = get_profile("DRAFT", crf_final)
+    assert (crf_draft.width, crf_draft.height, crf_draft.fps) == (360, 640, 15)
+    assert crf_draft.video_bitrate is None and crf_draft.crf == 30
+
+
+def test_final_and_unknown_qualities_keep_the_final_profile():
+    assert get_profile("final", FINAL) is FINAL
+    assert get_profile("ultra", FINAL) is FINAL
+    assert get_profile(None, FINAL) is FINAL
+
+
+def test_ffmpeg_backend_uses_the_profile_preset():
+    with tempfile.TemporaryDirectory() as tmp:
+        img = Path(tmp) / "scene.png"
+        Image.new("RGB", (540, 960)).save(img)
+        draft = get_profile("draft", FINAL)
+        timeline = RenderTimeline(width=draft.width, height=draft.height, fps=draft.fps, duration=2.0,
+                                  narration_path="narracao.wav", segments=[ImageSegment(str(img), 0.0, 2.0, 1.0, 1.0)])
+        cmd = build_ffmpeg_command(timeline, "draft.mp4", tmp, crf=draft.crf, preset=draft.preset)
+        graph = cmd[cmd.index("-filter_complex") + 1]
+        assert cmd[cmd.index("-preset") + 1] == "ultrafast" and cmd[cmd.index("-crf") + 1] == "30"
+        assert ":d=30:s=540x960:fps=15" in graph
+
+
+def test_platform_fan_out_uses_the_profile_preset():
+    with tempfile.TemporaryDirectory() as tmp:
+        img = Path(tmp) / "scene.png"
+        Image.new("RGB", (540, 960)).save(img)
+        draft = get_profile("draft", FINAL)
+        timeline = RenderTimeline(width=draft.width, height=draft.height, fps=draft.fps, duration=2.0,
+                                  narration_path="narracao.wav", segments=[ImageSegment(str(img), 0.0, 2.0, 1.0, 1.0)])
+        outputs = [OutputSpec("tiktok.mp4", 540, 960), OutputSpec("twitter.mp4", 960, 540)]
+        cmd = build_multi_output_command(timeline, outputs, tmp, crf=draft.crf, preset=draft.preset)
+        assert [cmd[i + 1] for i, arg in enumerate(cmd) if arg == "-preset"] == ["ultrafast", "ultrafast"]
+
+
+def test_run_pipeline_forwards_render_quality(monkeypatch):
+    seen = {}
+    monkeypatch.setattr(complete_pipeline, "render_audio_driven",
+                        lambda storyboard, **kwargs: seen.update(kwargs))
+    with tempfile.TemporaryDirectory() as tmp:
+        storyboard = Path(tmp) / "storyboard.json"
+        storyboard.write_text(json.dumps({"scenes": [{"narration": "oi", "t_start": 0, "t_end": 1}]}))
+        complete_pipeline.run_pipeline(storyboard, Path(tmp) / "work", Path(tmp) / "out.mp4",
+                                       openai_key="k", leonardo_key="k", eleven_key="k",
+                                       render_quality="draft")
+    assert seen["render_quality"] == "draft"
+    assert seen["assets_dir"] == str(Path(tmp) / "work" / "assets")
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do re-render incremental
+==============================
+Valida os sidecars `.src` (scene_fingerprint) e o reaproveitamento de segmentos
+já codificados em render_segments_parallel: só as cenas alteradas são re-renderizadas.
+"""
+
+import sys
+import json
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+import segment_render
+from scene_fingerprint import file_digest, fingerprint, is_fresh, mark_fresh
+
+
+def test_sidecar_tracks_inputs():
+    with tempfile.TemporaryDirectory() as tmp:
+        img = Path(tmp) / "scene_01.png"
+        video = Path(tmp) / "scene_01.mp4"
+        img.write_bytes(b"imagem original")
+        fp = fingerprint(file_digest(str(img)), "slow zoom")
+
+        assert not is_fresh(str(video), fp)                                   # ainda não gerado
+        video.write_bytes(b"motion")
+        assert not is_fresh(str(video), fp)                                   # sem .src
+        mark_fresh(str(video), fp)
+        assert is_fresh(str(video), fp)
+
+        img.write_bytes(b"imagem trocada pelo editor")
+        assert not is_fresh(str(video), fingerprint(file_digest(str(img)), "slow zoom"))
+        assert fingerprint({"a": 1, "b": 2}) == fingerprint({"b": 2, "a": 1})
+
+
+def test_legacy_artifact_is_adopted():
+    with tempfile.TemporaryDirectory() as tmp:
+        audio = Path(tmp) / "scene_01.mp3"
+        audio.write_bytes(b"tts antigo")
+        assert is_fresh(str(audio), "fp", adopt_legacy=True)
+        assert Path(f"{audio}.src").read_text(encoding="utf-8") == "fp"
+        assert not is_fresh(str(audio), "outro", adopt_legacy=True)           # .src já existe
+
+
+def _fake_render(i, out_path):
+    Path(out_path).write_bytes(b"segmento")
+    segment = {"path": out_path, "duration": float(i), "has_audio": True}
+    Path(f"{out_path}.json").write_text(json.dumps(segment), encoding="utf-8")
+    return segment
+
+
+def test_only_changed_segments_are_rendered(monkeypatch):
+    monkeypatch.setattr(segment_render, "ProcessPoolExecutor",
+                        lambda max_workers, mp_context, **kw: ThreadPoolExecutor(max_workers, **kw))
+    rendered = []
+
+    def render(i, out_path):
+        rendered.append(i)
+        return _fake_render(i, out_path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [str(Path(tmp) / f"scene_{i:02d}_aaaa.mp4") for i in (1, 2, 3)]
+        jobs = [(i, p) for i, p in zip((1, 2, 3), paths)]
+        first = segment_render.render_segments_parallel(render, jobs, out_paths=paths)
+        assert sorted(rendered) == [1, 2, 3]
+
+        # Editor troca a cena 2: novo hash -> novo nome de segmento
+        rendered.clear()
+        paths[1] = str(Path(tmp) / "scene_02_bbbb.mp4")
+        jobs[1] = (2, paths[1])
+        segment_render.prune_segments(tmp, keep=paths)
+        second = segment_render.render_segments_parallel(render, jobs, out_paths=paths)
+
+        assert rendered == [2]
+        assert [s["path"] for s in second] == paths
+        assert second[0] == first[0] and second[2] == first[2]
+        assert not Path(tmp, "scene_02_aaaa.mp4").exists()
+        assert not Path(tmp, "scene_02_aaaa.mp4.json").exists()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do grafo de cenas
+=======================
+Valida sobreposição de estágios entre cenas, limites por estágio, falha rápida e prazo do job.
+"""
+
+import sys
+import time
+import threading
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from scene_scheduler import SceneGraph
+from progress_events import job_context, current_job_id
+from render_governor import render_deadline
+
+
+def test_motion_starts_before_later_images_finish():
+    events = []
+    lock = threading.Lock()
+
+    def log(name):
+        with lock:
+            events.append(name)
+
+    def image(i):
+        time.sleep(0.05 * i)  # cenas posteriores demoram mais
+        log(f"image_{i}")
+        return f"img{i}"
+
+    def motion(i, img, dur):
+        log(f"motion_{i}")
+        return (img, dur)
+
+    graph = SceneGraph(stage_limits={"images": 3, "tts": 3, "motion": 3}, progress_stage=None)
+    for i in range(1, 4):
+        graph.add("images", i, lambda i=i: image(i))
+        graph.add("tts", i, lambda i=i: float(i))
+        graph.add("motion", i, lambda img, dur, i=i: motion(i, img, dur),
+                  deps=[("images", i), ("tts", i)])
+
+    t0 = time.time()
+    results = graph.run()
+    elapsed = time.time() - t0
+
+    assert results[("motion", 2)] == ("img2", 2.0)
+    assert events.index("motion_1") < events.index("image_3")
+    # Tempo ~ cadeia mais longa (0.15s), não a soma (0.30s)
+    assert elapsed < 0.28
+
+
+def test_stage_limit_is_respected():
+    active = {"n": 0, "max": 0}
+    lock = threading.Lock()
+
+    def work():
+        with lock:
+            active["n"] += 1
+            active["max"] = max(active["max"], active["n"])
+        time.sleep(0.02)
+        with lock:
+            active["n"] -= 1
+
+    graph = SceneGraph(stage_limits={"motion": 2}, progress_stage=None)
+    for i in range(1, 7):
+        graph.add("motion", i, work)
+    graph.run()
+    assert active["max"] == 2
+
+
+def test_failure_propagates_and_context_is_kept():
+    seen = []
+
+    def boom():
+        seen.append(current_job_id())
+        raise RuntimeError("falhou")
+
+    graph = SceneGraph(progress_stage=None)
+    graph.add("tts", 1, boom)
+    graph.add("motion", 1, lambda dur: dur, deps=[("tts", 1)])
+    try:
+        with job_context("job-dag"):
+            graph.run()
+    except RuntimeError as e:
+        assert "falhou" in str(e)
+    else:
+        raise AssertionError("erro não propagado")
+    assert seen == ["job-dag"]
+
+
+def test_deadline_abandons_stuck_task():
+    release = threading.Event()
+    graph = SceneGraph(progress_stage=None)
+    graph.add("motion", 1, lambda: release.wait(5))                  # poll travado
+    t0 = time.time()
+    try:
+        with render_deadline(0.2):
+            graph.run()
+    except TimeoutError as e:
+        assert "motion" in str(e)
+    else:
+        raise AssertionError("prazo não aplicado")
+    finally:
+        release.set()
+    assert time.time() - t0 < 1.0                                      # não esperou a thread travada
+
+
+if __name__ == "__main__":
+    test_motion_starts_before_later_images_finish()
+    test_stage_limit_is_respected()
+    test_failure_propagates_and_context_is_kept()
+    test_deadline_abandons_stuck_task()
+    print("✅ Grafo de cenas OK")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste da junção de segmentos
+============================
+Valida o plano de cortes (miolos por stream copy + junções re-codificadas; miolo re-codificado
+quando os keyframes do segmento foram forçados com outro crossfade) e a narração com
+acrossfade, registrando os comandos ffmpeg em vez de executá-los; a música entregue ao
+audio_mixer; uma junção real com o binário do ffmpeg (PATH ou o do imageio-ffmpeg, instalado
+com o MoviePy); e a montagem compose (crossfade + mix) com o MoviePy.
+"""
+
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+import audio_dsp
+import segment_render
+from audio_dsp import SAMPLE_RATE, decode_audio, integrated_loudness, write_wav
+
+
+def _record_commands(monkeypatch_target):
+    commands = []
+    concat_lists = []
+
+    def fake_run(cmd):
+        commands.append(cmd)
+        if "concat" in cmd:
+            concat_lists.append(Path(cmd[cmd.index("-i") + 1]).read_text(encoding="utf-8"))
+        Path(cmd[-1]).write_bytes(b"\0")
+
+    def fake_mix(narration_path, out_path, **kwargs):
+        mixes.append(kwargs)
+        Path(out_path).write_bytes(b"\0")
+        return out_path
+
+    mixes = []
+    monkeypatch_target.setattr(segment_render, "_run", fake_run)
+    monkeypatch_target.setattr(segment_render, "mix_to_wav", fake_mix)
+    return commands, concat_lists, mixes
+
+
+def _graph(cmd):
+    return cmd[cmd.index("-filter_complex") + 1]
+
+
+def test_bodies_are_copied_and_only_joints_reencoded(monkeypatch):
+    commands, concat_lists, _ = _record_commands(monkeypatch)
+    segments = [
+        {"path": "s1.mp4", "duration": 4.0, "has_audio": True},
+        {"path": "s2.mp4", "duration": 3.0, "has_audio": False},
+        {"path": "s3.mp4", "duration": 5.0, "has_audio": True},
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        segment_render.join_segments(segments, str(Path(tmp) / "final.mp4"), crossfade_s=0.2, fps=30,
+                                     music_path=None)
+
+    copies = [c for c in commands if Path(c[-1]).name.startswith("body_")]
+    joints = [c for c in commands if "xfade" in " ".join(c)]
+    assert len(copies) == 3 and len(joints) == 2
+    assert copies[0][copies[0].index("-t") + 1] == "3.800"                    # 4.0 - cauda
+    assert copies[1][copies[1].index("-ss") + 1] == "0.200"                    # começa no keyframe forçado
+    assert copies[1][copies[1].index("-t") + 1] == "2.600"                    # 3.0 - cabeça - cauda
+    assert joints[0][joints[0].index("-ss") + 1] == "3.800"
+
+    listing = concat_lists[0]
+    order = [line.split("/")[-1].rstrip("'") for line in listing.splitlines()]
+    assert order == ["body_000.mp4", "joint_000.mp4", "body_001.mp4", "joint_001.mp4", "body_002.mp4"]
+
+    audio = next(c for c in commands if "acrossfade" in " ".join(c))
+    graph = _graph(audio)
+    assert "anullsrc=r=44100:cl=stereo,atrim=0:3.000[a1]" in graph
+    assert graph.count("acrossfade=d=0.200") == 2
+
+
+def test_crossfade_is_clamped_and_music_mixed(monkeypatch):
+    commands, _, mixes = _record_commands(monkeypatch)
+    segments = [
+        {"path": "s1.mp4", "duration": 0.6, "has_audio": True},
+        {"path": "s2.mp4", "duration": 2.0, "has_audio": True},
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        music = Path(tmp) / "music.mp3"
+        music.write_bytes(b"\0")
+        segment_render.join_segments(segments, str(Path(tmp) / "final.mp4"), crossfade_s=0.5, fps=30,
+                                     music_path=str(music), music_volume=0.22)
+
+    audio = next(c for c in commands if "acrossfade" in " ".join(c))
+    graph = _graph(audio)
+    assert "acrossfade=d=0.200" in graph                                       # 0.6 / 3
+    assert "amix" not in graph                                                 # música vai ao audio_mixer
+    assert mixes == [{"duration": 2.4, "music_path": str(music), "music_volume": 0.22}]  # 0.6 + 2.0 - 0.2
+    mux = commands[-1]
+    assert mux[mux.index("-c:a") + 1] == "aac" and mux[mux.index("-c:v") + 1] == "copy"
+
+
+def test_segments_keyed_to_another_crossfade_are_reencoded(monkeypatch):
+    commands, _, _ = _record_commands(monkeypatch)
+    segments = [
+        {"path": "s1.mp4", "duration": 3.0, "has_audio": True, "keyframes_s": 0.2},
+        {"path": "s2.mp4", "duration": 0.3, "has_audio": True, "keyframes_s": 0.2},   # força limite de 0.1
+        {"path": "s3.mp4", "duration": 3.0, "has_audio": True, "keyframes_s": 0.1},
+    ]
+    assert segment_render.clamp_crossfade(0.2, [s["duration"] for s in segments]) == 0.1
+    with tempfile.TemporaryDirectory() as tmp:
+        segment_render.join_segments(segments, str(Path(tmp) / "final.mp4"), crossfade_s=0.2, fps=30)
+
+    bodies = {Path(c[-1]).name: c for c in commands if Path(c[-1]).name.startswith("body_")}
+    assert "libx264" in bodies["body_000.mp4"] and "libx264" in bodies["body_001.mp4"]
+    assert bodies["body_002.mp4"][bodies["body_002.mp4"].index("-c") + 1] == "copy"  # keyframes certos
+    assert bodies["body_002.mp4"][bodies["body_002.mp4"].index("-ss") + 1] == "0.100"
+
+
+def test_write_scene_segment_records_keyframes(monkeypatch):
+    written = {}
+
+    class FakeClip:
+        duration, audio = 3.0, None
+
+        def write_videofile(self, path, **opts):
+            written.update(opts)
+            Path(path).write_bytes(b"\0")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seg = segment_render.write_scene_segment(FakeClip(), str(Path(tmp) / "s.mp4"), fps=30,
+                                                 crossfade_s=0.1, export_opts={})
+        assert segment_render.load_segment(str(Path(tmp) / "s.mp4"))["keyframes_s"] == 0.1
+    params = written["ffmpeg_params"]
+    assert params[params.index("-force_key_frames") + 1] == "0.100,2.900" and seg["keyframes_s"] == 0.1
+
+
+def _ffmpeg_binary():
+    found = shutil.which("ffmpeg")
+    if found:
+        return found
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+
+def test_join_runs_on_real_ffmpeg(monkeypatch):
+    ffmpeg = _ffmpeg_binary()
+    if not ffmpeg:
+        pytest.skip("ffmpeg indisponível")
+    monkeypatch.setattr(segment_render, "FFMPEG_BIN", ffmpeg)
+    monkeypatch.setattr(audio_dsp, "FFMPEG_BIN", ffmpeg)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        segments = []
+        for k, duration in enumerate((1.0, 1.2, 1.0)):
+            path = str(Path(tmp) / f"s{k}.mp4")
+            subprocess.run([
+                ffmpeg, "-y", "-v", "error",
+                "-f", "lavfi", "-i", f"testsrc=size=64x112:rate=30:duration={duration}",
+                "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+                "-force_key_frames", f"0.200,{duration - 0.2:.3f}",
+                "-c:v", "libx264", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path,
+            ], check=True)
+            segments.append({"path": path, "duration": duration, "has_audio": True})
+
+        out = Path(tmp) / "final.mp4"
+        music = write_wav(str(Path(tmp) / "music.wav"), _tone(1.0, freq=220.0))
+        segment_render.join_segments(segments, str(out), crossfade_s=0.2, fps=30, video_bitrate="500k",
+                                     music_path=music)
+
+        probe = subprocess.run([ffmpeg, "-i", str(out)], capture_output=True, text=True).stderr
+        seconds = float(re.search(r"Duration: 00:00:([\d.]+)", probe).group(1))
+        assert abs(seconds - 2.8) < 0.1                                         # 3.2 - 2 * 0.2
+        assert "Video: h264" in probe and "Audio: aac" in probe
+        assert abs(integrated_loudness(decode_audio(str(out)), SAMPLE_RATE) + 14.0) < 1.0   # alvo do mixer
+
+
+def _tone(seconds, amplitude=0.3, freq=440.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    mono = (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+    return np.stack([mono, mono], axis=1)
+
+
+def test_compose_assembly_crossfades_and_mixes_music(monkeypatch):
+    ffmpeg = _ffmpeg_binary()
+    if not ffmpeg:
+        pytest.skip("ffmpeg indisponível")
+    monkeypatch.setattr(audio_dsp, "FFMPEG_BIN", ffmpeg)
+    from moviepy import AudioArrayClip, ColorClip
+    import render_pipeline_audio_driven as rp
+    from job_workspace import job_workspace
+    from render_quality import get_profile
+
+    def fake_scene_clip(i, s, assets_dir, enable_subtitles, profile, images_dir):
+        duration = s["t_end"] - s["t_start"]
+        return (ColorClip((64, 112), color=(40 * i, 0, 0), duration=duration)
+                .with_audio(AudioArrayClip(_tone(duration, amplitude=0.1 * i), fps=SAMPLE_RATE)))
+
+    monkeypatch.setattr(rp, "build_scene_clip", fake_scene_clip)
+    scenes = [{"t_start": 0.0, "t_end": 1.0}, {"t_start": 1.0, "t_end": 2.0}]
+    with tempfile.TemporaryDirectory() as tmp, job_workspace("compose", root=tmp):
+        music = write_wav(str(Path(tmp) / "music.wav"), _tone(0.5, freq=220.0))
+        out = rp._assemble_compose(scenes, tmp, str(Path(tmp) / "final.mp4"), music, False,
+                                   get_profile("draft", rp.FINAL_PROFILE), None, threads=1)
+        audio = decode_audio(out)
+    assert abs(len(audio) / SAMPLE_RATE - (2.0 - rp.CROSSFADE_S)) < 0.1
+    assert abs(integrated_loudness(audio, SAMPLE_RATE) + 14.0) < 1.0           # passou pelo audio_mixer
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
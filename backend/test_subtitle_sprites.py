@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do cache de sprites de legenda
+====================================
+Valida o raster RGBA (recortado ao texto, fundo transparente), o LRU em memória
+e a reutilização do PNG em disco entre instâncias (processos) do cache.
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from subtitle_sprites import SubtitleSpriteCache, normalize_style, rasterize
+
+STYLE = {"font": "Arial-Bold", "fontsize": 48, "color": "white", "stroke_color": "black", "stroke_width": 2}
+
+
+def test_sprite_is_cropped_rgba_with_transparent_background():
+    sprite = rasterize("Uma legenda longa o suficiente para quebrar em duas linhas", normalize_style(STYLE), 400)
+    assert sprite.ndim == 3 and sprite.shape[2] == 4
+    assert sprite.shape[1] <= 400
+    assert sprite[0, 0, 3] == 0                                   # canto transparente
+    assert sprite[..., 3].max() == 255                            # texto opaco
+    one_line = rasterize("Curta", normalize_style(STYLE), 400)
+    assert sprite.shape[0] > one_line.shape[0]                    # quebrou em mais linhas
+
+
+def test_memory_and_disk_reuse():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SubtitleSpriteCache(tmp, memory_items=2)
+        first = cache.get("Olá mundo", STYLE, 900)
+        assert cache.get("Olá mundo", dict(STYLE), 900) is first
+        assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 1
+        assert not first.flags.writeable
+        assert len(list(Path(tmp).rglob("*.png"))) == 1
+
+        cache.get("Olá mundo", STYLE, 600)                            # outra largura -> outro sprite
+        cache.get("Outra frase", STYLE, 900)
+        assert cache.stats()["memory_items"] == 2                     # LRU limitado
+
+        other = SubtitleSpriteCache(tmp)                              # outro processo, mesmo disco
+        again = other.get("Olá mundo", STYLE, 900)
+        assert other.stats()["misses"] == 0
+        assert (again == first).all()
+
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Teste do cache de TTS
+=====================
+Valida a chave por conteúdo, a materialização no destino e o despejo LRU.
+"""
+
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+# Adicionar o diretório backend ao path
+backend_dir = Path(__file__).parent
+sys.path.insert(0, str(backend_dir))
+
+from tts_cache import TTSCache
+
+
+def test_key_ignores_whitespace_but_not_settings():
+    settings = {"stability": 0.35, "similarity_boost": 0.85}
+    a = TTSCache.make_key("Olá   mundo\n", "voz", "modelo", settings, "mp3")
+    b = TTSCache.make_key(" Olá mundo", "voz", "modelo", dict(reversed(list(settings.items()))), "mp3")
+    c = TTSCache.make_key("Olá mundo", "voz", "modelo", {"stability": 0.5}, "mp3")
+    d = TTSCache.make_key("Olá mundo", "voz", "modelo", settings, "wav")
+    assert a == b
+    assert len({a, c, d}) == 3
+
+
+def test_store_then_lookup_materializes_audio():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(Path(tmp) / "cache")
+        key = TTSCache.make_key("narração", "voz")
+        out = Path(tmp) / "assets" / "scene_01.mp3"
+
+        assert not cache.lookup(key, out)
+        cache.store(key, b"ID3-audio", Path(tmp) / "first.mp3")
+        assert cache.lookup(key, out)
+        assert out.read_bytes() == b"ID3-audio"
+        assert cache.stats()["hits"] == 1
+
+
+def test_lru_eviction_respects_size_cap():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TTSCache(Path(tmp) / "cache", max_bytes=25)
+        keys = [TTSCache.make_key(f"cena {i}", "voz") for i in range(3)]
+
+        cache.store(keys[0], b"a" * 10)
+        time.sleep(0.01)
+        cache.store(keys[1], b"b" * 10)
+        time.sleep(0.01)
+        assert cache.get(keys[0]) is not None  # cena 0 passa a ser a mais recente
+        time.sleep(0.01)
+        cache.store(keys[2], b"c" * 10)
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) is not None
+        assert cache.get(keys[2]) is not None
+        assert cache.stats()["bytes"] <= 25
+
+
+if __name__ == "__main__":
+    test_key_ignores_whitespace_but_not_settings()
+    test_store_then_lookup_materializes_audio()
+    test_lru_eviction_respects_size_cap()
+    print("✅ Cache de TTS OK")
@@ -1,6 +1,7 @@
 # /var/www/tiktok-automation/backend/trending_content_system.py
 
 from config_manager import get_config
+from provider_throttle import get_throttle
 import requests
 import json
 import os
@@ -66,8 +67,16 @@ class RateLimiter:
                 f"{api_name} API: {self.limits[api_name]['calls']}/{self.limits[api_name]['max_per_hour']} calls")
 
     def wait_if_needed(self, api_name: str, min_interval: float = 1.0):
-        """Adiciona delay entre requests se necessário"""
-        time.sleep(min_interval)
+        """Espera pelo throttle global da API (token bucket compartilhado pelo processo).
+
+        `min_interval` só vale para APIs sem throttle registrado.
+        """
+        if api_name not in self.limits:
+            time.sleep(min_interval)
+            return
+        throttle = get_throttle(api_name)
+        throttle.acquire()
+        throttle.release()
 
 
 class TrendingContentSystem:
@@ -0,0 +1,196 @@
+# /var/www/tiktok-automation/backend/tts_cache.py
+# -*- coding: utf-8 -*-
+
+"""
+Cache de áudio TTS endereçado por conteúdo.
+
+A chave é o SHA-256 de (texto normalizado, voz, modelo, configurações de voz,
+formato): a mesma narração com a mesma voz nunca é sintetizada (e cobrada)
+duas vezes, seja num retry, num re-render ou numa AI battle.
+
+- Blobs em DATA_DIR/tts_cache/<k[:2]>/<chave>.<formato>
+- Índice SQLite (tamanho, último uso, hits) para LRU
+- Limite de tamanho (TTS_CACHE_MAX_MB); os menos usados são removidos
+- `lookup`/`store` copiam (hardlink quando possível) para o destino pedido
+
+Uso:
+    cache = get_tts_cache()
+    key = TTSCache.make_key(text, voice_id, model_id, settings, "mp3")
+    if not cache.lookup(key, out_path):
+        audio = sintetizar(...)
+        cache.store(key, audio, out_path)
+"""
+
+import os
+import json
+import time
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tts_cache (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    meta TEXT,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tts_cache_last_used ON tts_cache(last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza o texto da narração para a chave (Unicode NFC, espaços colapsados)."""
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class TTSCache:
+    """Cache em disco com índice SQLite e despejo LRU por tamanho."""
+
+    def __init__(self, root: Union[str, Path], max_bytes: int = 1024 * 1024 * 1024):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.root / "index.db"
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # ---------- Chave ----------
+    @staticmethod
+    def make_key(text: str, voice_id: str, model_id: Optional[str] = None,
+                 voice_settings: Optional[Dict[str, Any]] = None, audio_format: str = "mp3") -> str:
+        material = json.dumps({
+            "text": normalize_text(text),
+            "voice_id": voice_id,
+            "model_id": model_id,
+            "voice_settings": voice_settings or {},
+            "format": audio_format,
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, key: str, audio_format: str) -> Path:
+        return self.root / key[:2] / f"{key}.{audio_format}"
+
+    @staticmethod
+    def _place(src: Path, dest: Path):
+        """Hardlink do blob para o destino (cópia se estiver em outro filesystem)."""
+        dest = Path(dest)
+        if dest.exists() and dest.samefile(src):
+            return
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dest)
+
+    # ---------- API pública ----------
+    def get(self, key: str) -> Optional[Path]:
+        """Caminho do blob em cache (atualiza LRU/hits) ou None."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT path FROM tts_cache WHERE key = ?", (key,)).fetchone()
+            if not row:
+                return None
+            path = Path(row["path"])
+            if not path.exists():
+                conn.execute("DELETE FROM tts_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE tts_cache SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                         (time.time(), key))
+        return path
+
+    def lookup(self, key: str, dest: Union[str, Path]) -> bool:
+        """Se a chave estiver em cache, materializa o áudio em `dest` e retorna True."""
+        path = self.get(key)
+        if path is None:
+            return False
+        self._place(path, Path(dest))
+        logger.info(f"♻️ TTS cache hit {key[:12]} -> {dest}")
+        return True
+
+    def store(self, key: str, data: bytes, dest: Optional[Union[str, Path]] = None,
+              meta: Optional[Dict[str, Any]] = None) -> Path:
+        """Grava o áudio no cache (e em `dest`, se informado). Retorna o caminho do blob."""
+        audio_format = (Path(dest).suffix.lstrip(".") if dest else "") or "mp3"
+        blob = self._blob_path(key, audio_format)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        tmp = blob.with_name(f".{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, blob)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO tts_cache (key, path, size, meta, created_at, last_used, hits)
+                   VALUES (?, ?, ?, ?, ?, ?, 0)""",
+                (key, str(blob), len(data), json.dumps(meta or {}, ensure_ascii=False), now, now),
+            )
+        if dest:
+            self._place(blob, Path(dest))
+        self.evict()
+        return blob
+
+    def evict(self):
+        """Remove entradas menos usadas até o total caber em max_bytes."""
+        with self._lock, self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM tts_cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for row in conn.execute("SELECT key, path, size FROM tts_cache ORDER BY last_used").fetchall():
+                if total <= self.max_bytes:
+                    break
+                try:
+                    Path(row["path"]).unlink()
+                except FileNotFoundError:
+                    pass
+                conn.execute("DELETE FROM tts_cache WHERE key = ?", (row["key"],))
+                total -= row["size"]
+                logger.info(f"🧹 TTS cache: removido {row['key'][:12]} (LRU)")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes, COALESCE(SUM(hits), 0) AS hits FROM tts_cache"
+            ).fetchone()
+        return {"entries": row["entries"], "bytes": row["bytes"], "hits": row["hits"],
+                "max_bytes": self.max_bytes}
+
+
+_cache: Optional[TTSCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache() -> TTSCache:
+    """Cache único por processo, em DATA_DIR/tts_cache (limite TTS_CACHE_MAX_MB)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            from config_manager import get_config
+            config = get_config()
+            _cache = TTSCache(config.DATA_DIR / "tts_cache",
+                              max_bytes=config.TTS_CACHE_MAX_MB * 1024 * 1024)
+        return _cache
@@ -23,12 +23,18 @@ Observações:
 
 import os
 import json
-import time
 import math
 import hashlib
-import requests
 from typing import Optional, Dict, Any, List
 
+from elevenlabs_pool import get_tts_pool
+from tts_cache import TTSCache, get_tts_cache
+from segment_render import (PARALLEL_SEGMENTS, clamp_crossfade, join_segments, prune_segments, render_segments_parallel,
+                            write_scene_segment)
+from scene_fingerprint import file_digest, fingerprint, is_fresh, mark_fresh
+from job_workspace import temp_path
+from render_governor import admit_render, estimate_ffmpeg_processes, estimate_render_mb
+
 # Compatibilidade MoviePy 1.x e 2.x
 try:
     from moviepy.editor import (
@@ -72,7 +78,6 @@ EXPORT_OPTS = dict(
     preset="medium",
     bitrate="8000k",
     threads=4,
-    temp_audiofile="temp-audio.m4a",
     remove_temp=True
 )
 
@@ -152,25 +157,23 @@ def elevenlabs_tts(
 
     print(f"🎙️ Gerando TTS ElevenLabs: {len(text)} chars com voz {voice_id}")
     
-    last_err = None
-    for attempt in range(retries + 1):
-        try:
-            r = requests.post(url, headers=headers, json=payload, timeout=timeout)
-            if r.status_code != 200:
-                raise RuntimeError(f"ElevenLabs TTS falhou ({r.status_code}): {r.text[:300]}")
-            os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-            with open(out_path, "wb") as f:
-                f.write(r.content)
-            print(f"✅ TTS salvo: {out_path}")
-            return out_path
-        except Exception as e:
-            last_err = e
-            if attempt < retries:
-                print(f"⚠️ TTS tentativa {attempt + 1} falhou, tentando novamente em {backoff_sec}s...")
-                time.sleep(backoff_sec * (2 ** attempt))
-            else:
-                print(f"❌ TTS falhou após {retries + 1} tentativas: {e}")
-                raise last_err
+    # Mesma narração/voz/config: reaproveita o áudio do cache em vez de sintetizar de novo
+    cache = get_tts_cache()
+    cache_key = TTSCache.make_key(text, voice_id, model_id, payload["voice_settings"], audio_format)
+    if cache.lookup(cache_key, out_path):
+        print(f"♻️ TTS reaproveitado do cache: {out_path}")
+        return out_path
+
+    try:
+        # Sessão keep-alive, limite de concorrência e backoff de 429 compartilhados entre cenas
+        audio = get_tts_pool().post_tts(url, headers, payload, timeout=timeout,
+                                        retries=retries, backoff_sec=backoff_sec)
+    except Exception as e:
+        print(f"❌ TTS falhou após {retries + 1} tentativas: {e}")
+        raise
+    cache.store(cache_key, audio, out_path, meta={"provider": "elevenlabs", "voice_id": voice_id})
+    print(f"✅ TTS salvo: {out_path}")
+    return out_path
 
 # =========================
 # MOVIEPY (MONTAGEM)
@@ -229,18 +232,71 @@ def build_scene_clip(scene_idx: int, scene_meta: Dict[str, Any], assets_dir: str
 
     return v
 
+def render_scene_segment(scene_idx: int, scene_meta: Dict[str, Any], assets_dir: str, out_path: str,
+                         crossfade_s: float = CROSSFADE_S) -> Dict[str, Any]:
+    """Cena (vídeo + áudio) -> segmento intermediário. Roda no pool de processos."""
+    clip = build_scene_clip(scene_idx, scene_meta, assets_dir)
+    try:
+        return write_scene_segment(clip, out_path, fps=FPS, crossfade_s=crossfade_s, export_opts=EXPORT_OPTS)
+    finally:
+        clip.close()
+
+def scene_segment_key(scene_idx: int, scene_meta: Dict[str, Any], assets_dir: str,
+                      crossfade_s: float = CROSSFADE_S) -> str:
+    """Hash das entradas do segmento da cena (vídeo, áudio, duração e parâmetros de export)."""
+    base = os.path.join(assets_dir, f"scene_{scene_idx:02d}")
+    audio = base + ".mp3" if os.path.exists(base + ".mp3") else base + ".wav"
+    style = dict(fps=FPS, size=(TARGET_W, TARGET_H), crossfade=crossfade_s, export=EXPORT_OPTS,
+                 speed_adjust=ALLOW_SPEED_ADJUST)
+    return fingerprint(file_digest(base + ".mp4"), file_digest(audio), _scene_duration(scene_meta), style)
+
+def assemble_video_segments(
+    scenes: List[Dict[str, Any]],
+    assets_dir: str,
+    out_path: str,
+    music_path: Optional[str] = None,
+    crossfade_s: float = CROSSFADE_S
+) -> str:
+    """Montagem paralela: um segmento por cena no pool de processos + junção por stream copy.
+    Segmentos nomeados pelo hash das entradas: só cenas alteradas são re-codificadas."""
+    seg_dir = os.path.join(assets_dir, "segments")
+    # Crossfade já limitado pela menor cena: os keyframes dos segmentos caem nos cortes da junção
+    crossfade_s = clamp_crossfade(crossfade_s, [_scene_duration(s) for s in scenes])
+    out_paths = [os.path.join(seg_dir, f"scene_{i:02d}_{scene_segment_key(i, s, assets_dir, crossfade_s)[:16]}.mp4")
+                 for i, s in enumerate(scenes, start=1)]
+    jobs = [(i, s, assets_dir, seg_path, crossfade_s)
+            for (i, s), seg_path in zip(enumerate(scenes, start=1), out_paths)]
+    prune_segments(seg_dir, keep=out_paths)
+    print(f"🧩 Renderizando {len(jobs)} cenas em paralelo...")
+    segments = render_segments_parallel(render_scene_segment, jobs, out_paths=out_paths)
+    print(f"💾 Unindo segmentos: {out_path}")
+    join_segments(segments, out_path, crossfade_s=crossfade_s, fps=FPS,
+                  music_path=music_path, music_volume=DEFAULT_MUSIC_VOL,
+                  video_bitrate=EXPORT_OPTS["bitrate"], audio_bitrate=EXPORT_OPTS["audio_bitrate"])
+    print(f"✅ Vídeo exportado com sucesso: {out_path}")
+    return out_path
+
 def assemble_video(
     storyboard: Dict[str, Any],
     assets_dir: str,
     out_path: str,
     music_path: Optional[str] = None,
-    crossfade_s: float = CROSSFADE_S
+    crossfade_s: float = CROSSFADE_S,
+    parallel_segments: Optional[bool] = None
 ) -> str:
     """Monta o vídeo final a partir das cenas e storyboard"""
     scenes = storyboard.get("scenes") or storyboard.get("storyboard") or storyboard.get("cenas", [])
     if not scenes:
         raise ValueError("Storyboard sem 'scenes' (ou 'storyboard' ou 'cenas').")
 
+    if PARALLEL_SEGMENTS if parallel_segments is None else parallel_segments:
+        try:
+            return assemble_video_segments(scenes, assets_dir, out_path, music_path, crossfade_s)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            print(f"[WARN] Montagem por segmentos falhou ({e}); usando montagem única")
+
     print(f"🎬 Montando vídeo com {len(scenes)} cenas...")
     
     clips = []
@@ -274,7 +330,13 @@ def assemble_video(
 
     print(f"💾 Exportando vídeo final: {out_path}")
     os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-    final.write_videofile(out_path, **EXPORT_OPTS)
+    # Leitores abertos pelo MoviePy: vídeo + áudio de cada cena e a música
+    readers = 2 * len(clips) + (1 if music_path else 0)
+    with admit_render(estimate_render_mb(final.duration, final.w, final.h),
+                      label=f"export:{os.path.basename(out_path)}",
+                      ffmpeg=estimate_ffmpeg_processes(readers)) as ticket:
+        final.write_videofile(out_path, temp_audiofile=temp_path("audio", ".m4a"),
+                              **dict(EXPORT_OPTS, threads=ticket.threads))
     
     # Cleanup
     for clip in clips:
@@ -297,7 +359,8 @@ def generate_tts_per_scene_if_needed(
     voice_settings: Optional[Dict] = None
 ):
     """
-    Para cada cena, gera TTS da 'narration' se o arquivo de áudio não existir.
+    Para cada cena, gera TTS da 'narration' se o áudio não existir ou se
+    narração/voz/configuração mudaram desde a última geração (sidecar .src).
     - Salva como scene_{i:02d}.mp3 ou .wav
     """
     scenes = storyboard.get("scenes") or storyboard.get("storyboard") or storyboard.get("cenas", [])
@@ -318,30 +381,39 @@ def generate_tts_per_scene_if_needed(
 
     print(f"🎙️ Gerando TTS para {len(scenes)} cenas com voz {voice_id}")
 
+    pending = []
     for i, s in enumerate(scenes, start=1):
         base = f"scene_{i:02d}"
         out_path = os.path.join(assets_dir, f"{base}.{audio_format}")
-        if os.path.exists(out_path):
-            print(f"✅ TTS cena {i} já existe: {out_path}")
-            continue  # cache
-        
         text = (s.get("narration") or s.get("narracao") or "").strip()
         if not text:
-            print(f"⚠️ Cena {i} sem narração — ignorando.")
+            if not os.path.exists(out_path):
+                print(f"⚠️ Cena {i} sem narração — ignorando.")
             continue
-            
-        try:
-            elevenlabs_tts(
-                text=text,
-                voice_id=voice_id,
-                api_key=elevenlabs_api_key,
-                out_path=out_path,
-                audio_format=audio_format,
-                **tts_settings
-            )
-        except Exception as e:
-            print(f"❌ Erro ao gerar TTS para cena {i}: {e}")
+        fp = fingerprint(text, voice_id, tts_settings, audio_format)
+        if is_fresh(out_path, fp, adopt_legacy=True):
+            print(f"✅ TTS cena {i} já existe: {out_path}")
+            continue  # cache
+        pending.append((i, text, out_path, fp))
+
+    # Cenas em paralelo (limite ELEVENLABS_MAX_CONCURRENCY do pool compartilhado)
+    results = get_tts_pool().synthesize_many(
+        lambda job: elevenlabs_tts(
+            text=job[1],
+            voice_id=voice_id,
+            api_key=elevenlabs_api_key,
+            out_path=job[2],
+            audio_format=audio_format,
+            **tts_settings
+        ),
+        pending
+    )
+    for (i, _, out_path, fp), result in zip(pending, results):
+        if isinstance(result, Exception):
+            print(f"❌ Erro ao gerar TTS para cena {i}: {result}")
             # Continua com as outras cenas
+        else:
+            mark_fresh(out_path, fp)
 
 def load_storyboard(storyboard_path_or_dict) -> Dict[str, Any]:
     """Carrega storyboard de arquivo JSON ou dict"""
@@ -1,7 +1,6 @@
 # /var/www/tiktok-automation/backend/services/visual_effects_system.py
 
 import os
-import cv2
 import numpy as np
 import logging
 from typing import Dict, List, Optional, Tuple, Any
@@ -10,16 +9,27 @@ import math
 from dataclasses import dataclass
 from enum import Enum
 import json
-from datetime import datetime
 from config_manager import get_config
+from progress_events import publish_progress, MoviePyProgressLogger
+from ffmpeg_render import (ImageSegment, OutputSpec, RenderTimeline, SubtitleCue, render_timeline,
+                           render_timeline_outputs, transcode_outputs)
+from media_probe import audio_duration
+from render_quality import RenderProfile, get_profile
+from job_workspace import temp_path, unique_token
+from render_governor import aadmit_render, estimate_ffmpeg_processes, estimate_render_mb
+from subtitle_sprites import sprite_clip
+from ken_burns import KenBurns
+from music_library import DEFAULT_CATEGORY as DEFAULT_MUSIC_CATEGORY, get_music_library
+from audio_dsp import SAMPLE_RATE, decode_audio, write_wav
+from audio_mixer import mix as mix_audio
 import asyncio
-import requests
 import moviepy.config as mpy_config
 
 # Importações para processamento visual
 try:
-    from moviepy import VideoFileClip, AudioFileClip, ImageClip, TextClip, CompositeVideoClip, CompositeAudioClip
+    from moviepy import VideoFileClip, VideoClip, AudioFileClip, ImageClip, CompositeVideoClip
     from moviepy.video.tools.subtitles import SubtitlesClip
+    from moviepy.audio.AudioClip import AudioClip, AudioArrayClip
     # from moviepy import effects as vfx  # Removido temporariamente
 except ImportError as e:
     print(f"❌ Erro ao importar MoviePy: {e}")
@@ -186,34 +196,9 @@ class VisualEffectsSystem:
         try:
             logger.info("🎬 Iniciando criação do vídeo...")
 
-            # Verificar e converter audio_path se for URL
-            logger.info(f"🔍 Audio path original: '{audio_path}'")
-            logger.info(f"🔍 MEDIA_DIR: '{config.MEDIA_DIR}'")
-            
-            if audio_path.startswith('/media/'):
-                # Converter URL relativa para caminho absoluto
-                relative_path = audio_path[len('/media/'):]
-                logger.info(f"🔍 Relative path extraído: '{relative_path}'")
-                audio_path = str(config.MEDIA_DIR / relative_path)
-                logger.info(f"🔄 Convertido audio_path para: {audio_path}")
-                
-                # Verificar se arquivo existe
-                if not os.path.exists(audio_path):
-                    logger.error(f"❌ Arquivo de áudio não encontrado: {audio_path}")
-                    return None
-                else:
-                    logger.info(f"✅ Arquivo de áudio encontrado: {audio_path}")
-                    
-            elif audio_path.startswith('http'):
-                # Baixar áudio se for URL completa
-                logger.warning(f"⚠️ Áudio é URL completa, tentando converter: {audio_path}")
-                filename = audio_path.split('/')[-1]
-                local_audio_path = str(config.MEDIA_DIR / 'audio' / filename)
-                if os.path.exists(local_audio_path):
-                    audio_path = local_audio_path
-                else:
-                    logger.error(f"❌ Arquivo de áudio não encontrado: {local_audio_path}")
-                    return None
+            audio_path = self._resolve_audio_path(audio_path)
+            if not audio_path:
+                return None
 
             # Carregar áudio principal
             try:
@@ -233,6 +218,18 @@ class VisualEffectsSystem:
                 logger.error(f"❌ Erro ao carregar arquivo de áudio {audio_path}: {str(e)}")
                 return None
 
+            publish_progress("video", percent=5.0, message="Áudio carregado")
+            profile = self._render_profile(settings)
+            render_backend = str(settings.get('render_backend') or config.RENDER_BACKEND).lower()
+            if render_backend == 'ffmpeg':
+                try:
+                    output_path = await self._create_video_ffmpeg(audio_path, video_duration, images, script, settings)
+                    if output_path:
+                        audio_clip.close()
+                        return output_path
+                except Exception as ffmpeg_error:
+                    logger.warning(f"⚠️ Backend ffmpeg falhou, renderizando com MoviePy: {ffmpeg_error}")
+
             # Criar clipes de imagem com duração sincronizada e efeitos
             logger.info(f"🎬 Processando {len(images)} imagens para duração de {video_duration}s")
             image_clips = self._create_image_clips(images, video_duration, settings)
@@ -244,27 +241,20 @@ class VisualEffectsSystem:
             logger.info(f"✅ {len(image_clips)} clips de imagem criados com sucesso")
 
             # Gerar legendas com transcrição (se habilitado e disponível)
-            subtitle_mode = settings.get('subtitle_mode')  # 'script' | 'transcribe'
-            if subtitle_mode == 'transcribe' and self.transcriber and getattr(self.transcriber, 'transcribe', None):
-                try:
-                    segments = self.transcriber.transcribe(audio_path)
-                except Exception as trans_err:
-                    logger.warning(f"⚠️ Falha na transcrição, caindo para legendas por script: {trans_err}")
-                    segments = None
-                subtitle_clip = await self._create_subtitles(script, video_duration, settings.get('subtitle_style', 'moderno'), segments)
-            else:
-                subtitle_clip = await self._create_subtitles(script, video_duration, settings.get('subtitle_style', 'moderno'))
+            publish_progress("video", percent=15.0, message=f"{len(image_clips)} clipes de imagem criados")
+            segments = self._transcribe_segments(audio_path, settings)
+            subtitle_clips = await self._create_subtitles(script, video_duration, settings.get('subtitle_style', 'moderno'), segments, profile)
 
             # Adicionar música de fundo
+            publish_progress("video", percent=20.0, message="Legendas prontas")
             final_audio = await self._process_audio(audio_clip, video_duration, settings)
+            publish_progress("video", percent=25.0, message="Áudio final mixado")
 
             # Combinar todos os elementos visuais
-            video_clips = image_clips
-            if subtitle_clip:
-                video_clips.append(subtitle_clip)
+            # Sprites de legenda entram direto no composite: só a área do texto é mesclada, e só enquanto ativa
+            video_clips = image_clips + (subtitle_clips or [])
 
-            final_video = CompositeVideoClip(video_clips, size=(
-                config.VIDEO_WIDTH, config.VIDEO_HEIGHT))
+            final_video = CompositeVideoClip(video_clips, size=(profile.width, profile.height))
 
             # Adicionar áudio final
             logger.info(f"🎵 Adicionando áudio ao vídeo - Duração: {final_audio.duration}s")
@@ -272,13 +262,22 @@ class VisualEffectsSystem:
             final_video = final_video.with_duration(video_duration)
 
             # Salvar vídeo
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_filename = f"video_final_{timestamp}.mp4"
+            timestamp = unique_token()
+            output_filename = f"video_{profile.name}_{timestamp}.mp4"
             output_path = self.videos_dir / output_filename
 
-            final_video.write_videofile(
-                str(output_path), fps=config.VIDEO_FPS, codec='libx264', audio_codec='aac')
-
+            encode_logger = MoviePyProgressLogger("encode", str(output_path)) if MoviePyProgressLogger else 'bar'
+            # O encode (onde os frames são gerados) só começa quando cabe no orçamento de render
+            # Leitores do MoviePy: narração e música
+            async with aadmit_render(estimate_render_mb(video_duration, profile.width, profile.height),
+                                     label="create_video", ffmpeg=estimate_ffmpeg_processes(2)) as ticket:
+                final_video.write_videofile(
+                    str(output_path), fps=profile.fps, codec='libx264', audio_codec='aac',
+                    preset=profile.preset, bitrate=profile.video_bitrate,
+                    threads=ticket.threads, logger=encode_logger)
+
+            publish_progress("video", percent=100.0, message="Vídeo exportado",
+                             bytes_written=os.path.getsize(output_path))
             logger.info(f"✅ Vídeo criado com sucesso: {output_path}")
             return str(output_path)
 
@@ -289,15 +288,188 @@ class VisualEffectsSystem:
             logger.error(f"❌ Traceback completo: {traceback.format_exc()}")
             return None
 
-    def _create_image_clips(self, images: List[str], total_duration: float, settings: Optional[Dict[str, Any]] = None) -> List[ImageClip]:
-        """Cria clipes de imagem com duração e transições.
+    def _render_profile(self, settings: Optional[Dict[str, Any]]) -> RenderProfile:
+        """Perfil final (config) ou de rascunho, conforme settings['render_quality'] (ver render_quality)."""
+        final = RenderProfile("final", config.VIDEO_WIDTH, config.VIDEO_HEIGHT, config.VIDEO_FPS,
+                              audio_bitrate_k=config.AUDIO_BITRATE, crf=config.VIDEO_CRF)
+        return get_profile((settings or {}).get('render_quality'), final)
+
+    def _scaled_subtitle_style(self, style: str, profile: RenderProfile) -> Dict[str, Any]:
+        """Estilo de legenda com fonte/contorno na escala do perfil (medidas pensadas para 1080px)."""
+        style_config = dict(self._subtitle_style(style))
+        if profile.scale != 1.0:
+            style_config['fontsize'] = profile.px(style_config.get('fontsize', 56))
+            style_config['stroke_width'] = profile.px(style_config.get('stroke_width', 2))
+        return style_config
+
+    def _resolve_audio_path(self, audio_path: str) -> Optional[str]:
+        """Converte URL de mídia (/media/... ou http) no caminho local do áudio; None se não existir."""
+        logger.info(f"🔍 Audio path original: '{audio_path}'")
+        if audio_path.startswith('/media/'):
+            # Converter URL relativa para caminho absoluto
+            relative_path = audio_path[len('/media/'):]
+            audio_path = str(config.MEDIA_DIR / relative_path)
+            logger.info(f"🔄 Convertido audio_path para: {audio_path}")
+            if not os.path.exists(audio_path):
+                logger.error(f"❌ Arquivo de áudio não encontrado: {audio_path}")
+                return None
+        elif audio_path.startswith('http'):
+            # Baixar áudio se for URL completa
+            logger.warning(f"⚠️ Áudio é URL completa, tentando converter: {audio_path}")
+            filename = audio_path.split('/')[-1]
+            local_audio_path = str(config.MEDIA_DIR / 'audio' / filename)
+            if not os.path.exists(local_audio_path):
+                logger.error(f"❌ Arquivo de áudio não encontrado: {local_audio_path}")
+                return None
+            audio_path = local_audio_path
+        return audio_path
+
+    def platform_output(self, platform: str, path: str, overrides: Optional[Dict[str, Any]] = None) -> OutputSpec:
+        """Saída do encode para a plataforma: PlatformSpecs conhecido, sobrescrito por `overrides`
+        ({resolution, duration_max, bitrate}); plataforma desconhecida usa o tamanho do config."""
+        try:
+            specs = self.platform_specs[Platform(platform)]
+            width, height = specs.resolution
+            bitrate, max_duration = specs.bitrate, specs.max_duration
+        except ValueError:
+            width, height = config.VIDEO_WIDTH, config.VIDEO_HEIGHT
+            bitrate, max_duration = None, None
+        overrides = overrides or {}
+        width, height = overrides.get('resolution', (width, height))
+        return OutputSpec(path=path, width=int(width), height=int(height),
+                          bitrate=overrides.get('bitrate', bitrate),
+                          max_duration=overrides.get('duration_max', max_duration))
+
+    async def create_platform_videos(self, audio_path: str, images: List[str], script: str,
+                                     settings: Dict[str, Any], platforms: List[str]) -> Dict[str, str]:
+        """Um vídeo por plataforma compondo a timeline uma única vez.
+
+        As plataformas só diferem em resolução/bitrate/duração máxima: o composite
+        (imagens, legendas, áudio) é feito uma vez e dividido em um encoder por
+        saída no mesmo processo ffmpeg; saídas com encode idêntico são codificadas
+        uma vez só. `settings['platform_configs']` sobrescreve os PlatformSpecs.
+        Retorna {plataforma: caminho} (vazio se falhar).
+        """
+        audio_path = self._resolve_audio_path(audio_path)
+        if not audio_path or not platforms:
+            return {}
+        overrides = settings.get('platform_configs') or {}
+        timestamp = unique_token()
+        outputs = [self.platform_output(p, str(self.videos_dir / f"video_{p}_{timestamp}.mp4"), overrides.get(p))
+                   for p in platforms]
+
+        profile = self._render_profile(settings)
+        render_backend = str(settings.get('render_backend') or config.RENDER_BACKEND).lower()
+        if render_backend == 'ffmpeg':
+            try:
+                video_duration = audio_duration(audio_path)
+                planned = await self._plan_ffmpeg_timeline(audio_path, video_duration, images, script, settings) \
+                    if video_duration else None
+                if planned:
+                    timeline, mix_path = planned
+                    try:
+                        async with aadmit_render(estimate_render_mb(video_duration, timeline.width, timeline.height),
+                                                 label="platform_videos"):
+                            await asyncio.to_thread(
+                                render_timeline_outputs, timeline, outputs, timeout=config.FFMPEG_TIMEOUT,
+                                crf=profile.crf, audio_bitrate_k=profile.audio_bitrate_k, preset=profile.preset)
+                    finally:
+                        if os.path.exists(mix_path):
+                            os.remove(mix_path)
+                    logger.info(f"✅ {len(outputs)} vídeos de plataforma criados com ffmpeg (um composite)")
+                    return {p: spec.path for p, spec in zip(platforms, outputs)}
+            except Exception as ffmpeg_error:
+                logger.warning(f"⚠️ Backend ffmpeg falhou, renderizando com MoviePy: {ffmpeg_error}")
+
+        # MoviePy: compõe um master e o ffmpeg o decodifica uma vez para todas as saídas
+        master = await self.create_video(audio_path, images, script, {**settings, 'render_backend': 'moviepy'})
+        if not master:
+            return {}
+        try:
+            async with aadmit_render(estimate_render_mb(0.0, profile.width, profile.height),
+                                     label="platform_transcode"):
+                await asyncio.to_thread(
+                    transcode_outputs, master, outputs, profile.width, profile.height, profile.fps,
+                    audio_duration(master) or audio_duration(audio_path) or 0.0, timeout=config.FFMPEG_TIMEOUT,
+                    crf=profile.crf, audio_bitrate_k=profile.audio_bitrate_k, preset=profile.preset)
+        except Exception as e:
+            logger.error(f"❌ Falha ao codificar as saídas por plataforma: {e}")
+            return {}
+        finally:
+            os.remove(master)
+        logger.info(f"✅ {len(outputs)} vídeos de plataforma criados a partir de um único render")
+        return {p: spec.path for p, spec in zip(platforms, outputs)}
+
+    def _transcribe_segments(self, audio_path: str, settings: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Segmentos {start, end, text} da transcrição, se subtitle_mode='transcribe' e disponível."""
+        subtitle_mode = settings.get('subtitle_mode')  # 'script' | 'transcribe'
+        if subtitle_mode == 'transcribe' and self.transcriber and getattr(self.transcriber, 'transcribe', None):
+            try:
+                return self.transcriber.transcribe(audio_path)
+            except Exception as trans_err:
+                logger.warning(f"⚠️ Falha na transcrição, caindo para legendas por script: {trans_err}")
+        return None
+
+    async def _plan_ffmpeg_timeline(self, audio_path: str, video_duration: float, images: List[str], script: str,
+                                    settings: Dict[str, Any]) -> Optional[Tuple[RenderTimeline, str]]:
+        """Timeline do ffmpeg (segmentos, legendas, WAV já mixado). Retorna (timeline, caminho do mix)."""
+        profile = self._render_profile(settings)
+        segments = self._plan_image_timeline(images, video_duration, settings)
+        if not segments:
+            logger.error(f"❌ Nenhuma imagem válida entre {len(images)} imagens")
+            return None
+        publish_progress("video", percent=15.0, message=f"{len(segments)} segmentos de imagem planejados")
+
+        cues = self._plan_subtitles(script, video_duration, self._transcribe_segments(audio_path, settings))
+        publish_progress("video", percent=20.0, message="Legendas prontas")
+        mix_path = temp_path("mix", ".wav")
+        mixed = await asyncio.to_thread(self._mix_audio, audio_path, video_duration, settings)
+        await asyncio.to_thread(write_wav, mix_path, mixed, SAMPLE_RATE)
+        publish_progress("video", percent=25.0, message="Áudio final mixado")
+
+        # Narração + música já mixadas num único WAV: o ffmpeg só codifica
+        timeline = RenderTimeline(
+            width=profile.width, height=profile.height, fps=profile.fps,
+            duration=video_duration, narration_path=mix_path, segments=segments,
+            subtitles=cues, subtitle_style=self._scaled_subtitle_style(settings.get('subtitle_style', 'moderno'), profile),
+        )
+        return timeline, mix_path
+
+    async def _create_video_ffmpeg(self, audio_path: str, video_duration: float, images: List[str], script: str, settings: Dict[str, Any]) -> Optional[str]:
+        """Renderiza a mesma timeline do MoviePy num único filter_complex do ffmpeg."""
+        planned = await self._plan_ffmpeg_timeline(audio_path, video_duration, images, script, settings)
+        if not planned:
+            return None
+        timeline, mix_path = planned
+        profile = self._render_profile(settings)
+
+        timestamp = unique_token()
+        output_path = self.videos_dir / f"video_{profile.name}_{timestamp}.mp4"
+        try:
+            async with aadmit_render(estimate_render_mb(video_duration, profile.width, profile.height),
+                                     label="create_video"):
+                await asyncio.to_thread(
+                    render_timeline, timeline, str(output_path), timeout=config.FFMPEG_TIMEOUT,
+                    crf=profile.crf, audio_bitrate_k=profile.audio_bitrate_k, preset=profile.preset)
+        finally:
+            if os.path.exists(mix_path):
+                os.remove(mix_path)
+
+        publish_progress("video", percent=100.0, message="Vídeo exportado",
+                         bytes_written=os.path.getsize(output_path))
+        logger.info(f"✅ Vídeo criado com ffmpeg: {output_path}")
+        return str(output_path)
+
+    def _plan_image_timeline(self, images: List[str], total_duration: float, settings: Optional[Dict[str, Any]] = None) -> List[ImageSegment]:
+        """Define a timeline de imagens (caminho local, início e duração), comum aos dois backends.
         Regras:
         - Entre 1.5s e 3.0s por imagem (Regra dos 3s), mantendo dinamismo.
         - Repete o conjunto de imagens para preencher todo o áudio, se necessário.
         """
         if not images:
             return []
-        clips = []
+        timeline = []
+        static = self._render_profile(settings).static_motion
 
         # Parâmetros de pacing
         mincut = float(settings.get('min_cut', 1.5)) if settings else 1.5
@@ -335,7 +507,10 @@ class VisualEffectsSystem:
             diff = total_duration - sum(durations)
             durations[-1] = max(0.2, durations[-1] + diff)
 
+        start_time = 0.0
         for i, (original_image_path, duration_per_image) in enumerate(zip(images_sequence, durations)):
+            segment_start = start_time
+            start_time += duration_per_image
             try:
                 logger.info(f"🖼️ Processando imagem {i+1}/{len(images)}: {original_image_path}")
                 
@@ -382,115 +557,98 @@ class VisualEffectsSystem:
                             logger.error(f"❌ Erro ao baixar imagem {original_image_path}: {download_error}")
                             continue
                 
-                # Criar clip da imagem
-                logger.info(f"🎬 Criando ImageClip para CAMINHO FINAL: {image_path}")
+                logger.info(f"📍 Caminho final da imagem: {image_path}")
                 logger.info(f"🔍 Verificando se arquivo existe: {os.path.exists(image_path)}")
                 
                 if not os.path.exists(image_path):
                     logger.error(f"❌ ERRO CRÍTICO: Arquivo não existe no caminho final: {image_path}")
                     continue
                 
-                clip = ImageClip(image_path, duration=duration_per_image)
-                clip = clip.resized(height=getattr(config, 'VIDEO_HEIGHT', 1920)).with_position('center')
-                # Leve movimento para reduzir monotonia (ken-burns leve)
-                try:
-                    start_scale = 1.0
-                    end_scale = 1.05
-                    def zoom_effect(get_frame, t, s0=start_scale, s1=end_scale, dur=duration_per_image):
-                        alpha = min(1.0, max(0.0, t / max(0.001, dur)))
-                        scale = s0 + (s1 - s0) * alpha
-                        frame = get_frame(t)
-                        h, w = frame.shape[0], frame.shape[1]
-                        nh, nw = int(h * scale), int(w * scale)
-                        # padding crop
-                        dy = max(0, (nh - h) // 2)
-                        dx = max(0, (nw - w) // 2)
-                        # Safe crop
-                        zoomed = cv2.resize(frame, (nw, nh))
-                        zoomed = zoomed[dy:dy+h, dx:dx+w]
-                        return zoomed
-                    clip = clip.fl(lambda gf, t: zoom_effect(gf, t))
-                except Exception:
-                    pass
-                clip = clip.with_start(i * duration_per_image)
+                segment = ImageSegment(path=image_path, start=segment_start, duration=duration_per_image)
+                if static:
+                    segment.zoom_end = segment.zoom_start  # rascunho: imagem parada, sem Ken Burns
+                timeline.append(segment)
+            except Exception as e:
+                logger.error(f"❌ Erro ao processar imagem {original_image_path}: {e}")
+                continue
+
+        return timeline
+
+    def _create_image_clips(self, images: List[str], total_duration: float, settings: Optional[Dict[str, Any]] = None) -> List[VideoClip]:
+        """Cria clipes de imagem (MoviePy) a partir da timeline planejada, com ken-burns leve."""
+        clips = []
+        profile = self._render_profile(settings)
+        for i, segment in enumerate(self._plan_image_timeline(images, total_duration, settings)):
+            image_path, duration_per_image = segment.path, segment.duration
+            try:
+                # Leve movimento para reduzir monotonia: imagem escalada uma vez, zoom por crop afim
+                motion = KenBurns(image_path, duration_per_image, height=profile.height,
+                                  zoom_start=segment.zoom_start, zoom_end=segment.zoom_end)
+                clip = motion.clip().with_position('center').with_start(segment.start)
                 clips.append(clip)
                 logger.info(f"✅ Clip {i+1} criado com sucesso - duração: {duration_per_image}s")
             except Exception as e:
-                logger.error(f"❌ Erro ao processar imagem {original_image_path}: {e}")
+                logger.error(f"❌ Erro ao processar imagem {image_path}: {e}")
                 continue
 
         return clips
 
-    async def _create_subtitles(self, script: str, duration: float, style: str = 'moderno', segments: Optional[List[Dict[str, Any]]] = None) -> Optional[CompositeVideoClip]:
-        """Cria legendas.
+    def _plan_subtitles(self, script: str, duration: float, segments: Optional[List[Dict[str, Any]]] = None) -> List[SubtitleCue]:
+        """Define as legendas (início, fim, texto), comuns aos dois backends.
         - Se segments for fornecido, usa {start, end, text} (em segundos) para sincronização precisa.
         - Caso contrário, divide o script uniformemente pelo tempo total.
         """
-        # Esta é uma implementação simplificada. Em um sistema real,
-        # você usaria uma transcrição com timestamps para sincronizar.
+        cues = []
+        if segments:
+            for seg in segments:
+                text = str(seg.get('text', '') or '').strip()
+                if not text:
+                    continue
+                start_time = max(0.0, float(seg.get('start', 0.0)))
+                end_time = min(duration, float(seg.get('end', duration)))
+                if end_time <= start_time:
+                    continue
+                cues.append(SubtitleCue(start=start_time, end=end_time, text=text))
+        else:
+            sentences = [s.strip() for s in script.split('.') if s.strip()]
+            if not sentences:
+                return []
+            time_per_sentence = duration / len(sentences)
+            for i, sentence in enumerate(sentences):
+                start_time = i * time_per_sentence
+                end_time = min((i + 1) * time_per_sentence, duration)
+                cues.append(SubtitleCue(start=start_time, end=end_time, text=sentence))
+        return cues
+
+    def _subtitle_style(self, style: str) -> Dict[str, Any]:
+        # Compat: mapear estilo 'tiktok' para 'moderno'
+        if style == 'tiktok':
+            style = 'moderno'
+        return self.subtitle_styles.get(style, self.subtitle_styles['moderno'])
+
+    async def _create_subtitles(self, script: str, duration: float, style: str = 'moderno', segments: Optional[List[Dict[str, Any]]] = None,
+                                profile: Optional[RenderProfile] = None) -> Optional[List[ImageClip]]:
+        """Cria legendas (sprites RGBA cacheados, ver subtitle_sprites) a partir das legendas planejadas."""
         try:
-            # Compat: mapear estilo 'tiktok' para 'moderno'
-            if style == 'tiktok':
-                style = 'moderno'
-            style_config = self.subtitle_styles.get(style, self.subtitle_styles['moderno'])
+            profile = profile or self._render_profile(None)
+            style_config = self._scaled_subtitle_style(style, profile)
+            cues = self._plan_subtitles(script, duration, segments)
+            if not cues:
+                return None
 
             subtitle_clips = []
-            style_config = self.subtitle_styles.get(style, self.subtitle_styles['moderno'])
-
-            if segments:
-                base_segments = [seg for seg in segments if seg.get('text')]
-                for seg in base_segments:
-                    start_time = max(0.0, float(seg.get('start', 0.0)))
-                    end_time = min(duration, float(seg.get('end', duration)))
-                    if end_time <= start_time:
-                        continue
-                    text = str(seg.get('text', '')).strip()
-                    if not text:
-                        continue
-                    try:
-                        txt_clip = TextClip(
-                            text=text,
-                            font_size=int(style_config.get('fontsize', 56)),
-                            color=str(style_config.get('color', 'white')),
-                            stroke_color=str(style_config.get('stroke_color', 'black')),
-                            stroke_width=int(style_config.get('stroke_width', 2)),
-                            size=(int(config.VIDEO_WIDTH*0.9), None),
-                            font=str(style_config.get('font', 'Arial-Bold')),
-                            method='caption'
-                        )
-                        txt_clip = txt_clip.with_position(('center', 'bottom')).with_start(start_time).with_duration(end_time - start_time)
-                        subtitle_clips.append(txt_clip)
-                    except Exception as subtitle_error:
-                        logger.warning(f"⚠️ Erro ao criar legenda (transcribe) '{text[:30]}...': {subtitle_error}")
-                        continue
-            else:
-                sentences = [s.strip() for s in script.split('.') if s.strip()]
-                if not sentences:
-                    return None
-                time_per_sentence = duration / len(sentences)
-                for i, sentence in enumerate(sentences):
-                    start_time = i * time_per_sentence
-                    end_time = min((i + 1) * time_per_sentence, duration)
-                    try:
-                        txt_clip = TextClip(
-                            text=sentence,
-                            font_size=int(style_config.get('fontsize', 56)),
-                            color=str(style_config.get('color', 'white')),
-                            stroke_color=str(style_config.get('stroke_color', 'black')),
-                            stroke_width=int(style_config.get('stroke_width', 2)),
-                            size=(int(config.VIDEO_WIDTH*0.9), None),
-                            font=str(style_config.get('font', 'Arial-Bold')),
-                            method='caption'
-                        )
-                        txt_clip = txt_clip.with_position(('center', 'bottom')).with_start(start_time).with_duration(end_time - start_time)
-                        subtitle_clips.append(txt_clip)
-                    except Exception as subtitle_error:
-                        logger.warning(f"⚠️ Erro ao criar legenda para frase '{sentence[:30]}...': {subtitle_error}")
-                        continue
+            for cue in cues:
+                try:
+                    txt_clip = sprite_clip(cue.text, cue.start, cue.end - cue.start, style_config,
+                                           width=int(profile.width * 0.9), position=('center', 'bottom'))
+                    subtitle_clips.append(txt_clip)
+                except Exception as subtitle_error:
+                    logger.warning(f"⚠️ Erro ao criar legenda '{cue.text[:30]}...': {subtitle_error}")
+                    continue
 
             if subtitle_clips:
                 logger.info(f"✅ {len(subtitle_clips)} legendas criadas com sucesso")
-                return CompositeVideoClip(subtitle_clips, size=(getattr(config, 'VIDEO_WIDTH', 1080), getattr(config, 'VIDEO_HEIGHT', 1920)))
+                return subtitle_clips
             else:
                 logger.warning("⚠️ Nenhuma legenda foi criada com sucesso")
 
@@ -499,115 +657,60 @@ class VisualEffectsSystem:
 
         return None
 
-    async def _process_audio(self, audio_clip: AudioFileClip, video_duration: float, settings: Optional[Dict[str, Any]] = None) -> AudioFileClip:
-        """Processa o áudio principal e adiciona música de fundo se necessário."""
-        try:
-            background_music = None
-            music_volume = 0.3
-            if settings:
-                background_music = settings.get('background_music', settings.get('background_music_category'))
-                music_volume = float(settings.get('music_volume', 0.3) or 0.3)
-            logger.info(f"🎵 Processando áudio - Categoria música: {background_music}")
-            logger.info(f"🎵 Duração do áudio principal: {audio_clip.duration}s")
-
-            if not background_music or background_music == 'none':
-                logger.info("🎵 Sem música de fundo, retornando áudio principal")
-                return audio_clip.with_duration(video_duration)
-
-            # URLs de música de fundo gratuita
-            music_urls = {
-                'upbeat': 'https://www.soundjay.com/misc/sounds/gaming_music_loop.wav',
-                'chill': 'https://www.soundjay.com/misc/sounds/chill_background.wav',
-                'energetic': 'https://www.soundjay.com/misc/sounds/upbeat_loop.wav',
-                'ambient': 'https://www.soundjay.com/misc/sounds/ambient_music.wav'
-            }
-            
-            # Usar uma música padrão se a categoria não existir
-            music_url = music_urls.get(background_music, music_urls['upbeat'])
-            
-            try:
-                # Baixar música de fundo
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                # Definir extensão por Content-Type ou pela URL
-                def _choose_ext(resp, url):
-                    ct = resp.headers.get('Content-Type', '').lower()
-                    if 'mpeg' in ct or 'mp3' in ct:
-                        return 'mp3'
-                    if 'wav' in ct or url.lower().endswith('.wav'):
-                        return 'wav'
-                    if url.lower().endswith('.mp3'):
-                        return 'mp3'
-                    return 'mp3'
-                
-                import requests
-                response = requests.get(music_url, timeout=30)
-                if response.status_code == 200:
-                    ext = _choose_ext(response, music_url)
-                    music_filename = f"bg_music_{background_music}_{timestamp}.{ext}"
-                    music_path = config.MUSIC_DIR / music_filename
-                
-                    logger.info(f"🎵 Baixando música de fundo de: {music_url}")
-                    with open(music_path, 'wb') as f:
-                        f.write(response.content)
-                    logger.info(f"🎵 Música baixada: {music_path}")
-                    
-                    # Carregar música de fundo com fallback
-                    try:
-                        bg_music = AudioFileClip(str(music_path))
-                    except Exception as load_err:
-                        logger.warning(f"⚠️ Falha ao carregar música {music_path}: {load_err}. Continuando sem música de fundo.")
-                        return audio_clip.with_duration(video_duration)
-                    
-                    try:
-                        # Ajustar volume da música (mais baixo que a voz)
-                        bg_music = bg_music.with_duration(video_duration)
-                        bg_music = bg_music.multiply_volume(music_volume)
-                        
-                        # Misturar áudio principal com música de fundo
-                        final_audio = CompositeAudioClip([
-                            audio_clip.with_duration(video_duration),
-                            bg_music
-                        ])
-                        
-                        logger.info(f"✅ Música de fundo adicionada com sucesso")
-                        return final_audio
-                    except Exception as mix_err:
-                        logger.warning(f"⚠️ Erro ao mixar música de fundo: {mix_err}. Continuando sem música.")
-                        return audio_clip.with_duration(video_duration)
-                    
-                else:
-                    logger.warning(f"⚠️ Erro ao baixar música: {response.status_code}")
-                    return audio_clip.with_duration(video_duration)
-                    
-            except Exception as music_error:
-                logger.warning(f"⚠️ Erro ao processar música de fundo: {music_error}")
-                return audio_clip.with_duration(video_duration)
-                
-        except Exception as e:
-            logger.error(f"❌ Erro no processamento de áudio: {e}")
-            return audio_clip.with_duration(video_duration)
+    def _fetch_background_music(self, settings: Optional[Dict[str, Any]] = None,
+                                duration: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """Música de fundo da biblioteca local, já em loop/corte para a duração. Retorna (caminho, volume) ou None."""
+        background_music = None
+        music_volume = 0.3
+        if settings:
+            background_music = settings.get('background_music', settings.get('background_music_category'))
+            music_volume = float(settings.get('music_volume', 0.3) or 0.3)
+        logger.info(f"🎵 Processando áudio - Categoria música: {background_music}")
+
+        if not background_music or background_music == 'none':
+            logger.info("🎵 Sem música de fundo, retornando áudio principal")
+            return None
 
-    async def _download_background_music(self, url: str, category: str) -> Optional[str]:
-        """Download e cache de música de fundo."""
         try:
-            music_filename = f"bg_music_{category}.mp3"
-            music_path = self.audio_dir / music_filename
+            library = get_music_library()
+            # Aceita o id de uma faixa (catálogo /api/content/music) ou uma categoria
+            track = library.get(background_music) or library.pick(
+                background_music, mood=(settings or {}).get('music_mood'), duration=duration)
+            if not track and background_music != DEFAULT_MUSIC_CATEGORY:
+                # Usar uma música padrão se a categoria não existir
+                track = library.pick(DEFAULT_MUSIC_CATEGORY, duration=duration)
+            if not track:
+                logger.warning(f"⚠️ Nenhuma faixa disponível para '{background_music}'")
+                return None
 
-            if music_path.exists():
-                return str(music_path)
+            music_path = library.bed_path(track, duration) if duration else track.path
+            logger.info(f"🎵 Música da biblioteca: {track.name} ({track.category}) -> {music_path}")
+            return music_path, music_volume
 
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+        except Exception as music_error:
+            logger.warning(f"⚠️ Erro ao processar música de fundo: {music_error}")
+            return None
 
-            with open(music_path, 'wb') as f:
-                f.write(response.content)
+    def _mix_audio(self, audio_path: str, video_duration: float, settings: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Narração + música (ducking, fades, loudness alvo) num único buffer PCM (ver audio_mixer)."""
+        music = self._fetch_background_music(settings, video_duration)
+        music_path, music_volume = music if music else (None, 0.3)
+        narration = decode_audio(audio_path, SAMPLE_RATE)
+        music_samples = decode_audio(music_path, SAMPLE_RATE) if music_path else None
+        return mix_audio(narration, music_samples, SAMPLE_RATE, duration=video_duration,
+                         music_volume=music_volume, target_lufs=config.AUDIO_TARGET_LUFS)
 
-            logger.info(f"✅ Música de fundo baixada: {music_path}")
-            return str(music_path)
+    async def _process_audio(self, audio_clip: AudioFileClip, video_duration: float, settings: Optional[Dict[str, Any]] = None) -> AudioClip:
+        """Processa o áudio principal e adiciona música de fundo se necessário."""
+        try:
+            logger.info(f"🎵 Duração do áudio principal: {audio_clip.duration}s")
+            mixed = await asyncio.to_thread(self._mix_audio, audio_clip.filename, video_duration, settings)
+            logger.info(f"✅ Áudio mixado em memória ({config.AUDIO_TARGET_LUFS} LUFS)")
+            return AudioArrayClip(mixed, fps=SAMPLE_RATE)
 
         except Exception as e:
-            logger.error(f"❌ Erro ao baixar música de fundo: {e}")
-            return None
+            logger.error(f"❌ Erro no processamento de áudio: {e}")
+            return audio_clip.with_duration(video_duration)
 
     def get_available_subtitle_styles(self) -> List[Dict[str, Any]]:
         """Retorna estilos de legenda disponíveis."""